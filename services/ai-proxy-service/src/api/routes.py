@@ -1,62 +1,87 @@
 """API routes for AI proxy service"""
 
-import json
+import asyncio
 import logging
+import os
 import time
 import uuid
-from decimal import Decimal
+from datetime import date, datetime, timezone
 
 from fastapi import APIRouter, Body, HTTPException, status, Request
-from fastapi.responses import StreamingResponse
+from fastapi.responses import PlainTextResponse, StreamingResponse
+
+from shared.pagination import InvalidCursorError
+from shared.serialization import SSE_DONE, ChunkEncoder, FastJSONResponse, sse_event
 
 from ..container import container
-from ..middleware.rate_limit import limiter
+from ..middleware.rate_limit import rate_limit, too_many_requests
 from ..core.exceptions import (
     AIProviderException,
+    InsufficientCreditsException,
     InvalidModelException,
     InvalidRequestException,
+    RateLimitExceededException,
 )
+from ..core.fingerprint import request_fingerprint
 from ..core.models import (
+    ChatChoice,
     ChatCompletionRequest,
+    ChatCompletionResponse,
+    ChatMessage,
     ErrorResponse,
-    BillingMetadata,
     UsageLogEntry,
     UsageQueryResponse,
     ModelPricing,
     ModelPricingListResponse,
     ModelPricingUpdateRequest,
     ModelPricingCreateRequest,
+    PromptTokensDetails,
+    Usage,
 )
+from ..core.constants import RATE_LIMIT_CHAT_PER_MINUTE, RATE_LIMIT_USER_UNITS_PER_MINUTE
 from ..core.metrics import metrics_collector
+from ..services.usage_export import EXPORT_FORMATS, get_export_encoder
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Chat completions are expensive: requests per client, and model-weighted
+# units per user
+CHAT_RATE_LIMIT = f"{os.getenv('RATE_LIMIT_CHAT_PER_MINUTE', RATE_LIMIT_CHAT_PER_MINUTE)}/minute"
+USER_RATE_LIMIT = f"{os.getenv('RATE_LIMIT_USER_UNITS_PER_MINUTE', RATE_LIMIT_USER_UNITS_PER_MINUTE)}/minute"
+
+
+def _estimate_tokens(text_chars: int) -> int:
+    """Rough token count for text of the given length (about 4 characters per token)"""
+    return (text_chars + 3) // 4
+
 
-async def _log_usage_entry(
-    user_id: str,
+def _completion_chunk(
+    completion_id: str,
+    created: int,
     model: str,
-    prompt_tokens: int,
-    completion_tokens: int,
-    total_tokens: int,
-    cost_usd: float,
-    request_id: str,
-) -> None:
-    """Log a usage entry for persistent tracking. Errors are logged but not raised."""
-    try:
-        usage_log = container.get_usage_log()
-        await usage_log.log_usage(
-            user_id=user_id,
-            model=model,
-            prompt_tokens=prompt_tokens,
-            completion_tokens=completion_tokens,
-            total_tokens=total_tokens,
-            cost_usd=cost_usd,
-            request_id=request_id,
-        )
-    except Exception:
-        logger.exception(f"[{request_id}] Failed to log usage")
+    delta: dict,
+    finish_reason: str | None = None,
+    usage: dict | None = None,
+) -> dict:
+    """Build a single OpenAI-compatible chat.completion.chunk"""
+    chunk = {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": created,
+        "model": model,
+        "choices": [
+            {
+                "index": 0,
+                "delta": delta,
+                "finish_reason": finish_reason,
+            }
+        ],
+    }
+    if usage is not None:
+        chunk["usage"] = usage
+    return chunk
 
 
 @router.get("/health", response_model=dict[str, str])
@@ -78,18 +103,54 @@ async def get_metrics():
 
     Note: This endpoint should be secured or restricted to internal networks in production
     """
-    return metrics_collector.get_metrics()
+    metrics = metrics_collector.get_metrics()
+    response_cache = container.get_response_cache()
+    if response_cache is not None:
+        metrics["response_cache"] = response_cache.stats()
+    request_coalescer = container.get_request_coalescer()
+    if request_coalescer is not None:
+        metrics["request_coalescing"] = request_coalescer.stats()
+    metrics["billing_queue"] = container.get_usage_accountant().stats()
+    credits_client = container.get_credits_client()
+    if credits_client is not None:
+        metrics["credits_client"] = credits_client.stats()
+    balance_gate = container.get_balance_gate()
+    if balance_gate is not None:
+        metrics["balance_gate"] = balance_gate.stats()
+    rate_limiter = container.get_rate_limiter()
+    if rate_limiter is not None:
+        metrics["rate_limiter"] = rate_limiter.stats()
+    scheduler = container.get_provider_scheduler()
+    if scheduler is not None:
+        metrics["provider_scheduler"] = scheduler.stats()
+    provider_router = container.get_provider_router()
+    if provider_router is not None:
+        metrics["provider_router"] = provider_router.stats()
+    context_cache = container.get_context_cache()
+    if context_cache is not None:
+        metrics["context_cache"] = context_cache.stats()
+    return metrics
+
+
+@router.get("/metrics/prometheus", response_class=PlainTextResponse)
+async def get_prometheus_metrics():
+    """Request, token and latency metrics in the Prometheus text exposition format"""
+    return PlainTextResponse(
+        metrics_collector.render_prometheus(),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
 
 
 @router.post(
     "/v1/chat/completions",
     responses={
         400: {"model": ErrorResponse, "description": "Invalid request"},
+        402: {"model": ErrorResponse, "description": "Insufficient credits"},
         429: {"description": "Too many requests - rate limit exceeded"},
         500: {"model": ErrorResponse, "description": "Internal server error"},
     },
+    dependencies=[rate_limit(CHAT_RATE_LIMIT)],
 )
-@limiter.limit("30/minute")  # More restrictive limit for AI completions (expensive)
 async def chat_completions(request: Request, body: ChatCompletionRequest = Body(...)):
     """
     OpenAI-compatible chat completions endpoint
@@ -98,7 +159,7 @@ async def chat_completions(request: Request, body: ChatCompletionRequest = Body(
     returning responses in OpenAI format (streaming or non-streaming).
 
     Args:
-        request: HTTP request (for rate limiting)
+        request: HTTP request
         body: Chat completion request body
 
     Returns:
@@ -106,11 +167,17 @@ async def chat_completions(request: Request, body: ChatCompletionRequest = Body(
 
     Raises:
         400: Invalid request
-        429: Rate limit exceeded
+        402: Insufficient credits for the estimated cost
+        429: Rate limit exceeded (per client, or the user's weighted budget)
         500: Internal server error
     """
     start_time = time.time()
     request_id = f"req-{uuid.uuid4().hex[:12]}"
+    user_id = body.user_id or "anonymous"
+    reservation = None
+    # Set once the hold belongs to the stream or to the recorded completion;
+    # until then every way out of this handler releases it
+    reservation_handed_off = False
 
     try:
         logger.info(
@@ -122,94 +189,174 @@ async def chat_completions(request: Request, body: ChatCompletionRequest = Body(
         if not body.messages:
             raise InvalidRequestException("At least one message is required")
 
+        # Spend the user's budget in proportion to the model's cost
+        rate_limiter = container.get_rate_limiter()
+        if rate_limiter is not None:
+            await rate_limiter.hit(USER_RATE_LIMIT, "user", user_id, cost=rate_limiter.model_weight(body.model))
+
         # Get services from container
         gemini_client = container.get_gemini_client()
-        billing_service = container.get_billing_service()
+        accountant = container.get_usage_accountant()
+
+        temperature = body.temperature if body.temperature is not None else 0.7
+
+        response_cache = container.get_response_cache()
+        request_coalescer = container.get_request_coalescer()
+        fingerprint = None
+        if response_cache is not None or request_coalescer is not None:
+            fingerprint = request_fingerprint(body.model, body.messages, temperature, body.max_tokens)
+
+        # Serve deterministic (or opted-in) repeats from the response cache
+        cache_key = None
+        cached_response = None
+        if response_cache is not None and response_cache.is_eligible(temperature, body.cache):
+            cache_key = fingerprint
+            cached_response = response_cache.get(cache_key)
+
+        prompt_estimate = _estimate_tokens(sum(len(m.content) for m in body.messages))
+        scheduler = container.get_provider_scheduler()
+        scheduled_tokens = 0
+        if scheduler is not None:
+            scheduled_tokens = prompt_estimate + (body.max_tokens or scheduler.default_completion_tokens)
+
+        # Hold the estimated cost before paying for a provider call
+        balance_gate = container.get_balance_gate()
+        if balance_gate is not None and cached_response is None:
+            estimated_cost = container.get_billing_service().calculate_cost(
+                model=body.model,
+                prompt_tokens=prompt_estimate,
+                completion_tokens=body.max_tokens or balance_gate.default_completion_tokens,
+            )
+            reservation = await balance_gate.reserve(user_id, estimated_cost, request_id)
 
         # Return streaming or non-streaming response based on request
         if body.stream:
-            # Use real streaming for streaming requests
+            if cached_response is not None:
+                logger.info(f"[{request_id}] Replaying streaming completion from cache")
+                return StreamingResponse(
+                    _stream_cached_response(
+                        cached_response=cached_response,
+                        accountant=accountant,
+                        bill=response_cache.bill_hits,
+                        user_id=user_id,
+                        request_id=request_id,
+                        start_time=start_time,
+                    ),
+                    media_type="text/event-stream",
+                )
+
+            # Use real streaming for streaming requests; the stream settles
+            # or releases the hold itself
+            reservation_handed_off = True
             return StreamingResponse(
                 _stream_real_response(
                     gemini_client=gemini_client,
-                    billing_service=billing_service,
+                    accountant=accountant,
                     messages=body.messages,
                     model=body.model,
-                    temperature=body.temperature if body.temperature is not None else 0.7,
+                    temperature=temperature,
                     max_tokens=body.max_tokens,
-                    user_id=body.user_id or "anonymous",
+                    user_id=user_id,
                     request_id=request_id,
+                    response_cache=response_cache if cache_key else None,
+                    cache_key=cache_key,
+                    request_coalescer=request_coalescer,
+                    flight_key=fingerprint,
+                    start_time=start_time,
+                    reservation_key=reservation,
+                    scheduler=scheduler,
+                    scheduled_tokens=scheduled_tokens,
                 ),
                 media_type="text/event-stream",
             )
-        else:
-            # Generate completion using Gemini (non-streaming)
-            response = await gemini_client.generate_completion(
-                messages=body.messages,
-                model=body.model,
-                temperature=body.temperature if body.temperature is not None else 0.7,
-                max_tokens=body.max_tokens,
-            )
-
-            # Calculate cost
-            cost = billing_service.calculate_cost(
-                model=body.model,
-                prompt_tokens=response.usage.prompt_tokens,
-                completion_tokens=response.usage.completion_tokens,
-            )
-
-            # Create billing metadata
-            billing_metadata = BillingMetadata(
-                user_id=body.user_id or "anonymous",
-                model=body.model,
-                prompt_tokens=response.usage.prompt_tokens,
-                completion_tokens=response.usage.completion_tokens,
-                total_tokens=response.usage.total_tokens,
-                estimated_cost_usd=Decimal(str(cost)),
-                request_id=request_id,
-            )
-
-            # Log billing (Phase 1: just logging)
-            await billing_service.log_billing(billing_metadata)
-
-            # Log usage for persistent tracking
-            await _log_usage_entry(
-                user_id=body.user_id or "anonymous",
-                model=body.model,
-                prompt_tokens=response.usage.prompt_tokens,
-                completion_tokens=response.usage.completion_tokens,
-                total_tokens=response.usage.total_tokens,
-                cost_usd=float(cost),
-                request_id=request_id,
-            )
 
-            logger.info(f"[{request_id}] Chat completion successful")
+        coalesced = False
+        bill = True
+        provider_time = 0.0
+        if cached_response is not None:
+            logger.info(f"[{request_id}] Chat completion served from cache")
+            response = cached_response
+            bill = response_cache.bill_hits
+        else:
+            # Generate completion using Gemini (non-streaming); identical
+            # in-flight requests share one provider call when coalescing is on,
+            # and only that call is counted against the provider quota
+            async def generate():
+                admission = None
+                if scheduler is not None:
+                    admission = await scheduler.admit(body.model, user_id, scheduled_tokens)
+                completion = await gemini_client.generate_completion(
+                    messages=body.messages,
+                    model=body.model,
+                    temperature=temperature,
+                    max_tokens=body.max_tokens,
+                )
+                if admission is not None:
+                    scheduler.settle(admission, completion.usage.total_tokens)
+                return completion
+
+            provider_start = time.time()
+            if request_coalescer is not None:
+                response, coalesced = await request_coalescer.run(fingerprint, generate)
+            else:
+                response = await generate()
+            provider_time = time.time() - provider_start
+
+            if coalesced:
+                logger.info(f"[{request_id}] Chat completion shared from an in-flight request")
+                bill = request_coalescer.bill_shared
+            elif cache_key is not None:
+                response_cache.put(cache_key, response)
+
+        logger.info(f"[{request_id}] Chat completion successful")
+
+        # Record metrics now; usage log and billing run in the background
+        accountant.record_completion(
+            user_id=user_id,
+            model=body.model,
+            prompt_tokens=response.usage.prompt_tokens,
+            completion_tokens=response.usage.completion_tokens,
+            total_tokens=response.usage.total_tokens,
+            request_id=request_id,
+            response_time=time.time() - start_time,
+            bill=bill,
+            cache_hit=cached_response is not None,
+            coalesced=coalesced,
+            provider_time=provider_time,
+            reservation_key=reservation,
+            cached_tokens=response.usage.cached_tokens,
+        )
+        reservation_handed_off = True
 
-            # Record metrics
-            response_time = time.time() - start_time
-            metrics_collector.record_request(
-                model=body.model,
-                success=True,
-                prompt_tokens=response.usage.prompt_tokens,
-                completion_tokens=response.usage.completion_tokens,
-                cost_usd=float(cost),
-                response_time=response_time,
-            )
+        # Pydantic's own serializer, skipping FastAPI's jsonable_encoder pass
+        return FastJSONResponse(response.model_dump(mode="json"))
 
-            return response
+    except RateLimitExceededException as e:
+        logger.info(f"[{request_id}] Rate limited: {e}")
+        metrics_collector.record_request(model=body.model, success=False, status="rate_limited")
+        raise too_many_requests(e)
+    except InsufficientCreditsException as e:
+        logger.info(f"[{request_id}] Rejected before dispatch: {e}")
+        metrics_collector.record_request(model=body.model, success=False, status="insufficient_credits")
+        raise HTTPException(status_code=status.HTTP_402_PAYMENT_REQUIRED, detail=str(e))
 
     except InvalidRequestException as e:
         logger.warning(f"[{request_id}] Invalid request: {e}")
-        metrics_collector.record_request(model=body.model, success=False)
+        metrics_collector.record_request(model=body.model, success=False, status="invalid_request")
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except InvalidModelException as e:
         logger.warning(f"[{request_id}] Invalid model: {e}")
-        metrics_collector.record_request(model=body.model, success=False)
+        metrics_collector.record_request(model=body.model, success=False, status="invalid_model")
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except AIProviderException:
         # Log full error details internally
         logger.exception(f"[{request_id}] AI provider error")
-        metrics_collector.record_request(model=body.model, success=False)
+        metrics_collector.record_request(
+            model=body.model,
+            success=False,
+            status="provider_error",
+            response_time=time.time() - start_time,
+        )
         # Return generic error to client (no internal details)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -218,128 +365,331 @@ async def chat_completions(request: Request, body: ChatCompletionRequest = Body(
     except Exception:
         # Log full error details internally
         logger.exception(f"[{request_id}] Unexpected error processing chat completion")
-        metrics_collector.record_request(model=body.model, success=False)
+        metrics_collector.record_request(
+            model=body.model,
+            success=False,
+            response_time=time.time() - start_time,
+        )
         # Return generic error to client (no internal details)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Internal server error - please try again later",
         )
+    finally:
+        # Also runs for 429/402/400 and client disconnects (CancelledError)
+        if not reservation_handed_off:
+            container.get_usage_accountant().release_reservation(user_id, reservation)
 
 
 async def _stream_real_response(
     gemini_client,
-    billing_service,
+    accountant,
     messages,
     model,
     temperature,
     max_tokens,
     user_id,
     request_id,
+    response_cache=None,
+    cache_key=None,
+    request_coalescer=None,
+    flight_key=None,
+    start_time=None,
+    reservation_key=None,
+    scheduler=None,
+    scheduled_tokens=0,
 ):
     """
     Stream responses from Gemini in real-time with OpenAI-compatible format
 
     This function streams tokens as they arrive from Gemini, providing
-    true streaming behavior for better UX on long responses.
+    true streaming behavior for better UX on long responses. When a cache
+    key is given, the completed response is stored for later replay. With
+    a coalescer, identical concurrent streams share one upstream stream.
+
+    The stream is accounted for however it ends: completed streams with the
+    provider's usage, streams the client abandons with whatever usage was
+    seen so far (estimated from the text already sent if the final usage
+    chunk never arrived), and failed streams as errors. A credits hold
+    placed for the request is settled by the charge, or released when the
+    stream fails. With a scheduler, the upstream stream waits for room in
+    the model's provider quota before it starts.
     """
+    start_time = start_time or time.time()
     prompt_tokens = 0
     completion_tokens = 0
     total_tokens = 0
-
-    try:
-        # Stream chunks from Gemini
-        async for chunk in gemini_client.generate_completion_stream(
+    cached_tokens = 0
+    completion_chars = 0
+    content_parts: list[str] = []
+    coalesced = False
+    first_chunk_at = None
+    encoder = ChunkEncoder()
+    provider_start = time.time()
+    provider_done_at = None
+    outcome = "error"
+    error_status = "provider_error"
+
+    def open_stream():
+        chunks = gemini_client.generate_completion_stream(
             messages=messages,
             model=model,
             temperature=temperature,
             max_tokens=max_tokens,
-        ):
+        )
+        if scheduler is None:
+            return chunks
+        return scheduler.stream(model, user_id, scheduled_tokens, chunks)
+
+    try:
+        if request_coalescer is not None and flight_key is not None:
+            chunks, coalesced = request_coalescer.stream(flight_key, open_stream)
+        else:
+            chunks = open_stream()
+
+        # Stream chunks from Gemini
+        provider_start = time.time()
+        async for chunk in chunks:
             # Extract usage data from final chunk for billing
             if "usage" in chunk:
                 prompt_tokens = chunk["usage"]["prompt_tokens"]
                 completion_tokens = chunk["usage"]["completion_tokens"]
                 total_tokens = chunk["usage"]["total_tokens"]
+                cached_tokens = (chunk["usage"].get("prompt_tokens_details") or {}).get("cached_tokens", 0)
+            else:
+                content = chunk["choices"][0]["delta"].get("content")
+                if content:
+                    completion_chars += len(content)
+                    if cache_key is not None and not coalesced:
+                        content_parts.append(content)
 
             # Send chunk in SSE format
-            yield f"data: {json.dumps(chunk)}\n\n"
+            yield encoder.encode(chunk)
+            if first_chunk_at is None:
+                first_chunk_at = time.time()
+        provider_done_at = time.time()
 
         # Send the done signal
-        yield "data: [DONE]\n\n"
-
-        # Calculate cost and log billing after stream completes
-        if total_tokens > 0:
-            cost = billing_service.calculate_cost(
-                model=model,
-                prompt_tokens=prompt_tokens,
-                completion_tokens=completion_tokens,
+        yield SSE_DONE
+        outcome = "ok"
+
+        if total_tokens > 0 and response_cache is not None and cache_key is not None and not coalesced:
+            response_cache.put(
+                cache_key,
+                ChatCompletionResponse(
+                    id=f"chatcmpl-{uuid.uuid4().hex[:8]}",
+                    created=int(time.time()),
+                    model=model,
+                    choices=[
+                        ChatChoice(
+                            index=0,
+                            message=ChatMessage(role="assistant", content="".join(content_parts)),
+                            finish_reason="stop",
+                        )
+                    ],
+                    usage=Usage(
+                        prompt_tokens=prompt_tokens,
+                        completion_tokens=completion_tokens,
+                        total_tokens=total_tokens,
+                        prompt_tokens_details=(
+                            PromptTokensDetails(cached_tokens=cached_tokens) if cached_tokens else None
+                        ),
+                    ),
+                ),
             )
 
-            billing_metadata = BillingMetadata(
+        logger.info(f"[{request_id}] Streaming completion successful")
+
+    except (GeneratorExit, asyncio.CancelledError):
+        outcome = "aborted"
+        logger.info(f"[{request_id}] Client disconnected mid-stream")
+        raise
+    except RateLimitExceededException as e:
+        logger.warning(f"[{request_id}] Stream refused: {e}")
+        error_status = "rate_limited"
+        error_chunk = {"error": {"message": str(e), "type": "rate_limit_exceeded"}}
+        yield sse_event(error_chunk)
+    except Exception as e:
+        logger.error(f"[{request_id}] Error during streaming: {e}")
+        # Send error in SSE format
+        error_chunk = {
+            "error": {
+                "message": "Internal server error during streaming",
+                "type": "server_error",
+            }
+        }
+        yield sse_event(error_chunk)
+    finally:
+        # Synchronous on purpose: an aborted stream may not await here
+        response_time = time.time() - start_time
+        if outcome == "error":
+            metrics_collector.record_request(
+                model=model, success=False, status=error_status, response_time=response_time
+            )
+            accountant.release_reservation(user_id, reservation_key)
+        else:
+            estimated = total_tokens == 0 and completion_chars > 0
+            if estimated:
+                prompt_tokens = _estimate_tokens(sum(len(m.content) for m in messages))
+                completion_tokens = _estimate_tokens(completion_chars)
+                total_tokens = prompt_tokens + completion_tokens
+            accountant.record_completion(
                 user_id=user_id,
                 model=model,
                 prompt_tokens=prompt_tokens,
                 completion_tokens=completion_tokens,
                 total_tokens=total_tokens,
-                estimated_cost_usd=Decimal(str(cost)),
                 request_id=request_id,
+                response_time=response_time,
+                bill=not coalesced or request_coalescer.bill_shared,
+                estimated=estimated,
+                coalesced=coalesced,
+                status=None if outcome == "ok" else outcome,
+                time_to_first_token=first_chunk_at - start_time if first_chunk_at else None,
+                provider_time=(provider_done_at or time.time()) - provider_start,
+                reservation_key=reservation_key,
+                cached_tokens=cached_tokens,
             )
 
-            await billing_service.log_billing(billing_metadata)
 
-            # Log usage for persistent tracking
-            await _log_usage_entry(
-                user_id=user_id,
-                model=model,
-                prompt_tokens=prompt_tokens,
-                completion_tokens=completion_tokens,
-                total_tokens=total_tokens,
-                cost_usd=float(cost),
-                request_id=request_id,
-            )
+async def _stream_cached_response(
+    cached_response,
+    accountant,
+    bill,
+    user_id,
+    request_id,
+    start_time,
+):
+    """Replay a cached completion as an SSE stream (role, content, final usage chunk)"""
+    completion_id = cached_response.id
+    created = cached_response.created
+    model = cached_response.model
+    usage = cached_response.usage
 
-            logger.info(f"[{request_id}] Streaming completion successful")
+    try:
+        yield sse_event(_completion_chunk(completion_id, created, model, {"role": "assistant"}))
+        first_chunk_at = time.time()
+        content = cached_response.choices[0].message.content
+        if content:
+            yield ChunkEncoder(completion_id, created, model).content(content)
+        final_chunk = _completion_chunk(completion_id, created, model, {}, "stop", usage.model_dump(exclude_none=True))
+        yield sse_event(final_chunk)
+        yield SSE_DONE
+
+        accountant.record_completion(
+            user_id=user_id,
+            model=model,
+            prompt_tokens=usage.prompt_tokens,
+            completion_tokens=usage.completion_tokens,
+            total_tokens=usage.total_tokens,
+            request_id=request_id,
+            response_time=time.time() - start_time,
+            bill=bill,
+            cache_hit=True,
+            time_to_first_token=first_chunk_at - start_time,
+            provider_time=0.0,
+            cached_tokens=usage.cached_tokens,
+        )
 
     except Exception as e:
-        logger.error(f"[{request_id}] Error during streaming: {e}")
-        # Send error in SSE format
+        logger.error(f"[{request_id}] Error replaying cached stream: {e}")
         error_chunk = {
             "error": {
                 "message": "Internal server error during streaming",
                 "type": "server_error",
             }
         }
-        yield f"data: {json.dumps(error_chunk)}\n\n"
+        yield sse_event(error_chunk)
 
 
 # --- Usage log endpoints ---
 
 
 @router.get("/v1/usage/user/{user_id}")
-async def get_user_usage(user_id: str, page: int = 1, page_size: int = 20):
-    """Get usage history for a user"""
+async def get_user_usage(
+    user_id: str, page: int = 1, page_size: int = 20, cursor: str | None = None
+):
+    """Get usage history for a user
+
+    Pass the previous response's next_cursor to page without OFFSET; total is
+    cached briefly and may lag the newest entries.
+    """
     usage_log = container.get_usage_log()
     page_size = max(1, min(page_size, 100))
-    entries, total = await usage_log.get_user_usage(user_id, page, page_size)
+    try:
+        entries, total, next_cursor = await usage_log.get_user_usage(
+            user_id, page, page_size, cursor
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     return UsageQueryResponse(
         entries=[UsageLogEntry(**e) for e in entries],
         total=total,
         page=page,
         page_size=page_size,
+        next_cursor=next_cursor,
     )
 
 
 @router.get("/v1/usage/user/{user_id}/summary")
-async def get_user_usage_summary(user_id: str):
-    """Get usage summary for a user"""
+async def get_user_usage_summary(user_id: str, start_date: date | None = None, end_date: date | None = None):
+    """Get usage summary for a user, optionally for an inclusive UTC day range"""
     usage_log = container.get_usage_log()
-    return await usage_log.get_user_summary(user_id)
+    return await usage_log.get_user_summary(
+        user_id,
+        start_date=start_date.isoformat() if start_date else None,
+        end_date=end_date.isoformat() if end_date else None,
+    )
 
 
 @router.get("/v1/usage/summary")
-async def get_system_usage_summary():
-    """Get system-wide usage summary"""
+async def get_system_usage_summary(start_date: date | None = None, end_date: date | None = None):
+    """Get system-wide usage summary, optionally for an inclusive UTC day range"""
     usage_log = container.get_usage_log()
-    return await usage_log.get_system_summary()
+    return await usage_log.get_system_summary(
+        start_date=start_date.isoformat() if start_date else None,
+        end_date=end_date.isoformat() if end_date else None,
+    )
+
+
+@router.get("/v1/usage/export")
+async def export_usage(
+    start: datetime,
+    end: datetime,
+    format: str = "ndjson",
+    user_id: str | None = None,
+    after_id: int = 0,
+):
+    """Stream usage entries created in [start, end) as NDJSON, CSV, Arrow or Parquet
+
+    Entries are sent oldest first in (created_at, id) order. To resume an
+    interrupted export, pass the last received created_at as start and its id
+    as after_id. Naive timestamps are taken as UTC.
+    """
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=timezone.utc)
+    if end.tzinfo is None:
+        end = end.replace(tzinfo=timezone.utc)
+    if end <= start:
+        raise HTTPException(status_code=400, detail="end must be after start")
+    try:
+        encoder = get_export_encoder(format)
+    except InvalidRequestException as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    media_type, extension = EXPORT_FORMATS[format]
+    filename = f"usage-{start:%Y%m%d}-{end:%Y%m%d}.{extension}"
+    chunks = container.get_usage_log().iter_export(
+        start.astimezone(timezone.utc).isoformat(),
+        end.astimezone(timezone.utc).isoformat(),
+        user_id=user_id,
+        after_id=after_id,
+    )
+    return StreamingResponse(
+        encoder(chunks),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
 
 
 # --- Pricing endpoints ---
@@ -365,6 +715,7 @@ async def update_pricing(model_id: str, body: ModelPricingUpdateRequest):
         body.display_name,
         float(body.input_price_per_1k),
         float(body.output_price_per_1k),
+        float(body.cached_input_price_per_1k) if body.cached_input_price_per_1k is not None else None,
     )
     return ModelPricing(**result)
 
@@ -383,5 +734,6 @@ async def create_pricing(body: ModelPricingCreateRequest):
         body.display_name,
         float(body.input_price_per_1k),
         float(body.output_price_per_1k),
+        float(body.cached_input_price_per_1k) if body.cached_input_price_per_1k is not None else None,
     )
     return ModelPricing(**result)
@@ -1,8 +1,10 @@
 """Dependency injection container"""
 
+import inspect
+import json
 import logging
 import os
-from typing import Any, Callable, Dict, TypeVar, cast
+from typing import TYPE_CHECKING, Any, Callable, Dict, TypeVar, cast
 
 logger = logging.getLogger(__name__)
 
@@ -11,11 +13,48 @@ from .core.constants import (
     SERVICE_BILLING_SERVICE,
     SERVICE_USAGE_LOG,
     SERVICE_PRICING_SERVICE,
+    SERVICE_RESPONSE_CACHE,
+    SERVICE_REQUEST_COALESCER,
+    SERVICE_USAGE_ACCOUNTANT,
+    SERVICE_CREDITS_CLIENT,
+    SERVICE_BALANCE_GATE,
+    SERVICE_RATE_LIMITER,
+    SERVICE_PROVIDER_SCHEDULER,
+    SERVICE_PROVIDER_ROUTER,
+    SERVICE_CONTEXT_CACHE,
 )
-from .core.interfaces import IGeminiClient, IBillingService, IUsageLogService, IPricingService
+from .core.interfaces import (
+    IGeminiClient,
+    IBillingService,
+    IUsageLogService,
+    IPricingService,
+    IResponseCache,
+    IRequestCoalescer,
+    IUsageAccountant,
+    IBalanceGate,
+    IRateLimiter,
+    IProviderScheduler,
+    IContextCache,
+)
+
+if TYPE_CHECKING:
+    from .services.credits_client import CreditsClient
+    from .services.provider_router import ProviderRouter
 
 T = TypeVar("T")
 
+# Created by warm() at startup: everything a completion request touches. The
+# usage accountant pulls in billing, pricing, the usage log, the credits
+# client and the balance gate.
+STARTUP_SERVICES = (
+    SERVICE_GEMINI_CLIENT,
+    SERVICE_RATE_LIMITER,
+    SERVICE_PROVIDER_SCHEDULER,
+    SERVICE_RESPONSE_CACHE,
+    SERVICE_REQUEST_COALESCER,
+    SERVICE_USAGE_ACCOUNTANT,
+)
+
 
 class Container:
     """Simple dependency injection container"""
@@ -31,16 +70,131 @@ class Container:
         self._factories[SERVICE_BILLING_SERVICE] = lambda: self._create_billing_service()
         self._factories[SERVICE_USAGE_LOG] = lambda: self._create_usage_log_service()
         self._factories[SERVICE_PRICING_SERVICE] = lambda: self._create_pricing_service()
+        self._factories[SERVICE_RESPONSE_CACHE] = lambda: self._create_response_cache()
+        self._factories[SERVICE_REQUEST_COALESCER] = lambda: self._create_request_coalescer()
+        self._factories[SERVICE_USAGE_ACCOUNTANT] = lambda: self._create_usage_accountant()
+        self._factories[SERVICE_CREDITS_CLIENT] = lambda: self._create_credits_client()
+        self._factories[SERVICE_BALANCE_GATE] = lambda: self._create_balance_gate()
+        self._factories[SERVICE_RATE_LIMITER] = lambda: self._create_rate_limiter()
+        self._factories[SERVICE_PROVIDER_SCHEDULER] = lambda: self._create_provider_scheduler()
+        self._factories[SERVICE_PROVIDER_ROUTER] = lambda: self._create_provider_router()
+        self._factories[SERVICE_CONTEXT_CACHE] = lambda: self._create_context_cache()
 
     def _create_gemini_client(self) -> Any:
-        """Create Gemini client"""
+        """Create Gemini client, or the provider router when extra backends are configured"""
+        router = self.get_provider_router()
+        if router is not None:
+            return router
+        return self._create_gemini_sdk_client()
+
+    def _create_gemini_sdk_client(self) -> Any:
+        """Create the Gemini SDK client"""
         from .services.gemini_client import GeminiClient
 
         api_key = os.getenv("GEMINI_API_KEY")
         if not api_key:
             raise ValueError("GEMINI_API_KEY environment variable is required")
 
-        return GeminiClient(api_key=api_key)
+        from .core.constants import GEMINI_EXECUTOR_MAX_WORKERS, GEMINI_MODEL_CACHE_SIZE
+
+        max_workers = int(os.getenv("GEMINI_EXECUTOR_WORKERS", str(GEMINI_EXECUTOR_MAX_WORKERS)))
+        model_cache_size = int(os.getenv("GEMINI_MODEL_CACHE_SIZE", str(GEMINI_MODEL_CACHE_SIZE)))
+        return GeminiClient(
+            api_key=api_key,
+            max_workers=max_workers,
+            model_cache_size=model_cache_size,
+            context_cache=self.get_context_cache(),
+        )
+
+    def _create_context_cache(self) -> Any:
+        """Create the provider context cache for stable prompt prefixes, or None when disabled"""
+        if os.getenv("CONTEXT_CACHE_ENABLED", "false").lower() != "true":
+            return None
+
+        from .core.constants import (
+            CONTEXT_CACHE_DEFAULT_MIN_TOKENS,
+            CONTEXT_CACHE_EXPIRY_MARGIN_SECONDS,
+            CONTEXT_CACHE_MAX_ENTRIES,
+            CONTEXT_CACHE_MIN_TOKENS,
+            CONTEXT_CACHE_MIN_USES,
+            CONTEXT_CACHE_TTL_SECONDS,
+        )
+        from .services.context_cache import ContextCache
+
+        return ContextCache(
+            min_tokens=CONTEXT_CACHE_MIN_TOKENS,
+            default_min_tokens=CONTEXT_CACHE_DEFAULT_MIN_TOKENS,
+            ttl_seconds=float(os.getenv("CONTEXT_CACHE_TTL_SECONDS", str(CONTEXT_CACHE_TTL_SECONDS))),
+            min_uses=int(os.getenv("CONTEXT_CACHE_MIN_USES", str(CONTEXT_CACHE_MIN_USES))),
+            max_entries=int(os.getenv("CONTEXT_CACHE_MAX_ENTRIES", str(CONTEXT_CACHE_MAX_ENTRIES))),
+            expiry_margin=float(
+                os.getenv("CONTEXT_CACHE_EXPIRY_MARGIN_SECONDS", str(CONTEXT_CACHE_EXPIRY_MARGIN_SECONDS))
+            ),
+        )
+
+    def _create_provider_router(self) -> Any:
+        """Create the provider router, or None when PROVIDER_BACKENDS is unset
+
+        PROVIDER_BACKENDS is a JSON list of OpenAI-compatible backends, e.g.
+        [{"name": "gemini-eu", "base_url": "https://.../v1beta/openai",
+        "api_key_env": "GEMINI_API_KEY_EU", "models": {"gemini-2.5-flash": "..."}}].
+        The Gemini SDK client is routed as the "gemini" backend when
+        GEMINI_API_KEY is set.
+        """
+        raw = os.getenv("PROVIDER_BACKENDS", "").strip()
+        if not raw:
+            return None
+
+        from .core.constants import (
+            PROVIDER_ROUTER_ERROR_HALF_LIFE_SECONDS,
+            PROVIDER_ROUTER_ERROR_PENALTY,
+            PROVIDER_ROUTER_EWMA_ALPHA,
+            PROVIDER_ROUTER_HEDGE_MIN_SAMPLES,
+            PROVIDER_ROUTER_HEDGE_QUANTILE,
+            PROVIDER_ROUTER_MIN_HEDGE_DELAY_SECONDS,
+        )
+        from .services.openai_compatible_client import OpenAICompatibleClient
+        from .services.provider_router import ProviderRouter
+
+        try:
+            configs = json.loads(raw)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"PROVIDER_BACKENDS is not valid JSON: {e}") from e
+
+        backends: list[tuple[str, Any]] = []
+        if os.getenv("GEMINI_API_KEY"):
+            backends.append(("gemini", self._create_gemini_sdk_client()))
+        for config in configs:
+            api_key_env = config.get("api_key_env")
+            backends.append(
+                (
+                    config["name"],
+                    OpenAICompatibleClient(
+                        base_url=config["base_url"],
+                        api_key=os.getenv(api_key_env) if api_key_env else None,
+                        models=config.get("models"),
+                    ),
+                )
+            )
+
+        router = ProviderRouter(
+            backends,
+            ewma_alpha=float(os.getenv("PROVIDER_ROUTER_EWMA_ALPHA", str(PROVIDER_ROUTER_EWMA_ALPHA))),
+            error_penalty=float(os.getenv("PROVIDER_ROUTER_ERROR_PENALTY", str(PROVIDER_ROUTER_ERROR_PENALTY))),
+            error_half_life=float(
+                os.getenv("PROVIDER_ROUTER_ERROR_HALF_LIFE_SECONDS", str(PROVIDER_ROUTER_ERROR_HALF_LIFE_SECONDS))
+            ),
+            hedge=os.getenv("PROVIDER_HEDGE_ENABLED", "true").lower() == "true",
+            hedge_quantile=float(os.getenv("PROVIDER_ROUTER_HEDGE_QUANTILE", str(PROVIDER_ROUTER_HEDGE_QUANTILE))),
+            hedge_min_samples=int(
+                os.getenv("PROVIDER_ROUTER_HEDGE_MIN_SAMPLES", str(PROVIDER_ROUTER_HEDGE_MIN_SAMPLES))
+            ),
+            min_hedge_delay=float(
+                os.getenv("PROVIDER_ROUTER_MIN_HEDGE_DELAY_SECONDS", str(PROVIDER_ROUTER_MIN_HEDGE_DELAY_SECONDS))
+            ),
+        )
+        logger.info(f"Provider routing across {[name for name, _ in backends]}")
+        return router
 
     def _create_pricing_service(self) -> Any:
         """Create pricing service"""
@@ -49,7 +203,7 @@ class Container:
         return PricingService()
 
     def _create_billing_service(self) -> Any:
-        """Create billing service, wired with pricing service"""
+        """Create billing service, wired with pricing service and credits client"""
         from .services.billing_service import BillingService
 
         try:
@@ -57,7 +211,130 @@ class Container:
         except Exception:
             logger.exception("Pricing service unavailable; falling back to static pricing")
             pricing_service = None
-        return BillingService(pricing_service=pricing_service)
+        return BillingService(
+            pricing_service=pricing_service,
+            credits_client=self.get_credits_client(),
+            balance_gate=self.get_balance_gate(),
+        )
+
+    def _create_credits_client(self) -> Any:
+        """Create the pooled credits service client, or None when Phase 2 billing is off"""
+        url = os.getenv("CREDITS_SERVICE_URL", "")
+        api_key = os.getenv("CREDITS_SERVICE_API_KEY", "")
+        if not (url and api_key):
+            return None
+
+        from .core.circuit_breaker import CircuitBreaker
+        from .core.constants import (
+            CREDITS_BREAKER_FAILURE_THRESHOLD,
+            CREDITS_BREAKER_RESET_SECONDS,
+            CREDITS_HTTP_MAX_ATTEMPTS,
+            CREDITS_KEEPALIVE_EXPIRY_SECONDS,
+            CREDITS_MAX_CONNECTIONS,
+            CREDITS_MAX_KEEPALIVE_CONNECTIONS,
+        )
+        from .services.credits_client import CreditsClient
+
+        return CreditsClient(
+            base_url=url,
+            api_key=api_key,
+            max_connections=int(os.getenv("CREDITS_MAX_CONNECTIONS", str(CREDITS_MAX_CONNECTIONS))),
+            max_keepalive_connections=int(
+                os.getenv("CREDITS_MAX_KEEPALIVE_CONNECTIONS", str(CREDITS_MAX_KEEPALIVE_CONNECTIONS))
+            ),
+            keepalive_expiry=float(os.getenv("CREDITS_KEEPALIVE_EXPIRY_SECONDS", str(CREDITS_KEEPALIVE_EXPIRY_SECONDS))),
+            http2=os.getenv("CREDITS_HTTP2", "true").lower() == "true",
+            max_attempts=int(os.getenv("CREDITS_HTTP_MAX_ATTEMPTS", str(CREDITS_HTTP_MAX_ATTEMPTS))),
+            breaker=CircuitBreaker(
+                failure_threshold=int(
+                    os.getenv("CREDITS_BREAKER_FAILURE_THRESHOLD", str(CREDITS_BREAKER_FAILURE_THRESHOLD))
+                ),
+                reset_timeout=float(os.getenv("CREDITS_BREAKER_RESET_SECONDS", str(CREDITS_BREAKER_RESET_SECONDS))),
+            ),
+        )
+
+    def _create_balance_gate(self) -> Any:
+        """Create the pre-flight balance gate, or None when Phase 2 billing or the check is off"""
+        credits_client = self.get_credits_client()
+        if credits_client is None or os.getenv("BALANCE_CHECK_ENABLED", "true").lower() != "true":
+            return None
+
+        from .core.constants import (
+            BALANCE_CACHE_MAX_ENTRIES,
+            BALANCE_CACHE_TTL_SECONDS,
+            BALANCE_DEFAULT_COMPLETION_TOKENS,
+            BALANCE_RESERVATION_TIMEOUT_SECONDS,
+        )
+        from .services.balance_gate import BalanceGate
+
+        return BalanceGate(
+            credits_client=credits_client,
+            ttl_seconds=float(os.getenv("BALANCE_CACHE_TTL_SECONDS", str(BALANCE_CACHE_TTL_SECONDS))),
+            max_entries=int(os.getenv("BALANCE_CACHE_MAX_ENTRIES", str(BALANCE_CACHE_MAX_ENTRIES))),
+            reservation_timeout=int(
+                os.getenv("BALANCE_RESERVATION_TIMEOUT_SECONDS", str(BALANCE_RESERVATION_TIMEOUT_SECONDS))
+            ),
+            default_completion_tokens=int(
+                os.getenv("BALANCE_DEFAULT_COMPLETION_TOKENS", str(BALANCE_DEFAULT_COMPLETION_TOKENS))
+            ),
+            fail_open=os.getenv("BALANCE_CHECK_FAIL_OPEN", "true").lower() == "true",
+        )
+
+    def _create_rate_limiter(self) -> Any:
+        """Create the rate limiter, or None when rate limiting is off"""
+        if os.getenv("RATE_LIMIT_ENABLED", "true").lower() != "true":
+            logger.info("Rate limiting disabled")
+            return None
+
+        from .core.constants import RATE_LIMIT_DEFAULT_MODEL_WEIGHT, RATE_LIMIT_MODEL_WEIGHTS
+        from .services.rate_limiter import RateLimiter
+
+        model_weights = dict(RATE_LIMIT_MODEL_WEIGHTS)
+        for entry in os.getenv("RATE_LIMIT_MODEL_WEIGHTS", "").split(","):
+            if entry.strip():
+                model, _, weight = entry.partition("=")
+                model_weights[model.strip()] = int(weight)
+
+        storage_uri = os.getenv("RATE_LIMIT_STORAGE_URI", "memory://")
+        limiter = RateLimiter(
+            storage_uri=storage_uri,
+            strategy=os.getenv("RATE_LIMIT_STRATEGY", "sliding-window-counter"),
+            model_weights=model_weights,
+            default_weight=int(os.getenv("RATE_LIMIT_DEFAULT_MODEL_WEIGHT", str(RATE_LIMIT_DEFAULT_MODEL_WEIGHT))),
+            key_prefix=os.getenv("RATE_LIMIT_KEY_PREFIX", "ai-proxy"),
+            fail_open=os.getenv("RATE_LIMIT_FAIL_OPEN", "true").lower() == "true",
+        )
+        logger.info(f"Rate limiting enabled ({limiter.stats()['strategy']}, storage {storage_uri.split('://')[0]})")
+        return limiter
+
+    def _create_provider_scheduler(self) -> Any:
+        """Create the provider quota scheduler, or None when disabled"""
+        if os.getenv("PROVIDER_SCHEDULER_ENABLED", "true").lower() != "true":
+            return None
+
+        from .core.constants import (
+            PROVIDER_DEFAULT_BUDGET,
+            PROVIDER_DEFAULT_COMPLETION_TOKENS,
+            PROVIDER_MAX_QUEUE_SECONDS,
+            PROVIDER_MODEL_BUDGETS,
+        )
+        from .services.provider_scheduler import ProviderScheduler
+
+        budgets = dict(PROVIDER_MODEL_BUDGETS)
+        for entry in os.getenv("PROVIDER_BUDGETS", "").split(","):
+            if entry.strip():
+                model, _, budget = entry.partition("=")
+                tokens, _, requests = budget.partition(":")
+                budgets[model.strip()] = (int(tokens), int(requests))
+
+        return ProviderScheduler(
+            model_budgets=budgets,
+            default_budget=PROVIDER_DEFAULT_BUDGET,
+            max_wait=float(os.getenv("PROVIDER_MAX_QUEUE_SECONDS", str(PROVIDER_MAX_QUEUE_SECONDS))),
+            default_completion_tokens=int(
+                os.getenv("PROVIDER_DEFAULT_COMPLETION_TOKENS", str(PROVIDER_DEFAULT_COMPLETION_TOKENS))
+            ),
+        )
 
     def _create_usage_log_service(self) -> Any:
         """Create usage log service"""
@@ -65,6 +342,58 @@ class Container:
 
         return UsageLogService()
 
+    def _create_response_cache(self) -> Any:
+        """Create response cache, or None when caching is disabled"""
+        if os.getenv("RESPONSE_CACHE_ENABLED", "false").lower() != "true":
+            return None
+
+        from .core.constants import RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_TTL_SECONDS
+        from .services.response_cache import ResponseCache
+
+        return ResponseCache(
+            max_entries=int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", str(RESPONSE_CACHE_MAX_ENTRIES))),
+            ttl_seconds=float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", str(RESPONSE_CACHE_TTL_SECONDS))),
+            bill_hits=os.getenv("RESPONSE_CACHE_BILL_HITS", "true").lower() == "true",
+        )
+
+    def _create_request_coalescer(self) -> Any:
+        """Create request coalescer, or None when coalescing is disabled"""
+        if os.getenv("REQUEST_COALESCING_ENABLED", "false").lower() != "true":
+            return None
+
+        from .services.request_coalescer import RequestCoalescer
+
+        return RequestCoalescer(bill_shared=os.getenv("REQUEST_COALESCING_BILL_SHARED", "true").lower() == "true")
+
+    def _create_usage_accountant(self) -> Any:
+        """Create usage accountant, wired with billing and usage log services"""
+        from .core.constants import (
+            BILLING_BATCH_MAX_SIZE,
+            BILLING_BATCH_WINDOW_SECONDS,
+            BILLING_MAX_ATTEMPTS,
+            BILLING_RETRY_BASE_DELAY,
+            BILLING_RETRY_MAX_DELAY,
+            BILLING_WORKER_CONCURRENCY,
+        )
+        from .services.usage_accountant import UsageAccountant
+
+        try:
+            usage_log = self.get_usage_log()
+        except Exception:
+            logger.exception("Usage log unavailable; usage entries will not be persisted")
+            usage_log = None
+        return UsageAccountant(
+            billing_service=self.get_billing_service(),
+            usage_log=usage_log,
+            max_attempts=int(os.getenv("BILLING_MAX_ATTEMPTS", str(BILLING_MAX_ATTEMPTS))),
+            retry_base_delay=float(os.getenv("BILLING_RETRY_BASE_DELAY", str(BILLING_RETRY_BASE_DELAY))),
+            retry_max_delay=float(os.getenv("BILLING_RETRY_MAX_DELAY", str(BILLING_RETRY_MAX_DELAY))),
+            concurrency=int(os.getenv("BILLING_WORKER_CONCURRENCY", str(BILLING_WORKER_CONCURRENCY))),
+            batch_size=int(os.getenv("BILLING_BATCH_MAX_SIZE", str(BILLING_BATCH_MAX_SIZE))),
+            batch_window=float(os.getenv("BILLING_BATCH_WINDOW_SECONDS", str(BILLING_BATCH_WINDOW_SECONDS))),
+            balance_gate=self.get_balance_gate(),
+        )
+
     def get(self, service_name: str) -> Any:
         """Get a service by name (lazy initialization)"""
         if service_name not in self._services:
@@ -74,6 +403,52 @@ class Container:
             self._services[service_name] = self._factories[service_name]()
         return self._services[service_name]
 
+    async def warm(self) -> None:
+        """Create the services a request needs and open their connections
+
+        Run at startup, so the first request after a deploy does not pay for
+        provider SDK imports, schema setup, SQLite connections and client
+        construction. A service that cannot be created is logged and left to
+        fail on first use, as it would without warming.
+        """
+        for service_name in STARTUP_SERVICES:
+            try:
+                self.get(service_name)
+            except Exception as e:
+                logger.warning(f"Service '{service_name}' not created at startup: {e}")
+
+        warmed: set[int] = set()
+        for service_name, service in list(self._services.items()):
+            warm = getattr(service, "warm", None)
+            # The provider router is registered twice (as itself and as the client)
+            if not callable(warm) or id(service) in warmed:
+                continue
+            warmed.add(id(service))
+            try:
+                result = warm()
+                if inspect.isawaitable(result):
+                    await result
+            except Exception:
+                logger.exception(f"Error warming service '{service_name}'")
+
+    async def shutdown(self) -> None:
+        """Release resources held by services that have been created
+
+        Services are closed newest first, so a service is closed before the
+        services it was built from (the accountant drains into the usage log).
+        """
+        for service_name, service in reversed(list(self._services.items())):
+            close = getattr(service, "close", None)
+            if not callable(close):
+                continue
+            try:
+                result = close()
+                if inspect.isawaitable(result):
+                    await result
+            except Exception:
+                logger.exception(f"Error shutting down service '{service_name}'")
+        self._services.clear()
+
     def get_gemini_client(self) -> IGeminiClient:
         """Get Gemini client"""
         return cast(IGeminiClient, self.get(SERVICE_GEMINI_CLIENT))
@@ -90,6 +465,42 @@ class Container:
         """Get pricing service"""
         return cast(IPricingService, self.get(SERVICE_PRICING_SERVICE))
 
+    def get_credits_client(self) -> "CreditsClient | None":
+        """Get the pooled credits service client (None when Phase 2 billing is off)"""
+        return cast("CreditsClient | None", self.get(SERVICE_CREDITS_CLIENT))
+
+    def get_balance_gate(self) -> IBalanceGate | None:
+        """Get the pre-flight balance gate (None when disabled)"""
+        return cast("IBalanceGate | None", self.get(SERVICE_BALANCE_GATE))
+
+    def get_rate_limiter(self) -> IRateLimiter | None:
+        """Get the rate limiter (None when disabled)"""
+        return cast("IRateLimiter | None", self.get(SERVICE_RATE_LIMITER))
+
+    def get_provider_scheduler(self) -> IProviderScheduler | None:
+        """Get the provider quota scheduler (None when disabled)"""
+        return cast("IProviderScheduler | None", self.get(SERVICE_PROVIDER_SCHEDULER))
+
+    def get_provider_router(self) -> "ProviderRouter | None":
+        """Get the provider router (None when only the Gemini SDK client is used)"""
+        return cast("ProviderRouter | None", self.get(SERVICE_PROVIDER_ROUTER))
+
+    def get_context_cache(self) -> IContextCache | None:
+        """Get the provider context cache (None when disabled)"""
+        return cast("IContextCache | None", self.get(SERVICE_CONTEXT_CACHE))
+
+    def get_usage_accountant(self) -> IUsageAccountant:
+        """Get usage accountant"""
+        return cast(IUsageAccountant, self.get(SERVICE_USAGE_ACCOUNTANT))
+
+    def get_response_cache(self) -> IResponseCache | None:
+        """Get response cache (None when disabled)"""
+        return cast("IResponseCache | None", self.get(SERVICE_RESPONSE_CACHE))
+
+    def get_request_coalescer(self) -> IRequestCoalescer | None:
+        """Get request coalescer (None when disabled)"""
+        return cast("IRequestCoalescer | None", self.get(SERVICE_REQUEST_COALESCER))
+
 
 # Global container instance
 container = Container()
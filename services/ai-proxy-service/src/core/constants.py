@@ -5,18 +5,59 @@ SERVICE_GEMINI_CLIENT = "gemini_client"
 SERVICE_BILLING_SERVICE = "billing_service"
 SERVICE_USAGE_LOG = "usage_log"
 SERVICE_PRICING_SERVICE = "pricing_service"
+SERVICE_RESPONSE_CACHE = "response_cache"
+SERVICE_REQUEST_COALESCER = "request_coalescer"
+SERVICE_USAGE_ACCOUNTANT = "usage_accountant"
+SERVICE_CREDITS_CLIENT = "credits_client"
+SERVICE_BALANCE_GATE = "balance_gate"
+SERVICE_RATE_LIMITER = "rate_limiter"
+SERVICE_PROVIDER_SCHEDULER = "provider_scheduler"
+SERVICE_PROVIDER_ROUTER = "provider_router"
+SERVICE_CONTEXT_CACHE = "context_cache"
+
+# Gemini client tuning
+# Threads dedicated to blocking provider SDK calls (override with GEMINI_EXECUTOR_WORKERS)
+GEMINI_EXECUTOR_MAX_WORKERS = 16
+# Cached GenerativeModel objects, keyed on (model, system_instruction)
+GEMINI_MODEL_CACHE_SIZE = 32
+
+# Response cache defaults (enable with RESPONSE_CACHE_ENABLED=true)
+RESPONSE_CACHE_MAX_ENTRIES = 1000
+RESPONSE_CACHE_TTL_SECONDS = 300
+
+# Background billing: attempts per charge, backoff bounds (seconds), batches
+# billed in parallel, and the size and collection window (seconds) of each
+# batch (override with BILLING_* env vars)
+BILLING_MAX_ATTEMPTS = 5
+BILLING_RETRY_BASE_DELAY = 0.5
+BILLING_RETRY_MAX_DELAY = 30.0
+BILLING_WORKER_CONCURRENCY = 8
+BILLING_BATCH_MAX_SIZE = 100
+BILLING_BATCH_WINDOW_SECONDS = 0.05
+
+# Credits service connection pool, per-request retries and circuit breaker
+# (override with CREDITS_* env vars)
+CREDITS_MAX_CONNECTIONS = 100
+CREDITS_MAX_KEEPALIVE_CONNECTIONS = 20
+CREDITS_KEEPALIVE_EXPIRY_SECONDS = 30.0
+CREDITS_HTTP_MAX_ATTEMPTS = 3
+CREDITS_BREAKER_FAILURE_THRESHOLD = 5
+CREDITS_BREAKER_RESET_SECONDS = 10.0
 
 # Model pricing (USD per 1K tokens)
 # Based on Gemini pricing as of 2025
 # https://ai.google.dev/gemini-api/docs/pricing
+# Cached input is the price of prompt tokens served from context caching
 MODEL_PRICING = {
     "gemini-2.5-pro": {
         "input_price_per_1k": 0.00125,  # $1.25 per 1M input tokens
         "output_price_per_1k": 0.01,  # $10.00 per 1M output tokens
+        "cached_input_price_per_1k": 0.000125,  # $0.125 per 1M cached input tokens
     },
     "gemini-2.5-flash": {
         "input_price_per_1k": 0.0003,  # $0.30 per 1M input tokens
         "output_price_per_1k": 0.0025,  # $2.50 per 1M output tokens
+        "cached_input_price_per_1k": 0.00003,  # $0.03 per 1M cached input tokens
     },
 }
 
@@ -24,6 +65,7 @@ MODEL_PRICING = {
 DEFAULT_MODEL_PRICING = {
     "input_price_per_1k": 0.00125,
     "output_price_per_1k": 0.01,
+    "cached_input_price_per_1k": 0.000125,
 }
 
 # Model mappings (OpenAI model names to Gemini models)
@@ -37,3 +79,69 @@ MODEL_MAPPINGS = {
 
 # Default model if not specified
 DEFAULT_MODEL = "gemini-2.5-flash"
+
+# Pre-flight balance check (Phase 2 only; disable with BALANCE_CHECK_ENABLED=false):
+# seconds a reported balance is trusted, balances kept, seconds before an
+# unsettled hold expires, and the completion budget held for when a request
+# sets no max_tokens (override with BALANCE_* env vars)
+BALANCE_CACHE_TTL_SECONDS = 5.0
+BALANCE_CACHE_MAX_ENTRIES = 10000
+BALANCE_RESERVATION_TIMEOUT_SECONDS = 300
+BALANCE_DEFAULT_COMPLETION_TOKENS = 1024
+
+# Rate limiting (disable with RATE_LIMIT_ENABLED=false): chat completions per
+# client (IP, or API key with RATE_LIMIT_KEY=api_key) and weighted units per
+# user, where one request costs its model's weight (override with RATE_LIMIT_*
+# env vars; RATE_LIMIT_MODEL_WEIGHTS takes "model=weight,...")
+RATE_LIMIT_CHAT_PER_MINUTE = 30
+RATE_LIMIT_USER_UNITS_PER_MINUTE = 120
+RATE_LIMIT_MODEL_WEIGHTS = {
+    "gemini-2.5-pro": 4,
+    "gemini-2.5-flash": 1,
+}
+# Weight of models without an entry (priced like Pro, see DEFAULT_MODEL_PRICING)
+RATE_LIMIT_DEFAULT_MODEL_WEIGHT = 4
+
+# Provider quota scheduling (disable with PROVIDER_SCHEDULER_ENABLED=false):
+# (tokens, requests) per minute for each model, matching the Gemini API
+# quota of the project (override with PROVIDER_BUDGETS="model=tokens:requests,...";
+# with several workers, divide the quota between them), the budget shared by
+# other models, the longest a call may queue, and the completion tokens
+# assumed when a request sets no max_tokens
+PROVIDER_MODEL_BUDGETS = {
+    "gemini-2.5-pro": (2_000_000, 150),
+    "gemini-2.5-flash": (1_000_000, 1000),
+}
+PROVIDER_DEFAULT_BUDGET = (1_000_000, 150)
+PROVIDER_MAX_QUEUE_SECONDS = 30.0
+PROVIDER_DEFAULT_COMPLETION_TOKENS = 512
+
+# Provider routing (enabled by listing extra backends in PROVIDER_BACKENDS):
+# weight of the newest sample in the per-backend latency and error EWMAs, how
+# strongly the error rate inflates a backend's latency score, the seconds for
+# an idle backend's error rate to halve, the latency
+# quantile after which a call is hedged on a second backend, the samples a
+# backend needs before its calls are hedged, and the shortest hedge delay
+# (override with PROVIDER_ROUTER_* env vars)
+PROVIDER_ROUTER_EWMA_ALPHA = 0.2
+PROVIDER_ROUTER_ERROR_PENALTY = 4.0
+PROVIDER_ROUTER_ERROR_HALF_LIFE_SECONDS = 30.0
+PROVIDER_ROUTER_HEDGE_QUANTILE = 0.95
+PROVIDER_ROUTER_HEDGE_MIN_SAMPLES = 20
+PROVIDER_ROUTER_MIN_HEDGE_DELAY_SECONDS = 0.25
+
+# Provider context caching of stable prompt prefixes (enable with
+# CONTEXT_CACHE_ENABLED=true): smallest prefix Gemini caches per model, and
+# for other models, lifetime of each cached content at the provider (storage
+# is billed per hour), sends of a prefix before it is cached, most cached
+# contents kept, and how long before expiry a cached content stops being
+# used (override with CONTEXT_CACHE_* env vars)
+CONTEXT_CACHE_MIN_TOKENS = {
+    "gemini-2.5-pro": 4096,
+    "gemini-2.5-flash": 1024,
+}
+CONTEXT_CACHE_DEFAULT_MIN_TOKENS = 4096
+CONTEXT_CACHE_TTL_SECONDS = 600.0
+CONTEXT_CACHE_MIN_USES = 3
+CONTEXT_CACHE_MAX_ENTRIES = 64
+CONTEXT_CACHE_EXPIRY_MARGIN_SECONDS = 60.0
@@ -25,7 +25,27 @@ class InvalidRequestException(AIProxyException):
     pass
 
 
+class RateLimitExceededException(AIProxyException):
+    """Raised when a request exceeds a rate limit"""
+
+    def __init__(self, message: str, retry_after: int) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
 class BillingException(AIProxyException):
     """Raised when billing operations fail"""
 
     pass
+
+
+class BillingUnavailableException(BillingException):
+    """Raised when the credits service fails transiently and the charge can be retried"""
+
+    pass
+
+
+class InsufficientCreditsException(BillingException):
+    """Raised before dispatch when the user cannot cover the estimated cost"""
+
+    pass
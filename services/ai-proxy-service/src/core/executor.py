@@ -0,0 +1,128 @@
+"""Dedicated, instrumented thread pools for blocking work"""
+
+import asyncio
+import functools
+import logging
+import threading
+import weakref
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Live executors by name, reported through /metrics. Weak values so a pool
+# that is shut down and dropped (e.g. in tests) disappears from the report.
+_registry: "weakref.WeakValueDictionary[str, InstrumentedExecutor]" = weakref.WeakValueDictionary()
+
+
+class InstrumentedExecutor:
+    """Bounded thread pool that tracks its own saturation
+
+    Each blocking integration (provider SDK calls, SQLite, ...) gets its own
+    pool so that exhausting one cannot starve the others, which is what
+    happens when everything shares the event loop's default executor.
+    """
+
+    def __init__(self, name: str, max_workers: int) -> None:
+        """
+        Create a named pool
+
+        Args:
+            name: Pool name used in logs and metrics
+            max_workers: Maximum number of worker threads
+        """
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+
+        self.name = name
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"{name}-worker")
+        self._lock = threading.Lock()
+        self._active = 0
+        self._queued = 0
+        self._completed = 0
+        self._failed = 0
+        self._peak_in_flight = 0
+        _registry[name] = self
+        logger.info(f"Executor '{name}' started with {max_workers} workers")
+
+    def _wrap(self, fn: Callable[[], T]) -> Callable[[], T]:
+        """Wrap a callable so queue/active counters follow it through the pool"""
+
+        def runner() -> T:
+            with self._lock:
+                self._queued -= 1
+                self._active += 1
+            try:
+                result = fn()
+            except BaseException:
+                with self._lock:
+                    self._failed += 1
+                raise
+            finally:
+                with self._lock:
+                    self._active -= 1
+                    self._completed += 1
+            return result
+
+        return runner
+
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """
+        Run a blocking callable on this pool and await its result
+
+        Args:
+            fn: Blocking callable
+            *args: Positional arguments for fn
+            **kwargs: Keyword arguments for fn
+
+        Returns:
+            Whatever fn returns
+        """
+        call = functools.partial(fn, *args, **kwargs)
+        with self._lock:
+            self._queued += 1
+            in_flight = self._queued + self._active
+            if in_flight > self._peak_in_flight:
+                self._peak_in_flight = in_flight
+        future = self._executor.submit(self._wrap(call))
+        future.add_done_callback(self._on_done)
+        return await asyncio.wrap_future(future)
+
+    def _on_done(self, future: "Future[Any]") -> None:
+        """Drop work that was cancelled before a worker picked it up"""
+        if future.cancelled():
+            with self._lock:
+                self._queued -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get a saturation snapshot
+
+        Returns:
+            Dictionary with worker, queue and completion counters
+        """
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "active": self._active,
+                "queued": self._queued,
+                "completed": self._completed,
+                "failed": self._failed,
+                "peak_in_flight": self._peak_in_flight,
+                "saturation_percent": round(self._active / self.max_workers * 100, 2),
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop accepting work and release the worker threads"""
+        self._executor.shutdown(wait=wait)
+        if _registry.get(self.name) is self:
+            del _registry[self.name]
+        logger.info(f"Executor '{self.name}' shut down")
+
+
+def get_executor_stats() -> Dict[str, Dict[str, Any]]:
+    """Get saturation snapshots for every live executor, keyed by pool name"""
+    return {name: executor.stats() for name, executor in list(_registry.items())}
@@ -0,0 +1,38 @@
+"""Canonical request fingerprints for caching and de-duplication"""
+
+import hashlib
+import json
+
+from .models import ChatMessage
+
+
+def request_fingerprint(
+    model: str,
+    messages: list[ChatMessage],
+    temperature: float,
+    max_tokens: int | None,
+) -> str:
+    """
+    Build a stable hash identifying a completion request
+
+    Two requests with the same fingerprint would be sent to the provider
+    with identical inputs. The encoding is canonical (sorted keys, no
+    whitespace) so field order in the client's JSON does not matter.
+
+    Args:
+        model: Requested model name
+        messages: Conversation messages
+        temperature: Sampling temperature
+        max_tokens: Maximum tokens to generate
+
+    Returns:
+        Hex-encoded SHA-256 digest
+    """
+    payload = {
+        "model": model,
+        "messages": [{"role": m.role, "content": m.content} for m in messages],
+        "temperature": float(temperature),
+        "max_tokens": max_tokens,
+    }
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
@@ -0,0 +1,92 @@
+"""Fixed-size log-linear latency histogram"""
+
+import math
+
+# Buckets per power of two. 8 sub-buckets bound the relative error of any
+# reported quantile to about 4.5% (half of 2**(1/8) - 1).
+SUB_BUCKETS = 8
+# Smallest distinguishable value (seconds); anything below lands in bucket 0
+MIN_VALUE = 0.0001
+# Values above MIN_VALUE * 2**OCTAVES (~28 minutes) land in the last bucket
+OCTAVES = 24
+BUCKET_COUNT = OCTAVES * SUB_BUCKETS + 1
+
+
+def bucket_index(value: float) -> int:
+    """Bucket for a value in seconds"""
+    if value <= MIN_VALUE:
+        return 0
+    index = int(math.log2(value / MIN_VALUE) * SUB_BUCKETS) + 1
+    return index if index < BUCKET_COUNT else BUCKET_COUNT - 1
+
+
+def bucket_value(index: int) -> float:
+    """Representative value (geometric midpoint) of a bucket"""
+    if index == 0:
+        return MIN_VALUE
+    return MIN_VALUE * 2 ** ((index - 0.5) / SUB_BUCKETS)
+
+
+class LatencyHistogram:
+    """Latency distribution in constant memory
+
+    Recording is a bucket increment plus a few scalar updates, with no
+    allocation and no sorting, so it is cheap enough for every request.
+    Quantiles are read from the bucket counts; min, max, count and sum are
+    exact. Not synchronized: each instance must have a single writer (see
+    MetricsCollector), while readers use snapshot()/merge() to combine them.
+    """
+
+    __slots__ = ("counts", "count", "total", "min", "max")
+
+    def __init__(self) -> None:
+        self.counts = [0] * BUCKET_COUNT
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def record(self, value: float) -> None:
+        """Record one observation in seconds"""
+        if value < 0:
+            value = 0.0
+        self.counts[bucket_index(value)] += 1
+        self.count += 1
+        self.total += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def snapshot(self) -> "LatencyHistogram":
+        """Independent copy, safe to read while the original keeps recording"""
+        copy = LatencyHistogram()
+        copy.merge(self)
+        return copy
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        """Add another histogram's observations into this one"""
+        counts = list(other.counts)
+        for i, c in enumerate(counts):
+            if c:
+                self.counts[i] += c
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q: float) -> float:
+        """Approximate q-quantile (0 <= q <= 1), clamped to the exact min/max"""
+        if self.count == 0:
+            return 0.0
+        rank = max(1, math.ceil(q * self.count))
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank:
+                return min(max(bucket_value(i), self.min), self.max)
+        return self.max
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
@@ -3,7 +3,10 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
+from decimal import Decimal
+from typing import Any, AsyncIterator, Awaitable, Callable
 
+from .exceptions import BillingException
 from .models import ChatMessage, ChatCompletionResponse, BillingMetadata
 
 
@@ -68,12 +71,26 @@ class IBillingService(ABC):
         """
         pass
 
+    @abstractmethod
+    async def log_billing_batch(self, batch: list[BillingMetadata]) -> list[BillingException | None]:
+        """
+        Log and bill many charges in one round trip
+
+        Args:
+            batch: Billing metadata of the charges
+
+        Returns:
+            Per charge: None if billed, otherwise the exception it failed with
+        """
+        pass
+
     @abstractmethod
     def calculate_cost(
         self,
         model: str,
         prompt_tokens: int,
         completion_tokens: int,
+        cached_tokens: int = 0,
     ) -> float:
         """
         Calculate the cost of an AI request
@@ -82,6 +99,7 @@ class IBillingService(ABC):
             model: Model used
             prompt_tokens: Number of prompt tokens
             completion_tokens: Number of completion tokens
+            cached_tokens: Prompt tokens served from context caching
 
         Returns:
             Cost in USD
@@ -106,21 +124,85 @@ class IUsageLogService(ABC):
         """Log a usage entry"""
         pass
 
+    @abstractmethod
+    async def flush(self) -> None:
+        """Wait until every logged entry has been persisted"""
+        pass
+
     @abstractmethod
     async def get_user_usage(
-        self, user_id: str, page: int = 1, page_size: int = 20
-    ) -> tuple[list[dict], int]:
-        """Get usage entries for a user. Returns (entries, total_count)."""
+        self, user_id: str, page: int = 1, page_size: int = 20, cursor: str | None = None
+    ) -> tuple[list[dict], int, str | None]:
+        """Get usage entries for a user. Returns (entries, total_count, next_cursor)."""
+        pass
+
+    @abstractmethod
+    def iter_export(
+        self,
+        start: str,
+        end: str,
+        user_id: str | None = None,
+        after_id: int = 0,
+        chunk_size: int | None = None,
+    ) -> AsyncIterator[list[dict]]:
+        """Stream usage entries created in [start, end) as chunks, oldest first.
+
+        Entries created exactly at start are skipped up to and including after_id.
+        """
+        pass
+
+    @abstractmethod
+    async def get_user_summary(
+        self, user_id: str, start_date: str | None = None, end_date: str | None = None
+    ) -> dict:
+        """Get usage summary for a user, optionally for an inclusive YYYY-MM-DD day range."""
+        pass
+
+    @abstractmethod
+    async def get_system_summary(self, start_date: str | None = None, end_date: str | None = None) -> dict:
+        """Get system-wide usage summary, optionally for an inclusive YYYY-MM-DD day range."""
+        pass
+
+
+class IUsageAccountant(ABC):
+    """Interface for recording completions and billing them off the request path"""
+
+    @abstractmethod
+    def record_completion(
+        self,
+        user_id: str,
+        model: str,
+        prompt_tokens: int,
+        completion_tokens: int,
+        total_tokens: int,
+        request_id: str,
+        response_time: float,
+        bill: bool = True,
+        estimated: bool = False,
+        cache_hit: bool = False,
+        coalesced: bool = False,
+        status: str | None = None,
+        time_to_first_token: float | None = None,
+        provider_time: float | None = None,
+        reservation_key: str | None = None,
+        cached_tokens: int = 0,
+    ) -> float:
+        """Record metrics and queue usage logging and billing. Returns the cost in USD."""
+        pass
+
+    @abstractmethod
+    def release_reservation(self, user_id: str, reservation_key: str | None) -> None:
+        """Release the credits hold of a completion that will not be billed"""
         pass
 
     @abstractmethod
-    async def get_user_summary(self, user_id: str) -> dict:
-        """Get usage summary for a user."""
+    async def flush(self) -> None:
+        """Wait until every queued charge has been processed"""
         pass
 
     @abstractmethod
-    async def get_system_summary(self) -> dict:
-        """Get system-wide usage summary."""
+    def stats(self) -> dict:
+        """Get billing pipeline counters"""
         pass
 
 
@@ -144,6 +226,7 @@ class IPricingService(ABC):
         display_name: str | None,
         input_price: float,
         output_price: float,
+        cached_input_price: float | None = None,
     ) -> dict:
         """Update pricing for a model"""
         pass
@@ -155,6 +238,7 @@ class IPricingService(ABC):
         display_name: str | None,
         input_price: float,
         output_price: float,
+        cached_input_price: float | None = None,
     ) -> dict:
         """Create new model pricing"""
         pass
@@ -163,6 +247,158 @@ class IPricingService(ABC):
     def get_pricing_for_model_sync(self, model: str) -> dict:
         """Get pricing dict for billing (synchronous, cached).
 
-        Returns dict with input_price_per_1k, output_price_per_1k.
+        Returns dict with input_price_per_1k, output_price_per_1k and
+        cached_input_price_per_1k.
+        """
+        pass
+
+
+class IResponseCache(ABC):
+    """Interface for caching completed chat responses"""
+
+    bill_hits: bool
+
+    @abstractmethod
+    def is_eligible(self, temperature: float, opt_in: bool | None) -> bool:
+        """Whether a request with these settings may use the cache"""
+        pass
+
+    @abstractmethod
+    def get(self, key: str) -> ChatCompletionResponse | None:
+        """Get a cached response by request fingerprint, or None"""
+        pass
+
+    @abstractmethod
+    def put(self, key: str, response: ChatCompletionResponse) -> None:
+        """Cache a completed response under its request fingerprint"""
+        pass
+
+    @abstractmethod
+    def stats(self) -> dict:
+        """Get cache statistics"""
+        pass
+
+
+class IBalanceGate(ABC):
+    """Interface for checking and holding a user's credits before dispatch"""
+
+    default_completion_tokens: int
+
+    @abstractmethod
+    async def reserve(self, user_id: str, amount: float, reservation_key: str) -> str | None:
         """
+        Hold credits for an estimated cost before calling the provider
+
+        Returns:
+            The reservation key to settle the hold with, or None if no hold
+            was placed (the credits service was unavailable)
+
+        Raises:
+            InsufficientCreditsException: If the user cannot cover the cost
+        """
+        pass
+
+    @abstractmethod
+    def release(self, user_id: str, reservation_key: str) -> None:
+        """Release a hold in the background (its completion will not be billed)"""
+        pass
+
+    @abstractmethod
+    def update_balance(self, user_id: str, balance: Decimal) -> None:
+        """Write through a balance reported by the credits service"""
+        pass
+
+    @abstractmethod
+    def stats(self) -> dict:
+        """Get gate statistics"""
+        pass
+
+
+class IRateLimiter(ABC):
+    """Interface for request and cost-weighted rate limits"""
+
+    @abstractmethod
+    def model_weight(self, model: str) -> int:
+        """Cost of one request to a model"""
+        pass
+
+    @abstractmethod
+    async def hit(self, limit: str, *identifiers: str, cost: int = 1) -> None:
+        """Consume cost from a limit; raises RateLimitExceededException when used up"""
+        pass
+
+    @abstractmethod
+    def stats(self) -> dict:
+        """Get limiter counters"""
+        pass
+
+
+class IProviderScheduler(ABC):
+    """Interface for admitting provider calls against per-model token quotas"""
+
+    default_completion_tokens: int
+
+    @abstractmethod
+    async def admit(self, model: str, user_id: str, tokens: int) -> Any:
+        """Wait until a call of about `tokens` fits the model's quota; returns its admission"""
+        pass
+
+    @abstractmethod
+    def settle(self, admission: Any, actual_tokens: int) -> None:
+        """Replace an admission's estimate with the provider-reported usage"""
+        pass
+
+    @abstractmethod
+    def stream(self, model: str, user_id: str, tokens: int, chunks: AsyncIterator[dict]) -> AsyncIterator[dict]:
+        """Admit a streaming call before its first chunk and settle on its usage"""
+        pass
+
+    @abstractmethod
+    def stats(self) -> dict:
+        """Get per-model window usage and queue counters"""
+        pass
+
+
+class IContextCache(ABC):
+    """Interface for provider-side caching of stable prompt prefixes"""
+
+    @abstractmethod
+    def acquire(self, model: str, system_instruction: str | None, history: list[dict]) -> Any:
+        """Lease the longest cached prefix of a conversation (None when none is cached)"""
+        pass
+
+    @abstractmethod
+    def release(self, lease: Any, cached_tokens: int = 0) -> None:
+        """Give a lease back once its request is done"""
+        pass
+
+    @abstractmethod
+    def invalidate(self, lease: Any) -> None:
+        """Forget a leased prefix the provider no longer has, and release the lease"""
+        pass
+
+    @abstractmethod
+    def stats(self) -> dict:
+        """Get hit, creation and eviction counters"""
+        pass
+
+
+class IRequestCoalescer(ABC):
+    """Interface for sharing one provider call among identical concurrent requests"""
+
+    bill_shared: bool
+
+    @abstractmethod
+    async def run(self, key: str, factory: Callable[[], Awaitable[Any]]) -> tuple[Any, bool]:
+        """Run factory once per in-flight key. Returns (result, shared)."""
+        pass
+
+    @abstractmethod
+    def stream(self, key: str, factory: Callable[[], AsyncIterator[dict]]) -> tuple[AsyncIterator[dict], bool]:
+        """Subscribe to one shared upstream stream per in-flight key. Returns (chunks, shared)."""
+        pass
+
+    @abstractmethod
+    def stats(self) -> dict:
+        """Get coalescing statistics"""
         pass
@@ -1,40 +1,139 @@
-"""Simple metrics tracking for observability"""
+"""In-process metrics for observability"""
 
 import logging
+import math
+import threading
 import time
 from datetime import datetime
-from typing import Dict, List
-from collections import defaultdict
-from threading import Lock
+from typing import Dict
+
+from shared.sqlite import get_database_stats
+
+from .executor import get_executor_stats
+from .histogram import LatencyHistogram
 
 logger = logging.getLogger(__name__)
 
+# Distinct model labels tracked before further models are folded into
+# "other"; the model name comes from the request, so it must be bounded
+MAX_MODEL_LABELS = 64
+OTHER_MODEL = "other"
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class _Series:
+    """Counters and histograms for one (model, status) pair"""
+
+    __slots__ = (
+        "requests",
+        "cache_hits",
+        "coalesced",
+        "prompt_tokens",
+        "completion_tokens",
+        "cost_usd",
+        "latency",
+        "ttft",
+        "provider",
+        "overhead",
+    )
+
+    def __init__(self) -> None:
+        self.requests = 0
+        self.cache_hits = 0
+        self.coalesced = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost_usd = 0.0
+        self.latency = LatencyHistogram()
+        self.ttft = LatencyHistogram()
+        self.provider = LatencyHistogram()
+        self.overhead = LatencyHistogram()
+
+    def merge(self, other: "_Series") -> None:
+        self.requests += other.requests
+        self.cache_hits += other.cache_hits
+        self.coalesced += other.coalesced
+        self.prompt_tokens += other.prompt_tokens
+        self.completion_tokens += other.completion_tokens
+        self.cost_usd += other.cost_usd
+        self.latency.merge(other.latency)
+        self.ttft.merge(other.ttft)
+        self.provider.merge(other.provider)
+        self.overhead.merge(other.overhead)
+
+
+class _Shard:
+    """One thread's private series; only that thread ever writes to it"""
+
+    __slots__ = ("series",)
+
+    def __init__(self) -> None:
+        self.series: dict[tuple[str, str], _Series] = {}
+
+
+def _percentiles(histogram: LatencyHistogram) -> dict:
+    return {
+        "p50_seconds": round(histogram.quantile(0.5), 3),
+        "p95_seconds": round(histogram.quantile(0.95), 3),
+        "p99_seconds": round(histogram.quantile(0.99), 3),
+        "avg_seconds": round(histogram.mean, 3),
+        "sample_size": histogram.count,
+    }
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels: str) -> str:
+    return "{" + ",".join(f'{k}="{_escape_label(v)}"' for k, v in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
 
 class MetricsCollector:
-    """In-memory metrics collector for basic observability"""
+    """In-memory metrics collector with bounded memory and no hot-path locks
+
+    Each recording thread writes to its own shard, so record_request never
+    contends with other writers or with readers; the lock is only taken the
+    first time a thread records, and when a new model label appears.
+    Readers merge snapshots of all shards. Latencies go into fixed-size
+    histograms, so memory does not grow with traffic and p50/p95/p99 cover
+    every request since startup rather than a recent sample.
+    """
 
     def __init__(self):
         """Initialize metrics collector"""
-        self.lock = Lock()
         self.start_time = time.time()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._shards: list[_Shard] = []
+        self._models: frozenset[str] = frozenset()
 
-        # Request counters
-        self.total_requests = 0
-        self.successful_requests = 0
-        self.failed_requests = 0
-        self.requests_by_model: Dict[str, int] = defaultdict(int)
-
-        # Token usage
-        self.total_tokens_used = 0
-        self.total_prompt_tokens = 0
-        self.total_completion_tokens = 0
-
-        # Billing
-        self.total_cost_usd = 0.0
+    def _shard(self) -> _Shard:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = _Shard()
+            with self._lock:
+                self._shards.append(shard)
+            self._local.shard = shard
+            return shard
 
-        # Response times (for simple stats)
-        self.response_times: List[float] = []
-        self.max_response_times = 1000  # Keep last 1000 response times
+    def _model_label(self, model: str) -> str:
+        if model in self._models:
+            return model
+        with self._lock:
+            if model not in self._models and len(self._models) >= MAX_MODEL_LABELS:
+                return OTHER_MODEL
+            # Copy-on-write so lock-free readers always see a complete set
+            self._models = self._models | {model}
+        return model
 
     def record_request(
         self,
@@ -44,6 +143,11 @@ class MetricsCollector:
         completion_tokens: int = 0,
         cost_usd: float = 0.0,
         response_time: float = 0.0,
+        cache_hit: bool = False,
+        coalesced: bool = False,
+        status: str | None = None,
+        time_to_first_token: float | None = None,
+        provider_time: float | None = None,
     ):
         """
         Record a completed request
@@ -55,24 +159,53 @@ class MetricsCollector:
             completion_tokens: Number of completion tokens
             cost_usd: Cost in USD
             response_time: Response time in seconds
+            cache_hit: Whether the response was served from the response cache
+            coalesced: Whether the response was shared from another in-flight request
+            status: Outcome label; defaults to "ok" or "error" from success
+            time_to_first_token: Seconds until the first streamed chunk was sent
+            provider_time: Seconds spent waiting on the AI provider; the rest
+                of response_time is counted as proxy overhead
         """
-        with self.lock:
-            self.total_requests += 1
-
-            if success:
-                self.successful_requests += 1
-                self.requests_by_model[model] += 1
-                self.total_tokens_used += prompt_tokens + completion_tokens
-                self.total_prompt_tokens += prompt_tokens
-                self.total_completion_tokens += completion_tokens
-                self.total_cost_usd += cost_usd
-
-                # Track response time
-                self.response_times.append(response_time)
-                if len(self.response_times) > self.max_response_times:
-                    self.response_times.pop(0)
-            else:
-                self.failed_requests += 1
+        key = (self._model_label(model), status or ("ok" if success else "error"))
+        shard = self._shard()
+        series = shard.series.get(key)
+        if series is None:
+            series = shard.series[key] = _Series()
+
+        series.requests += 1
+        if not success:
+            if response_time > 0:
+                series.latency.record(response_time)
+            return
+
+        if cache_hit:
+            series.cache_hits += 1
+        if coalesced:
+            series.coalesced += 1
+        series.prompt_tokens += prompt_tokens
+        series.completion_tokens += completion_tokens
+        series.cost_usd += cost_usd
+        series.latency.record(response_time)
+        if time_to_first_token is not None:
+            series.ttft.record(time_to_first_token)
+        if provider_time is not None:
+            series.provider.record(provider_time)
+            series.overhead.record(max(0.0, response_time - provider_time))
+
+    def _collect(self) -> dict[tuple[str, str], _Series]:
+        """Merge every shard into fresh series without blocking writers"""
+        with self._lock:
+            shards = list(self._shards)
+        merged: dict[tuple[str, str], _Series] = {}
+        for shard in shards:
+            # list() of a dict is a single C-level copy under the GIL, so
+            # it cannot observe the owning thread half-way through an insert
+            for key, series in list(shard.series.items()):
+                target = merged.get(key)
+                if target is None:
+                    target = merged[key] = _Series()
+                target.merge(series)
+        return merged
 
     def get_metrics(self) -> Dict:
         """
@@ -81,56 +214,158 @@ class MetricsCollector:
         Returns:
             Dictionary of current metrics
         """
-        with self.lock:
-            uptime_seconds = time.time() - self.start_time
-
-            # Calculate response time stats
-            avg_response_time = sum(self.response_times) / len(self.response_times) if self.response_times else 0
-            min_response_time = min(self.response_times) if self.response_times else 0
-            max_response_time = max(self.response_times) if self.response_times else 0
-
-            # Calculate success rate
-            success_rate = (self.successful_requests / self.total_requests * 100) if self.total_requests > 0 else 0
-
-            return {
-                "service": "AI Proxy Service",
-                "timestamp": datetime.utcnow().isoformat() + "Z",
-                "uptime_seconds": round(uptime_seconds, 2),
-                "requests": {
-                    "total": self.total_requests,
-                    "successful": self.successful_requests,
-                    "failed": self.failed_requests,
-                    "success_rate_percent": round(success_rate, 2),
-                    "by_model": dict(self.requests_by_model),
-                },
-                "tokens": {
-                    "total": self.total_tokens_used,
-                    "prompt": self.total_prompt_tokens,
-                    "completion": self.total_completion_tokens,
-                },
-                "billing": {
-                    "total_cost_usd": round(self.total_cost_usd, 6),
-                },
-                "performance": {
-                    "avg_response_time_seconds": round(avg_response_time, 3),
-                    "min_response_time_seconds": round(min_response_time, 3),
-                    "max_response_time_seconds": round(max_response_time, 3),
-                    "sample_size": len(self.response_times),
-                },
-            }
+        series = self._collect()
+        uptime_seconds = time.time() - self.start_time
+
+        totals = _Series()
+        by_model: dict[str, int] = {}
+        by_status: dict[str, int] = {}
+        successful = 0
+        latency = LatencyHistogram()
+        for (model, status), s in series.items():
+            totals.merge(s)
+            by_status[status] = by_status.get(status, 0) + s.requests
+            if status == "ok":
+                successful += s.requests
+                by_model[model] = by_model.get(model, 0) + s.requests
+                latency.merge(s.latency)
+
+        total_requests = totals.requests
+        success_rate = (successful / total_requests * 100) if total_requests > 0 else 0
+
+        per_model_latency: dict[str, LatencyHistogram] = {}
+        for (model, status), s in series.items():
+            if status == "ok":
+                per_model_latency.setdefault(model, LatencyHistogram()).merge(s.latency)
+
+        return {
+            "service": "AI Proxy Service",
+            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "uptime_seconds": round(uptime_seconds, 2),
+            "requests": {
+                "total": total_requests,
+                "successful": successful,
+                "failed": total_requests - successful,
+                "success_rate_percent": round(success_rate, 2),
+                "cache_hits": totals.cache_hits,
+                "coalesced": totals.coalesced,
+                "by_model": by_model,
+                "by_status": by_status,
+            },
+            "tokens": {
+                "total": totals.prompt_tokens + totals.completion_tokens,
+                "prompt": totals.prompt_tokens,
+                "completion": totals.completion_tokens,
+            },
+            "billing": {
+                "total_cost_usd": round(totals.cost_usd, 6),
+            },
+            "performance": {
+                "avg_response_time_seconds": round(latency.mean, 3),
+                "min_response_time_seconds": round(latency.min if latency.count else 0, 3),
+                "max_response_time_seconds": round(latency.max, 3),
+                "p50_response_time_seconds": round(latency.quantile(0.5), 3),
+                "p95_response_time_seconds": round(latency.quantile(0.95), 3),
+                "p99_response_time_seconds": round(latency.quantile(0.99), 3),
+                "sample_size": latency.count,
+                "by_model": {model: _percentiles(h) for model, h in per_model_latency.items()},
+                "time_to_first_token": _percentiles(totals.ttft),
+                "provider": _percentiles(totals.provider),
+                "proxy_overhead": _percentiles(totals.overhead),
+            },
+            "executors": get_executor_stats(),
+            "databases": get_database_stats(),
+        }
+
+    def render_prometheus(self) -> str:
+        """
+        Render the metrics in the Prometheus text exposition format (0.0.4)
+
+        Returns:
+            Exposition text, one sample per line
+        """
+        series = self._collect()
+        lines: list[str] = []
+
+        def family(name: str, kind: str, help_text: str) -> None:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        def summary(name: str, help_text: str, histograms: dict[tuple, LatencyHistogram], label_names: tuple):
+            family(name, "summary", help_text)
+            for label_values, h in sorted(histograms.items()):
+                if not h.count:
+                    continue
+                labels = dict(zip(label_names, label_values))
+                for q in QUANTILES:
+                    lines.append(f"{name}{_labels(**labels, quantile=str(q))} {_format_value(h.quantile(q))}")
+                lines.append(f"{name}_sum{_labels(**labels)} {_format_value(h.total)}")
+                lines.append(f"{name}_count{_labels(**labels)} {h.count}")
+
+        family("ai_proxy_uptime_seconds", "gauge", "Seconds since the collector started")
+        lines.append(f"ai_proxy_uptime_seconds {_format_value(time.time() - self.start_time)}")
+
+        family("ai_proxy_requests_total", "counter", "Chat completion requests by model and outcome")
+        for (model, status), s in sorted(series.items()):
+            lines.append(f"ai_proxy_requests_total{_labels(model=model, status=status)} {s.requests}")
+
+        # Success-only counters and latencies, merged across statuses per model
+        per_model: dict[str, _Series] = {}
+        for (model, status), s in series.items():
+            if status == "ok":
+                per_model.setdefault(model, _Series()).merge(s)
+
+        family("ai_proxy_cache_hits_total", "counter", "Completions served from the response cache")
+        for model, s in sorted(per_model.items()):
+            lines.append(f"ai_proxy_cache_hits_total{_labels(model=model)} {s.cache_hits}")
+
+        family("ai_proxy_coalesced_requests_total", "counter", "Completions shared from an identical in-flight request")
+        for model, s in sorted(per_model.items()):
+            lines.append(f"ai_proxy_coalesced_requests_total{_labels(model=model)} {s.coalesced}")
+
+        family("ai_proxy_tokens_total", "counter", "Tokens processed by model and kind")
+        for model, s in sorted(per_model.items()):
+            lines.append(f"ai_proxy_tokens_total{_labels(model=model, kind='prompt')} {s.prompt_tokens}")
+            lines.append(f"ai_proxy_tokens_total{_labels(model=model, kind='completion')} {s.completion_tokens}")
+
+        family("ai_proxy_cost_usd_total", "counter", "Billed cost in USD")
+        for model, s in sorted(per_model.items()):
+            lines.append(f"ai_proxy_cost_usd_total{_labels(model=model)} {_format_value(s.cost_usd)}")
+
+        summary(
+            "ai_proxy_request_duration_seconds",
+            "End-to-end completion latency",
+            {key: s.latency for key, s in series.items()},
+            ("model", "status"),
+        )
+        summary(
+            "ai_proxy_time_to_first_token_seconds",
+            "Time until the first streamed chunk was sent",
+            {(model,): s.ttft for model, s in per_model.items()},
+            ("model",),
+        )
+        summary(
+            "ai_proxy_provider_duration_seconds",
+            "Time spent waiting on the AI provider",
+            {(model,): s.provider for model, s in per_model.items()},
+            ("model",),
+        )
+        summary(
+            "ai_proxy_overhead_seconds",
+            "Latency added by the proxy on top of the provider",
+            {(model,): s.overhead for model, s in per_model.items()},
+            ("model",),
+        )
+
+        return "\n".join(lines) + "\n"
 
     def reset(self):
         """Reset all metrics (useful for testing)"""
-        with self.lock:
-            self.total_requests = 0
-            self.successful_requests = 0
-            self.failed_requests = 0
-            self.requests_by_model.clear()
-            self.total_tokens_used = 0
-            self.total_prompt_tokens = 0
-            self.total_completion_tokens = 0
-            self.total_cost_usd = 0.0
-            self.response_times.clear()
+        with self._lock:
+            for shard in self._shards:
+                shard.series = {}
+            self._models = frozenset()
+            self.start_time = time.time()
 
 
 # Global metrics collector instance
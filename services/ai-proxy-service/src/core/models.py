@@ -25,6 +25,16 @@ class ChatCompletionRequest(BaseModel):
     max_tokens: int | None = Field(default=None, description="Maximum tokens to generate")
     stream: bool | None = Field(default=False, description="Whether to stream the response")
     user_id: str | None = Field(default=None, description="User identifier for billing")
+    cache: bool | None = Field(
+        default=None,
+        description="Use the response cache (default: only when temperature is 0; requires cache enabled)",
+    )
+
+
+class PromptTokensDetails(BaseModel):
+    """Breakdown of prompt tokens"""
+
+    cached_tokens: int = Field(0, description="Prompt tokens served from context caching")
 
 
 class Usage(BaseModel):
@@ -33,6 +43,14 @@ class Usage(BaseModel):
     prompt_tokens: int = Field(..., description="Number of tokens in the prompt")
     completion_tokens: int = Field(..., description="Number of tokens in the completion")
     total_tokens: int = Field(..., description="Total tokens used")
+    prompt_tokens_details: PromptTokensDetails | None = Field(
+        None, description="Prompt token breakdown, present when part of the prompt was cached"
+    )
+
+    @property
+    def cached_tokens(self) -> int:
+        """Prompt tokens served from context caching"""
+        return self.prompt_tokens_details.cached_tokens if self.prompt_tokens_details else 0
 
 
 class ChatChoice(BaseModel):
@@ -65,6 +83,8 @@ class BillingMetadata(BaseModel):
     total_tokens: int = Field(..., description="Total tokens")
     estimated_cost_usd: Decimal = Field(..., description="Estimated cost in USD")
     request_id: str = Field(..., description="Unique request ID")
+    estimated: bool = Field(False, description="Token counts were estimated because the stream was aborted")
+    reservation_key: str | None = Field(None, description="Key of the credits hold this charge settles")
 
 
 # Error models
@@ -97,6 +117,9 @@ class UsageQueryResponse(BaseModel):
     total: int = Field(..., description="Total number of entries")
     page: int = Field(..., description="Current page")
     page_size: int = Field(..., description="Entries per page")
+    next_cursor: str | None = Field(
+        None, description="Cursor for the next page, absent on the last page"
+    )
 
 
 class UserUsageSummary(BaseModel):
@@ -118,6 +141,9 @@ class ModelPricing(BaseModel):
     display_name: str | None = Field(None, description="Human-readable model name")
     input_price_per_1k: Decimal = Field(..., description="Input price per 1K tokens in USD")
     output_price_per_1k: Decimal = Field(..., description="Output price per 1K tokens in USD")
+    cached_input_price_per_1k: Decimal | None = Field(
+        None, description="Price per 1K prompt tokens served from context caching, in USD"
+    )
     updated_at: str = Field(..., description="ISO 8601 last update timestamp")
 
 
@@ -133,6 +159,9 @@ class ModelPricingUpdateRequest(BaseModel):
     display_name: str | None = Field(None, description="Human-readable name")
     input_price_per_1k: Decimal = Field(..., description="Input price per 1K tokens", ge=0)
     output_price_per_1k: Decimal = Field(..., description="Output price per 1K tokens", ge=0)
+    cached_input_price_per_1k: Decimal | None = Field(
+        None, description="Price per 1K cached prompt tokens (kept when omitted)", ge=0
+    )
 
 
 class ModelPricingCreateRequest(BaseModel):
@@ -142,3 +171,6 @@ class ModelPricingCreateRequest(BaseModel):
     display_name: str | None = Field(None, description="Human-readable name")
     input_price_per_1k: Decimal = Field(..., description="Input price per 1K tokens", ge=0)
     output_price_per_1k: Decimal = Field(..., description="Output price per 1K tokens", ge=0)
+    cached_input_price_per_1k: Decimal | None = Field(
+        None, description="Price per 1K cached prompt tokens (defaults to the input price)", ge=0
+    )
@@ -2,16 +2,17 @@
 
 import logging
 import os
+import time
 
 from dotenv import load_dotenv
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from .api.routes import router
+from .container import container
 from shared.auth import APIKeyAuthMiddleware
-from .middleware.rate_limit import limiter, rate_limit_handler
+from shared.serialization import FastJSONResponse
 from .middleware.request_id import RequestIDMiddleware
-from slowapi.errors import RateLimitExceeded
 
 # Load environment variables from .env file
 load_dotenv()
@@ -30,12 +31,10 @@ app = FastAPI(
     title="AI Proxy Service",
     description="OpenAI-compatible proxy for Gemini and other AI providers",
     version="0.1.0",
+    # orjson-backed when installed
+    default_response_class=FastJSONResponse,
 )
 
-# Add rate limiter state
-app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, rate_limit_handler)
-
 # Add CORS middleware
 # Configure allowed origins from environment variable
 # Example: CORS_ALLOWED_ORIGINS="https://app.lotti.com,https://dev.lotti.com"
@@ -54,7 +53,7 @@ app.add_middleware(
 # Admin paths require ADMIN_API_KEYS for write access to pricing and read access to usage data
 app.add_middleware(
     APIKeyAuthMiddleware,
-    exempt_paths=["/health", "/metrics", "/docs", "/openapi.json", "/redoc"],
+    exempt_paths=["/health", "/metrics", "/metrics/prometheus", "/docs", "/openapi.json", "/redoc"],
     admin_path_prefixes=["/v1/pricing", "/v1/usage"],
 )
 
@@ -69,6 +68,11 @@ app.include_router(router)
 async def startup_event():
     """Application startup event"""
     logger.info("Starting AI Proxy Service...")
+    # Build services and open connections now rather than on the first request
+    if os.getenv("STARTUP_WARM_ENABLED", "true").lower() == "true":
+        started = time.perf_counter()
+        await container.warm()
+        logger.info(f"Services warmed in {(time.perf_counter() - started) * 1000:.0f}ms")
     logger.info("AI Proxy Service started successfully")
 
 
@@ -76,6 +80,7 @@ async def startup_event():
 async def shutdown_event():
     """Application shutdown event"""
     logger.info("Shutting down AI Proxy Service...")
+    await container.shutdown()
     logger.info("AI Proxy Service shutdown complete")
 
 
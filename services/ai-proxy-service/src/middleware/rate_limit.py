@@ -1,41 +1,60 @@
-"""Rate limiting middleware using slowapi"""
+"""Rate limiting dependency for FastAPI routes"""
 
-import logging
+import hashlib
 import os
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
 
-logger = logging.getLogger(__name__)
+from fastapi import Depends, HTTPException, Request, status
 
+from ..container import container
+from ..core.exceptions import RateLimitExceededException
 
-def get_limiter():
+
+def client_key(request: Request) -> tuple[str, str]:
     """
-    Create and configure rate limiter
+    Identify the client a per-client limit is counted for
+
+    RATE_LIMIT_KEY selects what identifies a client:
+    - ip (default): the remote address
+    - api_key: the bearer token (hashed, so the key never reaches the
+      storage), falling back to the remote address without one
 
-    Rate limits are configured via environment variables:
-    - RATE_LIMIT_PER_MINUTE: Requests per minute per IP (default: 60)
-    - RATE_LIMIT_ENABLED: Enable/disable rate limiting (default: true)
+    Returns:
+        (kind, identifier) pair, used as the limit's identifiers
     """
-    rate_limit_enabled = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
-    rate_limit_per_minute = int(os.getenv("RATE_LIMIT_PER_MINUTE", "60"))
+    if os.getenv("RATE_LIMIT_KEY", "ip").lower() == "api_key":
+        token = request.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+        if token:
+            return "key", hashlib.sha256(token.encode()).hexdigest()[:32]
+    return "ip", request.client.host if request.client else "unknown"
+
+
+def too_many_requests(e: RateLimitExceededException) -> HTTPException:
+    """Build the 429 response for an exceeded limit"""
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail=str(e),
+        headers={"Retry-After": str(e.retry_after)},
+    )
 
-    if not rate_limit_enabled:
-        logger.info("ℹ️  Rate limiting disabled")
-        # Return a limiter with effectively no limit
-        return Limiter(key_func=get_remote_address, default_limits=["999999 per minute"])
 
-    logger.info(f"✓ Rate limiting enabled: {rate_limit_per_minute} requests/minute per IP")
+def rate_limit(limit: str):
+    """
+    Route dependency limiting each client to `limit` requests
 
-    # Create limiter with configurable rate
-    limiter = Limiter(
-        key_func=get_remote_address,
-        default_limits=[f"{rate_limit_per_minute} per minute"],
-        storage_uri="memory://",  # In-memory storage (consider Redis for production with multiple instances)
-    )
+    Counted in the container's rate limiter, so the limit holds across
+    workers and replicas when it uses a shared storage.
 
-    return limiter
+    Args:
+        limit: Limit in limits notation, e.g. "30/minute"
+    """
 
+    async def check(request: Request) -> None:
+        rate_limiter = container.get_rate_limiter()
+        if rate_limiter is None:
+            return
+        try:
+            await rate_limiter.hit(limit, request.url.path, *client_key(request))
+        except RateLimitExceededException as e:
+            raise too_many_requests(e)
 
-# Global limiter instance
-limiter = get_limiter()
-rate_limit_handler = _rate_limit_exceeded_handler
+    return Depends(check)
@@ -2,51 +2,59 @@
 
 import logging
 import uuid
-from typing import Callable
 
-from fastapi import Request
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 logger = logging.getLogger(__name__)
 
 
-class RequestIDMiddleware(BaseHTTPMiddleware):
-    """Middleware to add unique request ID to each request for tracing"""
+class RequestIDMiddleware:
+    """Middleware to add unique request ID to each request for tracing
 
-    async def dispatch(self, request: Request, call_next: Callable):
+    Plain ASGI rather than ``BaseHTTPMiddleware``: the response is not
+    re-wrapped, so SSE chunks reach the client as soon as the app sends them.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         """
         Add request ID to request state and response headers
 
         Args:
-            request: Incoming HTTP request
-            call_next: Next middleware in chain
-
-        Returns:
-            Response with X-Request-ID header
+            scope: ASGI connection scope
+            receive: ASGI receive channel
+            send: ASGI send channel
         """
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
         # Check if request already has an ID (from upstream proxy/load balancer)
-        request_id = request.headers.get("X-Request-ID")
+        request_id = ""
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")
+                break
 
         # Generate new ID if not present
         if not request_id:
             request_id = f"req-{uuid.uuid4().hex[:12]}"
 
-        # Store in request state for access by route handlers
-        request.state.request_id = request_id
+        # Store in request state (what request.state reads) for route handlers
+        scope.setdefault("state", {})["request_id"] = request_id
 
         # Log request with ID
-        logger.info(
-            f"[{request_id}] {request.method} {request.url.path} "
-            f"from {request.client.host if request.client else 'unknown'}"
-        )
-
-        # Process request
-        response = await call_next(request)
-
-        # Add request ID to response headers for tracing
-        response.headers["X-Request-ID"] = request_id
+        client = scope.get("client")
+        logger.info(f"[{request_id}] {scope['method']} {scope['path']} from {client[0] if client else 'unknown'}")
 
-        # Log response
-        logger.info(f"[{request_id}] Response: {response.status_code}")
+        async def send_with_request_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                # Add request ID to response headers for tracing
+                MutableHeaders(scope=message)["X-Request-ID"] = request_id
+                logger.info(f"[{request_id}] Response: {message['status']}")
+            await send(message)
 
-        return response
+        await self.app(scope, receive, send_with_request_id)
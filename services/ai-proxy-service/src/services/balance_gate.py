@@ -0,0 +1,211 @@
+"""Pre-flight balance check and credits holds before calling the provider"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from decimal import Decimal
+from typing import Callable
+
+from ..core.exceptions import BillingUnavailableException, InsufficientCreditsException
+from ..core.interfaces import IBalanceGate
+from .credits_client import CreditsClient
+
+logger = logging.getLogger(__name__)
+
+
+class BalanceGate(IBalanceGate):
+    """Rejects or holds requests against the user's credits before dispatch
+
+    Before a provider call, the estimated cost (prompt plus the completion
+    budget) is held on the user's account as a pending transfer in the
+    credits service. The accountant then settles the hold when it bills the
+    actual cost, or releases it when the completion is not billed. Users who
+    cannot cover the estimate are turned away before the provider is paid.
+
+    Balances reported by the credits service (from holds and from bills) are
+    kept for a few seconds, so a user known to be out of credits is rejected
+    without a round trip. Only a balance below the estimate is acted on; an
+    apparently sufficient one is still confirmed by placing the hold. If the
+    credits service is unavailable, requests go ahead without a hold when
+    fail_open is set (billing then settles them as before), and are refused
+    otherwise.
+
+    Only touched from the event loop, so no locking is needed.
+    """
+
+    def __init__(
+        self,
+        credits_client: CreditsClient,
+        ttl_seconds: float = 5.0,
+        max_entries: int = 10000,
+        reservation_timeout: int = 300,
+        default_completion_tokens: int = 1024,
+        fail_open: bool = True,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """
+        Initialize the gate
+
+        Args:
+            credits_client: Shared client for the credits service
+            ttl_seconds: How long a reported balance is trusted
+            max_entries: Cached balances kept before LRU eviction
+            reservation_timeout: Seconds before an unsettled hold expires
+            default_completion_tokens: Completion budget to hold for when the
+                request sets no max_tokens
+            fail_open: Let requests through without a hold when the credits
+                service is unavailable
+            clock: Monotonic time source (injectable for tests)
+        """
+        self._credits_client = credits_client
+        self._ttl_seconds = ttl_seconds
+        self._max_entries = max_entries
+        self._reservation_timeout = reservation_timeout
+        self.default_completion_tokens = default_completion_tokens
+        self._fail_open = fail_open
+        self._clock = clock
+        self._balances: OrderedDict[str, tuple[float, Decimal]] = OrderedDict()
+        self._releases: set[asyncio.Task] = set()
+
+        self._reserved = 0
+        self._rejected = 0
+        self._rejected_cached = 0
+        self._unavailable = 0
+        self._released = 0
+
+    def _cached_balance(self, user_id: str) -> Decimal | None:
+        entry = self._balances.get(user_id)
+        if entry is None:
+            return None
+        stored_at, balance = entry
+        if self._clock() - stored_at > self._ttl_seconds:
+            del self._balances[user_id]
+            return None
+        return balance
+
+    def update_balance(self, user_id: str, balance: Decimal) -> None:
+        """
+        Write through a balance reported by the credits service
+
+        Args:
+            user_id: User identifier
+            balance: Balance in USD (available, or posted as an upper bound)
+        """
+        self._balances[user_id] = (self._clock(), balance)
+        self._balances.move_to_end(user_id)
+        if len(self._balances) > self._max_entries:
+            self._balances.popitem(last=False)
+
+    def _reject(self, user_id: str, amount: float, balance: Decimal) -> InsufficientCreditsException:
+        self._rejected += 1
+        logger.info(f"Rejecting request for {user_id}: estimated ${amount:.6f}, available ${balance}")
+        return InsufficientCreditsException(
+            "Insufficient balance. Please top up your account to continue using AI services."
+        )
+
+    async def reserve(self, user_id: str, amount: float, reservation_key: str) -> str | None:
+        """
+        Hold credits for an estimated cost before calling the provider
+
+        Args:
+            user_id: User to hold credits for
+            amount: Estimated cost in USD
+            reservation_key: Key of the hold (the request ID); billing the
+                completion with it settles the hold
+
+        Returns:
+            reservation_key if a hold was placed, None if the request may
+            proceed without one (nothing to bill, or the credits service was
+            unavailable)
+
+        Raises:
+            InsufficientCreditsException: If the user cannot cover the estimate,
+                or the credits service is unavailable and fail_open is off
+        """
+        if amount <= 0:
+            # Nothing will be billed, so there is nothing to hold
+            return None
+
+        cached = self._cached_balance(user_id)
+        if cached is not None and cached < Decimal(str(amount)):
+            self._rejected_cached += 1
+            raise self._reject(user_id, amount, cached)
+
+        try:
+            response = await self._credits_client.post(
+                "/api/v1/reserve",
+                json={
+                    "user_id": user_id,
+                    "amount": amount,
+                    "idempotency_key": reservation_key,
+                    "timeout_seconds": self._reservation_timeout,
+                },
+                idempotency_key=reservation_key,
+            )
+            if response.status_code == 404:
+                # No credits account: nothing can be billed
+                self.update_balance(user_id, Decimal("0"))
+                raise self._reject(user_id, amount, Decimal("0"))
+            if response.status_code != 200:
+                raise BillingUnavailableException(f"Reservation returned {response.status_code}")
+            data = response.json()
+        except BillingUnavailableException as e:
+            self._unavailable += 1
+            if not self._fail_open:
+                raise InsufficientCreditsException("Billing is temporarily unavailable - please try again later") from e
+            logger.warning(f"[{reservation_key}] Credits service unavailable ({e}); proceeding without a hold")
+            return None
+
+        balance = Decimal(str(data["available_balance"]))
+        self.update_balance(user_id, balance)
+        if not data["reserved"]:
+            raise self._reject(user_id, amount, balance)
+        self._reserved += 1
+        return reservation_key
+
+    def release(self, user_id: str, reservation_key: str) -> None:
+        """
+        Release a hold in the background (its completion will not be billed)
+
+        Synchronous so it can be called from the cleanup path of an aborted
+        stream. Failures are only logged: the hold expires on its own.
+        """
+        try:
+            task = asyncio.get_running_loop().create_task(self._release(user_id, reservation_key))
+        except RuntimeError:
+            return
+        self._releases.add(task)
+        task.add_done_callback(self._releases.discard)
+
+    async def _release(self, user_id: str, reservation_key: str) -> None:
+        try:
+            response = await self._credits_client.post(
+                "/api/v1/release",
+                json={"items": [{"user_id": user_id, "reservation_key": reservation_key}]},
+                idempotency_key=reservation_key,
+            )
+            if response.status_code == 200:
+                self._released += response.json()["released"]
+                # The held amount is spendable again
+                self._balances.pop(user_id, None)
+            else:
+                logger.warning(f"[{reservation_key}] Releasing hold returned {response.status_code}")
+        except Exception as e:
+            logger.warning(f"[{reservation_key}] Could not release hold ({e}); it will expire")
+
+    async def close(self) -> None:
+        """Wait for outstanding releases"""
+        if self._releases:
+            await asyncio.gather(*self._releases, return_exceptions=True)
+
+    def stats(self) -> dict:
+        """Get gate counters for /metrics"""
+        return {
+            "cached_balances": len(self._balances),
+            "reserved": self._reserved,
+            "rejected": self._rejected,
+            "rejected_from_cache": self._rejected_cached,
+            "released": self._released,
+            "unavailable": self._unavailable,
+        }
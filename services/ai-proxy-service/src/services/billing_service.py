@@ -2,17 +2,17 @@
 
 import logging
 import os
-
-import httpx
+from decimal import Decimal
 
 from ..core.constants import (
     DEFAULT_MODEL_PRICING,
     MODEL_MAPPINGS,
     MODEL_PRICING,
 )
-from ..core.exceptions import AIProviderException
-from ..core.interfaces import IBillingService, IPricingService
+from ..core.exceptions import BillingException, BillingUnavailableException
+from ..core.interfaces import IBalanceGate, IBillingService, IPricingService
 from ..core.models import BillingMetadata
+from .credits_client import CreditsClient
 
 logger = logging.getLogger(__name__)
 
@@ -20,17 +20,30 @@ logger = logging.getLogger(__name__)
 class BillingService(IBillingService):
     """Service for billing operations with credits service integration"""
 
-    def __init__(self, pricing_service: IPricingService | None = None):
+    def __init__(
+        self,
+        pricing_service: IPricingService | None = None,
+        credits_client: CreditsClient | None = None,
+        balance_gate: IBalanceGate | None = None,
+    ):
         """Initialize billing service with credits service configuration
 
         Args:
             pricing_service: Optional pricing service for dynamic pricing lookups.
                 If not provided, falls back to constant-based pricing.
+            credits_client: Shared client for the credits service. If not
+                provided and Phase 2 is configured, a private one is created.
+            balance_gate: Optional pre-flight balance gate; balances reported
+                by the credits service are written through to it
         """
         self._pricing_service = pricing_service
         self.credits_service_url = os.getenv("CREDITS_SERVICE_URL", "")
         self.credits_service_api_key = os.getenv("CREDITS_SERVICE_API_KEY", "")
         self.phase2_enabled = bool(self.credits_service_url and self.credits_service_api_key)
+        self._credits_client = credits_client
+        self._balance_gate = balance_gate
+        if self.phase2_enabled and self._credits_client is None:
+            self._credits_client = CreditsClient(self.credits_service_url, self.credits_service_api_key)
 
         if self.phase2_enabled:
             logger.info(f"✓ Phase 2 billing enabled - Credits service: {self.credits_service_url}")
@@ -65,14 +78,17 @@ class BillingService(IBillingService):
         model: str,
         prompt_tokens: int,
         completion_tokens: int,
+        cached_tokens: int = 0,
     ) -> float:
         """
         Calculate the cost of an AI request
 
         Args:
             model: Model used
-            prompt_tokens: Number of prompt tokens
+            prompt_tokens: Number of prompt tokens, cached ones included
             completion_tokens: Number of completion tokens
+            cached_tokens: Prompt tokens served from context caching, billed
+                at the cached input price
 
         Returns:
             Cost in USD
@@ -80,17 +96,40 @@ class BillingService(IBillingService):
         # Get model-specific pricing
         pricing = self._get_pricing_for_model(model)
 
-        input_cost = (prompt_tokens / 1000) * pricing["input_price_per_1k"]
+        cached_tokens = min(cached_tokens, prompt_tokens)
+        cached_price = pricing.get("cached_input_price_per_1k", pricing["input_price_per_1k"])
+        input_cost = ((prompt_tokens - cached_tokens) / 1000) * pricing["input_price_per_1k"]
+        input_cost += (cached_tokens / 1000) * cached_price
         output_cost = (completion_tokens / 1000) * pricing["output_price_per_1k"]
         total_cost = input_cost + output_cost
 
         logger.debug(
-            f"Cost calculation for {model}: {prompt_tokens} input tokens (${input_cost:.6f}) + "
-            f"{completion_tokens} output tokens (${output_cost:.6f}) = ${total_cost:.6f}"
+            f"Cost calculation for {model}: {prompt_tokens} input tokens ({cached_tokens} cached, "
+            f"${input_cost:.6f}) + {completion_tokens} output tokens (${output_cost:.6f}) = ${total_cost:.6f}"
         )
 
         return total_cost
 
+    @staticmethod
+    def _log_charge(metadata: BillingMetadata) -> None:
+        logger.info(
+            f"💰 BILLING | "
+            f"User: {metadata.user_id} | "
+            f"Model: {metadata.model} | "
+            f"Tokens: {metadata.prompt_tokens} input + "
+            f"{metadata.completion_tokens} output = {metadata.total_tokens} total | "
+            f"Cost: ${metadata.estimated_cost_usd:.6f} USD | "
+            f"Request ID: {metadata.request_id}"
+            f"{' | Estimated (stream aborted)' if metadata.estimated else ''}"
+        )
+
+    @staticmethod
+    def _charge_description(metadata: BillingMetadata) -> str:
+        return (
+            f"{metadata.model} - {metadata.total_tokens} tokens "
+            f"{'(estimated) ' if metadata.estimated else ''}(req: {metadata.request_id})"
+        )
+
     async def log_billing(self, metadata: BillingMetadata) -> None:
         """
         Log billing information and optionally bill user via credits service
@@ -99,64 +138,149 @@ class BillingService(IBillingService):
             metadata: Billing metadata to log and process
 
         Raises:
-            AIProviderException: If billing via credits service fails
+            BillingUnavailableException: If the credits service failed
+                transiently (timeout, connection error, 429 or 5xx); the
+                charge is safe to retry with the same metadata
+            BillingException: If the credits service rejected the charge
         """
         # Always log billing info
-        logger.info(
-            f"💰 BILLING | "
-            f"User: {metadata.user_id} | "
-            f"Model: {metadata.model} | "
-            f"Tokens: {metadata.prompt_tokens} input + "
-            f"{metadata.completion_tokens} output = {metadata.total_tokens} total | "
-            f"Cost: ${metadata.estimated_cost_usd:.6f} USD | "
-            f"Request ID: {metadata.request_id}"
-        )
+        self._log_charge(metadata)
 
         # Phase 2: Call credits service to bill the user
         if self.phase2_enabled:
             try:
-                async with httpx.AsyncClient(timeout=10.0) as client:
-                    response = await client.post(
-                        f"{self.credits_service_url}/api/v1/bill",
-                        json={
-                            "user_id": metadata.user_id,
-                            "amount": float(metadata.estimated_cost_usd),
-                            "description": (
-                                f"{metadata.model} - {metadata.total_tokens} tokens " f"(req: {metadata.request_id})"
-                            ),
-                        },
-                        headers={"Authorization": f"Bearer {self.credits_service_api_key}"},
+                response = await self._credits_client.post(
+                    "/api/v1/bill",
+                    json={
+                        "user_id": metadata.user_id,
+                        "amount": float(metadata.estimated_cost_usd),
+                        "description": self._charge_description(metadata),
+                        # Retries of this charge reuse the key, so it is applied once
+                        "idempotency_key": metadata.request_id,
+                    },
+                    idempotency_key=metadata.request_id,
+                )
+
+                if response.status_code == 402:
+                    # Insufficient balance - this is a client error
+                    logger.warning(
+                        f"Billing failed for {metadata.user_id}: Insufficient balance "
+                        f"(cost: ${metadata.estimated_cost_usd:.6f})"
+                    )
+                    raise BillingException(
+                        "Insufficient balance. Please top up your account to continue using AI services."
                     )
+                elif response.status_code == 429 or response.status_code >= 500:
+                    logger.warning(
+                        f"Credits service unavailable billing {metadata.user_id}: Status {response.status_code}"
+                    )
+                    raise BillingUnavailableException(f"Billing service returned {response.status_code}")
+                elif response.status_code != 200:
+                    # Other billing errors
+                    logger.error(
+                        f"Billing failed for {metadata.user_id}: "
+                        f"Status {response.status_code}, Response: {response.text}"
+                    )
+                    raise BillingException("Billing service error - please contact support")
+
+                # Billing successful
+                logger.info(f"✓ Billed ${metadata.estimated_cost_usd:.6f} to {metadata.user_id}")
 
-                    if response.status_code == 402:
-                        # Insufficient balance - this is a client error
-                        logger.warning(
-                            f"Billing failed for {metadata.user_id}: Insufficient balance "
-                            f"(cost: ${metadata.estimated_cost_usd:.6f})"
-                        )
-                        raise AIProviderException(
-                            "Insufficient balance. Please top up your account to continue using AI services."
-                        )
-                    elif response.status_code != 200:
-                        # Other billing errors
-                        logger.error(
-                            f"Billing failed for {metadata.user_id}: "
-                            f"Status {response.status_code}, Response: {response.text}"
-                        )
-                        raise AIProviderException("Billing service error - please contact support")
-
-                    # Billing successful
-                    logger.info(f"✓ Billed ${metadata.estimated_cost_usd:.6f} to {metadata.user_id}")
-
-            except httpx.TimeoutException as e:
-                logger.error(f"Timeout calling credits service for {metadata.user_id}")
-                raise AIProviderException("Billing service timeout - please try again later") from e
-            except httpx.RequestError as e:
-                logger.error(f"Request error calling credits service for {metadata.user_id}: {e}")
-                raise AIProviderException("Billing service unavailable - please try again later") from e
-            except AIProviderException:
-                # Re-raise our custom exceptions
+            except BillingException:
+                # Re-raise our custom exceptions (including BillingUnavailableException
+                # from the client's retries and circuit breaker)
                 raise
             except Exception as e:
                 logger.exception(f"Unexpected error billing {metadata.user_id}")
-                raise AIProviderException("Billing error - please contact support") from e
+                raise BillingException("Billing error - please contact support") from e
+
+    async def log_billing_batch(self, batch: list[BillingMetadata]) -> list[BillingException | None]:
+        """
+        Log many charges and bill them with one credits service request
+
+        Args:
+            batch: Billing metadata of the charges, each keyed by its request ID
+
+        Returns:
+            One outcome per charge, in order: None if it was billed (or had
+            already been), BillingUnavailableException if only that charge
+            failed transiently and is safe to retry, or BillingException if
+            the credits service rejected it (e.g. insufficient balance)
+
+        Raises:
+            BillingUnavailableException: If the whole request failed
+                transiently; the batch is safe to retry as is
+            BillingException: If the credits service rejected the request
+        """
+        for metadata in batch:
+            self._log_charge(metadata)
+
+        outcomes: list[BillingException | None] = [None] * len(batch)
+        if not self.phase2_enabled:
+            return outcomes
+
+        # Free completions have nothing to charge, and the credits service
+        # rejects non-positive amounts
+        positions = [i for i, metadata in enumerate(batch) if metadata.estimated_cost_usd > 0]
+        if not positions:
+            return outcomes
+
+        try:
+            response = await self._credits_client.post(
+                "/api/v1/bill/batch",
+                json={
+                    "items": [
+                        {
+                            "user_id": batch[i].user_id,
+                            "amount": float(batch[i].estimated_cost_usd),
+                            "description": self._charge_description(batch[i]),
+                            # Retries of a charge reuse its key, so it is applied once
+                            "idempotency_key": batch[i].request_id,
+                            "reservation_key": batch[i].reservation_key,
+                        }
+                        for i in positions
+                    ]
+                },
+                idempotency_key=f"batch-{batch[positions[0]].request_id}",
+            )
+
+            if response.status_code == 429 or response.status_code >= 500:
+                logger.warning(f"Credits service unavailable billing {len(positions)} charges: Status {response.status_code}")
+                raise BillingUnavailableException(f"Billing service returned {response.status_code}")
+            elif response.status_code != 200:
+                logger.error(
+                    f"Batch billing of {len(positions)} charges failed: "
+                    f"Status {response.status_code}, Response: {response.text}"
+                )
+                raise BillingException("Billing service error - please contact support")
+
+            results = response.json()["results"]
+        except BillingException:
+            raise
+        except Exception as e:
+            logger.exception(f"Unexpected error billing {len(positions)} charges")
+            raise BillingException("Billing error - please contact support") from e
+
+        for i, result in zip(positions, results):
+            metadata = batch[i]
+            status = result["status"]
+            if self._balance_gate is not None and result.get("new_balance") is not None:
+                self._balance_gate.update_balance(metadata.user_id, Decimal(str(result["new_balance"])))
+            if status in ("billed", "duplicate"):
+                logger.debug(f"✓ Billed ${metadata.estimated_cost_usd:.6f} to {metadata.user_id}")
+            elif status == "error":
+                outcomes[i] = BillingUnavailableException("Credits service could not apply the charge")
+            elif status == "insufficient_balance":
+                logger.warning(
+                    f"Billing failed for {metadata.user_id}: Insufficient balance "
+                    f"(cost: ${metadata.estimated_cost_usd:.6f})"
+                )
+                outcomes[i] = BillingException(
+                    "Insufficient balance. Please top up your account to continue using AI services."
+                )
+            else:
+                logger.error(f"Billing failed for {metadata.user_id}: {status}")
+                outcomes[i] = BillingException(f"Billing rejected: {status}")
+
+        logger.info(f"✓ Billed {len(positions)} charges in one request")
+        return outcomes
@@ -0,0 +1,326 @@
+"""Provider-side context caching of stable prompt prefixes"""
+
+import asyncio
+import datetime
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Callable
+
+import google.generativeai as genai
+
+from ..core.executor import InstrumentedExecutor
+from ..core.interfaces import IContextCache
+
+logger = logging.getLogger(__name__)
+
+# Rough characters per token, used to skip prefixes below the provider's minimum
+CHARS_PER_TOKEN = 4
+
+# Prefixes whose creation failed (e.g. fewer tokens than the provider's
+# minimum) are remembered with this use count and not tried again
+_NOT_CACHEABLE = -1
+
+
+class GeminiContextProvider:
+    """Creates and deletes cached contents through the Gemini SDK (blocking calls)"""
+
+    def create(
+        self, model: str, system_instruction: str | None, contents: list[dict], ttl_seconds: float
+    ) -> tuple[Any, Any, int]:
+        """
+        Create a cached content for a prefix
+
+        Returns:
+            (handle, model bound to the cached content, cached token count)
+        """
+        cached = genai.caching.CachedContent.create(
+            model=model,
+            system_instruction=system_instruction,
+            contents=contents or None,
+            ttl=datetime.timedelta(seconds=ttl_seconds),
+            display_name="ai-proxy-prefix",
+        )
+        return cached, genai.GenerativeModel.from_cached_content(cached), cached.usage_metadata.total_token_count
+
+    def delete(self, handle: Any) -> None:
+        """Delete a cached content before its TTL runs out"""
+        handle.delete()
+
+
+class ContextLease:
+    """A cached prefix held by one request until it is released"""
+
+    __slots__ = ("model", "prefix_length", "_entry")
+
+    def __init__(self, entry: "_Entry") -> None:
+        # Model bound to the cached content: send only history[prefix_length:]
+        self.model = entry.model
+        self.prefix_length = entry.prefix_length
+        self._entry = entry
+
+
+class _Entry:
+    __slots__ = ("key", "handle", "model", "prefix_length", "tokens", "expires_at", "refs", "hits", "evicted")
+
+    def __init__(self, key: str, handle: Any, model: Any, prefix_length: int, tokens: int, expires_at: float) -> None:
+        self.key = key
+        self.handle = handle
+        self.model = model
+        self.prefix_length = prefix_length
+        self.tokens = tokens
+        self.expires_at = expires_at
+        self.refs = 0
+        self.hits = 0
+        self.evicted = False
+
+
+def prefix_keys(model: str, system_instruction: str | None, history: list[dict]) -> list[tuple[int, str, int]]:
+    """
+    Hash every prefix of a conversation: the system instruction plus the
+    first n history messages, for n = 0..len(history)
+
+    Returns:
+        (n, key, characters) for each prefix, shortest first
+    """
+    digest = hashlib.sha256(f"{model}\0{len(system_instruction or '')}:{system_instruction or ''}".encode())
+    chars = len(system_instruction or "")
+    keys = [(0, digest.hexdigest(), chars)]
+    for n, message in enumerate(history, 1):
+        text = "".join(message["parts"])
+        digest.update(f"\0{message['role']}\0{len(text)}:{text}".encode())
+        chars += len(text)
+        keys.append((n, digest.hexdigest(), chars))
+    return keys
+
+
+class ContextCache(IContextCache):
+    """Keeps long, repeatedly sent prompt prefixes in the provider's context cache
+
+    Task-agent and summarisation calls resend the same long system
+    instructions and leading history. Each request hashes every prefix of
+    its conversation (system instruction plus the first n history messages)
+    and counts how often each prefix long enough to cache has been sent. A
+    prefix sent min_uses times is stable, so a cached content is created for
+    the longest such prefix, in the background so no request waits for it.
+    Requests whose prefix is cached get a lease on it and send only the rest
+    of the conversation; the provider bills the cached part at the cached
+    input price and reports it as cached tokens.
+
+    Cached contents live for ttl_seconds at the provider (which bills their
+    storage per hour) and are forgotten locally expiry_margin earlier, so a
+    running request never finds its prefix gone. At most max_entries are
+    kept. The least recently used one is evicted, and deleted at the
+    provider once no request holds it. Only touched from the event loop, so
+    no locking is needed; provider calls run on a small dedicated pool.
+    """
+
+    def __init__(
+        self,
+        min_tokens: dict[str, int],
+        default_min_tokens: int = 4096,
+        ttl_seconds: float = 600.0,
+        min_uses: int = 3,
+        max_entries: int = 64,
+        expiry_margin: float = 60.0,
+        max_workers: int = 2,
+        provider: Any = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """
+        Initialize the cache
+
+        Args:
+            min_tokens: Smallest prefix the provider caches, per Gemini model
+            default_min_tokens: Smallest cacheable prefix for other models
+            ttl_seconds: Lifetime of each cached content at the provider
+            min_uses: Times a prefix must be sent before it is cached
+            max_entries: Maximum number of cached contents kept
+            expiry_margin: Stop using a cached content this long before it expires
+            max_workers: Threads for provider cache calls
+            provider: Creates and deletes cached contents (defaults to the Gemini SDK)
+            clock: Monotonic time source (injectable for tests)
+        """
+        self._min_tokens = min_tokens
+        self._default_min_tokens = default_min_tokens
+        self._ttl = ttl_seconds
+        self._min_uses = min_uses
+        self._max_entries = max_entries
+        self._expiry_margin = min(expiry_margin, ttl_seconds / 2)
+        self._provider = provider or GeminiContextProvider()
+        self._clock = clock
+        self._executor = InstrumentedExecutor("gemini-context-cache", max_workers)
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        # Use counts of prefixes not cached yet, bounded like an LRU
+        self._uses: OrderedDict[str, int] = OrderedDict()
+        self._max_tracked = max_entries * 64
+        self._creating: set[str] = set()
+        self._tasks: set[asyncio.Task] = set()
+        # The subset of _tasks deleting contents at the provider; close() lets them finish
+        self._deleting: set[asyncio.Task] = set()
+
+        self._hits = 0
+        self._misses = 0
+        self._created = 0
+        self._failed = 0
+        self._evicted = 0
+        self._invalidated = 0
+        self._cached_tokens_served = 0
+
+    def acquire(self, model: str, system_instruction: str | None, history: list[dict]) -> ContextLease | None:
+        """
+        Lease the longest cached prefix of a conversation, and count its prefixes
+
+        Args:
+            model: Gemini model name
+            system_instruction: System instruction, if any
+            history: Conversation before the last user message, in Gemini format
+
+        Returns:
+            A lease to release once the request is done, or None when no
+            prefix is cached
+        """
+        min_chars = self._min_tokens.get(model, self._default_min_tokens) * CHARS_PER_TOKEN
+        prefixes = [(n, key) for n, key, chars in prefix_keys(model, system_instruction, history) if chars >= min_chars]
+        if not prefixes:
+            return None
+
+        self._expire()
+        lease = None
+        for n, key in reversed(prefixes):
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                entry.refs += 1
+                entry.hits += 1
+                self._hits += 1
+                lease = ContextLease(entry)
+                break
+        if lease is None:
+            self._misses += 1
+
+        # Count the prefixes longer than the leased one; cache the longest stable one
+        candidate = None
+        for n, key in prefixes:
+            if lease is not None and n <= lease.prefix_length:
+                continue
+            uses = self._uses.get(key, 0)
+            if uses == _NOT_CACHEABLE:
+                continue
+            self._uses[key] = uses + 1
+            self._uses.move_to_end(key)
+            if uses + 1 >= self._min_uses and key not in self._creating and key not in self._entries:
+                candidate = (n, key)
+        while len(self._uses) > self._max_tracked:
+            self._uses.popitem(last=False)
+
+        if candidate is not None:
+            n, key = candidate
+            self._creating.add(key)
+            self._spawn(self._create(model, key, system_instruction, history[:n], n))
+        return lease
+
+    def release(self, lease: ContextLease, cached_tokens: int = 0) -> None:
+        """
+        Give a lease back once its request is done
+
+        Args:
+            lease: Lease returned by acquire
+            cached_tokens: Prompt tokens the provider served from the cache
+        """
+        entry = lease._entry
+        entry.refs -= 1
+        self._cached_tokens_served += cached_tokens
+        if entry.evicted and entry.refs == 0:
+            self._spawn_delete(entry)
+
+    def invalidate(self, lease: ContextLease) -> None:
+        """Forget a leased prefix the provider no longer has, and release the lease"""
+        entry = lease._entry
+        if self._entries.get(entry.key) is entry:
+            del self._entries[entry.key]
+            self._invalidated += 1
+        entry.refs -= 1
+
+    def _expire(self) -> None:
+        now = self._clock()
+        for key in [key for key, entry in self._entries.items() if entry.expires_at <= now]:
+            # Already on its way out at the provider; leases still running finish in the margin
+            del self._entries[key]
+
+    def _evict(self) -> None:
+        while len(self._entries) > self._max_entries:
+            _, entry = self._entries.popitem(last=False)
+            self._evicted += 1
+            entry.evicted = True
+            if entry.refs == 0:
+                self._spawn_delete(entry)
+
+    async def _create(
+        self, model: str, key: str, system_instruction: str | None, contents: list[dict], prefix_length: int
+    ) -> None:
+        try:
+            handle, cached_model, tokens = await self._executor.run(
+                self._provider.create, model, system_instruction, contents, self._ttl
+            )
+        except Exception as e:
+            self._failed += 1
+            self._uses[key] = _NOT_CACHEABLE
+            logger.warning(f"Could not cache a {prefix_length}-message prefix for {model}: {e}")
+            return
+        finally:
+            self._creating.discard(key)
+
+        self._created += 1
+        self._uses.pop(key, None)
+        expires_at = self._clock() + self._ttl - self._expiry_margin
+        self._entries[key] = _Entry(key, handle, cached_model, prefix_length, tokens, expires_at)
+        logger.info(f"Cached a {tokens}-token prefix ({prefix_length} history messages) for {model}")
+        self._evict()
+
+    async def _delete(self, entry: _Entry) -> None:
+        try:
+            await self._executor.run(self._provider.delete, entry.handle)
+        except Exception as e:
+            # It expires with its TTL anyway
+            logger.warning(f"Could not delete a cached prefix: {e}")
+
+    def _spawn(self, coro: Any) -> asyncio.Task:
+        task = asyncio.get_running_loop().create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def _spawn_delete(self, entry: _Entry) -> None:
+        task = self._spawn(self._delete(entry))
+        self._deleting.add(task)
+        task.add_done_callback(self._deleting.discard)
+
+    async def close(self) -> None:
+        """Stop pending creations and delete every cached content at the provider"""
+        # Deletions already under way are awaited, not cancelled, so no cached content outlives us
+        for task in list(self._tasks):
+            if task not in self._deleting:
+                task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        entries = list(self._entries.values())
+        self._entries.clear()
+        await asyncio.gather(*(self._delete(entry) for entry in entries), return_exceptions=True)
+        self._executor.shutdown(wait=False)
+
+    def stats(self) -> dict:
+        """Get hit, creation and eviction counters for /metrics"""
+        self._expire()
+        return {
+            "entries": len(self._entries),
+            "max_entries": self._max_entries,
+            "cached_prompt_tokens": sum(entry.tokens for entry in self._entries.values()),
+            "hits": self._hits,
+            "misses": self._misses,
+            "created": self._created,
+            "failed": self._failed,
+            "evicted": self._evicted,
+            "invalidated": self._invalidated,
+            "cached_tokens_served": self._cached_tokens_served,
+        }
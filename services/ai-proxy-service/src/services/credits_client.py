@@ -0,0 +1,178 @@
+"""Pooled HTTP client for the credits service"""
+
+import asyncio
+import importlib.util
+import logging
+import random
+
+import httpx
+
+from ..core.circuit_breaker import CircuitBreaker
+from ..core.exceptions import BillingUnavailableException
+
+logger = logging.getLogger(__name__)
+
+# Statuses worth retrying: the charge was not applied, or it was applied and
+# the idempotency key makes the repeat harmless
+RETRYABLE_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class CreditsClient:
+    """Long-lived, keep-alive connection pool to the credits service
+
+    One httpx.AsyncClient is reused for every charge, so requests share
+    warm TCP (and TLS) connections instead of opening one each; HTTP/2 is
+    negotiated when the h2 package is installed and the server offers it.
+    Transient failures are retried a few times with jittered backoff, and a
+    circuit breaker fails fast while the service is down so callers (the
+    usage accountant) can back off instead of piling up requests.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str,
+        timeout: float = 10.0,
+        connect_timeout: float = 2.0,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        http2: bool = True,
+        max_attempts: int = 3,
+        retry_base_delay: float = 0.1,
+        retry_max_delay: float = 1.0,
+        breaker: CircuitBreaker | None = None,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ) -> None:
+        """
+        Initialize the client (the connection pool is opened on first use)
+
+        Args:
+            base_url: Credits service base URL
+            api_key: Bearer token for the credits service
+            timeout: Read/write/pool timeout in seconds
+            connect_timeout: TCP connect timeout in seconds
+            max_connections: Upper bound on open connections
+            max_keepalive_connections: Idle connections kept for reuse
+            keepalive_expiry: Seconds an idle connection is kept
+            http2: Use HTTP/2 when the h2 package is available
+            max_attempts: Attempts per request on transient failures
+            retry_base_delay: Backoff before the first retry, in seconds
+            retry_max_delay: Cap on the backoff between retries, in seconds
+            breaker: Circuit breaker (a default one is created if omitted)
+            transport: Custom transport, for tests
+        """
+        if max_attempts < 1:
+            raise ValueError("max_attempts must be at least 1")
+        self._base_url = base_url.rstrip("/")
+        self._headers = {"Authorization": f"Bearer {api_key}"}
+        self._timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self._http2 = http2 and importlib.util.find_spec("h2") is not None
+        self._max_attempts = max_attempts
+        self._retry_base_delay = retry_base_delay
+        self._retry_max_delay = retry_max_delay
+        self._breaker = breaker or CircuitBreaker()
+        self._transport = transport
+        self._client: httpx.AsyncClient | None = None
+
+        self._requests = 0
+        self._retries = 0
+        if http2 and not self._http2:
+            logger.info("h2 not installed; credits service client will use HTTP/1.1")
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self._base_url,
+                headers=self._headers,
+                timeout=self._timeout,
+                limits=self._limits,
+                http2=self._http2,
+                transport=self._transport,
+            )
+        return self._client
+
+    async def post(self, path: str, json: dict, idempotency_key: str) -> httpx.Response:
+        """
+        POST to the credits service with retries on transient failures
+
+        Args:
+            path: Request path, e.g. /api/v1/bill
+            json: Request body; must carry the idempotency key the server
+                dedupes on, since a retry may follow a request that was applied
+            idempotency_key: Key of this request, also sent as X-Request-ID
+
+        Returns:
+            The final response (which may still be an error status)
+
+        Raises:
+            BillingUnavailableException: If the circuit is open, or every
+                attempt timed out, failed to connect or got a retryable status
+        """
+        client = self._get_client()
+        headers = {"X-Request-ID": idempotency_key}
+        last_error = "no attempt made"
+
+        for attempt in range(1, self._max_attempts + 1):
+            if not self._breaker.allow():
+                raise BillingUnavailableException("Credits service circuit is open")
+            self._requests += 1
+            try:
+                response = await client.post(path, json=json, headers=headers)
+            except httpx.TimeoutException:
+                self._breaker.record_failure()
+                last_error = "timeout"
+            except httpx.RequestError as e:
+                self._breaker.record_failure()
+                last_error = f"request error: {e}"
+            except BaseException:
+                # Cancelled or failed outside the transport: no verdict on
+                # the service, but a half-open trial must not stay claimed
+                self._breaker.record_abandoned()
+                raise
+            else:
+                if response.status_code not in RETRYABLE_STATUSES:
+                    self._breaker.record_success()
+                    return response
+                self._breaker.record_failure()
+                last_error = f"status {response.status_code}"
+                if attempt == self._max_attempts:
+                    return response
+
+            if attempt < self._max_attempts:
+                self._retries += 1
+                delay = min(self._retry_max_delay, self._retry_base_delay * 2 ** (attempt - 1))
+                await asyncio.sleep(random.uniform(0, delay))
+
+        raise BillingUnavailableException(f"Credits service unavailable ({last_error})")
+
+    async def warm(self) -> None:
+        """Open a pooled connection ahead of the first charge
+
+        Best effort: an unreachable service is logged and left for the first
+        charge to report, and does not count against the circuit breaker.
+        """
+        try:
+            await self._get_client().get("/api/v1/health")
+        except httpx.HTTPError as e:
+            logger.warning(f"Credits service not reachable at startup: {e}")
+
+    async def close(self) -> None:
+        """Close pooled connections"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def stats(self) -> dict:
+        """Get client counters for /metrics"""
+        return {
+            "http2": self._http2,
+            "requests": self._requests,
+            "retries": self._retries,
+            "circuit": self._breaker.stats(),
+        }
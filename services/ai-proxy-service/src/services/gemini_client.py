@@ -1,35 +1,132 @@
 """Gemini AI client implementation"""
 
-import asyncio
 import logging
+import threading
 import time
 import uuid
-from typing import List
+from collections import OrderedDict
+from typing import Any, List
 
 import google.generativeai as genai
-
-from ..core.constants import MODEL_MAPPINGS
+from google.api_core import exceptions as google_exceptions
+
+from ..core.constants import (
+    GEMINI_EXECUTOR_MAX_WORKERS,
+    DEFAULT_MODEL,
+    GEMINI_MODEL_CACHE_SIZE,
+    MODEL_MAPPINGS,
+)
 from ..core.exceptions import AIProviderException
-from ..core.interfaces import IGeminiClient
-from ..core.models import ChatMessage, ChatCompletionResponse, ChatChoice, Usage
+from ..core.executor import InstrumentedExecutor
+from ..core.interfaces import IContextCache, IGeminiClient
+from ..core.models import ChatMessage, ChatCompletionResponse, ChatChoice, PromptTokensDetails, Usage
 
 logger = logging.getLogger(__name__)
 
+# Sentinel returned by next() once a provider stream is exhausted
+_STREAM_END = object()
+
+
+def _cached_tokens(usage_metadata: Any) -> int:
+    """Prompt tokens the provider served from a (context or implicit) cache"""
+    cached = getattr(usage_metadata, "cached_content_token_count", 0)
+    return cached if isinstance(cached, int) else 0
+
+
+def _cached_content_unavailable(error: Exception) -> bool:
+    """Whether a request failed because its cached content is gone or not permitted
+
+    Quota, server and timeout errors say nothing about the cache; resending
+    the whole prompt for those would only double their cost.
+    """
+    if isinstance(error, (google_exceptions.NotFound, google_exceptions.PermissionDenied)):
+        return True
+    message = str(error).lower()
+    return "cache" in message and any(
+        reason in message for reason in ("expired", "not found", "does not exist", "permission")
+    )
+
 
 class GeminiClient(IGeminiClient):
     """Client for interacting with Google Gemini API"""
 
-    def __init__(self, api_key: str):
+    def __init__(
+        self,
+        api_key: str,
+        max_workers: int = GEMINI_EXECUTOR_MAX_WORKERS,
+        model_cache_size: int = GEMINI_MODEL_CACHE_SIZE,
+        context_cache: IContextCache | None = None,
+    ):
         """
         Initialize Gemini client
 
+        Blocking SDK calls run on a dedicated pool rather than the event loop's
+        default executor, which is shared with the SQLite-backed services.
+        Model and generation-config objects are cached and reused; they all
+        share the SDK's process-wide generative client and its connection.
+        With a context cache, long prompt prefixes that are sent repeatedly
+        are cached at the provider and only the rest of the conversation is
+        sent.
+
         Args:
             api_key: Google Gemini API key
+            max_workers: Size of the thread pool for provider calls
+            model_cache_size: Maximum number of cached model objects
+            context_cache: Provider-side cache of stable prompt prefixes
         """
         self.api_key = api_key
         genai.configure(api_key=api_key)
+        self._executor = InstrumentedExecutor("gemini", max_workers)
+        self._model_cache_size = model_cache_size
+        self._models: OrderedDict[tuple[str, str | None], Any] = OrderedDict()
+        self._configs: dict[tuple[float, int | None], Any] = {}
+        self._cache_lock = threading.Lock()
+        self._context_cache = context_cache
         logger.info("Gemini client initialized")
 
+    def _get_model(self, gemini_model: str, system_instruction: str | None) -> Any:
+        """
+        Get a cached GenerativeModel for (model, system_instruction)
+
+        Least recently used entries are evicted once the cache is full.
+        """
+        key = (gemini_model, system_instruction)
+        with self._cache_lock:
+            model = self._models.get(key)
+            if model is not None:
+                self._models.move_to_end(key)
+                return model
+
+            model = genai.GenerativeModel(gemini_model, system_instruction=system_instruction)
+            self._models[key] = model
+            if len(self._models) > self._model_cache_size:
+                self._models.popitem(last=False)
+            return model
+
+    def _get_generation_config(self, temperature: float, max_tokens: int | None) -> Any:
+        """Get a cached GenerationConfig for (temperature, max_tokens)"""
+        key = (temperature, max_tokens)
+        config = self._configs.get(key)
+        if config is None:
+            config = genai.GenerationConfig(
+                temperature=temperature,
+                max_output_tokens=max_tokens,
+            )
+            self._configs[key] = config
+        return config
+
+    def get_executor_stats(self) -> dict:
+        """Get saturation stats for the provider thread pool"""
+        return self._executor.stats()
+
+    def warm(self) -> None:
+        """Build the default model ahead of the first completion"""
+        self._get_model(self._map_model(DEFAULT_MODEL), None)
+
+    def close(self) -> None:
+        """Shut down the provider thread pool"""
+        self._executor.shutdown(wait=False)
+
     def _map_model(self, requested_model: str) -> str:
         """
         Map OpenAI-style model names to Gemini models
@@ -96,6 +193,51 @@ class GeminiClient(IGeminiClient):
 
         return system_instruction, history, last_user_message
 
+    async def _send(
+        self,
+        gemini_model: str,
+        system_instruction: str | None,
+        history: list[dict],
+        last_user_message: str,
+        generation_config: Any,
+        stream: bool = False,
+    ) -> tuple[Any, Any]:
+        """
+        Send a conversation, reusing a cached prefix of it when there is one
+
+        Returns:
+            (response, context cache lease or None); release the lease once
+            the response has been consumed
+        """
+        options: dict[str, Any] = {"generation_config": generation_config}
+        if stream:
+            options["stream"] = True
+
+        lease = None
+        if self._context_cache is not None and (history or system_instruction):
+            lease = self._context_cache.acquire(gemini_model, system_instruction, history)
+        if lease is not None:
+            # The cached content holds the system instruction and the first messages
+            chat = lease.model.start_chat(history=history[lease.prefix_length :])
+            try:
+                return await self._executor.run(chat.send_message, last_user_message, **options), lease
+            except Exception as e:
+                if not _cached_content_unavailable(e):
+                    self._context_cache.release(lease)
+                    raise
+                # The provider dropped the cached content: send everything
+                logger.warning(f"Cached prefix unusable, sending the full prompt: {e}")
+                self._context_cache.invalidate(lease)
+
+        # Reuse the model (with optional system instruction)
+        gemini = self._get_model(gemini_model, system_instruction)
+        if history or system_instruction:
+            # Start chat with history and send the last message
+            chat = gemini.start_chat(history=history)
+            return await self._executor.run(chat.send_message, last_user_message, **options), None
+        # Simple single-message case - use generate_content directly
+        return await self._executor.run(gemini.generate_content, last_user_message, **options), None
+
     async def generate_completion(
         self,
         messages: List[ChatMessage],
@@ -119,6 +261,8 @@ class GeminiClient(IGeminiClient):
             InvalidModelException: If model is not supported
             AIProviderException: If Gemini API returns an error
         """
+        lease = None
+        cached_tokens = 0
         try:
             # Map the model name
             gemini_model = self._map_model(model)
@@ -128,34 +272,12 @@ class GeminiClient(IGeminiClient):
 
             logger.info(f"Generating completion with model '{gemini_model}', temperature={temperature}")
 
-            # Configure generation parameters
-            generation_config = genai.GenerationConfig(
-                temperature=temperature,
-                max_output_tokens=max_tokens,
-            )
-
-            # Create the model with optional system instruction
-            gemini = genai.GenerativeModel(
-                gemini_model,
-                system_instruction=system_instruction,
+            # Reuse generation parameters
+            generation_config = self._get_generation_config(temperature, max_tokens)
+            response, lease = await self._send(
+                gemini_model, system_instruction, history, last_user_message, generation_config
             )
 
-            # Use chat for multi-turn conversations
-            loop = asyncio.get_running_loop()
-            if history or system_instruction:
-                # Start chat with history and send the last message
-                chat = gemini.start_chat(history=history)
-                response = await loop.run_in_executor(
-                    None,
-                    lambda: chat.send_message(last_user_message, generation_config=generation_config),
-                )
-            else:
-                # Simple single-message case - use generate_content directly
-                response = await loop.run_in_executor(
-                    None,
-                    lambda: gemini.generate_content(last_user_message, generation_config=generation_config),
-                )
-
             # Extract the generated text
             if not response.candidates:
                 raise AIProviderException("No candidates returned from Gemini")
@@ -167,9 +289,10 @@ class GeminiClient(IGeminiClient):
             prompt_tokens = usage_metadata.prompt_token_count
             completion_tokens = usage_metadata.candidates_token_count
             total_tokens = usage_metadata.total_token_count
+            cached_tokens = _cached_tokens(usage_metadata)
 
             logger.info(
-                f"Completion generated: {prompt_tokens} prompt tokens, "
+                f"Completion generated: {prompt_tokens} prompt tokens ({cached_tokens} cached), "
                 f"{completion_tokens} completion tokens, {total_tokens} total"
             )
 
@@ -193,6 +316,7 @@ class GeminiClient(IGeminiClient):
                     prompt_tokens=prompt_tokens,
                     completion_tokens=completion_tokens,
                     total_tokens=total_tokens,
+                    prompt_tokens_details=PromptTokensDetails(cached_tokens=cached_tokens) if cached_tokens else None,
                 ),
             )
 
@@ -201,6 +325,9 @@ class GeminiClient(IGeminiClient):
         except Exception as e:
             logger.error(f"Error generating completion: {e}")
             raise AIProviderException(f"Gemini API error: {e}") from e
+        finally:
+            if lease is not None:
+                self._context_cache.release(lease, cached_tokens)
 
     async def generate_completion_stream(
         self,
@@ -225,6 +352,8 @@ class GeminiClient(IGeminiClient):
             InvalidModelException: If model is not supported
             AIProviderException: If Gemini API returns an error
         """
+        lease = None
+        cached_tokens = 0
         try:
             # Map the model name
             gemini_model = self._map_model(model)
@@ -234,36 +363,12 @@ class GeminiClient(IGeminiClient):
 
             logger.info(f"Generating streaming completion with model '{gemini_model}', temperature={temperature}")
 
-            # Configure generation parameters
-            generation_config = genai.GenerationConfig(
-                temperature=temperature,
-                max_output_tokens=max_tokens,
-            )
-
-            # Create the model with optional system instruction
-            gemini = genai.GenerativeModel(
-                gemini_model,
-                system_instruction=system_instruction,
+            # Reuse generation parameters and start streaming content
+            generation_config = self._get_generation_config(temperature, max_tokens)
+            response_stream, lease = await self._send(
+                gemini_model, system_instruction, history, last_user_message, generation_config, stream=True
             )
 
-            # Generate streaming content
-            loop = asyncio.get_running_loop()
-            if history or system_instruction:
-                # Start chat with history and send the last message with streaming
-                chat = gemini.start_chat(history=history)
-                response_stream = await loop.run_in_executor(
-                    None,
-                    lambda: chat.send_message(last_user_message, generation_config=generation_config, stream=True),
-                )
-            else:
-                # Simple single-message case - use generate_content directly
-                response_stream = await loop.run_in_executor(
-                    None,
-                    lambda: gemini.generate_content(
-                        last_user_message, generation_config=generation_config, stream=True
-                    ),
-                )
-
             # Track token usage (accumulated from chunks)
             prompt_tokens = 0
             completion_tokens = 0
@@ -289,8 +394,13 @@ class GeminiClient(IGeminiClient):
             }
             yield first_chunk
 
-            # Stream content chunks as they arrive
-            for chunk in response_stream:
+            # Stream content chunks as they arrive. Each next() blocks on the
+            # network, so it runs on the provider pool instead of the event loop.
+            chunk_iterator = iter(response_stream)
+            while True:
+                chunk = await self._executor.run(next, chunk_iterator, _STREAM_END)
+                if chunk is _STREAM_END:
+                    break
                 if hasattr(chunk, "text") and chunk.text:
                     content_chunk = {
                         "id": completion_id,
@@ -313,9 +423,10 @@ class GeminiClient(IGeminiClient):
                     prompt_tokens = usage_metadata.prompt_token_count
                     completion_tokens = usage_metadata.candidates_token_count
                     total_tokens = usage_metadata.total_token_count
+                    cached_tokens = _cached_tokens(usage_metadata)
 
             logger.info(
-                f"Streaming completion finished: {prompt_tokens} prompt tokens, "
+                f"Streaming completion finished: {prompt_tokens} prompt tokens ({cached_tokens} cached), "
                 f"{completion_tokens} completion tokens, {total_tokens} total"
             )
 
@@ -338,8 +449,13 @@ class GeminiClient(IGeminiClient):
                     "total_tokens": total_tokens,
                 },
             }
+            if cached_tokens:
+                final_chunk["usage"]["prompt_tokens_details"] = {"cached_tokens": cached_tokens}
             yield final_chunk
 
         except Exception as e:
             logger.error(f"Error generating streaming completion: {e}")
             raise AIProviderException(f"Gemini API error: {e}") from e
+        finally:
+            if lease is not None:
+                self._context_cache.release(lease, cached_tokens)
@@ -0,0 +1,164 @@
+"""Client for OpenAI-compatible chat completion backends"""
+
+import json
+import logging
+from typing import AsyncIterator, List
+
+import httpx
+
+from ..core.constants import MODEL_MAPPINGS
+from ..core.exceptions import AIProviderException
+from ..core.interfaces import IGeminiClient
+from ..core.models import ChatCompletionResponse, ChatMessage
+
+logger = logging.getLogger(__name__)
+
+
+class OpenAICompatibleClient(IGeminiClient):
+    """Chat completions from any server speaking the OpenAI API
+
+    Covers Gemini's own OpenAI-compatible endpoint (so further API keys or
+    projects can serve as extra backends) as well as local servers such as
+    voxtral-local. Requested models are mapped with MODEL_MAPPINGS, then
+    through `models` to the backend's own model names; responses carry the
+    requested model name, like GeminiClient's. One pooled httpx client is
+    reused for every call.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str | None = None,
+        models: dict[str, str] | None = None,
+        timeout: float = 120.0,
+        connect_timeout: float = 5.0,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ) -> None:
+        """
+        Initialize the client (the connection pool is opened on first use)
+
+        Args:
+            base_url: API root, e.g. https://generativelanguage.googleapis.com/v1beta/openai
+            api_key: Bearer token, if the backend wants one
+            models: Backend model name per Gemini model name; unlisted models
+                are sent as mapped
+            timeout: Read/write/pool timeout in seconds
+            connect_timeout: TCP connect timeout in seconds
+            transport: Custom transport, for tests
+        """
+        self._base_url = base_url.rstrip("/")
+        self._headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+        self._models = dict(models or {})
+        self._timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self._transport = transport
+        self._client: httpx.AsyncClient | None = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self._base_url,
+                headers=self._headers,
+                timeout=self._timeout,
+                transport=self._transport,
+            )
+        return self._client
+
+    def warm(self) -> None:
+        """Create the HTTP client and its TLS context ahead of the first completion"""
+        self._get_client()
+
+    def _payload(self, messages: List[ChatMessage], model: str, temperature: float, max_tokens: int | None) -> dict:
+        mapped = MODEL_MAPPINGS.get(model, model)
+        payload = {
+            "model": self._models.get(mapped, mapped),
+            "messages": [{"role": m.role, "content": m.content} for m in messages],
+            "temperature": temperature,
+        }
+        if max_tokens is not None:
+            payload["max_tokens"] = max_tokens
+        return payload
+
+    async def generate_completion(
+        self,
+        messages: List[ChatMessage],
+        model: str,
+        temperature: float = 0.7,
+        max_tokens: int | None = None,
+    ) -> ChatCompletionResponse:
+        """
+        Generate a chat completion on the backend
+
+        Raises:
+            AIProviderException: If the backend fails or returns an error
+        """
+        try:
+            response = await self._get_client().post(
+                "/chat/completions", json=self._payload(messages, model, temperature, max_tokens)
+            )
+        except httpx.HTTPError as e:
+            raise AIProviderException(f"{self._base_url} unreachable: {e}") from e
+        if response.status_code != 200:
+            raise AIProviderException(f"{self._base_url} returned {response.status_code}: {response.text[:200]}")
+
+        data = response.json()
+        data["model"] = model
+        data.setdefault("object", "chat.completion")
+        try:
+            return ChatCompletionResponse.model_validate(data)
+        except ValueError as e:
+            raise AIProviderException(f"{self._base_url} returned an invalid completion: {e}") from e
+
+    async def generate_completion_stream(
+        self,
+        messages: List[ChatMessage],
+        model: str,
+        temperature: float = 0.7,
+        max_tokens: int | None = None,
+    ) -> AsyncIterator[dict]:
+        """
+        Stream a chat completion from the backend
+
+        Yields:
+            OpenAI chat.completion.chunk dicts, ending with a usage chunk when
+            the backend reports usage
+
+        Raises:
+            AIProviderException: If the backend fails or returns an error
+        """
+        payload = self._payload(messages, model, temperature, max_tokens)
+        payload["stream"] = True
+        payload["stream_options"] = {"include_usage": True}
+        try:
+            async with self._get_client().stream("POST", "/chat/completions", json=payload) as response:
+                if response.status_code != 200:
+                    body = await response.aread()
+                    raise AIProviderException(
+                        f"{self._base_url} returned {response.status_code}: {body[:200].decode(errors='replace')}"
+                    )
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == "[DONE]":
+                        break
+                    chunk = json.loads(data)
+                    if chunk.get("usage") is None:
+                        # Some servers send "usage": null on every chunk
+                        chunk.pop("usage", None)
+                        if not chunk.get("choices"):
+                            continue
+                    elif not chunk.get("choices"):
+                        # Usage-only chunk: give it the shape the proxy's own streams use
+                        chunk["choices"] = [{"index": 0, "delta": {}, "finish_reason": "stop"}]
+                    chunk["model"] = model
+                    yield chunk
+        except httpx.HTTPError as e:
+            raise AIProviderException(f"{self._base_url} stream failed: {e}") from e
+        except json.JSONDecodeError as e:
+            raise AIProviderException(f"{self._base_url} sent an invalid stream chunk: {e}") from e
+
+    async def close(self) -> None:
+        """Close pooled connections"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
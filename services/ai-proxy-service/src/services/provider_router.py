@@ -0,0 +1,366 @@
+"""Latency-aware routing of completions across provider backends"""
+
+import asyncio
+import inspect
+import logging
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, List
+
+from ..core.circuit_breaker import OPEN, CircuitBreaker
+from ..core.exceptions import AIProviderException, InvalidModelException
+from ..core.histogram import LatencyHistogram
+from ..core.interfaces import IGeminiClient
+from ..core.models import ChatCompletionResponse, ChatMessage
+
+logger = logging.getLogger(__name__)
+
+
+class _LatencyTracker:
+    """EWMA (for ranking) and histogram (for the hedge threshold) of one kind of call"""
+
+    __slots__ = ("ewma", "histogram")
+
+    def __init__(self) -> None:
+        self.ewma: float | None = None
+        self.histogram = LatencyHistogram()
+
+    def record(self, seconds: float, alpha: float) -> None:
+        self.ewma = seconds if self.ewma is None else alpha * seconds + (1 - alpha) * self.ewma
+        self.histogram.record(seconds)
+
+
+class _Backend:
+    """One provider backend and what the router has learned about it"""
+
+    def __init__(self, name: str, client: IGeminiClient, breaker: CircuitBreaker) -> None:
+        self.name = name
+        self.client = client
+        self.breaker = breaker
+        # Whole completions, and time to first chunk of streams
+        self.completion = _LatencyTracker()
+        self.first_chunk = _LatencyTracker()
+        # EWMA of failures, decaying with time too so a shunned backend gets retried
+        self._error_rate = 0.0
+        self._error_at = 0.0
+        self.requests = 0
+        self.failures = 0
+        self.hedges = 0
+        self.hedges_won = 0
+
+    def error_rate(self, half_life: float) -> float:
+        if not self._error_rate:
+            return 0.0
+        return self._error_rate * 0.5 ** ((time.monotonic() - self._error_at) / half_life)
+
+    def record_outcome(self, failed: bool, alpha: float, half_life: float) -> None:
+        self._error_rate = alpha * failed + (1 - alpha) * self.error_rate(half_life)
+        self._error_at = time.monotonic()
+
+    def score(self, tracker: _LatencyTracker, error_penalty: float, half_life: float) -> float:
+        if tracker.ewma is None:
+            # Not measured yet: try it
+            return 0.0
+        return tracker.ewma * (1 + error_penalty * self.error_rate(half_life))
+
+
+class ProviderRouter(IGeminiClient):
+    """Sends each completion to the fastest healthy backend, hedging slow ones
+
+    Backends are any IGeminiClient: the Gemini SDK client, further API keys
+    or projects through Gemini's OpenAI-compatible endpoint, or a local
+    OpenAI-compatible server. Per backend the router keeps an EWMA of latency
+    (completions and time to first stream chunk separately), an EWMA of the
+    error rate (which also halves every error_half_life seconds, so a backend
+    shunned for its errors is eventually tried again) and a circuit breaker.
+    Each call goes to the backend with the lowest latency, inflated by its
+    error rate. Backends not measured yet are tried first, and open circuits
+    are skipped.
+
+    If the chosen backend has not answered within its own p95 latency (once
+    it has enough samples), the call is hedged: the next best backend is
+    asked too and the first answer wins; the other is cancelled. A backend
+    that fails is failed over to the next one. Streams are hedged and failed
+    over only until their first chunk, since after that the client has
+    already received part of the answer.
+
+    Hedging trades provider spend for tail latency: a hedged call may be
+    paid for twice. Only touched from the event loop, so no locking is needed.
+    """
+
+    def __init__(
+        self,
+        backends: list[tuple[str, IGeminiClient]],
+        ewma_alpha: float = 0.2,
+        error_penalty: float = 4.0,
+        error_half_life: float = 30.0,
+        hedge: bool = True,
+        hedge_quantile: float = 0.95,
+        hedge_min_samples: int = 20,
+        min_hedge_delay: float = 0.25,
+        breaker_factory: Callable[[], CircuitBreaker] = CircuitBreaker,
+    ) -> None:
+        """
+        Initialize the router
+
+        Args:
+            backends: (name, client) pairs, in order of preference until measured
+            ewma_alpha: Weight of the newest sample in the latency and error EWMAs
+            error_penalty: How strongly the error rate inflates a backend's score
+            error_half_life: Seconds for an idle backend's error rate to halve
+            hedge: Whether slow calls are hedged on a second backend
+            hedge_quantile: Latency quantile after which a call is hedged
+            hedge_min_samples: Samples a backend needs before its calls are hedged
+            min_hedge_delay: Never hedge sooner than this, in seconds
+            breaker_factory: Builds each backend's circuit breaker
+
+        Raises:
+            ValueError: If no backends are given or names repeat
+        """
+        if not backends:
+            raise ValueError("At least one provider backend is required")
+        names = [name for name, _ in backends]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Provider backend names must be unique: {names}")
+        self._backends = [_Backend(name, client, breaker_factory()) for name, client in backends]
+        self._alpha = ewma_alpha
+        self._error_penalty = error_penalty
+        self._error_half_life = error_half_life
+        self._hedge = hedge and len(self._backends) > 1
+        self._hedge_quantile = hedge_quantile
+        self._hedge_min_samples = hedge_min_samples
+        self._min_hedge_delay = min_hedge_delay
+        self._closed = False
+
+    def _pick(self, tracker: str, tried: set) -> _Backend | None:
+        """Best backend not tried yet whose circuit lets a call through"""
+        candidates = [b for b in self._backends if b not in tried and b.breaker.state != OPEN]
+        candidates.sort(key=lambda b: b.score(getattr(b, tracker), self._error_penalty, self._error_half_life))
+        for backend in candidates:
+            if backend.breaker.allow():
+                return backend
+        return None
+
+    def _hedge_delay(self, backend: _Backend, tracker: str) -> float | None:
+        histogram = getattr(backend, tracker).histogram
+        if not self._hedge or histogram.count < self._hedge_min_samples:
+            return None
+        return max(self._min_hedge_delay, histogram.quantile(self._hedge_quantile))
+
+    def _record_success(self, backend: _Backend, tracker: str, seconds: float) -> None:
+        getattr(backend, tracker).record(seconds, self._alpha)
+        backend.record_outcome(False, self._alpha, self._error_half_life)
+        backend.breaker.record_success()
+
+    def _record_failure(self, backend: _Backend) -> None:
+        backend.failures += 1
+        backend.record_outcome(True, self._alpha, self._error_half_life)
+        backend.breaker.record_failure()
+
+    async def _attempt(self, backend: _Backend, tracker: str, call: Callable[[IGeminiClient], Awaitable[Any]]) -> Any:
+        """Run one call on one backend and learn from how it went"""
+        backend.requests += 1
+        started = time.monotonic()
+        try:
+            result = await call(backend.client)
+        except InvalidModelException:
+            # The request's fault, not the backend's
+            backend.breaker.record_abandoned()
+            raise
+        except asyncio.CancelledError:
+            # Lost a hedge race (or the client left): it took at least this long
+            getattr(backend, tracker).record(time.monotonic() - started, self._alpha)
+            backend.breaker.record_abandoned()
+            raise
+        except Exception as e:
+            self._record_failure(backend)
+            logger.warning(f"Provider backend '{backend.name}' failed: {e}")
+            if isinstance(e, AIProviderException):
+                raise
+            raise AIProviderException(f"Provider backend '{backend.name}' failed: {e}") from e
+        self._record_success(backend, tracker, time.monotonic() - started)
+        return result
+
+    async def _race(
+        self,
+        primary: _Backend,
+        tracker: str,
+        call: Callable[[IGeminiClient], Awaitable[Any]],
+        tried: set,
+        discard: Callable[[Any], Awaitable[None]] | None = None,
+    ) -> tuple[Any, _Backend]:
+        """Run call on primary, hedging on the next best backend after the hedge delay"""
+        tasks = {asyncio.create_task(self._attempt(primary, tracker, call)): primary}
+        winner = None
+        try:
+            delay = self._hedge_delay(primary, tracker)
+            if delay is not None:
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                if not done:
+                    secondary = self._pick(tracker, tried)
+                    if secondary is not None:
+                        tried.add(secondary)
+                        primary.hedges += 1
+                        logger.info(f"Hedging a call to '{primary.name}' after {delay:.2f}s on '{secondary.name}'")
+                        tasks[asyncio.create_task(self._attempt(secondary, tracker, call))] = secondary
+
+            error: BaseException | None = None
+            while tasks:
+                done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    backend = tasks.pop(task)
+                    if task.exception() is not None:
+                        error = task.exception()
+                    elif winner is None:
+                        winner = (task.result(), backend)
+                        if backend is not primary:
+                            backend.hedges_won += 1
+                    elif discard is not None:
+                        await discard(task.result())
+                if winner is not None:
+                    return winner
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+            if tasks:
+                # Let the losers clean up (close their streams) before returning
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _route(
+        self,
+        tracker: str,
+        call: Callable[[IGeminiClient], Awaitable[Any]],
+        discard: Callable[[Any], Awaitable[None]] | None = None,
+    ) -> tuple[Any, _Backend]:
+        """Fail over across backends until one answers"""
+        tried: set = set()
+        last_error: Exception | None = None
+        while True:
+            primary = self._pick(tracker, tried)
+            if primary is None:
+                if last_error is not None:
+                    raise last_error
+                raise AIProviderException("No healthy provider backend")
+            tried.add(primary)
+            try:
+                return await self._race(primary, tracker, call, tried, discard)
+            except AIProviderException as e:
+                last_error = e
+
+    async def generate_completion(
+        self,
+        messages: List[ChatMessage],
+        model: str,
+        temperature: float = 0.7,
+        max_tokens: int | None = None,
+    ) -> ChatCompletionResponse:
+        """
+        Generate a chat completion on the best backend
+
+        Raises:
+            InvalidModelException: If model is not supported
+            AIProviderException: If every backend failed
+        """
+
+        def call(client: IGeminiClient) -> Awaitable[ChatCompletionResponse]:
+            return client.generate_completion(
+                messages=messages, model=model, temperature=temperature, max_tokens=max_tokens
+            )
+
+        response, _ = await self._route("completion", call)
+        return response
+
+    async def generate_completion_stream(
+        self,
+        messages: List[ChatMessage],
+        model: str,
+        temperature: float = 0.7,
+        max_tokens: int | None = None,
+    ) -> AsyncIterator[dict]:
+        """
+        Stream a chat completion from the backend that delivers the first chunk
+
+        Raises:
+            InvalidModelException: If model is not supported
+            AIProviderException: If every backend failed before its first
+                chunk, or the chosen one failed after it
+        """
+
+        async def open_stream(client: IGeminiClient) -> tuple[AsyncIterator[dict], dict]:
+            stream = client.generate_completion_stream(
+                messages=messages, model=model, temperature=temperature, max_tokens=max_tokens
+            )
+            try:
+                first = await stream.__anext__()
+            except StopAsyncIteration:
+                raise AIProviderException("Provider stream ended before its first chunk")
+            except BaseException:
+                await stream.aclose()
+                raise
+            return stream, first
+
+        async def discard(opened: tuple[AsyncIterator[dict], dict]) -> None:
+            await opened[0].aclose()
+
+        (stream, first), backend = await self._route("first_chunk", open_stream, discard)
+        try:
+            yield first
+            async for chunk in stream:
+                yield chunk
+        except AIProviderException:
+            self._record_failure(backend)
+            raise
+        finally:
+            await stream.aclose()
+
+    async def warm(self) -> None:
+        """Warm every backend client that supports it"""
+        for backend in self._backends:
+            warm = getattr(backend.client, "warm", None)
+            if not callable(warm):
+                continue
+            try:
+                result = warm()
+                if inspect.isawaitable(result):
+                    await result
+            except Exception:
+                logger.exception(f"Error warming backend '{backend.name}'")
+
+    async def close(self) -> None:
+        """Close every backend client"""
+        if self._closed:
+            return
+        self._closed = True
+        for backend in self._backends:
+            close = getattr(backend.client, "close", None)
+            if callable(close):
+                result = close()
+                if inspect.isawaitable(result):
+                    await result
+
+    def stats(self) -> dict:
+        """Get per-backend latency, error and hedging counters for /metrics"""
+
+        def latency(tracker: _LatencyTracker) -> dict:
+            return {
+                "ewma_seconds": round(tracker.ewma, 3) if tracker.ewma is not None else None,
+                "p95_seconds": round(tracker.histogram.quantile(0.95), 3),
+                "sample_size": tracker.histogram.count,
+            }
+
+        return {
+            "hedging": self._hedge,
+            "backends": {
+                backend.name: {
+                    "circuit": backend.breaker.state,
+                    "requests": backend.requests,
+                    "failures": backend.failures,
+                    "error_rate": round(backend.error_rate(self._error_half_life), 3),
+                    "hedges": backend.hedges,
+                    "hedges_won": backend.hedges_won,
+                    "completion": latency(backend.completion),
+                    "first_chunk": latency(backend.first_chunk),
+                }
+                for backend in self._backends
+            },
+        }
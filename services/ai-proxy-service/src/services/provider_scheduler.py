@@ -0,0 +1,309 @@
+"""Token-aware admission of provider calls against per-model quotas"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import math
+import time
+from collections import deque
+from typing import AsyncIterator, Callable
+
+from ..core.constants import MODEL_MAPPINGS
+from ..core.exceptions import RateLimitExceededException
+from ..core.interfaces import IProviderScheduler
+
+logger = logging.getLogger(__name__)
+
+# Budget shared by every model without one of its own, so model names taken
+# from requests cannot grow the table
+OTHER_MODELS = "other"
+
+
+class Admission:
+    """A provider call let through by the scheduler, with its estimated tokens"""
+
+    __slots__ = ("model", "entry")
+
+    def __init__(self, model: str, entry: list) -> None:
+        self.model = model
+        # [admitted_at, tokens], shared with the budget's window
+        self.entry = entry
+
+    @property
+    def tokens(self) -> int:
+        return self.entry[1]
+
+
+class _Waiter:
+    __slots__ = ("tokens", "future")
+
+    def __init__(self, tokens: int, future: asyncio.Future) -> None:
+        self.tokens = tokens
+        self.future = future
+
+
+class _ModelBudget:
+    """Rolling one-window usage and the fair queue of one model"""
+
+    def __init__(self, name: str, tokens_per_window: int, requests_per_window: int) -> None:
+        self.name = name
+        self.tpm = tokens_per_window
+        self.rpm = requests_per_window
+        self.window: deque[list] = deque()
+        self.tokens_in_window = 0
+        self.queue: list[tuple[float, int, _Waiter]] = []
+        self.finish_tags: dict[str, float] = {}
+        self.virtual_time = 0.0
+        self.timer: asyncio.TimerHandle | None = None
+
+        self.admitted = 0
+        self.waited = 0
+        self.timeouts = 0
+        self.wait_seconds = 0.0
+        self.admitted_after_wait = 0
+
+    def expire(self, now: float, window_seconds: float) -> None:
+        cutoff = now - window_seconds
+        while self.window and self.window[0][0] <= cutoff:
+            self.tokens_in_window -= self.window.popleft()[1]
+
+    def fits(self, tokens: int) -> bool:
+        if len(self.window) >= self.rpm:
+            return False
+        # A call larger than the whole budget goes through on an idle window
+        return self.tokens_in_window + tokens <= self.tpm or not self.window
+
+    def delay_until_fits(self, tokens: int, now: float, window_seconds: float) -> float:
+        """Seconds until enough of the window has expired for a call of `tokens`"""
+        delay = 0.0
+        if len(self.window) >= self.rpm:
+            delay = self.window[len(self.window) - self.rpm][0] + window_seconds - now
+        excess = self.tokens_in_window + tokens - self.tpm
+        freed = 0
+        for admitted_at, used in self.window:
+            if excess <= 0:
+                break
+            freed += used
+            if freed >= excess:
+                delay = max(delay, admitted_at + window_seconds - now)
+                break
+        return max(0.0, delay)
+
+    def queued(self) -> int:
+        return sum(1 for _, _, waiter in self.queue if not waiter.future.done())
+
+
+class ProviderScheduler(IProviderScheduler):
+    """Keeps provider calls within each model's tokens- and requests-per-minute quota
+
+    Every call is admitted against a rolling window of the tokens (estimated
+    before dispatch, corrected once the provider reports usage) and requests
+    admitted for its model over the last minute. While a call fits, it goes
+    through at once. Once the window is full, calls wait in a per-model
+    queue and are let through as the window frees up, so sustained traffic
+    runs at the quota instead of bursting past it into provider 429s.
+
+    The queue is weighted fair queueing over users: each waiting call is
+    tagged with its user's virtual finish time (the user's previous tag, or
+    the current virtual time, plus the call's tokens) and the lowest tag goes
+    first. A user flooding the queue only delays their own calls, and among
+    users with equal standing the shorter job wins. A call that would wait
+    longer than max_wait is refused with RateLimitExceededException.
+
+    Budgets are per process; with several workers, divide the quota between
+    them. Only touched from the event loop, so no locking is needed.
+    """
+
+    def __init__(
+        self,
+        model_budgets: dict[str, tuple[int, int]],
+        default_budget: tuple[int, int],
+        max_wait: float = 30.0,
+        default_completion_tokens: int = 512,
+        window_seconds: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """
+        Initialize the scheduler
+
+        Args:
+            model_budgets: (tokens, requests) per window for each Gemini model
+            default_budget: (tokens, requests) per window shared by other models
+            max_wait: Longest a call may queue before it is refused, in seconds
+            default_completion_tokens: Completion tokens assumed when a request
+                sets no max_tokens
+            window_seconds: Length of the quota window
+            clock: Monotonic time source (injectable for tests)
+        """
+        self._budgets = {
+            model: _ModelBudget(model, tokens, requests) for model, (tokens, requests) in model_budgets.items()
+        }
+        self._budgets[OTHER_MODELS] = _ModelBudget(OTHER_MODELS, *default_budget)
+        self._max_wait = max_wait
+        self.default_completion_tokens = default_completion_tokens
+        self._window_seconds = window_seconds
+        self._clock = clock
+        self._sequence = itertools.count()
+
+    def _budget(self, model: str) -> _ModelBudget:
+        return self._budgets.get(MODEL_MAPPINGS.get(model, model)) or self._budgets[OTHER_MODELS]
+
+    def _grant(self, budget: _ModelBudget, tokens: int, now: float) -> Admission:
+        entry = [now, tokens]
+        budget.window.append(entry)
+        budget.tokens_in_window += tokens
+        budget.admitted += 1
+        return Admission(budget.name, entry)
+
+    async def admit(self, model: str, user_id: str, tokens: int) -> Admission:
+        """
+        Wait until a call fits the model's quota and count it against it
+
+        Args:
+            model: Requested model
+            user_id: User the call is made for (the unit of fairness)
+            tokens: Estimated prompt plus completion tokens
+
+        Returns:
+            The admission, to settle with the actual usage
+
+        Raises:
+            RateLimitExceededException: If the call would wait longer than max_wait
+        """
+        budget = self._budget(model)
+        tokens = max(1, tokens)
+        now = self._clock()
+        budget.expire(now, self._window_seconds)
+        if not budget.queue and budget.fits(tokens):
+            return self._grant(budget, tokens, now)
+
+        start = max(budget.virtual_time, budget.finish_tags.get(user_id, 0.0))
+        tag = start + tokens
+        budget.finish_tags[user_id] = tag
+        waiter = _Waiter(tokens, asyncio.get_running_loop().create_future())
+        heapq.heappush(budget.queue, (tag, next(self._sequence), waiter))
+        budget.waited += 1
+        self._schedule(budget)
+
+        try:
+            admission = await asyncio.wait_for(waiter.future, self._max_wait)
+        except asyncio.TimeoutError:
+            budget.timeouts += 1
+            retry_after = budget.delay_until_fits(tokens, self._clock(), self._window_seconds)
+            logger.warning(f"Provider queue for {budget.name} saturated; refusing a call of ~{tokens} tokens")
+            raise RateLimitExceededException(
+                "Provider capacity is saturated - please retry shortly", retry_after=max(1, math.ceil(retry_after))
+            )
+        except BaseException:
+            # Cancelled after being admitted: give the tokens back
+            if waiter.future.done() and not waiter.future.cancelled():
+                self.settle(waiter.future.result(), 0)
+            raise
+        finally:
+            self._schedule(budget)
+
+        budget.wait_seconds += self._clock() - now
+        budget.admitted_after_wait += 1
+        return admission
+
+    def settle(self, admission: Admission, actual_tokens: int) -> None:
+        """
+        Replace an admission's estimate with the tokens the provider reported
+
+        Args:
+            admission: Admission returned by admit
+            actual_tokens: Tokens the call actually used
+        """
+        budget = self._budgets[admission.model]
+        now = self._clock()
+        budget.expire(now, self._window_seconds)
+        entry = admission.entry
+        if entry[0] <= now - self._window_seconds:
+            # Already out of the window
+            return
+        delta = actual_tokens - entry[1]
+        entry[1] = actual_tokens
+        budget.tokens_in_window += delta
+        if delta < 0 and budget.queue:
+            self._dispatch(budget)
+
+    async def stream(
+        self, model: str, user_id: str, tokens: int, chunks: AsyncIterator[dict]
+    ) -> AsyncIterator[dict]:
+        """
+        Admit a streaming call before its first chunk and settle on its usage chunk
+
+        Args:
+            model: Requested model
+            user_id: User the call is made for
+            tokens: Estimated prompt plus completion tokens
+            chunks: The provider stream, not yet started
+
+        Yields:
+            The provider's chunks
+        """
+        admission = await self.admit(model, user_id, tokens)
+        async for chunk in chunks:
+            if "usage" in chunk:
+                self.settle(admission, chunk["usage"]["total_tokens"])
+            yield chunk
+
+    def _dispatch(self, budget: _ModelBudget) -> None:
+        """Admit queued calls in tag order while they fit"""
+        budget.timer = None
+        now = self._clock()
+        budget.expire(now, self._window_seconds)
+        while budget.queue:
+            tag, _, waiter = budget.queue[0]
+            if waiter.future.done():
+                # Timed out or cancelled while queued
+                heapq.heappop(budget.queue)
+                continue
+            if not budget.fits(waiter.tokens):
+                break
+            heapq.heappop(budget.queue)
+            budget.virtual_time = tag
+            waiter.future.set_result(self._grant(budget, waiter.tokens, now))
+        if budget.queue:
+            self._schedule(budget)
+        else:
+            budget.finish_tags.clear()
+
+    def _schedule(self, budget: _ModelBudget) -> None:
+        """Wake the queue when its head call will fit"""
+        if budget.timer is not None:
+            budget.timer.cancel()
+            budget.timer = None
+        while budget.queue and budget.queue[0][2].future.done():
+            heapq.heappop(budget.queue)
+        if not budget.queue:
+            budget.finish_tags.clear()
+            return
+        now = self._clock()
+        budget.expire(now, self._window_seconds)
+        delay = budget.delay_until_fits(budget.queue[0][2].tokens, now, self._window_seconds)
+        budget.timer = asyncio.get_running_loop().call_later(delay, self._dispatch, budget)
+
+    def stats(self) -> dict:
+        """Get per-model window usage and queue counters for /metrics"""
+        now = self._clock()
+        models = {}
+        for name, budget in self._budgets.items():
+            budget.expire(now, self._window_seconds)
+            if not budget.admitted and not budget.queue:
+                continue
+            models[name] = {
+                "tokens_per_minute": budget.tpm,
+                "requests_per_minute": budget.rpm,
+                "tokens_in_window": budget.tokens_in_window,
+                "requests_in_window": len(budget.window),
+                "queued": budget.queued(),
+                "admitted": budget.admitted,
+                "waited": budget.waited,
+                "timeouts": budget.timeouts,
+                "avg_wait_seconds": (
+                    round(budget.wait_seconds / budget.admitted_after_wait, 3) if budget.admitted_after_wait else 0.0
+                ),
+            }
+        return {"max_wait_seconds": self._max_wait, "models": models}
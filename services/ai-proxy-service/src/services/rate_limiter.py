@@ -0,0 +1,159 @@
+"""Rate limiting against a storage shared by every worker and replica"""
+
+import logging
+import math
+import time
+
+from limits import RateLimitItem, parse
+from limits.aio.strategies import (
+    FixedWindowRateLimiter,
+    MovingWindowRateLimiter,
+    SlidingWindowCounterRateLimiter,
+)
+from limits.aio.storage import Storage
+from limits.storage import storage_from_string
+
+from ..core.constants import MODEL_MAPPINGS
+from ..core.exceptions import RateLimitExceededException
+from ..core.interfaces import IRateLimiter
+
+logger = logging.getLogger(__name__)
+
+STRATEGIES = {
+    "sliding-window-counter": SlidingWindowCounterRateLimiter,
+    "moving-window": MovingWindowRateLimiter,
+    "fixed-window": FixedWindowRateLimiter,
+}
+
+
+def _async_storage_uri(uri: str) -> str:
+    """Select the asyncio variant of a storage (redis:// -> async+redis://)"""
+    return uri if uri.startswith("async+") else f"async+{uri}"
+
+
+class RateLimiter(IRateLimiter):
+    """Request and cost-weighted rate limits with a pluggable backend
+
+    Counters live in the storage named by storage_uri: "memory://" keeps
+    them in this process (one worker, or tests), while a Redis URI such as
+    "redis://redis:6379/0" shares them between every uvicorn worker and
+    replica, so the effective limit no longer grows with the number of
+    processes. Storage calls are async, so a shared backend never blocks
+    the event loop.
+
+    The sliding-window counter (the default) weighs the previous window by
+    how much of it still overlaps, which smooths the burst a fixed window
+    allows at its boundary for the same two counters per key. Hits can be
+    weighted, so an expensive model uses up a user's budget faster than a
+    cheap one (see model_weight).
+
+    If the storage fails, requests are let through when fail_open is set:
+    the limiter protects the provider, it should not take the proxy down
+    with it.
+    """
+
+    def __init__(
+        self,
+        storage_uri: str = "memory://",
+        strategy: str = "sliding-window-counter",
+        model_weights: dict[str, int] | None = None,
+        default_weight: int = 1,
+        key_prefix: str = "ai-proxy",
+        fail_open: bool = True,
+        storage: Storage | None = None,
+    ) -> None:
+        """
+        Initialize the limiter
+
+        Args:
+            storage_uri: limits storage URI (memory://, redis://, rediss://,
+                redis+sentinel://, ...); Redis needs the redis package
+            strategy: sliding-window-counter, moving-window or fixed-window
+            model_weights: Cost of one request per Gemini model name
+            default_weight: Cost of one request to a model not listed
+            key_prefix: Namespace of this service's keys in a shared storage
+            fail_open: Let requests through when the storage is unavailable
+            storage: An already-built async storage to count in instead of
+                the one named by storage_uri, e.g. one shared with another
+                limiter
+
+        Raises:
+            ValueError: If the strategy is unknown
+        """
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown rate limit strategy {strategy!r}; use one of {', '.join(STRATEGIES)}")
+        if storage is None:
+            options = {}
+            if "redis" in storage_uri.split("://", 1)[0]:
+                # redis-py rather than coredis, and this service's own namespace
+                options = {"implementation": "redispy", "key_prefix": key_prefix}
+            storage = storage_from_string(_async_storage_uri(storage_uri), **options)
+        self._storage = storage
+        self._strategy = STRATEGIES[strategy](self._storage)
+        self._strategy_name = strategy
+        self._model_weights = dict(model_weights or {})
+        self._default_weight = default_weight
+        self._fail_open = fail_open
+        self._limits: dict[str, RateLimitItem] = {}
+
+        self._allowed = 0
+        self._rejected = 0
+        self._errors = 0
+
+    def _limit(self, limit: str) -> RateLimitItem:
+        item = self._limits.get(limit)
+        if item is None:
+            item = self._limits[limit] = parse(limit)
+        return item
+
+    def model_weight(self, model: str) -> int:
+        """
+        Cost of one request to a model
+
+        Args:
+            model: Requested model; OpenAI names are mapped to Gemini models
+
+        Returns:
+            The configured weight, or the default weight
+        """
+        return self._model_weights.get(MODEL_MAPPINGS.get(model, model), self._default_weight)
+
+    async def hit(self, limit: str, *identifiers: str, cost: int = 1) -> None:
+        """
+        Consume cost from a limit, or reject the request
+
+        Args:
+            limit: Limit in limits notation, e.g. "30/minute"
+            identifiers: What the limit is counted per, e.g. ("user", user_id)
+            cost: Units this request uses up
+
+        Raises:
+            RateLimitExceededException: If the limit is used up; carries the
+                seconds until enough of the window has passed
+        """
+        item = self._limit(limit)
+        try:
+            if await self._strategy.hit(item, *identifiers, cost=cost):
+                self._allowed += 1
+                return
+            stats = await self._strategy.get_window_stats(item, *identifiers)
+        except Exception as e:
+            self._errors += 1
+            if self._fail_open:
+                logger.warning(f"Rate limit storage unavailable ({e}); allowing request")
+                return
+            raise RateLimitExceededException("Rate limiting is temporarily unavailable", retry_after=1) from e
+
+        self._rejected += 1
+        retry_after = max(1, math.ceil(stats.reset_time - time.time()))
+        raise RateLimitExceededException(f"Rate limit exceeded: {limit}", retry_after=retry_after)
+
+    def stats(self) -> dict:
+        """Get limiter counters for /metrics"""
+        return {
+            "storage": type(self._storage).__name__,
+            "strategy": self._strategy_name,
+            "allowed": self._allowed,
+            "rejected": self._rejected,
+            "storage_errors": self._errors,
+        }
@@ -0,0 +1,171 @@
+"""Single-flight coalescing of identical in-flight completion requests"""
+
+import asyncio
+import logging
+from typing import AsyncIterator, Awaitable, Callable, TypeVar
+
+from ..core.interfaces import IRequestCoalescer
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class _StreamFlight:
+    """Shared state of one upstream stream being fanned out to subscribers"""
+
+    def __init__(self) -> None:
+        self.chunks: list[dict] = []
+        self.done = False
+        self.error: BaseException | None = None
+        self.changed = asyncio.Condition()
+        self.task: asyncio.Task | None = None
+        self.subscribers = 0
+
+
+class RequestCoalescer(IRequestCoalescer):
+    """Lets identical concurrent requests share one provider call
+
+    The first caller for a key (the leader) starts the provider call as its
+    own task; callers arriving while it is in flight wait on that task, or
+    subscribe to its stream. Because the upstream work is a separate task,
+    a leader that disconnects does not cancel it for the others; a stream is
+    closed once its last subscriber has gone, so no provider tokens are
+    spent on output nobody receives. Entries are removed as soon as the
+    flight finishes, so nothing is served after the fact - that is the
+    response cache's job.
+
+    Only touched from the event loop, so no locking is needed.
+    """
+
+    def __init__(self, bill_shared: bool = True) -> None:
+        """
+        Initialize the coalescer
+
+        Args:
+            bill_shared: Whether callers that joined a flight are billed like
+                a fresh call (the leader is always billed)
+        """
+        self.bill_shared = bill_shared
+        self._calls: dict[str, asyncio.Future] = {}
+        self._streams: dict[str, _StreamFlight] = {}
+        self._leaders = 0
+        self._shared = 0
+        logger.info(f"Request coalescing enabled: bill_shared={bill_shared}")
+
+    async def run(self, key: str, factory: Callable[[], Awaitable[T]]) -> tuple[T, bool]:
+        """
+        Run factory once per key among concurrent callers
+
+        Args:
+            key: Request fingerprint
+            factory: Starts the provider call; only invoked by the leader
+
+        Returns:
+            Tuple of (result, shared) where shared is True for callers that
+            joined an existing flight
+        """
+        task = self._calls.get(key)
+        shared = task is not None
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._finish_call(key, done))
+            self._leaders += 1
+        else:
+            self._shared += 1
+            logger.debug(f"Joined in-flight completion {key[:12]}")
+
+        return await asyncio.shield(task), shared
+
+    def _finish_call(self, key: str, task: asyncio.Future) -> None:
+        """Drop a finished call and mark its exception as retrieved"""
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            task.exception()
+
+    def stream(self, key: str, factory: Callable[[], AsyncIterator[dict]]) -> tuple[AsyncIterator[dict], bool]:
+        """
+        Subscribe to a shared upstream stream for key
+
+        Subscribers that join late first replay the chunks already received,
+        so every subscriber sees the complete stream.
+
+        Args:
+            key: Request fingerprint
+            factory: Opens the provider stream; only invoked by the leader
+
+        Returns:
+            Tuple of (chunk iterator, shared)
+        """
+        flight = self._streams.get(key)
+        shared = flight is not None
+        if flight is None:
+            flight = _StreamFlight()
+            self._streams[key] = flight
+            flight.task = asyncio.ensure_future(self._pump(key, flight, factory))
+            self._leaders += 1
+        else:
+            self._shared += 1
+            logger.debug(f"Joined in-flight stream {key[:12]}")
+
+        flight.subscribers += 1
+        return self._subscribe(key, flight), shared
+
+    async def _pump(self, key: str, flight: _StreamFlight, factory: Callable[[], AsyncIterator[dict]]) -> None:
+        """Read the upstream stream into the shared buffer"""
+        try:
+            async for chunk in factory():
+                async with flight.changed:
+                    flight.chunks.append(chunk)
+                    flight.changed.notify_all()
+        except Exception as e:
+            flight.error = e
+        finally:
+            if self._streams.get(key) is flight:
+                del self._streams[key]
+            async with flight.changed:
+                flight.done = True
+                flight.changed.notify_all()
+
+    async def _subscribe(self, key: str, flight: _StreamFlight) -> AsyncIterator[dict]:
+        """Yield the flight's chunks from the start, waiting for new ones"""
+        index = 0
+        try:
+            while True:
+                async with flight.changed:
+                    while index >= len(flight.chunks) and not flight.done:
+                        await flight.changed.wait()
+                    pending = flight.chunks[index:]
+                    finished = flight.done
+
+                for chunk in pending:
+                    yield chunk
+                index += len(pending)
+
+                if finished and index >= len(flight.chunks):
+                    if flight.error is not None:
+                        raise flight.error
+                    return
+        finally:
+            # Synchronous, so it also runs when a disconnected client's
+            # stream is closed without awaiting
+            flight.subscribers -= 1
+            if flight.subscribers == 0 and not flight.done and flight.task is not None:
+                # Nobody is left to receive the output: cancelling the pump
+                # closes the provider stream. New callers start a fresh
+                # flight instead of joining this one.
+                if self._streams.get(key) is flight:
+                    del self._streams[key]
+                flight.task.cancel()
+                logger.debug(f"Closed abandoned stream {key[:12]}")
+
+    def stats(self) -> dict:
+        """Get coalescing counters for /metrics"""
+        return {
+            "in_flight_calls": len(self._calls),
+            "in_flight_streams": len(self._streams),
+            "leaders": self._leaders,
+            "shared": self._shared,
+        }
@@ -0,0 +1,99 @@
+"""In-memory response cache for deterministic chat completions"""
+
+import logging
+import time
+import uuid
+from collections import OrderedDict
+
+from ..core.interfaces import IResponseCache
+from ..core.models import ChatCompletionResponse
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache(IResponseCache):
+    """TTL + LRU bounded cache of completed chat responses
+
+    Only touched from the event loop, so no locking is needed.
+    """
+
+    def __init__(self, max_entries: int = 1000, ttl_seconds: float = 300.0, bill_hits: bool = True) -> None:
+        """
+        Initialize the response cache
+
+        Args:
+            max_entries: Maximum number of cached responses before LRU eviction
+            ttl_seconds: Time after which an entry is no longer served
+            bill_hits: Whether cache hits are billed to the user like a fresh call
+        """
+        self._max_entries = max_entries
+        self._ttl_seconds = ttl_seconds
+        self.bill_hits = bill_hits
+        self._entries: OrderedDict[str, tuple[float, ChatCompletionResponse]] = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        logger.info(f"Response cache enabled: {max_entries} entries, {ttl_seconds}s TTL, bill_hits={bill_hits}")
+
+    def is_eligible(self, temperature: float, opt_in: bool | None) -> bool:
+        """
+        Decide whether a request may be served from or stored in the cache
+
+        Deterministic (temperature 0) requests are cached unless the client
+        opts out; other temperatures only when the client opts in.
+        """
+        if opt_in is not None:
+            return opt_in
+        return temperature == 0
+
+    def get(self, key: str) -> ChatCompletionResponse | None:
+        """
+        Look up a cached response
+
+        Returns:
+            A copy of the cached response with a fresh id and timestamp,
+            or None on a miss or expired entry
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self._misses += 1
+            return None
+
+        stored_at, response = entry
+        if time.monotonic() - stored_at > self._ttl_seconds:
+            del self._entries[key]
+            self._expirations += 1
+            self._misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self._hits += 1
+        return response.model_copy(
+            update={
+                "id": f"chatcmpl-{uuid.uuid4().hex[:8]}",
+                "created": int(time.time()),
+            }
+        )
+
+    def put(self, key: str, response: ChatCompletionResponse) -> None:
+        """Store a completed response, evicting the least recently used entry if full"""
+        self._entries[key] = (time.monotonic(), response)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+    def stats(self) -> dict:
+        """Get cache counters for /metrics"""
+        lookups = self._hits + self._misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self._max_entries,
+            "ttl_seconds": self._ttl_seconds,
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_rate_percent": round(self._hits / lookups * 100, 2) if lookups else 0,
+            "evictions": self._evictions,
+            "expirations": self._expirations,
+        }
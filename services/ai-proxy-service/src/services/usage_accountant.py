@@ -0,0 +1,337 @@
+"""Off-request-path accounting of completed chat completions"""
+
+import asyncio
+import logging
+import random
+from collections import deque
+from decimal import Decimal
+
+from ..core.exceptions import BillingUnavailableException
+from ..core.interfaces import IBalanceGate, IBillingService, IUsageAccountant, IUsageLogService
+from ..core.metrics import metrics_collector
+from ..core.models import BillingMetadata
+
+logger = logging.getLogger(__name__)
+
+
+class UsageAccountant(IUsageAccountant):
+    """Records every completion and bills it from a background worker
+
+    record_completion is synchronous and never waits on the network: it
+    prices the completion, records metrics and queues the charge. A worker
+    task collects the charges queued over a short window (batch_window) and
+    bills up to batch_size of them with one credits service request, after
+    persisting their usage entries. Charges that fail transiently are
+    retried with jittered exponential backoff. Each charge carries the
+    request ID as its idempotency key, so a retry after a lost response
+    cannot bill twice. Because queuing needs no await, it is also safe from
+    the cleanup path of a stream the client has abandoned.
+
+    Only touched from the event loop, so no locking is needed.
+    """
+
+    def __init__(
+        self,
+        billing_service: IBillingService,
+        usage_log: IUsageLogService | None = None,
+        max_attempts: int = 5,
+        retry_base_delay: float = 0.5,
+        retry_max_delay: float = 30.0,
+        concurrency: int = 8,
+        batch_size: int = 100,
+        batch_window: float = 0.05,
+        balance_gate: IBalanceGate | None = None,
+    ) -> None:
+        """
+        Initialize the accountant
+
+        Args:
+            billing_service: Prices completions and charges the credits service
+            usage_log: Persistent usage log, or None to skip it
+            max_attempts: Billing attempts per charge before giving up
+            retry_base_delay: Backoff before the first retry, in seconds
+            retry_max_delay: Cap on the backoff between retries, in seconds
+            concurrency: Batches billed in parallel by the worker
+            batch_size: Most charges billed with one request
+            batch_window: Seconds to wait for more charges before billing a
+                batch that is not full
+            balance_gate: Pre-flight balance gate whose holds are released
+                for completions that are not billed
+        """
+        if max_attempts < 1:
+            raise ValueError("max_attempts must be at least 1")
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+
+        self._billing_service = billing_service
+        self._usage_log = usage_log
+        self._max_attempts = max_attempts
+        self._retry_base_delay = retry_base_delay
+        self._retry_max_delay = retry_max_delay
+        self._concurrency = concurrency
+        self._batch_size = batch_size
+        self._batch_window = batch_window
+        self._balance_gate = balance_gate
+
+        self._jobs: deque[BillingMetadata] = deque()
+        self._in_flight: set[asyncio.Task] = set()
+        self._worker: asyncio.Task | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._wakeup: asyncio.Event | None = None
+        self._slots: asyncio.Semaphore | None = None
+
+        self._billed = 0
+        self._requests = 0
+        self._retries = 0
+        self._failed = 0
+        self._estimated = 0
+
+    def record_completion(
+        self,
+        user_id: str,
+        model: str,
+        prompt_tokens: int,
+        completion_tokens: int,
+        total_tokens: int,
+        request_id: str,
+        response_time: float,
+        bill: bool = True,
+        estimated: bool = False,
+        cache_hit: bool = False,
+        coalesced: bool = False,
+        status: str | None = None,
+        time_to_first_token: float | None = None,
+        provider_time: float | None = None,
+        reservation_key: str | None = None,
+        cached_tokens: int = 0,
+    ) -> float:
+        """
+        Record a completion: metrics now, usage log and billing in the background
+
+        Args:
+            user_id: User to charge
+            model: Model used
+            prompt_tokens: Number of prompt tokens
+            completion_tokens: Number of completion tokens
+            total_tokens: Total tokens
+            request_id: Request ID, also the billing idempotency key
+            response_time: End-to-end latency in seconds
+            bill: Whether to charge the user and log the usage entry
+            estimated: Whether token counts were estimated (aborted stream)
+            cache_hit: Whether the response was served from the response cache
+            coalesced: Whether the response was shared from another request
+            status: Metrics outcome label (defaults to "ok")
+            time_to_first_token: Seconds until the first streamed chunk
+            provider_time: Seconds spent waiting on the AI provider
+            reservation_key: Key of the credits hold placed before dispatch;
+                the charge settles it, or it is released if nothing is billed
+            cached_tokens: Prompt tokens served from context caching (billed
+                at the cached input price)
+
+        Returns:
+            Cost in USD (0.0 when not billed)
+        """
+        cost = 0.0
+        if bill:
+            cost = self._billing_service.calculate_cost(
+                model=model,
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                cached_tokens=cached_tokens,
+            )
+
+        metrics_collector.record_request(
+            model=model,
+            success=True,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            cost_usd=float(cost),
+            response_time=response_time,
+            cache_hit=cache_hit,
+            coalesced=coalesced,
+            status=status,
+            time_to_first_token=time_to_first_token,
+            provider_time=provider_time,
+        )
+
+        if bill and total_tokens > 0:
+            if reservation_key is not None and cost <= 0:
+                # Nothing to charge, so nothing will settle the hold
+                self.release_reservation(user_id, reservation_key)
+                reservation_key = None
+            if estimated:
+                self._estimated += 1
+            self._jobs.append(
+                BillingMetadata(
+                    user_id=user_id,
+                    model=model,
+                    prompt_tokens=prompt_tokens,
+                    completion_tokens=completion_tokens,
+                    total_tokens=total_tokens,
+                    estimated_cost_usd=Decimal(str(cost)),
+                    request_id=request_id,
+                    estimated=estimated,
+                    reservation_key=reservation_key,
+                )
+            )
+            self._wake()
+        else:
+            self.release_reservation(user_id, reservation_key)
+        return cost
+
+    def release_reservation(self, user_id: str, reservation_key: str | None) -> None:
+        """
+        Release the credits hold of a completion that will not be billed
+
+        Args:
+            user_id: User the hold was placed for
+            reservation_key: Key of the hold, or None if none was placed
+        """
+        if reservation_key is not None and self._balance_gate is not None:
+            self._balance_gate.release(user_id, reservation_key)
+
+    def _wake(self) -> None:
+        """Start the worker on the running loop if needed and signal new work"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No loop to run on; the job waits for the next call from one
+            return
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            # First use, or a new event loop (e.g. between test runs)
+            self._loop = loop
+            self._wakeup = asyncio.Event()
+            self._slots = asyncio.Semaphore(self._concurrency)
+            self._in_flight = set()
+            self._worker = loop.create_task(self._run(), name="usage-accountant")
+        self._wakeup.set()
+
+    async def _run(self) -> None:
+        """Hand batches of queued charges to billing tasks, at most `concurrency` at a time"""
+        # Bound to this worker's loop; _wake replaces them along with the worker
+        wakeup, slots, in_flight = self._wakeup, self._slots, self._in_flight
+
+        def on_done(task: asyncio.Task) -> None:
+            in_flight.discard(task)
+            slots.release()
+
+        while True:
+            while self._jobs:
+                if len(self._jobs) < self._batch_size and self._batch_window > 0:
+                    # Let the charges of concurrent requests join this batch
+                    await asyncio.sleep(self._batch_window)
+                await slots.acquire()
+                batch = [self._jobs.popleft() for _ in range(min(self._batch_size, len(self._jobs)))]
+                task = asyncio.create_task(self._process(batch))
+                in_flight.add(task)
+                task.add_done_callback(on_done)
+            wakeup.clear()
+            await wakeup.wait()
+
+    async def _log_usage(self, job: BillingMetadata) -> None:
+        try:
+            await self._usage_log.log_usage(
+                user_id=job.user_id,
+                model=job.model,
+                prompt_tokens=job.prompt_tokens,
+                completion_tokens=job.completion_tokens,
+                total_tokens=job.total_tokens,
+                cost_usd=float(job.estimated_cost_usd),
+                request_id=job.request_id,
+            )
+        except Exception:
+            logger.exception(f"[{job.request_id}] Failed to log usage")
+
+    async def _process(self, batch: list[BillingMetadata]) -> None:
+        """Persist the usage entries, then bill the batch with retries"""
+        if self._usage_log is not None:
+            for job in batch:
+                await self._log_usage(job)
+
+        pending = batch
+        for attempt in range(1, self._max_attempts + 1):
+            self._requests += 1
+            try:
+                outcomes = await self._billing_service.log_billing_batch(pending)
+            except BillingUnavailableException as e:
+                outcomes = [e] * len(pending)
+            except Exception:
+                logger.exception(f"Billing rejected a batch of {len(pending)} charges")
+                break
+
+            retry: list[BillingMetadata] = []
+            for job, outcome in zip(pending, outcomes):
+                if outcome is None:
+                    self._billed += 1
+                elif isinstance(outcome, BillingUnavailableException):
+                    retry.append(job)
+                    reason = outcome
+                else:
+                    logger.warning(f"[{job.request_id}] Billing rejected: {outcome}")
+                    # The ledger voided the hold along with the rejected charge
+                    self._give_up([job], release=False)
+            pending = retry
+            if not pending or attempt == self._max_attempts:
+                break
+
+            delay = min(self._retry_max_delay, self._retry_base_delay * 2 ** (attempt - 1))
+            delay = random.uniform(delay / 2, delay)
+            self._retries += len(pending)
+            logger.warning(
+                f"Billing attempt {attempt} failed for {len(pending)} charges ({reason}); "
+                f"retrying in {delay:.2f}s"
+            )
+            await asyncio.sleep(delay)
+
+        self._give_up(pending)
+
+    def _give_up(self, jobs: list[BillingMetadata], release: bool = True) -> None:
+        """Count the charges as failed and log them for reconciliation
+
+        Unless release is False (the ledger processed the batch and voided
+        the holds itself), the charges' credits holds are released, so the
+        user is not refused for funds held by a charge that will never
+        settle them.
+        """
+        for job in jobs:
+            self._failed += 1
+            if release:
+                self.release_reservation(job.user_id, job.reservation_key)
+            # Everything needed to reconcile the charge by hand
+            logger.error(
+                f"[{job.request_id}] UNBILLED | User: {job.user_id} | Model: {job.model} | "
+                f"Tokens: {job.total_tokens} | Cost: ${job.estimated_cost_usd:.6f} USD"
+            )
+
+    async def flush(self) -> None:
+        """Wait until every queued charge has been billed or given up on"""
+        while self._jobs or self._in_flight:
+            if self._jobs:
+                self._wake()
+            await asyncio.sleep(0.01)
+
+    async def close(self, timeout: float = 10.0) -> None:
+        """Drain outstanding charges (up to timeout) and stop the worker"""
+        try:
+            await asyncio.wait_for(self.flush(), timeout)
+        except asyncio.TimeoutError:
+            logger.error(
+                f"Shutting down with {len(self._jobs) + len(self._in_flight)} charges not yet billed"
+            )
+        if self._worker is not None and not self._worker.done():
+            self._worker.cancel()
+        self._worker = None
+
+    def stats(self) -> dict:
+        """Get billing pipeline counters for /metrics"""
+        return {
+            "pending": len(self._jobs),
+            "in_flight": len(self._in_flight),
+            "billed": self._billed,
+            "requests": self._requests,
+            "retries": self._retries,
+            "failed": self._failed,
+            "estimated": self._estimated,
+        }
@@ -0,0 +1,159 @@
+"""Streaming encoders for bulk usage-log exports"""
+
+import csv
+import io
+import json
+from typing import AsyncIterator, Callable
+
+from ..core.exceptions import InvalidRequestException
+
+EXPORT_COLUMNS = (
+    "id",
+    "user_id",
+    "model",
+    "prompt_tokens",
+    "completion_tokens",
+    "total_tokens",
+    "cost_usd",
+    "request_id",
+    "created_at",
+)
+
+# Format name -> (media type, file extension)
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv", "csv"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrow"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+Chunks = AsyncIterator[list[dict]]
+
+
+async def _encode_ndjson(chunks: Chunks) -> AsyncIterator[bytes]:
+    """One JSON object per line"""
+    async for rows in chunks:
+        yield "".join(json.dumps(row, separators=(",", ":")) + "\n" for row in rows).encode("utf-8")
+
+
+async def _encode_csv(chunks: Chunks) -> AsyncIterator[bytes]:
+    """Header row, then one CSV row per entry"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    async for rows in chunks:
+        writer.writerows([row[column] for column in EXPORT_COLUMNS] for row in rows)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+class _ByteSink:
+    """Write-only file object whose contents are drained after each chunk
+
+    Arrow IPC streams and Parquet files are both written strictly
+    sequentially, so the writer never needs to seek and each record batch or
+    row group can be sent as soon as it is encoded.
+    """
+
+    closed = False
+
+    def __init__(self) -> None:
+        self._parts: list[bytes] = []
+
+    def write(self, data) -> int:
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def _arrow_schema(pa):
+    """Schema of an exported usage row"""
+    return pa.schema(
+        [
+            ("id", pa.int64()),
+            ("user_id", pa.string()),
+            ("model", pa.string()),
+            ("prompt_tokens", pa.int64()),
+            ("completion_tokens", pa.int64()),
+            ("total_tokens", pa.int64()),
+            ("cost_usd", pa.float64()),
+            ("request_id", pa.string()),
+            ("created_at", pa.string()),
+        ]
+    )
+
+
+async def _encode_columnar(chunks: Chunks, open_writer: Callable) -> AsyncIterator[bytes]:
+    """Encode each chunk as one Arrow record batch / Parquet row group"""
+    import pyarrow as pa
+
+    schema = _arrow_schema(pa)
+    sink = _ByteSink()
+    writer = open_writer(pa.PythonFile(sink, mode="w"), schema)
+    try:
+        async for rows in chunks:
+            writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+async def _encode_arrow(chunks: Chunks) -> AsyncIterator[bytes]:
+    import pyarrow.ipc as ipc
+
+    async for data in _encode_columnar(chunks, ipc.new_stream):
+        yield data
+
+
+async def _encode_parquet(chunks: Chunks) -> AsyncIterator[bytes]:
+    import pyarrow.parquet as pq
+
+    async for data in _encode_columnar(chunks, pq.ParquetWriter):
+        yield data
+
+
+_ENCODERS = {
+    "ndjson": _encode_ndjson,
+    "csv": _encode_csv,
+    "arrow": _encode_arrow,
+    "parquet": _encode_parquet,
+}
+
+
+def get_export_encoder(fmt: str) -> Callable[[Chunks], AsyncIterator[bytes]]:
+    """
+    Look up the encoder for an export format
+
+    Args:
+        fmt: One of EXPORT_FORMATS
+
+    Returns:
+        Function turning an async iterator of row chunks into bytes
+
+    Raises:
+        InvalidRequestException: If the format is unknown, or needs pyarrow
+            and pyarrow is not installed
+    """
+    if fmt not in _ENCODERS:
+        raise InvalidRequestException(
+            f"Unsupported export format '{fmt}'. Use one of: {', '.join(EXPORT_FORMATS)}"
+        )
+    if fmt in ("arrow", "parquet"):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise InvalidRequestException(
+                f"The '{fmt}' export format requires pyarrow, which is not installed"
+            )
+    return _ENCODERS[fmt]
@@ -3,121 +3,289 @@
 import asyncio
 import logging
 import os
+import queue
 import sqlite3
+import threading
+import time
 from datetime import datetime, timezone, timedelta
+from typing import AsyncIterator
+
+from shared.pagination import TotalCache, decode_cursor, encode_cursor
+from shared.sqlite import SQLiteDatabase
 
 from ..core.interfaces import IUsageLogService
 
 logger = logging.getLogger(__name__)
 
 DEFAULT_RETENTION_DAYS = 90
+# Write-behind tuning: rows per transaction, the longest a row may wait in
+# memory before it is committed (the durability window), and the buffer bound
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_FLUSH_INTERVAL_MS = 200
+DEFAULT_QUEUE_SIZE = 10000
+# Rows per read while streaming an export; bounds the memory an export holds
+DEFAULT_EXPORT_CHUNK_SIZE = 5000
+
+_INSERT_SQL = """
+    INSERT INTO usage_log
+        (user_id, model, prompt_tokens, completion_tokens, total_tokens, cost_usd, request_id, created_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# Pre-aggregated daily rollups, maintained in the same transaction as the
+# usage_log inserts so summaries never scan usage_log itself
+_ROLLUP_TABLES = {
+    "usage_daily_user": ("user_id", "model", "day"),
+    "usage_daily_system": ("model", "day"),
+}
+
+# Queue marker that stops the batcher thread once everything before it is written
+_STOP = object()
 
 
 class UsageLogService(IUsageLogService):
-    """SQLite-backed usage logging service"""
+    """SQLite-backed usage logging service
+
+    Inserts are write-behind: log_usage only enqueues the row, and a batcher
+    thread hands queued rows to the database's single writer in batched
+    transactions. A crash can lose at most the rows still inside the flush
+    interval; close() drains the queue on shutdown.
+    """
 
-    def __init__(self, db_path: str | None = None) -> None:
+    def __init__(
+        self,
+        db_path: str | None = None,
+        batch_size: int | None = None,
+        flush_interval_ms: int | None = None,
+        queue_size: int | None = None,
+    ) -> None:
         self._db_path = db_path or os.path.join("data", "usage_log.db")
         self._retention_days = int(
             os.getenv("USAGE_LOG_RETENTION_DAYS", str(DEFAULT_RETENTION_DAYS))
         )
-        self._init_db()
+        self._batch_size = batch_size or int(
+            os.getenv("USAGE_LOG_BATCH_SIZE", str(DEFAULT_BATCH_SIZE))
+        )
+        self._flush_interval = (
+            flush_interval_ms
+            if flush_interval_ms is not None
+            else int(os.getenv("USAGE_LOG_FLUSH_INTERVAL_MS", str(DEFAULT_FLUSH_INTERVAL_MS)))
+        ) / 1000
+        self._queue: queue.Queue = queue.Queue(
+            maxsize=queue_size
+            or int(os.getenv("USAGE_LOG_QUEUE_SIZE", str(DEFAULT_QUEUE_SIZE)))
+        )
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+        self._closed = False
+        # Per-user totals are reused across pages; the batcher drops a user's
+        # entry whenever it commits rows for them
+        self._totals = TotalCache()
+        self._db = SQLiteDatabase(self._db_path, name="usage_log")
+        self._db.write_sync(self._init_db)
+        self._batcher = threading.Thread(
+            target=self._batcher_loop, name="usage-log-batcher", daemon=True
+        )
+        self._batcher.start()
         # Schedule cleanup in a background thread to avoid blocking startup
         # on large databases
-        import threading
-
         threading.Thread(
-            target=self._cleanup_old_entries, daemon=True
+            target=self._db.write_sync, args=(self._cleanup_old_entries,), daemon=True
         ).start()
 
-    def _get_connection(self) -> sqlite3.Connection:
-        """Create a new SQLite connection"""
-        conn = sqlite3.connect(self._db_path)
-        conn.row_factory = sqlite3.Row
-        return conn
-
     def _init_db(self) -> None:
         """Initialize the database schema"""
-        os.makedirs(os.path.dirname(self._db_path) or ".", exist_ok=True)
-        conn = self._get_connection()
-        try:
-            conn.execute(
-                """
-                CREATE TABLE IF NOT EXISTS usage_log (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id TEXT NOT NULL,
-                    model TEXT NOT NULL,
-                    prompt_tokens INTEGER NOT NULL,
-                    completion_tokens INTEGER NOT NULL,
-                    total_tokens INTEGER NOT NULL,
-                    cost_usd REAL NOT NULL,
-                    request_id TEXT NOT NULL,
-                    created_at TEXT NOT NULL
-                )
-                """
+        conn = self._db.connection()
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS usage_log (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id TEXT NOT NULL,
+                model TEXT NOT NULL,
+                prompt_tokens INTEGER NOT NULL,
+                completion_tokens INTEGER NOT NULL,
+                total_tokens INTEGER NOT NULL,
+                cost_usd REAL NOT NULL,
+                request_id TEXT NOT NULL,
+                created_at TEXT NOT NULL
             )
+            """
+        )
+        # Covers the per-user listing in its ORDER BY, so a page is an
+        # index seek rather than a sort over every row the user has
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_usage_log_user_created "
+            "ON usage_log(user_id, created_at DESC, id DESC)"
+        )
+        conn.execute("DROP INDEX IF EXISTS idx_usage_log_user_id")
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_usage_log_created_at ON usage_log(created_at)"
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS usage_daily_user (
+                user_id TEXT NOT NULL,
+                day TEXT NOT NULL,
+                model TEXT NOT NULL,
+                requests INTEGER NOT NULL,
+                prompt_tokens INTEGER NOT NULL,
+                completion_tokens INTEGER NOT NULL,
+                total_tokens INTEGER NOT NULL,
+                cost_usd REAL NOT NULL,
+                PRIMARY KEY (user_id, day, model)
+            ) WITHOUT ROWID
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS usage_daily_system (
+                day TEXT NOT NULL,
+                model TEXT NOT NULL,
+                requests INTEGER NOT NULL,
+                prompt_tokens INTEGER NOT NULL,
+                completion_tokens INTEGER NOT NULL,
+                total_tokens INTEGER NOT NULL,
+                cost_usd REAL NOT NULL,
+                PRIMARY KEY (day, model)
+            ) WITHOUT ROWID
+            """
+        )
+        self._backfill_rollups(conn)
+        conn.commit()
+
+    def _backfill_rollups(self, conn: sqlite3.Connection) -> None:
+        """Build the rollups from usage_log for databases that predate them"""
+        has_rollups = conn.execute("SELECT 1 FROM usage_daily_system LIMIT 1").fetchone()
+        has_log = conn.execute("SELECT 1 FROM usage_log LIMIT 1").fetchone()
+        if has_rollups or not has_log:
+            return
+
+        logger.info("Backfilling usage rollups from usage_log")
+        for table, keys in _ROLLUP_TABLES.items():
+            columns = ", ".join(keys)
+            group_by = columns.replace("day", "substr(created_at, 1, 10)")
             conn.execute(
-                "CREATE INDEX IF NOT EXISTS idx_usage_log_user_id ON usage_log(user_id)"
+                f"""
+                INSERT INTO {table}
+                    ({columns}, requests, prompt_tokens, completion_tokens, total_tokens, cost_usd)
+                SELECT {group_by}, COUNT(*), SUM(prompt_tokens), SUM(completion_tokens),
+                       SUM(total_tokens), SUM(cost_usd)
+                FROM usage_log
+                GROUP BY {group_by}
+                """
             )
-            conn.execute(
-                "CREATE INDEX IF NOT EXISTS idx_usage_log_created_at ON usage_log(created_at)"
+
+    @staticmethod
+    def _insert_rows(conn: sqlite3.Connection, rows: list[tuple]) -> None:
+        """Insert usage rows and fold them into the daily rollups (caller commits)"""
+        conn.executemany(_INSERT_SQL, rows)
+
+        # Pre-aggregate the batch so each rollup row is touched once
+        user_totals: dict[tuple, list] = {}
+        system_totals: dict[tuple, list] = {}
+        for user_id, model, prompt, completion, total, cost, _request_id, created_at in rows:
+            day = created_at[:10]
+            for totals, key in ((user_totals, (user_id, model, day)), (system_totals, (model, day))):
+                acc = totals.setdefault(key, [0, 0, 0, 0, 0.0])
+                acc[0] += 1
+                acc[1] += prompt
+                acc[2] += completion
+                acc[3] += total
+                acc[4] += cost
+
+        for table, totals in (("usage_daily_user", user_totals), ("usage_daily_system", system_totals)):
+            keys = _ROLLUP_TABLES[table]
+            columns = ", ".join(keys)
+            placeholders = ", ".join("?" * (len(keys) + 5))
+            conn.executemany(
+                f"""
+                INSERT INTO {table}
+                    ({columns}, requests, prompt_tokens, completion_tokens, total_tokens, cost_usd)
+                VALUES ({placeholders})
+                ON CONFLICT ({columns}) DO UPDATE SET
+                    requests = requests + excluded.requests,
+                    prompt_tokens = prompt_tokens + excluded.prompt_tokens,
+                    completion_tokens = completion_tokens + excluded.completion_tokens,
+                    total_tokens = total_tokens + excluded.total_tokens,
+                    cost_usd = cost_usd + excluded.cost_usd
+                """,
+                [(*key, *acc) for key, acc in totals.items()],
             )
-            conn.commit()
-        finally:
-            conn.close()
 
     def _cleanup_old_entries(self) -> None:
         """Delete entries older than retention period"""
         cutoff = datetime.now(timezone.utc) - timedelta(days=self._retention_days)
         cutoff_str = cutoff.isoformat()
-        conn = self._get_connection()
-        try:
-            cursor = conn.execute(
-                "DELETE FROM usage_log WHERE created_at < ?", (cutoff_str,)
+        conn = self._db.connection()
+        cursor = conn.execute(
+            "DELETE FROM usage_log WHERE created_at < ?", (cutoff_str,)
+        )
+        deleted = cursor.rowcount
+        # Rollups keep whole days: drop the days entirely before the cutoff
+        cutoff_day = cutoff_str[:10]
+        conn.execute("DELETE FROM usage_daily_user WHERE day < ?", (cutoff_day,))
+        conn.execute("DELETE FROM usage_daily_system WHERE day < ?", (cutoff_day,))
+        conn.commit()
+        if deleted > 0:
+            logger.info(
+                f"Cleaned up {deleted} usage log entries older than {self._retention_days} days"
             )
-            deleted = cursor.rowcount
-            conn.commit()
-            if deleted > 0:
-                logger.info(
-                    f"Cleaned up {deleted} usage log entries older than {self._retention_days} days"
-                )
+
+    def _batcher_loop(self) -> None:
+        """Drain the queue, handing batched rows to the database writer"""
+        while True:
+            item = self._queue.get()
+            batch: list[tuple] = []
+            flush_waiters: list[threading.Event] = []
+            stop = False
+            deadline = time.monotonic() + self._flush_interval
+            while True:
+                if item is _STOP:
+                    stop = True
+                    break
+                if isinstance(item, threading.Event):
+                    flush_waiters.append(item)
+                    break
+                batch.append(item)
+                if len(batch) >= self._batch_size:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+
+            if batch:
+                self._db.write_sync(self._write_batch, batch)
+            for waiter in flush_waiters:
+                waiter.set()
+            if stop:
+                break
+
+    def _write_batch(self, batch: list[tuple]) -> None:
+        """Insert a batch of rows in one transaction"""
+        conn = self._db.connection()
+        try:
+            with conn:
+                self._insert_rows(conn, batch)
+        except Exception:
+            logger.exception(f"Failed to write {len(batch)} usage log entries")
         finally:
-            conn.close()
+            for user_id in {row[0] for row in batch}:
+                self._totals.invalidate(user_id)
+            with self._pending_lock:
+                self._pending -= len(batch)
 
-    def _log_usage_sync(
-        self,
-        user_id: str,
-        model: str,
-        prompt_tokens: int,
-        completion_tokens: int,
-        total_tokens: int,
-        cost_usd: float,
-        request_id: str,
-    ) -> None:
-        """Synchronous insert for use with asyncio.to_thread"""
-        created_at = datetime.now(timezone.utc).isoformat()
-        conn = self._get_connection()
+    def _log_usage_sync(self, row: tuple) -> None:
+        """Synchronous single-row insert, used once the batcher has stopped"""
+        conn = self._db.connection()
         try:
-            conn.execute(
-                """
-                INSERT INTO usage_log
-                    (user_id, model, prompt_tokens, completion_tokens, total_tokens, cost_usd, request_id, created_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                (
-                    user_id,
-                    model,
-                    prompt_tokens,
-                    completion_tokens,
-                    total_tokens,
-                    cost_usd,
-                    request_id,
-                    created_at,
-                ),
-            )
-            conn.commit()
+            with conn:
+                self._insert_rows(conn, [row])
         finally:
-            conn.close()
+            self._totals.invalidate(row[0])
 
     async def log_usage(
         self,
@@ -129,9 +297,8 @@ class UsageLogService(IUsageLogService):
         cost_usd: float,
         request_id: str,
     ) -> None:
-        """Log a usage entry"""
-        await asyncio.to_thread(
-            self._log_usage_sync,
+        """Log a usage entry (queued for the batcher)"""
+        row = (
             user_id,
             model,
             prompt_tokens,
@@ -139,20 +306,95 @@ class UsageLogService(IUsageLogService):
             total_tokens,
             cost_usd,
             request_id,
+            datetime.now(timezone.utc).isoformat(),
         )
+        if self._closed:
+            await self._db.write(self._log_usage_sync, row)
+            return
 
-    def _get_user_usage_sync(
-        self, user_id: str, page: int, page_size: int
-    ) -> tuple[list[dict], int]:
-        """Synchronous paginated query"""
-        conn = self._get_connection()
+        with self._pending_lock:
+            self._pending += 1
         try:
-            row = conn.execute(
+            self._queue.put_nowait(row)
+        except queue.Full:
+            # Apply backpressure off the event loop rather than dropping rows
+            logger.warning("Usage log buffer full; waiting for the writer to catch up")
+            await asyncio.to_thread(self._queue.put, row)
+
+    def _flush_sync(self, timeout: float | None = None) -> bool:
+        """Block until every row queued so far is committed"""
+        if not self._batcher.is_alive():
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    async def flush(self) -> None:
+        """Wait until every queued usage entry is committed"""
+        with self._pending_lock:
+            pending = self._pending
+        if pending:
+            await asyncio.to_thread(self._flush_sync)
+
+    async def warm(self) -> None:
+        """Open the pooled database connections ahead of the first query"""
+        await self._db.warm()
+
+    def close(self, timeout: float = 10.0) -> None:
+        """Flush queued entries, stop the batcher and close the database"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._batcher.join(timeout)
+        if self._batcher.is_alive():
+            logger.warning("Usage log batcher did not finish flushing before shutdown timeout")
+            return
+
+        # Rows that raced with shutdown and landed behind the stop marker
+        leftovers = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(item, tuple):
+                leftovers.append(item)
+        if leftovers:
+            self._db.write_sync(self._write_batch, leftovers)
+        self._db.close()
+
+    def _get_user_usage_sync(
+        self, user_id: str, page: int, page_size: int, cursor: str | None = None
+    ) -> tuple[list[dict], int, str | None]:
+        """Synchronous paginated query
+
+        With a cursor the page is found by seeking past the cursor's
+        (created_at, id) on idx_usage_log_user_created; page is then ignored.
+        """
+        conn = self._db.connection()
+        total = self._totals.get_or_compute(
+            user_id,
+            lambda: conn.execute(
                 "SELECT COUNT(*) as cnt FROM usage_log WHERE user_id = ?",
                 (user_id,),
-            ).fetchone()
-            total = row["cnt"]
+            ).fetchone()["cnt"],
+        )
 
+        if cursor is not None:
+            created_at, last_id = decode_cursor(cursor, 2)
+            rows = conn.execute(
+                """
+                SELECT id, user_id, model, prompt_tokens, completion_tokens,
+                       total_tokens, cost_usd, request_id, created_at
+                FROM usage_log
+                WHERE user_id = ? AND (created_at, id) < (?, ?)
+                ORDER BY created_at DESC, id DESC
+                LIMIT ?
+                """,
+                (user_id, created_at, last_id, page_size),
+            ).fetchall()
+        else:
             offset = (page - 1) * page_size
             rows = conn.execute(
                 """
@@ -160,87 +402,147 @@ class UsageLogService(IUsageLogService):
                        total_tokens, cost_usd, request_id, created_at
                 FROM usage_log
                 WHERE user_id = ?
-                ORDER BY created_at DESC
+                ORDER BY created_at DESC, id DESC
                 LIMIT ? OFFSET ?
                 """,
                 (user_id, page_size, offset),
             ).fetchall()
 
-            entries = [dict(r) for r in rows]
-            return entries, total
-        finally:
-            conn.close()
+        entries = [dict(r) for r in rows]
+        next_cursor = (
+            encode_cursor(entries[-1]["created_at"], entries[-1]["id"])
+            if len(entries) == page_size
+            else None
+        )
+        return entries, total, next_cursor
 
     async def get_user_usage(
-        self, user_id: str, page: int = 1, page_size: int = 20
-    ) -> tuple[list[dict], int]:
-        """Get usage entries for a user. Returns (entries, total_count)."""
-        return await asyncio.to_thread(
-            self._get_user_usage_sync, user_id, page, page_size
+        self, user_id: str, page: int = 1, page_size: int = 20, cursor: str | None = None
+    ) -> tuple[list[dict], int, str | None]:
+        """Get usage entries for a user. Returns (entries, total_count, next_cursor)."""
+        await self.flush()
+        return await self._db.read(
+            self._get_user_usage_sync, user_id, page, page_size, cursor
         )
 
-    def _get_summary_sync(self, user_id: str | None = None) -> dict:
-        """Synchronous summary query, optionally filtered by user_id"""
-        conn = self._get_connection()
-        try:
-            where_clause = "WHERE user_id = ?" if user_id else ""
-            params: tuple = (user_id,) if user_id else ()
+    def _export_chunk_sync(
+        self, after: tuple[str, int], end: str, user_id: str | None, limit: int
+    ) -> list[dict]:
+        """Synchronous read of the next export chunk in (created_at, id) order"""
+        conn = self._db.connection()
+        user_clause = "AND user_id = ?" if user_id else ""
+        params: list = [after[0], after[1], end]
+        if user_id:
+            params.append(user_id)
+        params.append(limit)
+        rows = conn.execute(
+            f"""
+            SELECT id, user_id, model, prompt_tokens, completion_tokens,
+                   total_tokens, cost_usd, request_id, created_at
+            FROM usage_log
+            WHERE (created_at, id) > (?, ?) AND created_at < ? {user_clause}
+            ORDER BY created_at, id
+            LIMIT ?
+            """,
+            params,
+        ).fetchall()
+        return [dict(r) for r in rows]
 
-            row = conn.execute(
-                f"""
-                SELECT
-                    COUNT(*) as total_requests,
-                    COALESCE(SUM(prompt_tokens), 0) as total_prompt_tokens,
-                    COALESCE(SUM(completion_tokens), 0) as total_completion_tokens,
-                    COALESCE(SUM(total_tokens), 0) as total_tokens,
-                    COALESCE(SUM(cost_usd), 0.0) as total_cost_usd
-                FROM usage_log
-                {where_clause}
-                """,
-                params,
-            ).fetchone()
+    async def iter_export(
+        self,
+        start: str,
+        end: str,
+        user_id: str | None = None,
+        after_id: int = 0,
+        chunk_size: int | None = None,
+    ) -> AsyncIterator[list[dict]]:
+        """Stream usage entries in [start, end) as chunks, oldest first
 
-            by_model_rows = conn.execute(
-                f"""
-                SELECT
-                    model,
-                    COUNT(*) as requests,
-                    SUM(prompt_tokens) as prompt_tokens,
-                    SUM(completion_tokens) as completion_tokens,
-                    SUM(total_tokens) as total_tokens,
-                    SUM(cost_usd) as cost_usd
-                FROM usage_log
-                {where_clause}
-                GROUP BY model
-                """,
-                params,
-            ).fetchall()
+        Each chunk is a separate keyset read on idx_usage_log_created_at, so
+        memory stays bounded by chunk_size and no read snapshot is held open
+        between chunks. An interrupted export resumes by passing the last
+        received entry's created_at as start and its id as after_id.
+        """
+        limit = chunk_size or DEFAULT_EXPORT_CHUNK_SIZE
+        await self.flush()
+        after = (start, after_id)
+        while True:
+            rows = await self._db.read(self._export_chunk_sync, after, end, user_id, limit)
+            if rows:
+                yield rows
+            if len(rows) < limit:
+                return
+            after = (rows[-1]["created_at"], rows[-1]["id"])
 
-            by_model = {}
-            for mr in by_model_rows:
-                by_model[mr["model"]] = {
-                    "requests": mr["requests"],
-                    "prompt_tokens": mr["prompt_tokens"],
-                    "completion_tokens": mr["completion_tokens"],
-                    "total_tokens": mr["total_tokens"],
-                    "cost_usd": mr["cost_usd"],
-                }
-
-            return {
-                "total_requests": row["total_requests"],
-                "total_prompt_tokens": row["total_prompt_tokens"],
-                "total_completion_tokens": row["total_completion_tokens"],
-                "total_tokens": row["total_tokens"],
-                "total_cost_usd": row["total_cost_usd"],
-                "by_model": by_model,
+    def _get_summary_sync(
+        self,
+        user_id: str | None = None,
+        start_date: str | None = None,
+        end_date: str | None = None,
+    ) -> dict:
+        """Synchronous summary from the daily rollups, optionally filtered by user and day range"""
+        conn = self._db.connection()
+        conditions = []
+        params: list = []
+        if user_id:
+            table = "usage_daily_user"
+            conditions.append("user_id = ?")
+            params.append(user_id)
+        else:
+            table = "usage_daily_system"
+        if start_date:
+            conditions.append("day >= ?")
+            params.append(start_date)
+        if end_date:
+            conditions.append("day <= ?")
+            params.append(end_date)
+        where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        by_model_rows = conn.execute(
+            f"""
+            SELECT
+                model,
+                SUM(requests) as requests,
+                SUM(prompt_tokens) as prompt_tokens,
+                SUM(completion_tokens) as completion_tokens,
+                SUM(total_tokens) as total_tokens,
+                SUM(cost_usd) as cost_usd
+            FROM {table}
+            {where_clause}
+            GROUP BY model
+            """,
+            params,
+        ).fetchall()
+
+        by_model = {}
+        for mr in by_model_rows:
+            by_model[mr["model"]] = {
+                "requests": mr["requests"],
+                "prompt_tokens": mr["prompt_tokens"],
+                "completion_tokens": mr["completion_tokens"],
+                "total_tokens": mr["total_tokens"],
+                "cost_usd": mr["cost_usd"],
             }
-        finally:
-            conn.close()
 
-    async def get_user_summary(self, user_id: str) -> dict:
-        """Get usage summary for a user."""
-        return await asyncio.to_thread(self._get_summary_sync, user_id)
+        return {
+            "total_requests": sum(m["requests"] for m in by_model.values()),
+            "total_prompt_tokens": sum(m["prompt_tokens"] for m in by_model.values()),
+            "total_completion_tokens": sum(m["completion_tokens"] for m in by_model.values()),
+            "total_tokens": sum(m["total_tokens"] for m in by_model.values()),
+            "total_cost_usd": sum((m["cost_usd"] for m in by_model.values()), 0.0),
+            "by_model": by_model,
+        }
+
+    async def get_user_summary(
+        self, user_id: str, start_date: str | None = None, end_date: str | None = None
+    ) -> dict:
+        """Get usage summary for a user, optionally limited to a UTC day range (inclusive)."""
+        await self.flush()
+        return await self._db.read(self._get_summary_sync, user_id, start_date, end_date)
 
-    async def get_system_summary(self) -> dict:
-        """Get system-wide usage summary."""
-        return await asyncio.to_thread(self._get_summary_sync)
+    async def get_system_summary(
+        self, start_date: str | None = None, end_date: str | None = None
+    ) -> dict:
+        """Get system-wide usage summary, optionally limited to a UTC day range (inclusive)."""
+        await self.flush()
+        return await self._db.read(self._get_summary_sync, None, start_date, end_date)
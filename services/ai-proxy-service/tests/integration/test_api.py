@@ -229,3 +229,416 @@ class TestErrorHandling:
 
         assert response.status_code == 500
         assert "Internal server error" in response.text
+
+    @pytest.mark.asyncio
+    async def test_insufficient_credits_rejected_before_provider_call(self):
+        """Test that a user who cannot cover the estimate gets 402 and no provider call"""
+        from unittest.mock import AsyncMock, Mock, patch
+        from src.core.exceptions import InsufficientCreditsException
+
+        transport = ASGITransport(app=app)
+        mock_client = Mock()
+        gate = Mock()
+        gate.default_completion_tokens = 1024
+        gate.reserve = AsyncMock(side_effect=InsufficientCreditsException("Insufficient balance"))
+
+        with patch("src.container.container.get_gemini_client", return_value=mock_client), patch(
+            "src.container.container.get_balance_gate", return_value=gate
+        ):
+            async with AsyncClient(transport=transport, base_url="http://test") as client:
+                response = await client.post(
+                    "/v1/chat/completions",
+                    headers=_auth_headers(),
+                    json={
+                        "model": "gemini-pro",
+                        "messages": [{"role": "user", "content": "Test"}],
+                        "user_id": "broke@example.com",
+                    },
+                )
+
+        assert response.status_code == 402
+        assert "Insufficient balance" in response.text
+        mock_client.generate_completion.assert_not_called()
+        assert gate.reserve.await_args.args[0] == "broke@example.com"
+
+    @pytest.mark.parametrize("status_code", [429, 400])
+    @pytest.mark.asyncio
+    async def test_hold_is_released_when_request_fails_after_reserving(self, status_code):
+        """Test that a 429 from the scheduler or a 400 from the provider releases the hold"""
+        from unittest.mock import AsyncMock, Mock, patch
+        from src.core.exceptions import InvalidRequestException, RateLimitExceededException
+
+        transport = ASGITransport(app=app)
+        mock_client = Mock()
+        mock_client.generate_completion = AsyncMock(side_effect=InvalidRequestException("Bad request"))
+        gate = Mock()
+        gate.default_completion_tokens = 1024
+        gate.reserve = AsyncMock(return_value="hold-1")
+        scheduler = Mock()
+        scheduler.default_completion_tokens = 1024
+        scheduler.admit = AsyncMock(return_value=None)
+        if status_code == 429:
+            scheduler.admit.side_effect = RateLimitExceededException("Model quota exhausted", retry_after=1)
+        accountant = Mock()
+
+        with patch("src.container.container.get_gemini_client", return_value=mock_client), patch(
+            "src.container.container.get_balance_gate", return_value=gate
+        ), patch("src.container.container.get_provider_scheduler", return_value=scheduler), patch(
+            "src.container.container.get_usage_accountant", return_value=accountant
+        ), patch("src.container.container.get_request_coalescer", return_value=None):
+            async with AsyncClient(transport=transport, base_url="http://test") as client:
+                response = await client.post(
+                    "/v1/chat/completions",
+                    headers=_auth_headers(),
+                    json={
+                        "model": "gemini-pro",
+                        "messages": [{"role": "user", "content": "Test"}],
+                        "user_id": "held@example.com",
+                    },
+                )
+
+        assert response.status_code == status_code
+        accountant.release_reservation.assert_called_once_with("held@example.com", "hold-1")
+        accountant.record_completion.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_weighted_user_budget_returns_429(self):
+        """Test that a user's model-weighted budget is enforced with Retry-After"""
+        from unittest.mock import AsyncMock, Mock, patch
+        from src.services.rate_limiter import RateLimiter
+
+        limiter = RateLimiter(model_weights={"gemini-2.5-pro": 4, "gemini-2.5-flash": 1})
+        mock_client = AsyncMock()
+        mock_client.generate_completion.return_value = TestResponseCache._completion()
+
+        def payload(model):
+            return {"model": model, "messages": [{"role": "user", "content": "Test"}], "user_id": "busy@example.com"}
+
+        transport = ASGITransport(app=app)
+        with patch("src.container.container.get_gemini_client", return_value=mock_client), patch(
+            "src.container.container.get_rate_limiter", return_value=limiter
+        ), patch("src.container.container.get_usage_accountant", return_value=Mock()), patch(
+            "src.api.routes.USER_RATE_LIMIT", "9/minute"
+        ):
+            async with AsyncClient(transport=transport, base_url="http://test") as client:
+                statuses = [
+                    (await client.post("/v1/chat/completions", headers=_auth_headers(), json=payload("gpt-4"))).status_code
+                    for _ in range(2)
+                ]
+                rejected = await client.post("/v1/chat/completions", headers=_auth_headers(), json=payload("gpt-4"))
+                # A cheaper model still fits in what is left of the budget
+                cheap = await client.post("/v1/chat/completions", headers=_auth_headers(), json=payload("gemini-flash"))
+
+        assert statuses == [200, 200]
+        assert rejected.status_code == 429
+        assert int(rejected.headers["Retry-After"]) >= 1
+        assert cheap.status_code == 200
+        assert mock_client.generate_completion.await_count == 3
+
+
+class TestResponseCache:
+    """Test cases for serving repeated completions from the response cache"""
+
+    @staticmethod
+    def _completion():
+        from src.core.models import ChatChoice, ChatCompletionResponse, ChatMessage, Usage
+
+        return ChatCompletionResponse(
+            id="chatcmpl-test",
+            created=1,
+            model="gemini-pro",
+            choices=[ChatChoice(message=ChatMessage(role="assistant", content="Cached answer"))],
+            usage=Usage(prompt_tokens=5, completion_tokens=2, total_tokens=7),
+        )
+
+    @pytest.mark.asyncio
+    async def test_repeat_request_bypasses_provider(self):
+        """Test that an identical temperature-0 request is answered from the cache"""
+        from unittest.mock import AsyncMock, Mock, patch
+        from src.core.metrics import metrics_collector
+        from src.services.response_cache import ResponseCache
+        from src.services.usage_accountant import UsageAccountant
+
+        cache = ResponseCache(max_entries=10, ttl_seconds=60, bill_hits=False)
+        mock_client = AsyncMock()
+        mock_client.generate_completion.return_value = self._completion()
+        billing = Mock()
+        billing.calculate_cost.return_value = 0.0
+        billing.log_billing_batch = AsyncMock(side_effect=lambda batch: [None] * len(batch))
+        accountant = UsageAccountant(billing, batch_window=0)
+        metrics_collector.reset()
+
+        payload = {
+            "model": "gemini-pro",
+            "messages": [{"role": "user", "content": "Summarise"}],
+            "temperature": 0,
+        }
+
+        transport = ASGITransport(app=app)
+        with patch("src.container.container.get_gemini_client", return_value=mock_client), patch(
+            "src.container.container.get_response_cache", return_value=cache
+        ), patch("src.container.container.get_usage_accountant", return_value=accountant):
+            async with AsyncClient(transport=transport, base_url="http://test") as client:
+                first = await client.post("/v1/chat/completions", headers=_auth_headers(), json=payload)
+                second = await client.post("/v1/chat/completions", headers=_auth_headers(), json=payload)
+            await accountant.close()
+
+        assert first.status_code == 200
+        assert second.status_code == 200
+        assert second.json()["choices"][0]["message"]["content"] == "Cached answer"
+        assert mock_client.generate_completion.await_count == 1
+        # Hits are not billed when bill_hits is off
+        assert accountant.stats()["billed"] == 1
+        assert metrics_collector.get_metrics()["requests"]["cache_hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_streaming_request_replays_cached_completion(self):
+        """Test that a streaming request is replayed from a cached completion"""
+        import json
+        from unittest.mock import AsyncMock, patch
+        from src.core.fingerprint import request_fingerprint
+        from src.core.models import ChatMessage
+        from src.services.response_cache import ResponseCache
+
+        cache = ResponseCache(max_entries=10, ttl_seconds=60, bill_hits=False)
+        key = request_fingerprint("gemini-pro", [ChatMessage(role="user", content="Summarise")], 0.0, None)
+        cache.put(key, self._completion())
+        mock_client = AsyncMock()
+
+        transport = ASGITransport(app=app)
+        with patch("src.container.container.get_gemini_client", return_value=mock_client), patch(
+            "src.container.container.get_response_cache", return_value=cache
+        ):
+            async with AsyncClient(transport=transport, base_url="http://test") as client:
+                response = await client.post(
+                    "/v1/chat/completions",
+                    headers=_auth_headers(),
+                    json={
+                        "model": "gemini-pro",
+                        "messages": [{"role": "user", "content": "Summarise"}],
+                        "temperature": 0,
+                        "stream": True,
+                    },
+                )
+                lines = [line async for line in response.aiter_lines() if line.startswith("data: ")]
+
+        assert lines[-1] == "data: [DONE]"
+        chunks = [json.loads(line[6:]) for line in lines[:-1]]
+        assert chunks[0]["choices"][0]["delta"]["role"] == "assistant"
+        assert chunks[1]["choices"][0]["delta"]["content"] == "Cached answer"
+        assert chunks[-1]["usage"]["total_tokens"] == 7
+        mock_client.generate_completion_stream.assert_not_called()
+
+
+class TestRequestCoalescing:
+    """Test cases for sharing identical in-flight completions"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_identical_requests_share_provider_call(self):
+        """Test that identical concurrent requests trigger one provider call but bill every caller"""
+        import asyncio
+        from unittest.mock import AsyncMock, Mock, patch
+        from src.core.models import ChatChoice, ChatCompletionResponse, ChatMessage, Usage
+        from src.services.request_coalescer import RequestCoalescer
+
+        release = asyncio.Event()
+
+        async def slow_completion(**kwargs):
+            await release.wait()
+            return ChatCompletionResponse(
+                id="chatcmpl-test",
+                created=1,
+                model="gemini-pro",
+                choices=[ChatChoice(message=ChatMessage(role="assistant", content="Shared"))],
+                usage=Usage(prompt_tokens=5, completion_tokens=2, total_tokens=7),
+            )
+
+        mock_client = Mock()
+        mock_client.generate_completion = AsyncMock(side_effect=slow_completion)
+        coalescer = RequestCoalescer(bill_shared=True)
+        accountant = Mock()
+        accountant.record_completion.return_value = 0.0
+        payload = {
+            "model": "gemini-pro",
+            "messages": [{"role": "user", "content": "Sync me"}],
+            "user_id": "user-1",
+        }
+
+        transport = ASGITransport(app=app)
+        with patch("src.container.container.get_gemini_client", return_value=mock_client), patch(
+            "src.container.container.get_request_coalescer", return_value=coalescer
+        ), patch("src.container.container.get_usage_accountant", return_value=accountant):
+            async with AsyncClient(transport=transport, base_url="http://test") as client:
+                requests = [
+                    asyncio.create_task(client.post("/v1/chat/completions", headers=_auth_headers(), json=payload))
+                    for _ in range(3)
+                ]
+                while coalescer.stats()["shared"] < 2:
+                    await asyncio.sleep(0.01)
+                release.set()
+                responses = await asyncio.gather(*requests)
+
+        assert [r.status_code for r in responses] == [200, 200, 200]
+        assert all(r.json()["choices"][0]["message"]["content"] == "Shared" for r in responses)
+        assert mock_client.generate_completion.await_count == 1
+        assert accountant.record_completion.call_count == 3
+        assert all(c.kwargs["bill"] for c in accountant.record_completion.call_args_list)
+
+
+class TestUsageExport:
+    """Test cases for the streaming usage export endpoint"""
+
+    @pytest.mark.asyncio
+    async def test_export_streams_ndjson_attachment(self):
+        import json
+        from unittest.mock import Mock, patch
+
+        async def chunks(*args, **kwargs):
+            yield [{"id": 1, "request_id": "req-1"}]
+            yield [{"id": 2, "request_id": "req-2"}]
+
+        usage_log = Mock()
+        usage_log.iter_export = Mock(side_effect=chunks)
+        transport = ASGITransport(app=app)
+        with patch("src.container.container.get_usage_log", return_value=usage_log):
+            async with AsyncClient(transport=transport, base_url="http://test") as client:
+                response = await client.get(
+                    "/v1/usage/export",
+                    headers=_auth_headers(),
+                    params={"start": "2026-03-01T00:00:00", "end": "2026-04-01T00:00:00", "after_id": 7},
+                )
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        assert 'filename="usage-20260301-20260401.ndjson"' in response.headers["content-disposition"]
+        assert [json.loads(line)["id"] for line in response.text.splitlines()] == [1, 2]
+        usage_log.iter_export.assert_called_once_with(
+            "2026-03-01T00:00:00+00:00", "2026-04-01T00:00:00+00:00", user_id=None, after_id=7
+        )
+
+    @pytest.mark.asyncio
+    async def test_export_rejects_bad_range_and_format(self):
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            reversed_range = await client.get(
+                "/v1/usage/export",
+                headers=_auth_headers(),
+                params={"start": "2026-04-01T00:00:00Z", "end": "2026-03-01T00:00:00Z"},
+            )
+            bad_format = await client.get(
+                "/v1/usage/export",
+                headers=_auth_headers(),
+                params={"start": "2026-03-01T00:00:00Z", "end": "2026-04-01T00:00:00Z", "format": "xml"},
+            )
+
+        assert reversed_range.status_code == 400
+        assert bad_format.status_code == 400
+        assert "Unsupported export format" in bad_format.text
+
+
+class TestPrometheusMetrics:
+    """Test cases for the Prometheus metrics endpoint"""
+
+    @pytest.mark.asyncio
+    async def test_prometheus_endpoint_is_public_text(self):
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.get("/metrics/prometheus")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        assert "# TYPE ai_proxy_requests_total counter" in response.text
+
+
+class TestStreamingAccounting:
+    """Test cases for accounting streamed completions however they end"""
+
+    @staticmethod
+    def _client(chunks):
+        from unittest.mock import Mock
+
+        async def stream(**kwargs):
+            for chunk in chunks:
+                yield chunk
+
+        client = Mock()
+        client.generate_completion_stream = Mock(side_effect=stream)
+        return client
+
+    @staticmethod
+    def _delta(content):
+        return {"choices": [{"index": 0, "delta": {"content": content}, "finish_reason": None}]}
+
+    @staticmethod
+    def _stream(client, accountant):
+        from src.api.routes import _stream_real_response
+        from src.core.models import ChatMessage
+
+        return _stream_real_response(
+            gemini_client=client,
+            accountant=accountant,
+            messages=[ChatMessage(role="user", content="x" * 40)],
+            model="gemini-2.5-flash",
+            temperature=0.7,
+            max_tokens=None,
+            user_id="user-1",
+            request_id="req-stream",
+        )
+
+    @pytest.mark.asyncio
+    async def test_completed_stream_is_recorded_with_ttft(self):
+        from unittest.mock import Mock
+
+        accountant = Mock()
+        usage = {"usage": {"prompt_tokens": 12, "completion_tokens": 3, "total_tokens": 15}}
+        client = self._client([self._delta("Hello"), usage])
+
+        lines = [line async for line in self._stream(client, accountant)]
+
+        assert lines[-1] == b"data: [DONE]\n\n"
+        kwargs = accountant.record_completion.call_args.kwargs
+        assert kwargs["total_tokens"] == 15
+        assert kwargs["estimated"] is False
+        assert kwargs["status"] is None
+        assert kwargs["time_to_first_token"] is not None
+
+    @pytest.mark.asyncio
+    async def test_aborted_stream_is_billed_with_estimated_usage(self):
+        from unittest.mock import Mock
+
+        accountant = Mock()
+        client = self._client([self._delta("a" * 20), self._delta("b" * 20), self._delta("never sent")])
+
+        stream = self._stream(client, accountant)
+        await stream.__anext__()
+        await stream.__anext__()
+        # The client disconnects before the final usage chunk
+        await stream.aclose()
+
+        kwargs = accountant.record_completion.call_args.kwargs
+        assert kwargs["status"] == "aborted"
+        assert kwargs["estimated"] is True
+        assert kwargs["bill"] is True
+        assert kwargs["prompt_tokens"] == 10
+        assert kwargs["completion_tokens"] == 10
+        assert kwargs["request_id"] == "req-stream"
+
+    @pytest.mark.asyncio
+    async def test_failed_stream_is_counted_as_error_and_not_billed(self):
+        from unittest.mock import Mock
+        from src.core.metrics import metrics_collector
+
+        async def broken(**kwargs):
+            yield self._delta("partial")
+            raise RuntimeError("provider died")
+
+        accountant = Mock()
+        client = Mock()
+        client.generate_completion_stream = Mock(side_effect=broken)
+        metrics_collector.reset()
+
+        lines = [line async for line in self._stream(client, accountant)]
+
+        assert b"server_error" in lines[-1]
+        accountant.record_completion.assert_not_called()
+        assert metrics_collector.get_metrics()["requests"]["by_status"] == {"provider_error": 1}
@@ -0,0 +1,130 @@
+"""Load test of the billing path against a local stub credits service
+
+Sends a burst of concurrent charges through the pooled CreditsClient and,
+for comparison, through a fresh httpx client per charge (the previous
+behaviour), and checks that the pool keeps the number of TCP connections
+bounded. Runs against 127.0.0.1 only, in a few seconds.
+"""
+
+import asyncio
+import socket
+import threading
+import time
+
+import httpx
+import pytest
+import uvicorn
+
+from src.services.credits_client import CreditsClient
+
+CHARGES = 100
+CONCURRENCY = 20
+# Keep every concurrent connection alive so the pool never churns
+KEEPALIVE = CONCURRENCY
+
+
+class StubCreditsService:
+    """Minimal ASGI credits service that records the client port of every request"""
+
+    def __init__(self) -> None:
+        self.peers: set[tuple[str, int]] = set()
+        self.requests = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return
+        while True:
+            message = await receive()
+            if not message.get("more_body"):
+                break
+        self.requests += 1
+        self.peers.add(tuple(scope["client"]))
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [(b"content-type", b"application/json")],
+            }
+        )
+        await send({"type": "http.response.body", "body": b'{"new_balance": "1.00"}'})
+
+
+@pytest.fixture(scope="module")
+def stub_server():
+    """Run the stub on a free port in a background thread"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    app = StubCreditsService()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 5
+    while not server.started:
+        if time.monotonic() > deadline:
+            pytest.fail("stub credits service did not start")
+        time.sleep(0.01)
+
+    yield app, f"http://127.0.0.1:{port}"
+
+    server.should_exit = True
+    thread.join(timeout=5)
+
+
+async def _run_load(send_charge) -> list[float]:
+    slots = asyncio.Semaphore(CONCURRENCY)
+    latencies: list[float] = []
+
+    async def one(i: int) -> None:
+        async with slots:
+            started = time.perf_counter()
+            response = await send_charge(i)
+            latencies.append(time.perf_counter() - started)
+            assert response.status_code == 200
+
+    await asyncio.gather(*(one(i) for i in range(CHARGES)))
+    return sorted(latencies)
+
+
+def _summary(label: str, latencies: list[float], connections: int) -> str:
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000
+    return f"{label}: {connections} connections, p50 {p50:.2f} ms, p99 {p99:.2f} ms"
+
+
+async def test_pooled_client_reuses_connections(stub_server):
+    app, base_url = stub_server
+
+    # Baseline: a new client (and connection) per charge
+    app.peers.clear()
+
+    async def fresh_client_charge(i: int) -> httpx.Response:
+        async with httpx.AsyncClient(base_url=base_url) as client:
+            return await client.post("/api/v1/bill", json={"idempotency_key": f"fresh-{i}"})
+
+    baseline = await _run_load(fresh_client_charge)
+    baseline_connections = len(app.peers)
+
+    # Pooled: one long-lived client for every charge
+    app.peers.clear()
+    client = CreditsClient(base_url, "secret", max_keepalive_connections=KEEPALIVE)
+
+    async def pooled_charge(i: int) -> httpx.Response:
+        return await client.post("/api/v1/bill", json={"idempotency_key": f"pooled-{i}"}, idempotency_key=f"pooled-{i}")
+
+    try:
+        pooled = await _run_load(pooled_charge)
+    finally:
+        await client.close()
+    pooled_connections = len(app.peers)
+
+    print()
+    print(_summary("fresh client per charge", baseline, baseline_connections))
+    print(_summary("pooled client", pooled, pooled_connections))
+
+    assert baseline_connections == CHARGES
+    # At most one connection per concurrent request, far fewer than one per charge
+    assert pooled_connections <= CONCURRENCY
+    assert pooled_connections * 4 < baseline_connections
+    assert client.stats()["retries"] == 0
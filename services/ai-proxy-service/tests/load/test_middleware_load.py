@@ -0,0 +1,186 @@
+"""Benchmark of the auth and request-ID middleware against local stub apps
+
+Builds the middleware stacks of the ai-proxy (request ID, API key auth,
+CORS) and the credits service (API key auth with admin prefixes, CORS) twice:
+with the previous ``BaseHTTPMiddleware`` implementations and with the plain
+ASGI ones. Each stack serves a small JSON route and an SSE route through
+uvicorn on 127.0.0.1; the test prints requests/sec for the JSON route and
+time to first event and total time for the SSE route. Runs in a few seconds.
+"""
+
+import asyncio
+import socket
+import threading
+import time
+import uuid
+
+import httpx
+import pytest
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from shared.auth import APIKeyAuthMiddleware
+from src.middleware.request_id import RequestIDMiddleware
+
+REQUESTS = 300
+CONCURRENCY = 20
+STREAMS = 30
+STREAM_EVENTS = 20
+HEADERS = {"Authorization": "Bearer bench-key"}
+
+
+class LegacyAPIKeyAuthMiddleware(BaseHTTPMiddleware):
+    """The previous BaseHTTPMiddleware wrapping, with the same auth decisions"""
+
+    def __init__(self, app, **kwargs):
+        super().__init__(app)
+        self.auth = APIKeyAuthMiddleware(app, **kwargs)
+
+    async def dispatch(self, request: Request, call_next):
+        denial = self.auth._check(request.url.path, request.headers.get("Authorization", ""))
+        if denial is not None:
+            return denial
+        return await call_next(request)
+
+
+class LegacyRequestIDMiddleware(BaseHTTPMiddleware):
+    """The previous BaseHTTPMiddleware request-ID implementation"""
+
+    async def dispatch(self, request: Request, call_next):
+        request_id = request.headers.get("X-Request-ID") or f"req-{uuid.uuid4().hex[:12]}"
+        request.state.request_id = request_id
+        response = await call_next(request)
+        response.headers["X-Request-ID"] = request_id
+        return response
+
+
+def _build_app(service: str, legacy: bool) -> FastAPI:
+    auth = LegacyAPIKeyAuthMiddleware if legacy else APIKeyAuthMiddleware
+    app = FastAPI()
+
+    @app.get("/api/v1/ping")
+    async def ping():
+        return {"ok": True}
+
+    @app.get("/api/v1/stream")
+    async def stream():
+        async def events():
+            for i in range(STREAM_EVENTS):
+                yield f'data: {{"i": {i}}}\n\n'
+                await asyncio.sleep(0.001)
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    app.add_middleware(CORSMiddleware, allow_origins=["http://localhost:3000"], allow_headers=["Authorization"])
+    if service == "ai-proxy":
+        app.add_middleware(auth, admin_path_prefixes=["/v1/pricing", "/v1/usage"])
+        app.add_middleware(LegacyRequestIDMiddleware if legacy else RequestIDMiddleware)
+    else:
+        app.add_middleware(auth, admin_path_prefixes=["/api/v1/users"])
+    return app
+
+
+def _serve(app: FastAPI) -> tuple[uvicorn.Server, threading.Thread, str]:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 5
+    while not server.started:
+        if time.monotonic() > deadline:
+            pytest.fail("stub app did not start")
+        time.sleep(0.01)
+    return server, thread, f"http://127.0.0.1:{port}"
+
+
+@pytest.fixture(scope="module")
+def stacks():
+    """Serve both stacks of both services, keyed by (service, legacy)"""
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("API_KEYS", "bench-key")
+        mp.setenv("ADMIN_API_KEYS", "bench-admin-key")
+        servers = {
+            (service, legacy): _serve(_build_app(service, legacy))
+            for service in ("ai-proxy", "credits-service")
+            for legacy in (True, False)
+        }
+
+    yield {key: base_url for key, (_, _, base_url) in servers.items()}
+
+    for server, thread, _ in servers.values():
+        server.should_exit = True
+        thread.join(timeout=5)
+
+
+async def _requests_per_second(client: httpx.AsyncClient) -> float:
+    slots = asyncio.Semaphore(CONCURRENCY)
+
+    async def one() -> None:
+        async with slots:
+            response = await client.get("/api/v1/ping", headers=HEADERS)
+            assert response.status_code == 200
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(REQUESTS)))
+    return REQUESTS / (time.perf_counter() - started)
+
+
+async def _stream_latency(client: httpx.AsyncClient) -> tuple[float, float]:
+    """Median time to first event and to the end of the stream, in seconds"""
+    first_event, total = [], []
+    for _ in range(STREAMS):
+        started = time.perf_counter()
+        async with client.stream("GET", "/api/v1/stream", headers=HEADERS) as response:
+            assert response.status_code == 200
+            first = None
+            async for _ in response.aiter_raw():
+                if first is None:
+                    first = time.perf_counter() - started
+        first_event.append(first)
+        total.append(time.perf_counter() - started)
+    first_event.sort()
+    total.sort()
+    return first_event[STREAMS // 2], total[STREAMS // 2]
+
+
+async def _measure(base_url: str) -> tuple[float, float, float]:
+    limits = httpx.Limits(max_connections=CONCURRENCY, max_keepalive_connections=CONCURRENCY)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits) as client:
+        # Warm up connections and both code paths
+        await _requests_per_second(client)
+        rps = await _requests_per_second(client)
+        first_event, total = await _stream_latency(client)
+    return rps, first_event, total
+
+
+@pytest.mark.parametrize("service", ["ai-proxy", "credits-service"])
+async def test_plain_asgi_middleware_throughput_and_streaming(stacks, service):
+    results = {legacy: await _measure(stacks[(service, legacy)]) for legacy in (True, False)}
+
+    print()
+    for legacy, label in ((True, "BaseHTTPMiddleware"), (False, "plain ASGI")):
+        rps, first_event, total = results[legacy]
+        print(
+            f"{service} {label}: {rps:.0f} req/s, "
+            f"SSE first event p50 {first_event * 1000:.2f} ms, stream p50 {total * 1000:.2f} ms"
+        )
+
+    for rps, first_event, total in results.values():
+        # Events are delivered as they are produced, not buffered to the end
+        assert first_event < total
+
+    # Both stacks answer the same way: auth denials and the request-ID header
+    for legacy in (True, False):
+        async with httpx.AsyncClient(base_url=stacks[(service, legacy)]) as client:
+            assert (await client.get("/api/v1/ping")).status_code == 401
+            assert (await client.get("/api/v1/ping", headers={"Authorization": "Bearer wrong"})).status_code == 403
+            response = await client.get("/api/v1/ping", headers={**HEADERS, "X-Request-ID": "req-bench"})
+            if service == "ai-proxy":
+                assert response.headers["X-Request-ID"] == "req-bench"
@@ -0,0 +1,63 @@
+"""Micro-benchmark of SSE chunk encoding
+
+Encodes the content chunks of a streamed completion the previous way
+(stdlib ``json.dumps`` of the chunk dict per token), through the shared
+``sse_event`` (orjson when installed) and ``ChunkEncoder.encode``, and
+with ``ChunkEncoder.content``'s pre-encoded envelope, which skips building
+the dict. Prints microseconds and bytes per chunk. Runs in about a second.
+"""
+
+import json
+import time
+
+from shared.serialization import HAS_ORJSON, ChunkEncoder, sse_event
+
+TOKENS = 20000
+# Mixed ASCII and non-ASCII text, as in multilingual completions
+WORDS = ["The", " quick", " brown", " fox", " — über", " café", " naïve", " 東京", " jumps", "\n"]
+
+
+def _chunks() -> list[dict]:
+    return [
+        {
+            "id": "chatcmpl-1a2b3c4d",
+            "object": "chat.completion.chunk",
+            "created": 1700000000,
+            "model": "gemini-2.5-flash",
+            "choices": [{"index": 0, "delta": {"content": WORDS[i % len(WORDS)]}, "finish_reason": None}],
+        }
+        for i in range(TOKENS)
+    ]
+
+
+def _run(label: str, encode, chunks: list[dict]) -> tuple[float, float]:
+    started = time.perf_counter()
+    encoded = [encode(chunk) for chunk in chunks]
+    elapsed = time.perf_counter() - started
+    size = sum(len(event if isinstance(event, bytes) else event.encode()) for event in encoded)
+    micros, per_chunk = elapsed / len(chunks) * 1e6, size / len(chunks)
+    print(f"{label}: {micros:.2f} µs/chunk, {per_chunk:.1f} bytes/chunk")
+    return micros, per_chunk
+
+
+def test_chunk_encoding_cost_and_size():
+    chunks = _chunks()
+    encoder = ChunkEncoder()
+
+    print(f"\norjson installed: {HAS_ORJSON}")
+    stdlib_time, stdlib_size = _run("json.dumps per chunk", lambda chunk: f"data: {json.dumps(chunk)}\n\n", chunks)
+    _run("sse_event", sse_event, chunks)
+    _run("ChunkEncoder.encode", encoder.encode, chunks)
+    envelope = ChunkEncoder(chunks[0]["id"], chunks[0]["created"], chunks[0]["model"])
+    texts = [chunk["choices"][0]["delta"]["content"] for chunk in chunks]
+    started = time.perf_counter()
+    events = [envelope.content(text) for text in texts]
+    micros = (time.perf_counter() - started) / len(texts) * 1e6
+    content_size = sum(map(len, events)) / len(events)
+    print(f"ChunkEncoder.content: {micros:.2f} µs/chunk, {content_size:.1f} bytes/chunk")
+
+    # Compact UTF-8 output: no spaces after separators, no \u escapes
+    assert content_size < stdlib_size
+    assert micros < stdlib_time
+    # Same events, decoded
+    assert json.loads(events[7][6:]) == chunks[7]
@@ -0,0 +1,145 @@
+"""Unit tests for the pre-flight balance gate"""
+
+import json
+from decimal import Decimal
+
+import httpx
+import pytest
+
+from src.core.exceptions import InsufficientCreditsException
+from src.services.balance_gate import BalanceGate
+from src.services.credits_client import CreditsClient
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _gate(handler, **kwargs) -> BalanceGate:
+    client = CreditsClient(
+        "http://credits.test",
+        "secret",
+        max_attempts=1,
+        retry_base_delay=0.0,
+        transport=httpx.MockTransport(handler),
+    )
+    return BalanceGate(credits_client=client, **kwargs)
+
+
+def _reserve_handler(requests: list, available: str = "9.00", reserved: bool = True):
+    def handler(request):
+        requests.append(json.loads(request.content))
+        return httpx.Response(
+            200,
+            json={
+                "user_id": "user-1",
+                "idempotency_key": "req-1",
+                "reserved": reserved,
+                "available_balance": available,
+            },
+        )
+
+    return handler
+
+
+class TestBalanceGate:
+
+    @pytest.mark.asyncio
+    async def test_reserve_places_hold_and_caches_balance(self):
+        requests = []
+        gate = _gate(_reserve_handler(requests), reservation_timeout=60)
+
+        assert await gate.reserve("user-1", 0.5, "req-1") == "req-1"
+
+        assert requests == [
+            {"user_id": "user-1", "amount": 0.5, "idempotency_key": "req-1", "timeout_seconds": 60}
+        ]
+        assert gate.stats()["reserved"] == 1
+        assert gate.stats()["cached_balances"] == 1
+
+    @pytest.mark.asyncio
+    async def test_insufficient_balance_rejects_then_rejects_from_cache(self):
+        requests = []
+        gate = _gate(_reserve_handler(requests, available="0.10", reserved=False))
+
+        with pytest.raises(InsufficientCreditsException):
+            await gate.reserve("user-1", 0.5, "req-1")
+        with pytest.raises(InsufficientCreditsException):
+            await gate.reserve("user-1", 0.5, "req-2")
+
+        assert len(requests) == 1
+        stats = gate.stats()
+        assert stats["rejected"] == 2
+        assert stats["rejected_from_cache"] == 1
+
+    @pytest.mark.asyncio
+    async def test_cached_balance_expires(self):
+        requests = []
+        clock = FakeClock()
+        gate = _gate(_reserve_handler(requests), ttl_seconds=5, clock=clock)
+        gate.update_balance("user-1", Decimal("0"))
+
+        with pytest.raises(InsufficientCreditsException):
+            await gate.reserve("user-1", 0.5, "req-1")
+        clock.now = 6
+        assert await gate.reserve("user-1", 0.5, "req-2") == "req-2"
+        assert len(requests) == 1
+
+    @pytest.mark.asyncio
+    async def test_unknown_account_is_rejected(self):
+        gate = _gate(lambda request: httpx.Response(404, json={"detail": "Account not found"}))
+
+        with pytest.raises(InsufficientCreditsException):
+            await gate.reserve("anonymous", 0.5, "req-1")
+
+    @pytest.mark.asyncio
+    async def test_unavailable_service_fails_open(self):
+        gate = _gate(lambda request: httpx.Response(503))
+
+        assert await gate.reserve("user-1", 0.5, "req-1") is None
+        assert gate.stats()["unavailable"] == 1
+
+    @pytest.mark.asyncio
+    async def test_unavailable_service_fails_closed(self):
+        gate = _gate(lambda request: httpx.Response(503), fail_open=False)
+
+        with pytest.raises(InsufficientCreditsException):
+            await gate.reserve("user-1", 0.5, "req-1")
+
+    @pytest.mark.asyncio
+    async def test_free_requests_are_not_held(self):
+        requests = []
+        gate = _gate(_reserve_handler(requests))
+
+        assert await gate.reserve("user-1", 0.0, "req-1") is None
+        assert requests == []
+
+    @pytest.mark.asyncio
+    async def test_release_posts_and_forgets_balance(self):
+        requests = []
+
+        def handler(request):
+            requests.append((request.url.path, json.loads(request.content)))
+            return httpx.Response(200, json={"released": 1})
+
+        gate = _gate(handler)
+        gate.update_balance("user-1", Decimal("0.10"))
+
+        gate.release("user-1", "req-1")
+        await gate.close()
+
+        assert requests == [
+            ("/api/v1/release", {"items": [{"user_id": "user-1", "reservation_key": "req-1"}]})
+        ]
+        assert gate.stats()["released"] == 1
+        assert gate.stats()["cached_balances"] == 0
+
+    def test_cache_is_bounded(self):
+        gate = _gate(lambda request: httpx.Response(500), max_entries=2)
+        for user in ("a", "b", "c"):
+            gate.update_balance(user, Decimal("1"))
+        assert gate.stats()["cached_balances"] == 2
@@ -28,6 +28,20 @@ class TestBillingService:
         # = 0.00125 + 0.01 = 0.01125
         assert cost == pytest.approx(0.01125, rel=1e-6)
 
+    def test_calculate_cost_with_cached_tokens(self, billing_service):
+        """Test that cached prompt tokens are billed at the cached input price"""
+        # 1000 prompt tokens, 800 of them cached, + 1000 output tokens
+        cost = billing_service.calculate_cost(
+            model="gemini-pro",
+            prompt_tokens=1000,
+            completion_tokens=1000,
+            cached_tokens=800,
+        )
+
+        # Expected (Pro pricing): (200/1000 * 0.00125) + (800/1000 * 0.000125) + (1000/1000 * 0.01)
+        # = 0.00025 + 0.0001 + 0.01 = 0.01035
+        assert cost == pytest.approx(0.01035, rel=1e-6)
+
     def test_calculate_cost_small_request(self, billing_service):
         """Test cost calculation for small request"""
         # 100 input tokens + 50 output tokens
@@ -139,3 +153,161 @@ class TestBillingService:
         assert "test@example.com" in caplog.text
         assert "gemini-pro" in caplog.text
         assert "req-test123" in caplog.text
+
+
+class TestBillingServicePhase2:
+    """Test cases for charging through the credits service"""
+
+    @staticmethod
+    def _service(monkeypatch, handler):
+        import httpx
+        from src.services.credits_client import CreditsClient
+
+        monkeypatch.setenv("CREDITS_SERVICE_URL", "http://credits.test")
+        monkeypatch.setenv("CREDITS_SERVICE_API_KEY", "secret")
+        client = CreditsClient(
+            "http://credits.test",
+            "secret",
+            retry_base_delay=0.0,
+            transport=httpx.MockTransport(handler),
+        )
+        return BillingService(credits_client=client), client
+
+    @staticmethod
+    def _metadata():
+        return BillingMetadata(
+            user_id="test@example.com",
+            model="gemini-pro",
+            prompt_tokens=100,
+            completion_tokens=50,
+            total_tokens=150,
+            estimated_cost_usd=Decimal("0.00005"),
+            request_id="req-test123",
+        )
+
+    @pytest.mark.asyncio
+    async def test_sends_request_id_as_idempotency_key(self, monkeypatch):
+        import json
+        import httpx
+
+        seen = []
+
+        def handler(request):
+            seen.append(request)
+            return httpx.Response(200, json={})
+
+        service, client = self._service(monkeypatch, handler)
+        await service.log_billing(self._metadata())
+        await client.close()
+
+        assert json.loads(seen[0].content)["idempotency_key"] == "req-test123"
+        assert seen[0].headers["X-Request-ID"] == "req-test123"
+        assert seen[0].headers["Authorization"] == "Bearer secret"
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("status_code", [429, 500, 503])
+    async def test_transient_errors_are_retryable(self, monkeypatch, status_code):
+        import httpx
+        from src.core.exceptions import BillingUnavailableException
+
+        service, client = self._service(monkeypatch, lambda request: httpx.Response(status_code))
+        with pytest.raises(BillingUnavailableException):
+            await service.log_billing(self._metadata())
+        await client.close()
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("status_code", [400, 402, 404])
+    async def test_rejections_are_not_retryable(self, monkeypatch, status_code):
+        import httpx
+        from src.core.exceptions import BillingException, BillingUnavailableException
+
+        service, client = self._service(monkeypatch, lambda request: httpx.Response(status_code))
+        with pytest.raises(BillingException) as excinfo:
+            await service.log_billing(self._metadata())
+        await client.close()
+        assert not isinstance(excinfo.value, BillingUnavailableException)
+
+    @pytest.mark.asyncio
+    async def test_batch_is_one_request_with_per_charge_outcomes(self, monkeypatch):
+        import json
+        import httpx
+        from src.core.exceptions import BillingException, BillingUnavailableException
+
+        seen = []
+        statuses = ["billed", "insufficient_balance", "error", "duplicate"]
+
+        def handler(request):
+            seen.append(request)
+            items = json.loads(request.content)["items"]
+            return httpx.Response(
+                200,
+                json={
+                    "results": [
+                        {"user_id": item["user_id"], "idempotency_key": item["idempotency_key"], "status": status}
+                        for item, status in zip(items, statuses)
+                    ]
+                },
+            )
+
+        service, client = self._service(monkeypatch, handler)
+        batch = [self._metadata().model_copy(update={"request_id": f"req-{i}"}) for i in range(5)]
+        # Free completions are not sent to the credits service
+        batch.insert(2, self._metadata().model_copy(update={"request_id": "free", "estimated_cost_usd": Decimal("0")}))
+        outcomes = await service.log_billing_batch(batch)
+        await client.close()
+
+        assert len(seen) == 1
+        assert seen[0].url.path == "/api/v1/bill/batch"
+        keys = [item["idempotency_key"] for item in json.loads(seen[0].content)["items"]]
+        assert keys == [f"req-{i}" for i in range(5)]
+
+        assert outcomes[0] is None
+        assert isinstance(outcomes[1], BillingException)
+        assert not isinstance(outcomes[1], BillingUnavailableException)
+        assert outcomes[2] is None
+        assert isinstance(outcomes[3], BillingUnavailableException)
+        assert outcomes[4] is None
+
+    @pytest.mark.asyncio
+    async def test_batch_settles_reservations_and_reports_balances(self, monkeypatch):
+        import json
+        import httpx
+        from unittest.mock import Mock
+
+        seen = []
+
+        def handler(request):
+            seen.append(json.loads(request.content))
+            return httpx.Response(
+                200,
+                json={
+                    "results": [
+                        {
+                            "user_id": "test@example.com",
+                            "idempotency_key": "req-test123",
+                            "status": "billed",
+                            "new_balance": "4.25",
+                        }
+                    ]
+                },
+            )
+
+        service, client = self._service(monkeypatch, handler)
+        gate = Mock()
+        service._balance_gate = gate
+        metadata = self._metadata().model_copy(update={"reservation_key": "req-test123"})
+        assert await service.log_billing_batch([metadata]) == [None]
+        await client.close()
+
+        assert seen[0]["items"][0]["reservation_key"] == "req-test123"
+        gate.update_balance.assert_called_once_with("test@example.com", Decimal("4.25"))
+
+    @pytest.mark.asyncio
+    async def test_batch_transient_failure_raises(self, monkeypatch):
+        import httpx
+        from src.core.exceptions import BillingUnavailableException
+
+        service, client = self._service(monkeypatch, lambda request: httpx.Response(503))
+        with pytest.raises(BillingUnavailableException):
+            await service.log_billing_batch([self._metadata()])
+        await client.close()
@@ -4,8 +4,18 @@ import os
 import pytest
 from unittest.mock import patch
 from src.container import Container
+from src.core.constants import (
+    SERVICE_BILLING_SERVICE,
+    SERVICE_GEMINI_CLIENT,
+    SERVICE_PRICING_SERVICE,
+    SERVICE_USAGE_ACCOUNTANT,
+    SERVICE_USAGE_LOG,
+)
 from src.services.gemini_client import GeminiClient
 from src.services.billing_service import BillingService
+from src.services.request_coalescer import RequestCoalescer
+from src.services.provider_router import ProviderRouter
+from src.services.response_cache import ResponseCache
 
 
 class TestContainer:
@@ -15,7 +25,7 @@ class TestContainer:
         """Test container initialization"""
         container = Container()
         assert container._services == {}
-        assert len(container._factories) == 4
+        assert len(container._factories) == 13
 
     @patch("google.generativeai.configure")
     @patch.dict(os.environ, {"GEMINI_API_KEY": "test-key"})
@@ -77,3 +87,115 @@ class TestContainer:
 
         assert isinstance(gemini_client, GeminiClient)
         assert isinstance(billing_service, BillingService)
+
+    @patch.dict(os.environ, {}, clear=True)
+    def test_response_cache_disabled_by_default(self):
+        """Test that the response cache is off unless RESPONSE_CACHE_ENABLED is set"""
+        container = Container()
+
+        assert container.get_response_cache() is None
+
+    @patch.dict(os.environ, {"RESPONSE_CACHE_ENABLED": "true", "RESPONSE_CACHE_MAX_ENTRIES": "5"})
+    def test_response_cache_enabled(self):
+        """Test that the response cache is created from environment settings"""
+        container = Container()
+        cache = container.get_response_cache()
+
+        assert isinstance(cache, ResponseCache)
+        assert cache.stats()["max_entries"] == 5
+        assert cache is container.get_response_cache()
+
+    @patch.dict(os.environ, {}, clear=True)
+    def test_request_coalescer_disabled_by_default(self):
+        """Test that request coalescing is off unless REQUEST_COALESCING_ENABLED is set"""
+        container = Container()
+
+        assert container.get_request_coalescer() is None
+
+    @patch.dict(os.environ, {"REQUEST_COALESCING_ENABLED": "true", "REQUEST_COALESCING_BILL_SHARED": "false"})
+    def test_request_coalescer_enabled(self):
+        """Test that the request coalescer is created from environment settings"""
+        container = Container()
+        coalescer = container.get_request_coalescer()
+
+        assert isinstance(coalescer, RequestCoalescer)
+        assert coalescer.bill_shared is False
+
+    @patch.dict(os.environ, {}, clear=True)
+    def test_provider_router_disabled_by_default(self):
+        """Test that the router is only created when extra backends are configured"""
+        container = Container()
+
+        assert container.get_provider_router() is None
+
+    @patch("google.generativeai.configure")
+    @patch.dict(
+        os.environ,
+        {
+            "GEMINI_API_KEY": "test-key",
+            "PROVIDER_BACKENDS": '[{"name": "local", "base_url": "http://localhost:8000/v1"}]',
+        },
+    )
+    def test_provider_router_wraps_gemini_and_extra_backends(self, mock_configure):
+        """Test that the Gemini client is routed alongside the configured backends"""
+        container = Container()
+        client = container.get_gemini_client()
+
+        assert isinstance(client, ProviderRouter)
+        assert client is container.get_provider_router()
+        assert list(client.stats()["backends"]) == ["gemini", "local"]
+
+    @pytest.mark.asyncio
+    @patch("google.generativeai.configure")
+    @patch.dict(os.environ, {"GEMINI_API_KEY": "test-key"})
+    async def test_warm_creates_request_path_services(self, mock_configure):
+        """Test that warming builds the services a completion needs and opens their databases"""
+        container = Container()
+        try:
+            await container.warm()
+
+            for service_name in (
+                SERVICE_GEMINI_CLIENT,
+                SERVICE_USAGE_ACCOUNTANT,
+                SERVICE_BILLING_SERVICE,
+                SERVICE_PRICING_SERVICE,
+                SERVICE_USAGE_LOG,
+            ):
+                assert service_name in container._services
+            # Every reader thread and the writer hold a connection already
+            assert container.get_pricing_service()._db.stats()["connections"] == 5
+            assert container.get_gemini_client()._models
+        finally:
+            await container.shutdown()
+
+    @pytest.mark.asyncio
+    @patch.dict(os.environ, {}, clear=True)
+    async def test_warm_leaves_failing_services_to_first_use(self):
+        """Test that a service that cannot be built does not fail startup"""
+        container = Container()
+        try:
+            await container.warm()
+
+            assert SERVICE_GEMINI_CLIENT not in container._services
+            assert SERVICE_USAGE_ACCOUNTANT in container._services
+            with pytest.raises(ValueError, match="GEMINI_API_KEY"):
+                container.get_gemini_client()
+        finally:
+            await container.shutdown()
+
+    @pytest.mark.asyncio
+    @patch.dict(
+        os.environ,
+        {"PROVIDER_BACKENDS": '[{"name": "local", "base_url": "http://localhost:8000/v1"}]'},
+        clear=True,
+    )
+    async def test_warm_reaches_routed_backends(self):
+        """Test that warming the router creates each backend's HTTP client"""
+        container = Container()
+        try:
+            await container.warm()
+
+            backend = container.get_provider_router()._backends[0].client
+            assert backend._client is not None
+        finally:
+            await container.shutdown()
@@ -0,0 +1,206 @@
+"""Unit tests for the provider context cache"""
+
+import asyncio
+
+import pytest
+
+from src.services.context_cache import ContextCache, prefix_keys
+
+SYSTEM = "You are a careful summariser. " * 40  # ~1200 characters
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class FakeProvider:
+    """Stands in for the Gemini cachedContents API"""
+
+    def __init__(self, fail: bool = False) -> None:
+        self.fail = fail
+        self.created: list[tuple[str, str | None, list[dict]]] = []
+        self.deleted: list[str] = []
+
+    def create(self, model, system_instruction, contents, ttl_seconds):
+        if self.fail:
+            raise ValueError("Cached content is too small")
+        handle = f"cachedContents/{len(self.created)}"
+        self.created.append((model, system_instruction, contents))
+        return handle, f"model-for-{handle}", 300
+
+    def delete(self, handle):
+        self.deleted.append(handle)
+
+
+def _history(*texts: str) -> list[dict]:
+    roles = ["user", "model"]
+    return [{"role": roles[i % 2], "parts": [text]} for i, text in enumerate(texts)]
+
+
+def _cache(provider=None, **kwargs) -> ContextCache:
+    kwargs.setdefault("min_tokens", {"gemini-2.5-flash": 100})
+    kwargs.setdefault("min_uses", 2)
+    kwargs.setdefault("ttl_seconds", 600)
+    kwargs.setdefault("expiry_margin", 60)
+    return ContextCache(provider=provider or FakeProvider(), **kwargs)
+
+
+async def _settle() -> None:
+    """Let background creations and deletions finish"""
+    for _ in range(5):
+        await asyncio.sleep(0.01)
+
+
+class TestContextCache:
+
+    def test_prefix_keys_extend_each_other(self):
+        short = prefix_keys("m", SYSTEM, _history("a", "b"))
+        longer = prefix_keys("m", SYSTEM, _history("a", "b", "c"))
+
+        assert [key for _, key, _ in longer[:3]] == [key for _, key, _ in short]
+        assert prefix_keys("other", SYSTEM, [])[0][1] != short[0][1]
+
+    @pytest.mark.asyncio
+    async def test_stable_prefix_is_cached_after_min_uses(self):
+        provider = FakeProvider()
+        cache = _cache(provider)
+
+        assert cache.acquire("gemini-2.5-flash", SYSTEM, []) is None
+        assert cache.acquire("gemini-2.5-flash", SYSTEM, []) is None
+        await _settle()
+        lease = cache.acquire("gemini-2.5-flash", SYSTEM, [])
+
+        assert len(provider.created) == 1
+        assert lease is not None
+        assert lease.model == "model-for-cachedContents/0"
+        assert lease.prefix_length == 0
+        cache.release(lease, cached_tokens=300)
+        assert cache.stats()["cached_tokens_served"] == 300
+        await cache.close()
+
+    @pytest.mark.asyncio
+    async def test_short_prefixes_are_not_cached(self):
+        provider = FakeProvider()
+        cache = _cache(provider)
+
+        for _ in range(5):
+            assert cache.acquire("gemini-2.5-flash", "Be brief.", _history("hi", "hello")) is None
+        await _settle()
+
+        assert provider.created == []
+        await cache.close()
+
+    @pytest.mark.asyncio
+    async def test_longest_shared_history_is_cached(self):
+        provider = FakeProvider()
+        cache = _cache(provider)
+        shared = _history("Here is the document: " + "x" * 500, "Noted.")
+
+        cache.acquire("gemini-2.5-flash", SYSTEM, shared + _history("First question"))
+        cache.acquire("gemini-2.5-flash", SYSTEM, shared + _history("Second question"))
+        await _settle()
+        lease = cache.acquire("gemini-2.5-flash", SYSTEM, shared + _history("Third question"))
+
+        # System instruction plus the two shared messages, not the differing third
+        assert lease.prefix_length == 2
+        assert provider.created[0][2] == shared
+        cache.release(lease)
+        await cache.close()
+
+    @pytest.mark.asyncio
+    async def test_failed_prefix_is_not_retried(self):
+        provider = FakeProvider(fail=True)
+        cache = _cache(provider)
+
+        for _ in range(2):
+            cache.acquire("gemini-2.5-flash", SYSTEM, [])
+        await _settle()
+        for _ in range(3):
+            cache.acquire("gemini-2.5-flash", SYSTEM, [])
+        await _settle()
+
+        assert cache.stats()["failed"] == 1
+        await cache.close()
+
+    @pytest.mark.asyncio
+    async def test_entries_expire_before_the_provider_ttl(self):
+        clock = FakeClock()
+        cache = _cache(clock=clock)
+        for _ in range(2):
+            cache.acquire("gemini-2.5-flash", SYSTEM, [])
+        await _settle()
+
+        clock.now = 600 - 60
+        assert cache.acquire("gemini-2.5-flash", SYSTEM, []) is None
+        assert cache.stats()["entries"] == 0
+        await cache.close()
+
+    @pytest.mark.asyncio
+    async def test_evicted_entry_is_deleted_once_released(self):
+        provider = FakeProvider()
+        cache = _cache(provider, max_entries=1)
+        for _ in range(2):
+            cache.acquire("gemini-2.5-flash", SYSTEM, [])
+        await _settle()
+        lease = cache.acquire("gemini-2.5-flash", SYSTEM, [])
+
+        other = "A different, equally long instruction. " * 30
+        for _ in range(2):
+            cache.acquire("gemini-2.5-flash", other, [])
+        await _settle()
+        assert cache.stats()["evicted"] == 1
+        assert provider.deleted == []
+
+        cache.release(lease)
+        await _settle()
+        assert provider.deleted == ["cachedContents/0"]
+        await cache.close()
+
+    @pytest.mark.asyncio
+    async def test_invalidate_forgets_the_entry(self):
+        cache = _cache()
+        for _ in range(2):
+            cache.acquire("gemini-2.5-flash", SYSTEM, [])
+        await _settle()
+        lease = cache.acquire("gemini-2.5-flash", SYSTEM, [])
+
+        cache.invalidate(lease)
+
+        assert cache.stats()["entries"] == 0
+        assert cache.stats()["invalidated"] == 1
+        await cache.close()
+
+    @pytest.mark.asyncio
+    async def test_close_deletes_cached_contents(self):
+        provider = FakeProvider()
+        cache = _cache(provider)
+        for _ in range(2):
+            cache.acquire("gemini-2.5-flash", SYSTEM, [])
+        await _settle()
+
+        await cache.close()
+
+        assert provider.deleted == ["cachedContents/0"]
+
+    @pytest.mark.asyncio
+    async def test_close_finishes_pending_deletions(self):
+        provider = FakeProvider()
+        cache = _cache(provider, max_entries=1)
+        for _ in range(2):
+            cache.acquire("gemini-2.5-flash", SYSTEM, [])
+        await _settle()
+        lease = cache.acquire("gemini-2.5-flash", SYSTEM, [])
+        other = "A different, equally long instruction. " * 30
+        for _ in range(2):
+            cache.acquire("gemini-2.5-flash", other, [])
+        await _settle()
+
+        # Releasing the evicted prefix starts its deletion; close before it has run
+        cache.release(lease)
+        await cache.close()
+
+        assert sorted(provider.deleted) == ["cachedContents/0", "cachedContents/1"]
@@ -0,0 +1,166 @@
+"""Unit tests for the credits service client and circuit breaker"""
+
+import httpx
+import pytest
+
+from src.core.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from src.core.exceptions import BillingUnavailableException
+from src.services.credits_client import CreditsClient
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestCircuitBreaker:
+
+    def test_opens_after_consecutive_failures(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10, clock=clock)
+        for _ in range(2):
+            breaker.record_failure()
+        assert breaker.state == CLOSED
+        breaker.record_failure()
+        assert breaker.state == OPEN
+        assert breaker.allow() is False
+        assert breaker.stats()["rejected_calls"] == 1
+
+    def test_success_resets_failure_count(self):
+        breaker = CircuitBreaker(failure_threshold=2)
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        assert breaker.state == CLOSED
+
+    def test_half_open_allows_one_trial(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+        breaker.record_failure()
+        clock.now = 10
+        assert breaker.state == HALF_OPEN
+        assert breaker.allow() is True
+        assert breaker.allow() is False
+
+        breaker.record_success()
+        assert breaker.state == CLOSED
+
+    def test_failed_trial_reopens(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+        breaker.record_failure()
+        clock.now = 10
+        assert breaker.allow() is True
+        breaker.record_failure()
+        assert breaker.state == OPEN
+        assert breaker.stats()["times_opened"] == 2
+
+
+class TestCreditsClient:
+
+    @staticmethod
+    def _client(handler, **kwargs):
+        return CreditsClient(
+            "http://credits.test",
+            "secret",
+            retry_base_delay=0.0,
+            transport=httpx.MockTransport(handler),
+            **kwargs,
+        )
+
+    @pytest.mark.asyncio
+    async def test_retries_transient_failures_with_same_key(self):
+        keys = []
+        statuses = iter([503, 502, 200])
+
+        def handler(request):
+            keys.append(request.headers["X-Request-ID"])
+            return httpx.Response(next(statuses))
+
+        client = self._client(handler)
+        response = await client.post("/api/v1/bill", json={}, idempotency_key="req-1")
+        await client.close()
+
+        assert response.status_code == 200
+        assert keys == ["req-1"] * 3
+        assert client.stats()["retries"] == 2
+
+    @pytest.mark.asyncio
+    async def test_connection_errors_raise_after_last_attempt(self):
+        def handler(request):
+            raise httpx.ConnectError("refused")
+
+        client = self._client(handler, max_attempts=2)
+        with pytest.raises(BillingUnavailableException, match="request error"):
+            await client.post("/api/v1/bill", json={}, idempotency_key="req-1")
+        await client.close()
+        assert client.stats()["requests"] == 2
+
+    @pytest.mark.asyncio
+    async def test_client_errors_are_returned_without_retry(self):
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(402)
+
+        client = self._client(handler)
+        response = await client.post("/api/v1/bill", json={}, idempotency_key="req-1")
+        await client.close()
+
+        assert response.status_code == 402
+        assert len(calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_open_circuit_fails_fast(self):
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(503)
+
+        client = self._client(handler, max_attempts=1, breaker=CircuitBreaker(failure_threshold=2))
+        for _ in range(2):
+            await client.post("/api/v1/bill", json={}, idempotency_key="req-1")
+        with pytest.raises(BillingUnavailableException, match="circuit is open"):
+            await client.post("/api/v1/bill", json={}, idempotency_key="req-2")
+        await client.close()
+
+        assert len(calls) == 2
+        assert client.stats()["circuit"]["state"] == OPEN
+
+    @pytest.mark.asyncio
+    async def test_abandoned_trial_frees_the_half_open_circuit(self):
+        def handler(request):
+            raise ValueError("unexpected")
+
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+        breaker.record_failure()
+        clock.now = 10
+        client = self._client(handler, breaker=breaker)
+        with pytest.raises(ValueError):
+            await client.post("/api/v1/bill", json={}, idempotency_key="req-1")
+        await client.close()
+
+        assert breaker.state == HALF_OPEN
+        assert breaker.allow() is True
+
+    @pytest.mark.asyncio
+    async def test_warm_opens_the_pool_without_touching_the_breaker(self):
+        paths = []
+
+        def handler(request):
+            paths.append(request.url.path)
+            raise httpx.ConnectError("refused")
+
+        breaker = CircuitBreaker(failure_threshold=1)
+        client = self._client(handler, breaker=breaker)
+        await client.warm()
+        await client.close()
+
+        assert paths == ["/api/v1/health"]
+        assert breaker.state == CLOSED
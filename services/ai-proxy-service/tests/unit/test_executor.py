@@ -0,0 +1,67 @@
+"""Unit tests for the instrumented executor"""
+
+import asyncio
+import threading
+
+import pytest
+
+from src.core.executor import InstrumentedExecutor, get_executor_stats
+
+
+class TestInstrumentedExecutor:
+    """Test cases for InstrumentedExecutor"""
+
+    @pytest.fixture
+    def executor(self):
+        pool = InstrumentedExecutor("test-pool", max_workers=2)
+        yield pool
+        pool.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_run_returns_result(self, executor):
+        result = await executor.run(lambda a, b=0: a + b, 2, b=3)
+        assert result == 5
+        assert executor.stats()["completed"] == 1
+
+    @pytest.mark.asyncio
+    async def test_run_counts_failures(self, executor):
+        def boom():
+            raise RuntimeError("boom")
+
+        with pytest.raises(RuntimeError, match="boom"):
+            await executor.run(boom)
+
+        stats = executor.stats()
+        assert stats["failed"] == 1
+        assert stats["active"] == 0
+
+    @pytest.mark.asyncio
+    async def test_saturation_reported_while_busy(self, executor):
+        release = threading.Event()
+        tasks = [asyncio.create_task(executor.run(release.wait)) for _ in range(3)]
+
+        for _ in range(100):
+            if executor.stats()["active"] == 2:
+                break
+            await asyncio.sleep(0.01)
+
+        stats = executor.stats()
+        assert stats["active"] == 2
+        assert stats["queued"] == 1
+        assert stats["saturation_percent"] == 100.0
+
+        release.set()
+        await asyncio.gather(*tasks)
+        assert executor.stats()["peak_in_flight"] == 3
+
+    def test_registered_for_metrics(self, executor):
+        assert "test-pool" in get_executor_stats()
+
+    def test_shutdown_unregisters(self):
+        pool = InstrumentedExecutor("short-lived", max_workers=1)
+        pool.shutdown()
+        assert "short-lived" not in get_executor_stats()
+
+    def test_rejects_empty_pool(self):
+        with pytest.raises(ValueError):
+            InstrumentedExecutor("empty", max_workers=0)
@@ -2,6 +2,7 @@
 
 import pytest
 from unittest.mock import Mock, patch
+from google.api_core import exceptions as google_exceptions
 from src.services.gemini_client import GeminiClient
 from src.core.models import ChatMessage
 from src.core.exceptions import AIProviderException
@@ -390,3 +391,169 @@ class TestGeminiClient:
         # Verify send_message was called with the last user message
         mock_chat.send_message.assert_called_once()
         assert mock_chat.send_message.call_args[0][0] == "How are you?"
+
+    # ==================== Caching & Executor Tests ====================
+
+    @pytest.mark.asyncio
+    async def test_model_object_reused_for_same_system_instruction(self, gemini_client):
+        """Test that GenerativeModel is built once per (model, system_instruction)"""
+        messages = [
+            ChatMessage(role="system", content="Be brief."),
+            ChatMessage(role="user", content="Hello"),
+        ]
+
+        mock_response = Mock()
+        mock_response.candidates = [Mock()]
+        mock_response.text = "Hi"
+        mock_response.usage_metadata = Mock(
+            prompt_token_count=3,
+            candidates_token_count=1,
+            total_token_count=4,
+        )
+        mock_chat = Mock()
+        mock_chat.send_message = Mock(return_value=mock_response)
+        mock_model = Mock()
+        mock_model.start_chat = Mock(return_value=mock_chat)
+
+        with patch("google.generativeai.GenerativeModel", return_value=mock_model) as model_cls, patch(
+            "google.generativeai.GenerationConfig"
+        ) as mock_config:
+            await gemini_client.generate_completion(messages=messages, model="gemini-pro", temperature=0.0)
+            await gemini_client.generate_completion(messages=messages, model="gemini-pro", temperature=0.0)
+
+            model_cls.assert_called_once_with("gemini-2.5-pro", system_instruction="Be brief.")
+            mock_config.assert_called_once()
+
+            # A different system instruction gets its own model object
+            other = [ChatMessage(role="system", content="Be verbose."), messages[1]]
+            await gemini_client.generate_completion(messages=other, model="gemini-pro", temperature=0.0)
+            assert model_cls.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_cached_prefix_sends_only_the_delta(self):
+        """Test that a leased context cache prefix is not resent and its tokens are reported"""
+        mock_response = Mock()
+        mock_response.candidates = [Mock()]
+        mock_response.text = "Done"
+        mock_response.usage_metadata = Mock(
+            prompt_token_count=1200,
+            cached_content_token_count=1000,
+            candidates_token_count=5,
+            total_token_count=1205,
+        )
+        cached_chat = Mock()
+        cached_chat.send_message = Mock(return_value=mock_response)
+        cached_model = Mock()
+        cached_model.start_chat = Mock(return_value=cached_chat)
+        lease = Mock(model=cached_model, prefix_length=2)
+        context_cache = Mock()
+        context_cache.acquire = Mock(return_value=lease)
+
+        with patch("google.generativeai.configure"):
+            client = GeminiClient(api_key="test-api-key", context_cache=context_cache)
+        messages = [
+            ChatMessage(role="system", content="Long instructions"),
+            ChatMessage(role="user", content="Document"),
+            ChatMessage(role="assistant", content="Noted"),
+            ChatMessage(role="user", content="Earlier question"),
+            ChatMessage(role="assistant", content="Earlier answer"),
+            ChatMessage(role="user", content="Summarise"),
+        ]
+
+        with patch("google.generativeai.GenerativeModel") as model_cls:
+            response = await client.generate_completion(messages=messages, model="gemini-flash")
+
+        model_cls.assert_not_called()
+        assert cached_model.start_chat.call_args.kwargs["history"] == [
+            {"role": "user", "parts": ["Earlier question"]},
+            {"role": "model", "parts": ["Earlier answer"]},
+        ]
+        assert cached_chat.send_message.call_args[0][0] == "Summarise"
+        assert response.usage.cached_tokens == 1000
+        context_cache.release.assert_called_once_with(lease, 1000)
+
+    @pytest.mark.parametrize(
+        "error, falls_back",
+        [
+            (google_exceptions.NotFound("CachedContent not found"), True),
+            (google_exceptions.PermissionDenied("Permission denied on cached content"), True),
+            (google_exceptions.ResourceExhausted("Quota exceeded"), False),
+            (google_exceptions.ServiceUnavailable("Backend error"), False),
+            (TimeoutError("Deadline exceeded"), False),
+        ],
+    )
+    @pytest.mark.asyncio
+    async def test_only_a_missing_cached_prefix_resends_the_full_prompt(self, error, falls_back):
+        """Test that quota, server and timeout errors are not retried without the cache"""
+        mock_response = Mock()
+        mock_response.candidates = [Mock()]
+        mock_response.text = "Done"
+        mock_response.usage_metadata = Mock(prompt_token_count=10, candidates_token_count=1, total_token_count=11)
+        cached_chat = Mock()
+        cached_chat.send_message = Mock(side_effect=error)
+        lease = Mock(model=Mock(start_chat=Mock(return_value=cached_chat)), prefix_length=1)
+        context_cache = Mock()
+        context_cache.acquire = Mock(return_value=lease)
+        full_chat = Mock()
+        full_chat.send_message = Mock(return_value=mock_response)
+
+        with patch("google.generativeai.configure"):
+            client = GeminiClient(api_key="test-api-key", context_cache=context_cache)
+        messages = [
+            ChatMessage(role="system", content="Long instructions"),
+            ChatMessage(role="user", content="Document"),
+            ChatMessage(role="assistant", content="Noted"),
+            ChatMessage(role="user", content="Summarise"),
+        ]
+
+        with patch("google.generativeai.GenerativeModel", return_value=Mock(start_chat=Mock(return_value=full_chat))):
+            if falls_back:
+                await client.generate_completion(messages=messages, model="gemini-flash")
+            else:
+                with pytest.raises(AIProviderException):
+                    await client.generate_completion(messages=messages, model="gemini-flash")
+
+        assert full_chat.send_message.called is falls_back
+        assert context_cache.invalidate.called is falls_back
+        if not falls_back:
+            context_cache.release.assert_called_once_with(lease)
+
+    def test_model_cache_evicts_least_recently_used(self):
+        """Test that the model cache stays within its bound"""
+        with patch("google.generativeai.configure"):
+            client = GeminiClient(api_key="test-api-key", model_cache_size=2)
+
+        with patch("google.generativeai.GenerativeModel", side_effect=lambda *a, **k: Mock()) as model_cls:
+            first = client._get_model("gemini-2.5-pro", "a")
+            client._get_model("gemini-2.5-pro", "b")
+            assert client._get_model("gemini-2.5-pro", "a") is first
+            client._get_model("gemini-2.5-pro", "c")  # evicts "b"
+            client._get_model("gemini-2.5-pro", "b")
+
+        assert model_cls.call_count == 4
+        assert len(client._models) == 2
+        client.close()
+
+    @pytest.mark.asyncio
+    async def test_provider_calls_use_dedicated_executor(self, gemini_client):
+        """Test that completions are counted on the client's own thread pool"""
+        messages = [ChatMessage(role="user", content="Hello")]
+
+        mock_response = Mock()
+        mock_response.candidates = [Mock()]
+        mock_response.text = "Hi"
+        mock_response.usage_metadata = Mock(
+            prompt_token_count=1,
+            candidates_token_count=1,
+            total_token_count=2,
+        )
+        mock_model = Mock()
+        mock_model.generate_content = Mock(return_value=mock_response)
+
+        with patch("google.generativeai.GenerativeModel", return_value=mock_model):
+            await gemini_client.generate_completion(messages=messages, model="gemini-pro")
+
+        stats = gemini_client.get_executor_stats()
+        assert stats["completed"] == 1
+        assert stats["active"] == 0
+        assert stats["queued"] == 0
@@ -0,0 +1,123 @@
+"""Unit tests for the metrics collector and latency histogram"""
+
+import random
+import threading
+
+import pytest
+
+from src.core.histogram import LatencyHistogram
+from src.core.metrics import MAX_MODEL_LABELS, OTHER_MODEL, MetricsCollector
+
+
+class TestLatencyHistogram:
+
+    def test_quantiles_within_bucket_error(self):
+        rng = random.Random(42)
+        values = [rng.lognormvariate(-1, 1) for _ in range(10_000)]
+        histogram = LatencyHistogram()
+        for v in values:
+            histogram.record(v)
+
+        values.sort()
+        for q in (0.5, 0.95, 0.99):
+            exact = values[int(q * len(values)) - 1]
+            assert histogram.quantile(q) == pytest.approx(exact, rel=0.05)
+        assert histogram.min == values[0]
+        assert histogram.max == values[-1]
+        assert histogram.count == 10_000
+
+    def test_empty_histogram(self):
+        histogram = LatencyHistogram()
+        assert histogram.quantile(0.99) == 0.0
+        assert histogram.mean == 0.0
+
+    def test_merge_adds_observations(self):
+        a, b = LatencyHistogram(), LatencyHistogram()
+        a.record(0.1)
+        b.record(2.0)
+        a.merge(b)
+        assert a.count == 2
+        assert a.min == 0.1
+        assert a.max == 2.0
+
+
+class TestMetricsCollector:
+
+    @pytest.fixture
+    def collector(self):
+        return MetricsCollector()
+
+    def test_breakdown_by_model_and_status(self, collector):
+        collector.record_request("gemini-2.5-pro", True, 10, 5, 0.01, response_time=0.5, provider_time=0.4)
+        collector.record_request("gemini-2.5-pro", True, 20, 5, 0.02, response_time=1.5, cache_hit=True)
+        collector.record_request("gemini-2.5-flash", False, status="invalid_request")
+        collector.record_request("gemini-2.5-flash", False)
+
+        metrics = collector.get_metrics()
+        requests = metrics["requests"]
+        assert requests["total"] == 4
+        assert requests["successful"] == 2
+        assert requests["failed"] == 2
+        assert requests["cache_hits"] == 1
+        assert requests["by_model"] == {"gemini-2.5-pro": 2}
+        assert requests["by_status"] == {"ok": 2, "invalid_request": 1, "error": 1}
+        assert metrics["tokens"] == {"total": 40, "prompt": 30, "completion": 10}
+        assert metrics["billing"]["total_cost_usd"] == 0.03
+
+        performance = metrics["performance"]
+        assert performance["min_response_time_seconds"] == 0.5
+        assert performance["max_response_time_seconds"] == 1.5
+        assert performance["sample_size"] == 2
+        assert performance["provider"]["sample_size"] == 1
+        assert performance["proxy_overhead"]["p50_seconds"] == pytest.approx(0.1, rel=0.05)
+
+    def test_time_to_first_token(self, collector):
+        for ttft in (0.1, 0.2, 0.3):
+            collector.record_request("gemini-2.5-flash", True, response_time=1.0, time_to_first_token=ttft)
+        ttft = collector.get_metrics()["performance"]["time_to_first_token"]
+        assert ttft["sample_size"] == 3
+        assert ttft["p50_seconds"] == pytest.approx(0.2, rel=0.05)
+
+    def test_concurrent_recording_loses_nothing(self, collector):
+        def worker():
+            for _ in range(2_000):
+                collector.record_request("gemini-2.5-flash", True, 1, 1, response_time=0.01)
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        metrics = collector.get_metrics()
+        assert metrics["requests"]["total"] == 16_000
+        assert metrics["tokens"]["total"] == 32_000
+        assert metrics["performance"]["sample_size"] == 16_000
+
+    def test_model_labels_are_bounded(self, collector):
+        for i in range(MAX_MODEL_LABELS + 10):
+            collector.record_request(f"model-{i}", False)
+        models = {model for model, _ in collector._collect()}
+        assert len(models) == MAX_MODEL_LABELS + 1
+        assert OTHER_MODEL in models
+
+    def test_prometheus_exposition(self, collector):
+        collector.record_request("gemini-2.5-pro", True, 10, 5, 0.01, response_time=0.5, provider_time=0.4)
+        collector.record_request('weird"model', False, status="provider_error", response_time=2.0)
+
+        text = collector.render_prometheus()
+        assert "# TYPE ai_proxy_requests_total counter" in text
+        assert 'ai_proxy_requests_total{model="gemini-2.5-pro",status="ok"} 1' in text
+        assert 'ai_proxy_requests_total{model="weird\\"model",status="provider_error"} 1' in text
+        assert 'ai_proxy_tokens_total{model="gemini-2.5-pro",kind="prompt"} 10' in text
+        assert 'ai_proxy_request_duration_seconds_count{model="gemini-2.5-pro",status="ok"} 1' in text
+        assert 'ai_proxy_request_duration_seconds{model="gemini-2.5-pro",status="ok",quantile="0.99"}' in text
+        assert 'ai_proxy_provider_duration_seconds_count{model="gemini-2.5-pro"} 1' in text
+        assert text.endswith("\n")
+
+    def test_reset_clears_all_series(self, collector):
+        collector.record_request("gemini-2.5-pro", True, response_time=0.5)
+        collector.reset()
+        metrics = collector.get_metrics()
+        assert metrics["requests"]["total"] == 0
+        assert metrics["performance"]["sample_size"] == 0
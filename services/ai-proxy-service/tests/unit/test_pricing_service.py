@@ -59,3 +59,36 @@ class TestPricingService:
         # gpt-4 should map to gemini-2.5-pro pricing
         pricing = service.get_pricing_for_model_sync("gpt-4")
         assert pricing["input_price_per_1k"] == 0.00125
+
+    def test_sync_pricing_includes_cached_input_price(self, service):
+        pricing = service.get_pricing_for_model_sync("gemini-2.5-flash")
+        assert pricing["cached_input_price_per_1k"] == 0.00003
+
+    @pytest.mark.asyncio
+    async def test_cached_price_defaults_to_input_price(self, service):
+        await service.create_pricing("new-model", "New Model", 0.001, 0.005)
+        pricing = service.get_pricing_for_model_sync("new-model")
+        assert pricing["cached_input_price_per_1k"] == 0.001
+
+    @pytest.mark.asyncio
+    async def test_update_keeps_cached_price_when_omitted(self, service):
+        await service.update_pricing("gemini-2.5-pro", "Pro", 0.002, 0.02)
+        pricing = service.get_pricing_for_model_sync("gemini-2.5-pro")
+        assert pricing["cached_input_price_per_1k"] == 0.000125
+
+    def test_adds_cached_price_to_existing_database(self, db_path):
+        import sqlite3
+
+        conn = sqlite3.connect(db_path)
+        conn.execute(
+            "CREATE TABLE model_pricing (model_id TEXT PRIMARY KEY, display_name TEXT, "
+            "input_price_per_1k REAL NOT NULL, output_price_per_1k REAL NOT NULL, updated_at TEXT NOT NULL)"
+        )
+        conn.execute("INSERT INTO model_pricing VALUES ('gemini-2.5-pro', 'Pro', 0.00125, 0.01, '2025-01-01')")
+        conn.commit()
+        conn.close()
+
+        service = PricingService(db_path=db_path)
+        pricing = service.get_pricing_for_model_sync("gemini-2.5-pro")
+        service.close()
+        assert pricing["cached_input_price_per_1k"] == 0.000125
@@ -0,0 +1,299 @@
+"""Unit tests for the provider router and the OpenAI-compatible backend client"""
+
+import asyncio
+import json
+import time
+
+import httpx
+import pytest
+
+from src.core.circuit_breaker import CircuitBreaker
+from src.core.exceptions import AIProviderException, InvalidModelException
+from src.core.models import ChatCompletionResponse, ChatMessage
+from src.services.openai_compatible_client import OpenAICompatibleClient
+from src.services.provider_router import ProviderRouter
+
+MESSAGES = [ChatMessage(role="user", content="Hello")]
+
+
+def _response(text: str) -> ChatCompletionResponse:
+    return ChatCompletionResponse.model_validate(
+        {
+            "id": "chatcmpl-1",
+            "created": 0,
+            "model": "gemini-2.5-flash",
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+        }
+    )
+
+
+class StubBackend:
+    """Local backend answering with its own name after a delay, or failing"""
+
+    def __init__(self, name: str, delay: float = 0.0, fail: bool = False) -> None:
+        self.name = name
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+        self.cancelled = 0
+        self.closed = False
+
+    async def _wait(self) -> None:
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.fail:
+            raise AIProviderException(f"{self.name} is down")
+
+    async def generate_completion(self, messages, model, temperature=0.7, max_tokens=None):
+        await self._wait()
+        return _response(self.name)
+
+    async def generate_completion_stream(self, messages, model, temperature=0.7, max_tokens=None):
+        await self._wait()
+        yield {"choices": [{"delta": {"content": self.name}}]}
+        yield {"choices": [{"delta": {}}], "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2}}
+
+    def close(self) -> None:
+        self.closed = True
+
+
+def _router(*backends: StubBackend, **kwargs) -> ProviderRouter:
+    kwargs.setdefault("hedge_min_samples", 5)
+    kwargs.setdefault("min_hedge_delay", 0.01)
+    return ProviderRouter([(backend.name, backend) for backend in backends], **kwargs)
+
+
+def _warm(router: ProviderRouter, tracker: str, seconds: float) -> None:
+    """Give every backend the same latency history, enough to hedge on"""
+    for backend in router._backends:
+        for _ in range(10):
+            getattr(backend, tracker).record(seconds, 0.2)
+
+
+async def _complete(router: ProviderRouter) -> str:
+    response = await router.generate_completion(MESSAGES, "gemini-flash")
+    return response.choices[0].message.content
+
+
+class TestProviderRouter:
+
+    @pytest.mark.asyncio
+    async def test_routes_to_the_fastest_backend(self):
+        slow, fast = StubBackend("slow", delay=0.03), StubBackend("fast", delay=0.001)
+        router = _router(slow, fast, hedge=False)
+
+        # Both get measured once, then the fast one takes the traffic
+        answers = [await _complete(router) for _ in range(10)]
+
+        assert answers[2:] == ["fast"] * 8
+        assert slow.calls == 1
+
+    @pytest.mark.asyncio
+    async def test_fails_over_to_the_next_backend(self):
+        down, up = StubBackend("down", fail=True), StubBackend("up")
+        router = _router(down, up, hedge=False)
+
+        assert await _complete(router) == "up"
+        stats = router.stats()["backends"]
+        assert stats["down"]["failures"] == 1
+        assert stats["down"]["error_rate"] > 0
+
+    @pytest.mark.asyncio
+    async def test_errors_steer_traffic_away(self):
+        flaky, steady = StubBackend("flaky", delay=0.01), StubBackend("steady", delay=0.015)
+        router = _router(flaky, steady, hedge=False)
+        await _complete(router)
+        await _complete(router)
+
+        flaky.fail = True
+        await _complete(router)
+        flaky.fail = False
+        flaky.calls = 0
+        answers = [await _complete(router) for _ in range(5)]
+
+        # Faster, but its error rate outweighs the difference for a while
+        assert answers == ["steady"] * 5
+        assert flaky.calls == 0
+
+    @pytest.mark.asyncio
+    async def test_shunned_backend_is_retried_as_its_errors_age(self):
+        flaky, steady = StubBackend("flaky", delay=0.01), StubBackend("steady", delay=0.015)
+        router = _router(flaky, steady, hedge=False, error_half_life=0.02)
+        await _complete(router)
+        await _complete(router)
+        flaky.fail = True
+        await _complete(router)
+        flaky.fail = False
+
+        await asyncio.sleep(0.1)
+
+        assert await _complete(router) == "flaky"
+
+    @pytest.mark.asyncio
+    async def test_open_circuit_is_skipped(self):
+        down, up = StubBackend("down", fail=True), StubBackend("up", delay=0.01)
+        router = _router(down, up, hedge=False, breaker_factory=lambda: CircuitBreaker(failure_threshold=1))
+
+        await _complete(router)
+        down.calls = 0
+        await _complete(router)
+
+        assert down.calls == 0
+        assert router.stats()["backends"]["down"]["circuit"] == "open"
+
+    @pytest.mark.asyncio
+    async def test_all_backends_failing_raises(self):
+        router = _router(StubBackend("a", fail=True), StubBackend("b", fail=True))
+
+        with pytest.raises(AIProviderException):
+            await _complete(router)
+
+    @pytest.mark.asyncio
+    async def test_invalid_model_is_not_retried(self):
+        class Rejecting(StubBackend):
+            async def generate_completion(self, messages, model, temperature=0.7, max_tokens=None):
+                self.calls += 1
+                raise InvalidModelException("nope")
+
+        first, second = Rejecting("first"), StubBackend("second")
+        router = _router(first, second)
+
+        with pytest.raises(InvalidModelException):
+            await _complete(router)
+        assert second.calls == 0
+
+    @pytest.mark.asyncio
+    async def test_slow_call_is_hedged_on_another_backend(self):
+        primary, backup = StubBackend("primary", delay=1.0), StubBackend("backup", delay=0.01)
+        router = _router(primary, backup)
+        _warm(router, "completion", 0.01)
+
+        started = time.monotonic()
+        answer = await _complete(router)
+
+        assert time.monotonic() - started < 0.5
+        assert answer == "backup"
+        assert primary.cancelled == 1
+        stats = router.stats()["backends"]
+        assert stats["primary"]["hedges"] == 1
+        assert stats["backup"]["hedges_won"] == 1
+
+    @pytest.mark.asyncio
+    async def test_fast_call_is_not_hedged(self):
+        primary, backup = StubBackend("primary", delay=0.001), StubBackend("backup")
+        router = _router(primary, backup, min_hedge_delay=0.2)
+        _warm(router, "completion", 0.01)
+
+        assert await _complete(router) == "primary"
+        assert backup.calls == 0
+
+    @pytest.mark.asyncio
+    async def test_stream_fails_over_before_the_first_chunk(self):
+        down, up = StubBackend("down", fail=True), StubBackend("up")
+        router = _router(down, up, hedge=False)
+
+        chunks = [chunk async for chunk in router.generate_completion_stream(MESSAGES, "gemini-flash")]
+
+        assert chunks[0]["choices"][0]["delta"]["content"] == "up"
+        assert "usage" in chunks[-1]
+
+    @pytest.mark.asyncio
+    async def test_stream_is_hedged_on_the_first_chunk(self):
+        primary, backup = StubBackend("primary", delay=1.0), StubBackend("backup", delay=0.01)
+        router = _router(primary, backup)
+        _warm(router, "first_chunk", 0.01)
+
+        started = time.monotonic()
+        chunks = [chunk async for chunk in router.generate_completion_stream(MESSAGES, "gemini-flash")]
+
+        assert time.monotonic() - started < 0.5
+        assert chunks[0]["choices"][0]["delta"]["content"] == "backup"
+        assert primary.cancelled == 1
+
+    @pytest.mark.asyncio
+    async def test_close_closes_every_backend_once(self):
+        a, b = StubBackend("a"), StubBackend("b")
+        router = _router(a, b)
+
+        await router.close()
+        a.closed = False
+        await router.close()
+
+        assert b.closed and not a.closed
+
+    def test_backend_names_must_be_unique(self):
+        with pytest.raises(ValueError):
+            ProviderRouter([("a", StubBackend("a")), ("a", StubBackend("a"))])
+
+
+def _completion_json(content: str, model: str = "local-model") -> dict:
+    return {
+        "id": "chatcmpl-1",
+        "object": "chat.completion",
+        "created": 0,
+        "model": model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": 3, "completion_tokens": 2, "total_tokens": 5},
+    }
+
+
+class TestOpenAICompatibleClient:
+
+    @pytest.mark.asyncio
+    async def test_completion_maps_model_names(self):
+        seen = {}
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            seen["auth"] = request.headers.get("Authorization")
+            seen["body"] = json.loads(request.content)
+            return httpx.Response(200, json=_completion_json("hi"))
+
+        client = OpenAICompatibleClient(
+            "http://backend/v1",
+            api_key="secret",
+            models={"gemini-2.5-flash": "local-model"},
+            transport=httpx.MockTransport(handler),
+        )
+        response = await client.generate_completion(MESSAGES, "gemini-flash", max_tokens=10)
+        await client.close()
+
+        assert seen["auth"] == "Bearer secret"
+        assert seen["body"]["model"] == "local-model"
+        assert seen["body"]["max_tokens"] == 10
+        assert response.model == "gemini-flash"
+        assert response.usage.total_tokens == 5
+
+    @pytest.mark.asyncio
+    async def test_error_status_raises_provider_exception(self):
+        client = OpenAICompatibleClient(
+            "http://backend/v1", transport=httpx.MockTransport(lambda request: httpx.Response(503, text="busy"))
+        )
+
+        with pytest.raises(AIProviderException):
+            await client.generate_completion(MESSAGES, "gemini-flash")
+        await client.close()
+
+    @pytest.mark.asyncio
+    async def test_stream_yields_chunks_and_usage(self):
+        events = [
+            {"id": "c", "choices": [{"index": 0, "delta": {"content": "Hel"}}], "usage": None},
+            {"id": "c", "choices": [{"index": 0, "delta": {"content": "lo"}}], "usage": None},
+            {"id": "c", "choices": [], "usage": {"prompt_tokens": 3, "completion_tokens": 2, "total_tokens": 5}},
+        ]
+        body = "".join(f"data: {json.dumps(event)}\n\n" for event in events) + "data: [DONE]\n\n"
+        client = OpenAICompatibleClient(
+            "http://backend/v1", transport=httpx.MockTransport(lambda request: httpx.Response(200, text=body))
+        )
+
+        chunks = [chunk async for chunk in client.generate_completion_stream(MESSAGES, "gemini-flash")]
+        await client.close()
+
+        assert [chunk["choices"][0]["delta"].get("content") for chunk in chunks] == ["Hel", "lo", None]
+        assert "usage" not in chunks[0]
+        assert chunks[-1]["usage"]["total_tokens"] == 5
+        assert all(chunk["model"] == "gemini-flash" for chunk in chunks)
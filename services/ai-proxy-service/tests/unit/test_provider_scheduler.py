@@ -0,0 +1,180 @@
+"""Unit tests for the provider quota scheduler"""
+
+import asyncio
+import time
+from collections import deque
+
+import pytest
+
+from src.core.exceptions import RateLimitExceededException
+from src.services.provider_scheduler import ProviderScheduler
+
+WINDOW = 0.2
+
+
+def _scheduler(tokens=100, requests=100, **kwargs) -> ProviderScheduler:
+    kwargs.setdefault("window_seconds", WINDOW)
+    return ProviderScheduler(
+        model_budgets={"gemini-2.5-flash": (tokens, requests)},
+        default_budget=(tokens, requests),
+        **kwargs,
+    )
+
+
+async def _admit_in_order(scheduler, calls):
+    """Queue (user, tokens) calls in order and return the order they were admitted in"""
+    admitted = []
+
+    async def call(label, user, tokens):
+        await scheduler.admit("gemini-flash", user, tokens)
+        admitted.append(label)
+
+    tasks = []
+    for label, user, tokens in calls:
+        tasks.append(asyncio.create_task(call(label, user, tokens)))
+        # Let each call reach the queue before the next one arrives
+        await asyncio.sleep(0)
+    await asyncio.gather(*tasks)
+    return admitted
+
+
+class TestProviderScheduler:
+
+    @pytest.mark.asyncio
+    async def test_calls_within_budget_go_straight_through(self):
+        scheduler = _scheduler()
+        await scheduler.admit("gemini-flash", "alice", 40)
+        await scheduler.admit("gemini-2.5-flash", "bob", 40)
+
+        stats = scheduler.stats()["models"]["gemini-2.5-flash"]
+        assert stats["tokens_in_window"] == 80
+        assert stats["requests_in_window"] == 2
+        assert stats["waited"] == 0
+
+    @pytest.mark.asyncio
+    async def test_full_window_queues_until_it_frees_up(self):
+        scheduler = _scheduler()
+        await scheduler.admit("gemini-flash", "alice", 100)
+
+        started = time.monotonic()
+        await scheduler.admit("gemini-flash", "alice", 50)
+
+        assert time.monotonic() - started >= WINDOW * 0.9
+        assert scheduler.stats()["models"]["gemini-2.5-flash"]["waited"] == 1
+
+    @pytest.mark.asyncio
+    async def test_requests_per_minute_are_enforced(self):
+        scheduler = _scheduler(tokens=10_000, requests=2, max_wait=0.05)
+        await scheduler.admit("gemini-flash", "alice", 1)
+        await scheduler.admit("gemini-flash", "alice", 1)
+
+        with pytest.raises(RateLimitExceededException):
+            await scheduler.admit("gemini-flash", "alice", 1)
+
+    @pytest.mark.asyncio
+    async def test_users_are_served_fairly(self):
+        scheduler = _scheduler()
+        await scheduler.admit("gemini-flash", "filler", 100)
+
+        order = await _admit_in_order(
+            scheduler,
+            [("a1", "alice", 50), ("a2", "alice", 50), ("a3", "alice", 50), ("b1", "bob", 50)],
+        )
+
+        # Bob's only call does not wait behind Alice's backlog
+        assert order.index("b1") < order.index("a2")
+
+    @pytest.mark.asyncio
+    async def test_shorter_jobs_go_first_under_pressure(self):
+        scheduler = _scheduler()
+        await scheduler.admit("gemini-flash", "filler", 100)
+
+        order = await _admit_in_order(scheduler, [("long", "alice", 90), ("short", "bob", 10)])
+
+        assert order == ["short", "long"]
+
+    @pytest.mark.asyncio
+    async def test_settling_below_estimate_frees_budget_at_once(self):
+        scheduler = _scheduler(window_seconds=60)
+        admission = await scheduler.admit("gemini-flash", "alice", 100)
+        waiting = asyncio.create_task(scheduler.admit("gemini-flash", "bob", 50))
+        await asyncio.sleep(0)
+        assert not waiting.done()
+
+        scheduler.settle(admission, 30)
+
+        await asyncio.wait_for(waiting, 1)
+        assert scheduler.stats()["models"]["gemini-2.5-flash"]["tokens_in_window"] == 80
+
+    @pytest.mark.asyncio
+    async def test_calls_that_would_wait_too_long_are_refused(self):
+        scheduler = _scheduler(window_seconds=60, max_wait=0.05)
+        await scheduler.admit("gemini-flash", "alice", 100)
+
+        with pytest.raises(RateLimitExceededException) as excinfo:
+            await scheduler.admit("gemini-flash", "bob", 50)
+
+        assert excinfo.value.retry_after >= 59
+        stats = scheduler.stats()["models"]["gemini-2.5-flash"]
+        assert stats["timeouts"] == 1
+        assert stats["queued"] == 0
+
+    @pytest.mark.asyncio
+    async def test_oversized_call_runs_on_an_idle_window(self):
+        scheduler = _scheduler()
+        admission = await scheduler.admit("gemini-flash", "alice", 500)
+        assert admission.tokens == 500
+
+    @pytest.mark.asyncio
+    async def test_unknown_models_share_one_budget(self):
+        scheduler = _scheduler()
+        for i in range(5):
+            await scheduler.admit(f"made-up-model-{i}", "alice", 10)
+
+        models = scheduler.stats()["models"]
+        assert list(models) == ["other"]
+        assert models["other"]["requests_in_window"] == 5
+
+    @pytest.mark.asyncio
+    async def test_stream_is_admitted_and_settled_on_usage(self):
+        scheduler = _scheduler(window_seconds=60)
+
+        async def chunks():
+            yield {"choices": [{"delta": {"content": "hi"}}]}
+            yield {"usage": {"prompt_tokens": 5, "completion_tokens": 2, "total_tokens": 7}}
+
+        received = [chunk async for chunk in scheduler.stream("gemini-flash", "alice", 80, chunks())]
+
+        assert len(received) == 2
+        assert scheduler.stats()["models"]["gemini-2.5-flash"]["tokens_in_window"] == 7
+
+    @pytest.mark.asyncio
+    async def test_sustained_load_stays_within_quota(self):
+        """Many users at once: no provider rejections, throughput near the quota"""
+        quota = 1000
+        scheduler = _scheduler(tokens=quota, requests=1000, max_wait=10)
+        provider_window: deque[tuple[float, int]] = deque()
+        rejected = 0
+
+        async def provider_call(tokens):
+            # Stub provider enforcing the same quota over a sliding window
+            nonlocal rejected
+            now = time.monotonic()
+            while provider_window and provider_window[0][0] <= now - WINDOW:
+                provider_window.popleft()
+            if sum(used for _, used in provider_window) + tokens > quota:
+                rejected += 1
+            provider_window.append((now, tokens))
+
+        async def client(user, count):
+            for _ in range(count):
+                await scheduler.admit("gemini-flash", user, 50)
+                await provider_call(50)
+
+        started = time.monotonic()
+        await asyncio.gather(*(client(f"user-{i}", 15) for i in range(4)))
+        elapsed = time.monotonic() - started
+
+        # 3000 tokens at 1000 per window: two windows of waiting at the least
+        assert rejected == 0
+        assert elapsed < WINDOW * 2 * 1.5
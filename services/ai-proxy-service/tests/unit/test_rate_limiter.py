@@ -0,0 +1,127 @@
+"""Unit tests for the rate limiter"""
+
+import pytest
+from limits.aio.storage import MemoryStorage
+
+from src.core.exceptions import RateLimitExceededException
+from src.services.rate_limiter import RateLimiter
+
+
+class TestRateLimiter:
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("strategy", ["sliding-window-counter", "moving-window", "fixed-window"])
+    async def test_rejects_once_limit_is_used_up(self, strategy):
+        limiter = RateLimiter(strategy=strategy)
+        for _ in range(3):
+            await limiter.hit("3/minute", "ip", "10.0.0.1")
+
+        with pytest.raises(RateLimitExceededException) as excinfo:
+            await limiter.hit("3/minute", "ip", "10.0.0.1")
+
+        assert 1 <= excinfo.value.retry_after <= 60
+        assert limiter.stats()["allowed"] == 3
+        assert limiter.stats()["rejected"] == 1
+
+    @pytest.mark.asyncio
+    async def test_limits_are_counted_per_identifier(self):
+        limiter = RateLimiter()
+        await limiter.hit("1/minute", "user", "alice")
+        await limiter.hit("1/minute", "user", "bob")
+
+        with pytest.raises(RateLimitExceededException):
+            await limiter.hit("1/minute", "user", "alice")
+
+    @pytest.mark.asyncio
+    async def test_weighted_hits_use_up_budget_faster(self):
+        limiter = RateLimiter(model_weights={"gemini-2.5-pro": 4, "gemini-2.5-flash": 1})
+        pro = limiter.model_weight("gpt-4")
+        assert pro == 4
+
+        await limiter.hit("10/minute", "user", "alice", cost=pro)
+        await limiter.hit("10/minute", "user", "alice", cost=pro)
+        with pytest.raises(RateLimitExceededException):
+            await limiter.hit("10/minute", "user", "alice", cost=pro)
+        # Two units left: enough for the cheap model
+        await limiter.hit("10/minute", "user", "alice", cost=limiter.model_weight("gemini-flash"))
+
+    def test_unknown_models_use_default_weight(self):
+        limiter = RateLimiter(model_weights={"gemini-2.5-flash": 1}, default_weight=4)
+        assert limiter.model_weight("some-new-model") == 4
+
+    def test_unknown_strategy_is_rejected(self):
+        with pytest.raises(ValueError):
+            RateLimiter(strategy="leaky-bucket")
+
+    @pytest.mark.asyncio
+    async def test_storage_failure_fails_open(self, monkeypatch):
+        limiter = RateLimiter()
+
+        async def broken(*args, **kwargs):
+            raise ConnectionError("storage down")
+
+        monkeypatch.setattr(limiter._strategy, "hit", broken)
+        await limiter.hit("1/minute", "ip", "10.0.0.1")
+        await limiter.hit("1/minute", "ip", "10.0.0.1")
+        assert limiter.stats()["storage_errors"] == 2
+
+    @pytest.mark.asyncio
+    async def test_storage_failure_fails_closed(self, monkeypatch):
+        limiter = RateLimiter(fail_open=False)
+
+        async def broken(*args, **kwargs):
+            raise ConnectionError("storage down")
+
+        monkeypatch.setattr(limiter._strategy, "hit", broken)
+        with pytest.raises(RateLimitExceededException):
+            await limiter.hit("1/minute", "ip", "10.0.0.1")
+
+    @pytest.mark.asyncio
+    async def test_limit_holds_across_limiters_sharing_a_storage(self):
+        # Two workers pointed at one storage, as with RATE_LIMIT_STORAGE_URI=redis://...
+        storage = MemoryStorage()
+        first = RateLimiter(storage=storage)
+        second = RateLimiter(storage=storage)
+
+        await first.hit("2/minute", "user", "alice")
+        await second.hit("2/minute", "user", "alice")
+        with pytest.raises(RateLimitExceededException):
+            await first.hit("2/minute", "user", "alice")
+        with pytest.raises(RateLimitExceededException):
+            await second.hit("2/minute", "user", "alice")
+
+    def test_redis_storage_can_be_built(self):
+        # Building the storage checks that the redis package is installed;
+        # no connection is made until the first hit
+        limiter = RateLimiter(storage_uri="redis://localhost:6379/0")
+        assert limiter.stats()["storage"] == "RedisStorage"
+
+
+class TestClientKey:
+
+    @staticmethod
+    def _request(headers):
+        from starlette.requests import Request
+
+        return Request(
+            {
+                "type": "http",
+                "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+                "client": ("10.0.0.1", 1234),
+            }
+        )
+
+    def test_defaults_to_remote_address(self, monkeypatch):
+        from src.middleware.rate_limit import client_key
+
+        monkeypatch.delenv("RATE_LIMIT_KEY", raising=False)
+        assert client_key(self._request({"Authorization": "Bearer secret"})) == ("ip", "10.0.0.1")
+
+    def test_api_key_is_hashed(self, monkeypatch):
+        from src.middleware.rate_limit import client_key
+
+        monkeypatch.setenv("RATE_LIMIT_KEY", "api_key")
+        kind, identifier = client_key(self._request({"Authorization": "Bearer secret"}))
+        assert kind == "key"
+        assert "secret" not in identifier
+        assert client_key(self._request({})) == ("ip", "10.0.0.1")
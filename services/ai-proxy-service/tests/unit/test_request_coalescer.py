@@ -0,0 +1,155 @@
+"""Unit tests for the request coalescer"""
+
+import asyncio
+
+import pytest
+
+from src.services.request_coalescer import RequestCoalescer
+
+
+class TestRequestCoalescer:
+    """Test cases for RequestCoalescer"""
+
+    @pytest.fixture
+    def coalescer(self):
+        return RequestCoalescer()
+
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_share_one_invocation(self, coalescer):
+        calls = 0
+        release = asyncio.Event()
+
+        async def provider_call():
+            nonlocal calls
+            calls += 1
+            await release.wait()
+            return "answer"
+
+        tasks = [asyncio.create_task(coalescer.run("key", provider_call)) for _ in range(3)]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*tasks)
+
+        assert calls == 1
+        assert [r for r, _ in results] == ["answer"] * 3
+        assert sorted(shared for _, shared in results) == [False, True, True]
+        assert coalescer.stats()["in_flight_calls"] == 0
+
+    @pytest.mark.asyncio
+    async def test_sequential_calls_are_not_shared(self, coalescer):
+        calls = 0
+
+        async def provider_call():
+            nonlocal calls
+            calls += 1
+            return calls
+
+        assert await coalescer.run("key", provider_call) == (1, False)
+        assert await coalescer.run("key", provider_call) == (2, False)
+
+    @pytest.mark.asyncio
+    async def test_errors_propagate_to_all_callers(self, coalescer):
+        release = asyncio.Event()
+
+        async def provider_call():
+            await release.wait()
+            raise RuntimeError("provider down")
+
+        tasks = [asyncio.create_task(coalescer.run("key", provider_call)) for _ in range(2)]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+
+        assert all(isinstance(r, RuntimeError) for r in results)
+
+    @pytest.mark.asyncio
+    async def test_leader_cancellation_does_not_cancel_followers(self, coalescer):
+        release = asyncio.Event()
+
+        async def provider_call():
+            await release.wait()
+            return "answer"
+
+        leader = asyncio.create_task(coalescer.run("key", provider_call))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(coalescer.run("key", provider_call))
+        await asyncio.sleep(0)
+        leader.cancel()
+        release.set()
+
+        assert await follower == ("answer", True)
+
+    @pytest.mark.asyncio
+    async def test_stream_fans_out_to_late_subscribers(self, coalescer):
+        opened = 0
+        step = asyncio.Event()
+
+        async def provider_stream():
+            nonlocal opened
+            opened += 1
+            yield {"n": 1}
+            await step.wait()
+            yield {"n": 2}
+
+        async def collect(chunks):
+            return [c async for c in chunks]
+
+        first, first_shared = coalescer.stream("key", provider_stream)
+        first_task = asyncio.create_task(collect(first))
+        await asyncio.sleep(0.01)  # first chunk already buffered
+
+        second, second_shared = coalescer.stream("key", provider_stream)
+        second_task = asyncio.create_task(collect(second))
+        step.set()
+
+        assert await first_task == [{"n": 1}, {"n": 2}]
+        assert await second_task == [{"n": 1}, {"n": 2}]
+        assert opened == 1
+        assert (first_shared, second_shared) == (False, True)
+        assert coalescer.stats()["in_flight_streams"] == 0
+
+    @pytest.mark.asyncio
+    async def test_stream_error_reaches_subscribers(self, coalescer):
+        async def provider_stream():
+            yield {"n": 1}
+            raise RuntimeError("mid-stream")
+
+        chunks, _ = coalescer.stream("key", provider_stream)
+        received = []
+        with pytest.raises(RuntimeError, match="mid-stream"):
+            async for chunk in chunks:
+                received.append(chunk)
+
+        assert received == [{"n": 1}]
+
+    @pytest.mark.asyncio
+    async def test_stream_is_closed_when_every_subscriber_leaves(self, coalescer):
+        produced = 0
+        closed = asyncio.Event()
+
+        async def provider_stream():
+            nonlocal produced
+            try:
+                while True:
+                    produced += 1
+                    yield {"n": produced}
+                    await asyncio.sleep(0)
+            finally:
+                closed.set()
+
+        first, _ = coalescer.stream("key", provider_stream)
+        second, _ = coalescer.stream("key", provider_stream)
+        assert await first.__anext__() == {"n": 1}
+        assert await second.__anext__() == {"n": 1}
+
+        await first.aclose()
+        await asyncio.sleep(0.01)
+        assert not closed.is_set()  # one subscriber is still reading
+
+        await second.aclose()
+        await asyncio.wait_for(closed.wait(), timeout=1)
+        stopped_at = produced
+        await asyncio.sleep(0.01)
+
+        assert produced == stopped_at
+        assert coalescer.stats()["in_flight_streams"] == 0
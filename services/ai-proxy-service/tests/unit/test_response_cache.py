@@ -0,0 +1,90 @@
+"""Unit tests for the response cache"""
+
+from unittest.mock import patch
+
+import pytest
+
+from src.core.fingerprint import request_fingerprint
+from src.core.models import ChatChoice, ChatCompletionResponse, ChatMessage, Usage
+from src.services.response_cache import ResponseCache
+
+
+def _response(content: str = "Hi") -> ChatCompletionResponse:
+    return ChatCompletionResponse(
+        id="chatcmpl-original",
+        created=1,
+        model="gemini-pro",
+        choices=[ChatChoice(message=ChatMessage(role="assistant", content=content))],
+        usage=Usage(prompt_tokens=3, completion_tokens=1, total_tokens=4),
+    )
+
+
+class TestRequestFingerprint:
+    """Test cases for request_fingerprint"""
+
+    def test_identical_requests_share_fingerprint(self):
+        messages = [ChatMessage(role="user", content="Hello")]
+        assert request_fingerprint("gemini-pro", messages, 0.0, None) == request_fingerprint(
+            "gemini-pro", [ChatMessage(role="user", content="Hello")], 0, None
+        )
+
+    @pytest.mark.parametrize(
+        "model,content,temperature,max_tokens",
+        [
+            ("gemini-flash", "Hello", 0.0, None),
+            ("gemini-pro", "Hello!", 0.0, None),
+            ("gemini-pro", "Hello", 0.5, None),
+            ("gemini-pro", "Hello", 0.0, 10),
+        ],
+    )
+    def test_any_field_changes_fingerprint(self, model, content, temperature, max_tokens):
+        base = request_fingerprint("gemini-pro", [ChatMessage(role="user", content="Hello")], 0.0, None)
+        other = request_fingerprint(model, [ChatMessage(role="user", content=content)], temperature, max_tokens)
+        assert base != other
+
+
+class TestResponseCache:
+    """Test cases for ResponseCache"""
+
+    @pytest.fixture
+    def cache(self):
+        return ResponseCache(max_entries=2, ttl_seconds=60)
+
+    def test_eligibility(self, cache):
+        assert cache.is_eligible(0.0, None) is True
+        assert cache.is_eligible(0.7, None) is False
+        assert cache.is_eligible(0.7, True) is True
+        assert cache.is_eligible(0.0, False) is False
+
+    def test_miss_then_hit(self, cache):
+        assert cache.get("k") is None
+        cache.put("k", _response())
+
+        hit = cache.get("k")
+        assert hit is not None
+        assert hit.choices[0].message.content == "Hi"
+        assert hit.id != "chatcmpl-original"
+
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+
+    def test_lru_eviction(self, cache):
+        cache.put("a", _response("a"))
+        cache.put("b", _response("b"))
+        cache.get("a")  # "b" becomes least recently used
+        cache.put("c", _response("c"))
+
+        assert cache.get("b") is None
+        assert cache.get("a") is not None
+        assert cache.get("c") is not None
+        assert cache.stats()["evictions"] == 1
+
+    def test_ttl_expiry(self, cache):
+        with patch("src.services.response_cache.time.monotonic", return_value=100.0):
+            cache.put("k", _response())
+        with patch("src.services.response_cache.time.monotonic", return_value=161.0):
+            assert cache.get("k") is None
+
+        assert cache.stats()["expirations"] == 1
+        assert cache.stats()["entries"] == 0
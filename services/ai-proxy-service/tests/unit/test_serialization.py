@@ -0,0 +1,78 @@
+"""Unit tests for the shared fast JSON and SSE chunk encoding"""
+
+import json
+
+import pytest
+
+from shared.serialization import SSE_DONE, ChunkEncoder, dumps, sse_event
+from shared.serialization import fastjson
+
+
+def _chunk(content, completion_id="chatcmpl-1", model="gemini-2.5-flash", **choice) -> dict:
+    return {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": 1700000000,
+        "model": model,
+        "choices": [{"index": 0, "delta": {"content": content}, "finish_reason": None, **choice}],
+    }
+
+
+def _decode(event: bytes) -> dict:
+    assert event.startswith(b"data: ") and event.endswith(b"\n\n")
+    return json.loads(event[6:])
+
+
+@pytest.fixture(params=[True, False], ids=["orjson-path", "envelope-path"], autouse=True)
+def encode_path(request, monkeypatch):
+    """Run each test with whole-chunk encoding and with the pre-encoded envelope"""
+    monkeypatch.setattr(fastjson, "HAS_ORJSON", request.param)
+
+
+class TestChunkEncoder:
+
+    @pytest.mark.parametrize("content", ["Hello", 'quote " and \\ backslash', "Grüße 👋", "line\nbreak", ""])
+    def test_content_delta_round_trips(self, content):
+        chunk = _chunk(content)
+
+        assert _decode(ChunkEncoder().encode(chunk)) == chunk
+
+    def test_non_ascii_text_is_sent_as_utf8(self):
+        event = ChunkEncoder().encode(_chunk("Grüße"))
+
+        assert "Grüße".encode() in event
+        assert len(event) < len(f"data: {json.dumps(_chunk('Grüße'))}\n\n")
+
+    def test_envelope_follows_the_chunks(self):
+        encoder = ChunkEncoder()
+        encoder.encode(_chunk("a"))
+
+        assert _decode(encoder.encode(_chunk("b", completion_id="chatcmpl-2", model="other")))["id"] == "chatcmpl-2"
+
+    @pytest.mark.parametrize(
+        "chunk",
+        [
+            {**_chunk("x"), "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2}},
+            {**_chunk("x"), "choices": [{"index": 0, "delta": {"role": "assistant"}, "finish_reason": None}]},
+            _chunk("x", finish_reason="stop"),
+            {"error": {"message": "boom", "type": "server_error"}},
+            {"choices": [{"delta": {"content": "no envelope"}}]},
+        ],
+    )
+    def test_other_chunks_are_encoded_as_they_are(self, chunk):
+        assert _decode(ChunkEncoder().encode(chunk)) == chunk
+
+    def test_content_uses_the_given_envelope(self):
+        encoder = ChunkEncoder("chatcmpl-1", 1700000000, "gemini-2.5-flash")
+
+        assert _decode(encoder.content("Hi")) == _chunk("Hi")
+
+    def test_content_needs_an_envelope(self):
+        with pytest.raises(ValueError):
+            ChunkEncoder().content("Hi")
+
+
+def test_sse_helpers():
+    assert sse_event({"a": [1, None]}) == b'data: {"a":[1,null]}\n\n'
+    assert dumps({"k": "ü"}) == '{"k":"ü"}'.encode()
+    assert SSE_DONE == b"data: [DONE]\n\n"
@@ -0,0 +1,94 @@
+"""Import-time budget for the service entry point
+
+Runs ``python -X importtime -c "import src.main"`` in a fresh interpreter, as
+a new worker does on a deploy, and checks the report: provider SDKs and HTTP
+client stacks stay out of the import (the container loads them when it warms
+up), and importing stays within budget. ``make import-time`` prints the same
+report sorted by cumulative time.
+"""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+SERVICE_DIR = Path(__file__).resolve().parents[2]
+
+# Loaded by the container during startup warm-up, never by importing the app
+DEFERRED_MODULES = ("google.generativeai", "google.genai", "httpx", "limits")
+
+# Milliseconds; generous against slow CI runners. Override with
+# IMPORT_TIME_BUDGET_MS / OWN_IMPORT_TIME_BUDGET_MS, or set one to 0 to skip
+# that check on a runner too noisy to time anything.
+IMPORT_TIME_BUDGET_MS = 2000
+OWN_IMPORT_TIME_BUDGET_MS = 300
+
+
+def _import_times(tmp_path: Path) -> dict[str, tuple[float, float]]:
+    """Import the app in a fresh interpreter; (self, cumulative) ms per module"""
+    env = {
+        **os.environ,
+        "PYTHONPATH": os.pathsep.join([str(SERVICE_DIR), str(SERVICE_DIR.parent)]),
+    }
+    command = [sys.executable, "-X", "importtime", "-c", "import src.main"]
+    # The first run writes bytecode caches; measure the second
+    subprocess.run(command, cwd=tmp_path, env=env, check=True, capture_output=True)
+    result = subprocess.run(
+        command, cwd=tmp_path, env=env, check=True, capture_output=True, text=True
+    )
+
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, cumulative_us, name = line.removeprefix("import time:").split("|")
+        if self_us.strip().isdigit():
+            times[name.strip()] = (int(self_us) / 1000, int(cumulative_us) / 1000)
+    return times
+
+
+@pytest.fixture(scope="module")
+def import_times(tmp_path_factory) -> dict[str, tuple[float, float]]:
+    return _import_times(tmp_path_factory.mktemp("importtime"))
+
+
+def _slowest(times: dict[str, tuple[float, float]], column: int, count: int = 10) -> str:
+    """The slowest modules by self (0) or cumulative (1) time, for failure messages"""
+    ranked = sorted(times.items(), key=lambda item: item[1][column], reverse=True)[:count]
+    return "\n".join(f"{t[column]:8.1f}ms  {name}" for name, t in ranked)
+
+
+def test_heavy_dependencies_are_not_imported_with_the_app(import_times):
+    eager = [
+        name
+        for name in import_times
+        if any(name == module or name.startswith(f"{module}.") for module in DEFERRED_MODULES)
+    ]
+
+    assert not eager, f"Imported with src.main instead of at warm-up: {eager}"
+
+
+def _budget(variable: str, default: float) -> float:
+    budget = float(os.getenv(variable, default))
+    if budget <= 0:
+        pytest.skip(f"{variable} is 0")
+    return budget
+
+
+def test_app_import_is_within_budget(import_times):
+    budget = _budget("IMPORT_TIME_BUDGET_MS", IMPORT_TIME_BUDGET_MS)
+
+    total = import_times["src.main"][1]
+
+    assert total <= budget, f"Importing src.main took {total:.0f}ms:\n{_slowest(import_times, 1)}"
+
+
+def test_own_modules_are_within_budget(import_times):
+    budget = _budget("OWN_IMPORT_TIME_BUDGET_MS", OWN_IMPORT_TIME_BUDGET_MS)
+    own = {name: t for name, t in import_times.items() if name.split(".")[0] in ("src", "shared")}
+
+    total = sum(self_ms for self_ms, _ in own.values())
+
+    assert total <= budget, f"src and shared modules took {total:.0f}ms:\n{_slowest(own, 0)}"
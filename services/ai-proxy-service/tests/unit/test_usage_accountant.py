@@ -0,0 +1,251 @@
+"""Unit tests for the usage accountant"""
+
+import asyncio
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from src.core.exceptions import BillingException, BillingUnavailableException
+from src.core.metrics import metrics_collector
+from src.services.usage_accountant import UsageAccountant
+
+
+def _record(accountant, request_id="req-1", total_tokens=15, **kwargs):
+    return accountant.record_completion(
+        user_id="user-1",
+        model="gemini-2.5-flash",
+        prompt_tokens=10,
+        completion_tokens=5,
+        total_tokens=total_tokens,
+        request_id=request_id,
+        response_time=0.2,
+        **kwargs,
+    )
+
+
+def _billed_ids(billing):
+    """Request IDs of every charge sent to the credits service, per call"""
+    return [[job.request_id for job in call.args[0]] for call in billing.log_billing_batch.await_args_list]
+
+
+class TestUsageAccountant:
+
+    @pytest.fixture
+    def billing(self):
+        billing = Mock()
+        billing.calculate_cost.return_value = 0.01
+        billing.log_billing_batch = AsyncMock(side_effect=lambda batch: [None] * len(batch))
+        return billing
+
+    @pytest.fixture
+    def usage_log(self):
+        usage_log = Mock()
+        usage_log.log_usage = AsyncMock()
+        return usage_log
+
+    @pytest.fixture
+    async def accountant(self, billing, usage_log):
+        accountant = UsageAccountant(
+            billing, usage_log, retry_base_delay=0.001, retry_max_delay=0.01, batch_window=0
+        )
+        yield accountant
+        await accountant.close()
+
+    @pytest.mark.asyncio
+    async def test_records_metrics_and_bills_in_background(self, accountant, billing, usage_log):
+        metrics_collector.reset()
+        release = asyncio.Event()
+
+        async def slow_billing(batch):
+            await release.wait()
+            return [None] * len(batch)
+
+        billing.log_billing_batch.side_effect = slow_billing
+
+        cost = _record(accountant, time_to_first_token=0.05)
+
+        # The caller got its answer while the credits service is still busy
+        assert cost == 0.01
+        performance = metrics_collector.get_metrics()["performance"]
+        assert performance["time_to_first_token"]["sample_size"] == 1
+        await asyncio.sleep(0.01)
+        assert accountant.stats()["in_flight"] == 1
+
+        release.set()
+        await accountant.flush()
+        assert accountant.stats()["billed"] == 1
+        usage_log.log_usage.assert_awaited_once()
+        assert _billed_ids(billing) == [["req-1"]]
+
+    @pytest.mark.asyncio
+    async def test_charges_within_window_share_one_request(self, billing, usage_log):
+        accountant = UsageAccountant(billing, usage_log, batch_window=0.02)
+        for i in range(5):
+            _record(accountant, request_id=f"req-{i}")
+        await asyncio.sleep(0.005)
+        _record(accountant, request_id="req-5")
+        await accountant.flush()
+
+        assert _billed_ids(billing) == [[f"req-{i}" for i in range(6)]]
+        assert accountant.stats()["requests"] == 1
+        assert usage_log.log_usage.await_count == 6
+        await accountant.close()
+
+    @pytest.mark.asyncio
+    async def test_batches_are_capped_at_batch_size(self, billing, usage_log):
+        accountant = UsageAccountant(billing, usage_log, batch_size=4, batch_window=0.01)
+        for i in range(10):
+            _record(accountant, request_id=f"req-{i}")
+        await accountant.flush()
+
+        assert [len(ids) for ids in _billed_ids(billing)] == [4, 4, 2]
+        assert accountant.stats()["billed"] == 10
+        await accountant.close()
+
+    @pytest.mark.asyncio
+    async def test_transient_failures_are_retried_with_same_key(self, accountant, billing):
+        billing.log_billing_batch.side_effect = [
+            BillingUnavailableException("down"),
+            BillingUnavailableException("down"),
+            [None],
+        ]
+
+        _record(accountant)
+        await accountant.flush()
+
+        assert _billed_ids(billing) == [["req-1"]] * 3
+        assert accountant.stats()["retries"] == 2
+        assert accountant.stats()["billed"] == 1
+
+    @pytest.mark.asyncio
+    async def test_only_failed_charges_of_a_batch_are_retried(self, billing, usage_log):
+        accountant = UsageAccountant(billing, usage_log, retry_base_delay=0.001, batch_window=0.01)
+        billing.log_billing_batch.side_effect = [
+            [None, BillingUnavailableException("ledger busy"), BillingException("Insufficient balance")],
+            [None],
+        ]
+        for i in range(3):
+            _record(accountant, request_id=f"req-{i}")
+        await accountant.flush()
+
+        assert _billed_ids(billing) == [["req-0", "req-1", "req-2"], ["req-1"]]
+        stats = accountant.stats()
+        assert stats["billed"] == 2
+        assert stats["failed"] == 1
+        assert stats["retries"] == 1
+        await accountant.close()
+
+    @pytest.mark.asyncio
+    async def test_gives_up_after_max_attempts(self, billing, usage_log):
+        accountant = UsageAccountant(billing, usage_log, max_attempts=3, retry_base_delay=0.001, batch_window=0)
+        billing.log_billing_batch.side_effect = BillingUnavailableException("down")
+
+        _record(accountant)
+        await accountant.flush()
+
+        assert billing.log_billing_batch.await_count == 3
+        assert accountant.stats()["failed"] == 1
+        # Usage is persisted even though the charge could not be made
+        usage_log.log_usage.assert_awaited_once()
+        await accountant.close()
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("error", [BillingUnavailableException("down"), ValueError("bad batch")])
+    async def test_reservation_of_given_up_charge_is_released(self, billing, usage_log, error):
+        gate = Mock()
+        accountant = UsageAccountant(
+            billing, usage_log, max_attempts=2, retry_base_delay=0.001, batch_window=0, balance_gate=gate
+        )
+        billing.log_billing_batch.side_effect = error
+
+        _record(accountant, reservation_key="req-1")
+        await accountant.close()
+
+        assert accountant.stats()["failed"] == 1
+        gate.release.assert_called_once_with("user-1", "req-1")
+
+    @pytest.mark.asyncio
+    async def test_reservation_of_rejected_charge_is_left_to_the_ledger(self, billing, usage_log):
+        gate = Mock()
+        accountant = UsageAccountant(billing, usage_log, batch_window=0, balance_gate=gate)
+        billing.log_billing_batch.side_effect = lambda jobs: [BillingException("Insufficient balance")] * len(jobs)
+
+        _record(accountant, reservation_key="req-1")
+        await accountant.close()
+
+        assert accountant.stats()["failed"] == 1
+        gate.release.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_rejections_are_not_retried(self, accountant, billing):
+        billing.log_billing_batch.side_effect = BillingException("Billing service error")
+
+        _record(accountant)
+        await accountant.flush()
+
+        assert billing.log_billing_batch.await_count == 1
+        assert accountant.stats()["failed"] == 1
+
+    @pytest.mark.asyncio
+    async def test_unbilled_completions_are_only_measured(self, accountant, billing, usage_log):
+        assert _record(accountant, bill=False) == 0.0
+        await accountant.flush()
+
+        billing.calculate_cost.assert_not_called()
+        billing.log_billing_batch.assert_not_called()
+        usage_log.log_usage.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_reservation_is_settled_by_the_charge(self, billing, usage_log):
+        gate = Mock()
+        accountant = UsageAccountant(billing, usage_log, batch_window=0, balance_gate=gate)
+
+        _record(accountant, reservation_key="req-1")
+        await accountant.close()
+
+        assert billing.log_billing_batch.await_args.args[0][0].reservation_key == "req-1"
+        gate.release.assert_not_called()
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("kwargs", [{"bill": False}, {"total_tokens": 0}])
+    async def test_reservation_of_unbilled_completion_is_released(self, billing, usage_log, kwargs):
+        gate = Mock()
+        accountant = UsageAccountant(billing, usage_log, batch_window=0, balance_gate=gate)
+
+        _record(accountant, reservation_key="req-1", **kwargs)
+        await accountant.close()
+
+        gate.release.assert_called_once_with("user-1", "req-1")
+        billing.log_billing_batch.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_concurrency_is_bounded(self, billing, usage_log):
+        accountant = UsageAccountant(billing, usage_log, concurrency=2, batch_size=1, batch_window=0)
+        active = peak = 0
+
+        async def tracked(batch):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.005)
+            active -= 1
+            return [None] * len(batch)
+
+        billing.log_billing_batch.side_effect = tracked
+        for i in range(10):
+            _record(accountant, request_id=f"req-{i}")
+        await accountant.flush()
+
+        assert billing.log_billing_batch.await_count == 10
+        assert peak == 2
+        await accountant.close()
+
+    @pytest.mark.asyncio
+    async def test_close_drains_pending_charges(self, accountant, billing):
+        for i in range(5):
+            _record(accountant, request_id=f"req-{i}", estimated=True)
+        await accountant.close()
+
+        assert sum(len(ids) for ids in _billed_ids(billing)) == 5
+        assert accountant.stats()["estimated"] == 5
+        assert accountant.stats()["pending"] == 0
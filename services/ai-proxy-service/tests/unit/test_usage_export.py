@@ -0,0 +1,79 @@
+"""Unit tests for usage export encoders"""
+
+import csv
+import io
+import json
+
+import pytest
+
+from src.core.exceptions import InvalidRequestException
+from src.services.usage_export import EXPORT_COLUMNS, get_export_encoder
+
+
+def _row(i: int) -> dict:
+    return {
+        "id": i,
+        "user_id": "user-1",
+        "model": "gemini-2.5-flash",
+        "prompt_tokens": 10,
+        "completion_tokens": 5,
+        "total_tokens": 15,
+        "cost_usd": 0.001,
+        "request_id": f"req-{i}",
+        "created_at": f"2026-03-01T00:00:0{i}+00:00",
+    }
+
+
+async def _chunks(*sizes: int):
+    next_id = 1
+    for size in sizes:
+        yield [_row(next_id + n) for n in range(size)]
+        next_id += size
+
+
+async def _encode(fmt: str, *sizes: int) -> list[bytes]:
+    return [part async for part in get_export_encoder(fmt)(_chunks(*sizes))]
+
+
+class TestUsageExport:
+
+    @pytest.mark.asyncio
+    async def test_ndjson_yields_one_part_per_chunk(self):
+        parts = await _encode("ndjson", 2, 1)
+        assert len(parts) == 2
+        lines = b"".join(parts).decode().splitlines()
+        assert [json.loads(line)["id"] for line in lines] == [1, 2, 3]
+
+    @pytest.mark.asyncio
+    async def test_csv_has_single_header(self):
+        parts = await _encode("csv", 2, 2)
+        rows = list(csv.reader(io.StringIO(b"".join(parts).decode())))
+        assert rows[0] == list(EXPORT_COLUMNS)
+        assert [r[0] for r in rows[1:]] == ["1", "2", "3", "4"]
+
+    @pytest.mark.asyncio
+    async def test_empty_export_still_has_csv_header(self):
+        parts = await _encode("csv")
+        assert b"".join(parts).decode().strip() == ",".join(EXPORT_COLUMNS)
+
+    @pytest.mark.asyncio
+    async def test_arrow_stream_round_trips(self):
+        pa = pytest.importorskip("pyarrow")
+        parts = await _encode("arrow", 2, 3)
+        table = pa.ipc.open_stream(b"".join(parts)).read_all()
+        assert table.column_names == list(EXPORT_COLUMNS)
+        assert table.column("id").to_pylist() == [1, 2, 3, 4, 5]
+
+    @pytest.mark.asyncio
+    async def test_parquet_round_trips_with_row_group_per_chunk(self):
+        pytest.importorskip("pyarrow")
+        import pyarrow.parquet as pq
+
+        parts = await _encode("parquet", 2, 3)
+        parquet = pq.ParquetFile(io.BytesIO(b"".join(parts)))
+        assert parquet.metadata.num_row_groups == 2
+        assert parquet.read().column("request_id").to_pylist() == [f"req-{i}" for i in range(1, 6)]
+
+    def test_unknown_format_is_rejected(self):
+        with pytest.raises(InvalidRequestException):
+            get_export_encoder("xml")
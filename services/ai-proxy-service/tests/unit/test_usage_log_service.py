@@ -1,7 +1,12 @@
 """Unit tests for usage log service"""
 
+import asyncio
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
 import pytest
 
+from shared.pagination import InvalidCursorError
 from src.services.usage_log_service import UsageLogService
 
 
@@ -13,12 +18,14 @@ class TestUsageLogService:
 
     @pytest.fixture
     def service(self, db_path):
-        return UsageLogService(db_path=db_path)
+        service = UsageLogService(db_path=db_path)
+        yield service
+        service.close()
 
     @pytest.mark.asyncio
     async def test_log_and_query(self, service):
         await service.log_usage("user-1", "gemini-2.5-pro", 100, 50, 150, 0.005, "req-1")
-        entries, total = await service.get_user_usage("user-1")
+        entries, total, _ = await service.get_user_usage("user-1")
         assert total == 1
         assert entries[0]["model"] == "gemini-2.5-pro"
         assert entries[0]["prompt_tokens"] == 100
@@ -29,10 +36,48 @@ class TestUsageLogService:
             await service.log_usage(
                 "user-1", "gemini-2.5-flash", 10, 5, 15, 0.001, f"req-{i}"
             )
-        entries, total = await service.get_user_usage("user-1", page=1, page_size=2)
+        entries, total, _ = await service.get_user_usage("user-1", page=1, page_size=2)
         assert len(entries) == 2
         assert total == 5
 
+    @pytest.mark.asyncio
+    async def test_cursor_pagination_walks_every_entry_once(self, service):
+        for i in range(5):
+            await service.log_usage(
+                "user-1", "gemini-2.5-flash", 10, 5, 15, 0.001, f"req-{i}"
+            )
+        await service.log_usage("user-2", "gemini-2.5-flash", 10, 5, 15, 0.001, "other")
+
+        seen = []
+        entries, total, cursor = await service.get_user_usage("user-1", page_size=2)
+        seen.extend(e["request_id"] for e in entries)
+        while cursor:
+            entries, total, cursor = await service.get_user_usage(
+                "user-1", page_size=2, cursor=cursor
+            )
+            seen.extend(e["request_id"] for e in entries)
+
+        assert seen == [f"req-{i}" for i in reversed(range(5))]
+        assert total == 5
+
+    @pytest.mark.asyncio
+    async def test_cursor_is_stable_under_new_writes(self, service):
+        for i in range(4):
+            await service.log_usage("user-1", "gemini-2.5-flash", 1, 1, 2, 0.001, f"req-{i}")
+        first, _, cursor = await service.get_user_usage("user-1", page_size=2)
+
+        # A new entry lands at the head and must not shift the next page
+        await service.log_usage("user-1", "gemini-2.5-flash", 1, 1, 2, 0.001, "req-new")
+        second, total, _ = await service.get_user_usage("user-1", page_size=2, cursor=cursor)
+
+        assert [e["request_id"] for e in second] == ["req-1", "req-0"]
+        assert total == 5
+
+    @pytest.mark.asyncio
+    async def test_invalid_cursor_is_rejected(self, service):
+        with pytest.raises(InvalidCursorError):
+            await service.get_user_usage("user-1", cursor="not-a-cursor")
+
     @pytest.mark.asyncio
     async def test_user_summary(self, service):
         await service.log_usage("user-1", "gemini-2.5-pro", 100, 50, 150, 0.005, "req-1")
@@ -57,6 +102,194 @@ class TestUsageLogService:
 
     @pytest.mark.asyncio
     async def test_empty_user_usage(self, service):
-        entries, total = await service.get_user_usage("nobody")
+        entries, total, _ = await service.get_user_usage("nobody")
         assert entries == []
         assert total == 0
+
+    @pytest.mark.asyncio
+    async def test_log_usage_is_write_behind(self, db_path):
+        service = UsageLogService(db_path=db_path, flush_interval_ms=60_000)
+        try:
+            await service.log_usage("user-1", "gemini-2.5-pro", 1, 1, 2, 0.001, "req-1")
+
+            # Nothing committed yet: the row waits in the durability window
+            conn = sqlite3.connect(db_path)
+            assert conn.execute("SELECT COUNT(*) FROM usage_log").fetchone()[0] == 0
+            conn.close()
+
+            await service.flush()
+            conn = sqlite3.connect(db_path)
+            assert conn.execute("SELECT COUNT(*) FROM usage_log").fetchone()[0] == 1
+            conn.close()
+        finally:
+            service.close()
+
+    @pytest.mark.asyncio
+    async def test_batched_insert_of_many_rows(self, db_path):
+        service = UsageLogService(db_path=db_path, batch_size=100)
+        try:
+            await asyncio.gather(
+                *(
+                    service.log_usage("user-1", "gemini-2.5-flash", 1, 1, 2, 0.0001, f"req-{i}")
+                    for i in range(1000)
+                )
+            )
+            summary = await service.get_user_summary("user-1")
+            assert summary["total_requests"] == 1000
+        finally:
+            service.close()
+
+    @pytest.mark.asyncio
+    async def test_close_flushes_pending_rows(self, db_path):
+        service = UsageLogService(db_path=db_path, flush_interval_ms=60_000)
+        for i in range(3):
+            await service.log_usage("user-1", "gemini-2.5-pro", 1, 1, 2, 0.001, f"req-{i}")
+        service.close()
+
+        conn = sqlite3.connect(db_path)
+        assert conn.execute("SELECT COUNT(*) FROM usage_log").fetchone()[0] == 3
+        conn.close()
+
+    @pytest.mark.asyncio
+    async def test_log_after_close_writes_directly(self, db_path):
+        service = UsageLogService(db_path=db_path)
+        service.close()
+        await service.log_usage("user-1", "gemini-2.5-pro", 1, 1, 2, 0.001, "req-late")
+
+        entries, total, _ = await service.get_user_usage("user-1")
+        assert total == 1
+        assert entries[0]["request_id"] == "req-late"
+
+    @pytest.mark.asyncio
+    async def test_full_buffer_applies_backpressure(self, db_path):
+        service = UsageLogService(db_path=db_path, queue_size=2, batch_size=1)
+        try:
+            for i in range(20):
+                await service.log_usage("user-1", "gemini-2.5-pro", 1, 1, 2, 0.001, f"req-{i}")
+            _, total, _ = await service.get_user_usage("user-1")
+            assert total == 20
+        finally:
+            service.close()
+
+    def test_database_uses_wal(self, service, db_path):
+        conn = sqlite3.connect(db_path)
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        conn.close()
+
+    @pytest.mark.asyncio
+    async def test_summary_time_range(self, service):
+        # Recent days, so the startup retention sweep cannot race the inserts
+        day0, day1, day2 = (
+            (datetime.now(timezone.utc) - timedelta(days=n)).date().isoformat() for n in (3, 2, 1)
+        )
+        rows = [
+            ("user-1", "gemini-2.5-pro", 10, 5, 15, 0.01, "req-a", f"{day0}T10:00:00+00:00"),
+            ("user-1", "gemini-2.5-pro", 20, 5, 25, 0.02, "req-b", f"{day1}T10:00:00+00:00"),
+            ("user-1", "gemini-2.5-flash", 30, 5, 35, 0.03, "req-c", f"{day2}T10:00:00+00:00"),
+            ("user-2", "gemini-2.5-flash", 40, 5, 45, 0.04, "req-d", f"{day1}T23:59:59+00:00"),
+        ]
+        for row in rows:
+            service._log_usage_sync(row)
+
+        user_summary = await service.get_user_summary("user-1", start_date=day1, end_date=day2)
+        assert user_summary["total_requests"] == 2
+        assert user_summary["total_prompt_tokens"] == 50
+        assert set(user_summary["by_model"]) == {"gemini-2.5-pro", "gemini-2.5-flash"}
+
+        system_summary = await service.get_system_summary(start_date=day1, end_date=day1)
+        assert system_summary["total_requests"] == 2
+        assert system_summary["total_tokens"] == 70
+        assert system_summary["by_model"]["gemini-2.5-flash"]["requests"] == 1
+
+    @pytest.mark.asyncio
+    async def test_rollups_match_usage_log(self, service, db_path):
+        for i in range(10):
+            await service.log_usage(f"user-{i % 3}", "gemini-2.5-flash", i, 1, i + 1, 0.001, f"req-{i}")
+        await service.flush()
+
+        conn = sqlite3.connect(db_path)
+        raw = conn.execute(
+            "SELECT user_id, COUNT(*), SUM(prompt_tokens) FROM usage_log GROUP BY user_id ORDER BY user_id"
+        ).fetchall()
+        rolled = conn.execute(
+            "SELECT user_id, SUM(requests), SUM(prompt_tokens) FROM usage_daily_user GROUP BY user_id ORDER BY user_id"
+        ).fetchall()
+        conn.close()
+        assert raw == rolled
+
+    @pytest.mark.asyncio
+    async def test_rollups_backfilled_for_existing_database(self, db_path):
+        service = UsageLogService(db_path=db_path)
+        await service.log_usage("user-1", "gemini-2.5-pro", 100, 50, 150, 0.005, "req-1")
+        service.close()
+
+        # Simulate a database created before rollups existed
+        conn = sqlite3.connect(db_path)
+        conn.execute("DROP TABLE usage_daily_user")
+        conn.execute("DROP TABLE usage_daily_system")
+        conn.commit()
+        conn.close()
+
+        service = UsageLogService(db_path=db_path)
+        try:
+            assert (await service.get_user_summary("user-1"))["total_tokens"] == 150
+            assert (await service.get_system_summary())["total_requests"] == 1
+        finally:
+            service.close()
+
+    def test_cleanup_drops_expired_rollup_days(self, service, db_path):
+        service._log_usage_sync(
+            ("user-1", "gemini-2.5-pro", 1, 1, 2, 0.001, "req-old", "2000-01-01T00:00:00+00:00")
+        )
+        service._cleanup_old_entries()
+
+        conn = sqlite3.connect(db_path)
+        assert conn.execute("SELECT COUNT(*) FROM usage_log").fetchone()[0] == 0
+        assert conn.execute("SELECT COUNT(*) FROM usage_daily_user").fetchone()[0] == 0
+        assert conn.execute("SELECT COUNT(*) FROM usage_daily_system").fetchone()[0] == 0
+        conn.close()
+
+    @pytest.mark.asyncio
+    async def test_export_streams_range_in_chunks(self, service):
+        base = datetime.now(timezone.utc).replace(microsecond=0) - timedelta(days=1)
+        stamps = [(base + timedelta(minutes=i)).isoformat() for i in range(7)]
+        for i, stamp in enumerate(stamps):
+            service._log_usage_sync(("user-1", "gemini-2.5-flash", i, 1, i + 1, 0.001, f"req-{i}", stamp))
+
+        chunks = [chunk async for chunk in service.iter_export(stamps[1], stamps[6], chunk_size=2)]
+
+        assert [len(c) for c in chunks] == [2, 2, 1]
+        assert [r["request_id"] for c in chunks for r in c] == [f"req-{i}" for i in range(1, 6)]
+
+    @pytest.mark.asyncio
+    async def test_export_resumes_after_last_entry(self, service):
+        base = datetime.now(timezone.utc) - timedelta(days=1)
+        stamp, end = base.isoformat(), (base + timedelta(hours=1)).isoformat()
+        for i in range(4):
+            service._log_usage_sync(("user-1", "gemini-2.5-flash", 1, 1, 2, 0.001, f"req-{i}", stamp))
+
+        first = [r async for c in service.iter_export(stamp, end) for r in c]
+        # Resume from the second row: rows sharing its timestamp are split on id
+        rest = [
+            r
+            async for c in service.iter_export(first[1]["created_at"], end, after_id=first[1]["id"])
+            for r in c
+        ]
+
+        assert [r["request_id"] for r in rest] == ["req-2", "req-3"]
+
+    @pytest.mark.asyncio
+    async def test_export_filters_by_user_and_includes_pending_rows(self, db_path):
+        service = UsageLogService(db_path=db_path, flush_interval_ms=60_000)
+        try:
+            await service.log_usage("user-1", "gemini-2.5-pro", 1, 1, 2, 0.001, "mine")
+            await service.log_usage("user-2", "gemini-2.5-pro", 1, 1, 2, 0.001, "other")
+
+            rows = [
+                r
+                async for c in service.iter_export("2000-01-01T00:00:00+00:00", "2999-01-01T00:00:00+00:00", user_id="user-1")
+                for r in c
+            ]
+            assert [r["request_id"] for r in rows] == ["mine"]
+        finally:
+            service.close()
@@ -2,11 +2,12 @@
 
 from __future__ import annotations
 
-import asyncio
 import logging
 
 from fastapi import APIRouter, Depends, HTTPException, status
 
+from shared.pagination import InvalidCursorError
+
 from ..container import container
 from ..core.exceptions import (
     AccountAlreadyExistsException,
@@ -19,9 +20,15 @@ from ..core.models import (
     AccountCreateResponse,
     BalanceRequest,
     BalanceResponse,
+    BillBatchRequest,
+    BillBatchResponse,
     BillRequest,
     BillResponse,
     ErrorResponse,
+    ReleaseRequest,
+    ReleaseResponse,
+    ReserveRequest,
+    ReserveResponse,
     TopUpRequest,
     TopUpResponse,
     TransactionListResponse,
@@ -36,11 +43,16 @@ router = APIRouter()
 
 
 class Paging:
-    """FastAPI dependency for clamped pagination parameters"""
+    """FastAPI dependency for clamped pagination parameters
+
+    ``cursor`` is the ``next_cursor`` of a previous page; when present it takes
+    precedence over ``page`` and the listing seeks instead of using OFFSET.
+    """
 
-    def __init__(self, page: int = 1, page_size: int = 20):
+    def __init__(self, page: int = 1, page_size: int = 20, cursor: str | None = None):
         self.page = max(1, page)
         self.page_size = max(1, min(100, page_size))
+        self.cursor = cursor
 
 
 @router.get("/health", response_model=dict[str, str])
@@ -200,7 +212,9 @@ async def bill(request: BillRequest):
     """
     try:
         billing_service = container.get_billing_service()
-        new_balance = await billing_service.bill(request.user_id, request.amount, request.description)
+        new_balance = await billing_service.bill(
+            request.user_id, request.amount, request.description, request.idempotency_key
+        )
 
         return BillResponse(user_id=request.user_id, amount_billed=request.amount, new_balance=new_balance)
 
@@ -221,6 +235,133 @@ async def bill(request: BillRequest):
         )
 
 
+@router.post(
+    "/bill/batch",
+    response_model=BillBatchResponse,
+    responses={
+        400: {"model": ErrorResponse, "description": "Invalid amount"},
+        503: {"model": ErrorResponse, "description": "Ledger unavailable; the batch is safe to retry"},
+    },
+)
+async def bill_batch(request: BillBatchRequest):
+    """
+    Bill many charges at once (one ledger write for the whole batch)
+
+    Each charge succeeds or fails on its own; see the per-item status.
+
+    Args:
+        request: Batch bill request
+
+    Returns:
+        One result per charge, in request order
+
+    Raises:
+        400: Invalid amount
+        503: Ledger request failed; retry the batch with the same keys
+    """
+    try:
+        billing_service = container.get_billing_service()
+        results = await billing_service.bill_batch(request.items)
+
+        return BillBatchResponse(results=results)
+
+    except InvalidAmountException as e:
+        logger.warning(f"Batch billing failed: {e}")
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception:
+        logger.exception("Error processing batch bill")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Batch billing failed - please retry",
+        )
+
+
+@router.post(
+    "/reserve",
+    response_model=ReserveResponse,
+    responses={
+        400: {"model": ErrorResponse, "description": "Invalid amount"},
+        404: {"model": ErrorResponse, "description": "Account not found"},
+        500: {"model": ErrorResponse, "description": "Internal server error"},
+    },
+)
+async def reserve(request: ReserveRequest):
+    """
+    Hold credits for an estimated charge before incurring it
+
+    The hold counts against the balance until it is settled (bill it with
+    the key as reservation_key), released, or it times out.
+
+    Args:
+        request: Reserve request
+
+    Returns:
+        Whether the hold was placed, and the balance still available
+
+    Raises:
+        400: Invalid amount
+        404: Account not found
+        500: Internal server error
+    """
+    try:
+        billing_service = container.get_billing_service()
+        reserved, available = await billing_service.reserve(
+            request.user_id, request.amount, request.idempotency_key, request.timeout_seconds
+        )
+
+        return ReserveResponse(
+            user_id=request.user_id,
+            idempotency_key=request.idempotency_key,
+            reserved=reserved,
+            available_balance=available,
+        )
+
+    except InvalidAmountException as e:
+        logger.warning(f"Reservation failed: {e}")
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except AccountNotFoundException as e:
+        logger.warning(f"Reservation failed: {e}")
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except Exception:
+        logger.exception("Error processing reservation")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Internal server error - please try again later",
+        )
+
+
+@router.post(
+    "/release",
+    response_model=ReleaseResponse,
+    responses={500: {"model": ErrorResponse, "description": "Internal server error"}},
+)
+async def release(request: ReleaseRequest):
+    """
+    Release holds whose charges will not be billed (e.g. the call failed)
+
+    Args:
+        request: Holds to release
+
+    Returns:
+        Number of holds released
+
+    Raises:
+        500: Internal server error
+    """
+    try:
+        billing_service = container.get_billing_service()
+        released = await billing_service.release([(item.user_id, item.reservation_key) for item in request.items])
+
+        return ReleaseResponse(released=released)
+
+    except Exception:
+        logger.exception("Error releasing reservations")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Internal server error - please try again later",
+        )
+
+
 @router.get("/users", response_model=UserListResponse)
 async def list_users(paging: Paging = Depends()):
     """List all registered users with pagination"""
@@ -228,25 +369,24 @@ async def list_users(paging: Paging = Depends()):
         user_registry = container.get_user_registry()
         balance_service = container.get_balance_service()
 
-        users, total = await user_registry.list_users(page=paging.page, page_size=paging.page_size)
-
-        # Fetch balances concurrently to avoid N+1 sequential lookups
-        async def _get_balance(uid: str):
-            try:
-                return await balance_service.get_balance(uid)
-            except AccountNotFoundException:
-                return None
+        try:
+            users, total, next_cursor = await user_registry.list_users(
+                page=paging.page, page_size=paging.page_size, cursor=paging.cursor
+            )
+        except InvalidCursorError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
-        balances = await asyncio.gather(*[_get_balance(u["user_id"]) for u in users])
+        # One ledger lookup for the whole page, however many users it has
+        balances = await balance_service.get_balances([u["user_id"] for u in users])
 
         user_infos = [
             UserInfo(
                 user_id=user["user_id"],
                 display_name=user.get("display_name"),
                 created_at=user["created_at"],
-                balance=balance,
+                balance=balances.get(user["user_id"]),
             )
-            for user, balance in zip(users, balances)
+            for user in users
         ]
 
         return UserListResponse(
@@ -254,8 +394,11 @@ async def list_users(paging: Paging = Depends()):
             total=total,
             page=paging.page,
             page_size=paging.page_size,
+            next_cursor=next_cursor,
         )
 
+    except HTTPException:
+        raise
     except Exception:
         logger.exception("Error listing users")
         raise HTTPException(
@@ -321,9 +464,12 @@ async def get_transactions(user_id: str, paging: Paging = Depends()):
             )
 
         transaction_log = container.get_transaction_log()
-        transactions, total = await transaction_log.get_transactions(
-            user_id, page=paging.page, page_size=paging.page_size
-        )
+        try:
+            transactions, total, next_cursor = await transaction_log.get_transactions(
+                user_id, page=paging.page, page_size=paging.page_size, cursor=paging.cursor
+            )
+        except InvalidCursorError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
         transaction_records = [
             TransactionRecord(
@@ -343,6 +489,7 @@ async def get_transactions(user_id: str, paging: Paging = Depends()):
             total=total,
             page=paging.page,
             page_size=paging.page_size,
+            next_cursor=next_cursor,
         )
 
     except HTTPException:
@@ -1,5 +1,7 @@
 """Dependency injection container"""
 
+import inspect
+import logging
 import os
 from typing import Any, Callable, Dict, TypeVar, cast
 
@@ -20,8 +22,20 @@ from .core.interfaces import (
     IUserRegistryService,
 )
 
+logger = logging.getLogger(__name__)
+
 T = TypeVar("T")
 
+# Created by warm() at startup: every service. The SQLite-backed ones come
+# first, so they are warmed even if the TigerBeetle client cannot be created.
+STARTUP_SERVICES = (
+    SERVICE_USER_REGISTRY,
+    SERVICE_TRANSACTION_LOG,
+    SERVICE_ACCOUNT_SERVICE,
+    SERVICE_BALANCE_SERVICE,
+    SERVICE_BILLING_SERVICE,
+)
+
 
 class Container:
     """Simple dependency injection container"""
@@ -44,6 +58,7 @@ class Container:
         """Create TigerBeetle client"""
         import socket
 
+        from .core.constants import TIGERBEETLE_BATCH_WINDOW_SECONDS
         from .services.tigerbeetle_client import TigerBeetleClient
 
         cluster_id = int(os.getenv("TIGERBEETLE_CLUSTER_ID", "0"))
@@ -54,7 +69,21 @@ class Container:
         resolved_host = socket.gethostbyname(host)
         addresses = port if resolved_host in ("127.0.0.1",) else f"{resolved_host}:{port}"
 
-        return TigerBeetleClient(cluster_id=cluster_id, addresses=addresses)
+        batch_window = None
+        if os.getenv("TIGERBEETLE_BATCHING_ENABLED", "true").lower() == "true":
+            batch_window = float(
+                os.getenv("TIGERBEETLE_BATCH_WINDOW_SECONDS", str(TIGERBEETLE_BATCH_WINDOW_SECONDS))
+            )
+
+        # Tracked balances are only exact while this process is the ledger's sole writer
+        track_balances = os.getenv("TIGERBEETLE_BALANCE_TRACKING_ENABLED", "false").lower() == "true"
+
+        return TigerBeetleClient(
+            cluster_id=cluster_id,
+            addresses=addresses,
+            batch_window=batch_window,
+            track_balances=track_balances,
+        )
 
     def _create_user_registry(self) -> Any:
         """Create user registry service"""
@@ -95,6 +124,45 @@ class Container:
             self._services[service_name] = self._factories[service_name]()
         return self._services[service_name]
 
+    async def warm(self) -> None:
+        """Create the request-path services and open their database connections
+
+        Run at startup, so the first request after a deploy does not pay for
+        imports, schema setup and SQLite connections. A service that cannot
+        be created is logged and left to fail on first use, as it would
+        without warming.
+        """
+        for service_name in STARTUP_SERVICES:
+            try:
+                self.get(service_name)
+            except Exception as e:
+                logger.warning(f"Service '{service_name}' not created at startup: {e}")
+
+        for service_name, service in list(self._services.items()):
+            warm = getattr(service, "warm", None)
+            if not callable(warm):
+                continue
+            try:
+                result = warm()
+                if inspect.isawaitable(result):
+                    await result
+            except Exception:
+                logger.exception(f"Error warming service '{service_name}'")
+
+    async def shutdown(self) -> None:
+        """Release resources held by services that have been created"""
+        for service_name, service in list(self._services.items()):
+            close = getattr(service, "close", None)
+            if not callable(close):
+                continue
+            try:
+                result = close()
+                if inspect.isawaitable(result):
+                    await result
+            except Exception:
+                logger.exception(f"Error shutting down service '{service_name}'")
+        self._services.clear()
+
     def get_tigerbeetle_client(self) -> ITigerBeetleClient:
         """Get TigerBeetle client"""
         return cast(ITigerBeetleClient, self.get(SERVICE_TIGERBEETLE_CLIENT))
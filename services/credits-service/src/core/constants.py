@@ -23,5 +23,18 @@ ACCOUNT_CODE_SYSTEM = 2
 SERVICE_USER_REGISTRY = "user_registry"
 SERVICE_TRANSACTION_LOG = "transaction_log"
 
+# Concurrent single TigerBeetle operations (transfers, account creations,
+# balance lookups) are coalesced into one request per kind: seconds to wait
+# for more operations to join before sending (TIGERBEETLE_BATCH_WINDOW_SECONDS)
+TIGERBEETLE_BATCH_WINDOW_SECONDS = 0.0005
+
+# Largest accepted POST /bill/batch; applied with one TigerBeetle request
+MAX_BILL_BATCH_SIZE = 1000
+
+# Holds placed by POST /reserve expire after this many seconds unless
+# settled or released first
+DEFAULT_RESERVATION_TIMEOUT_SECONDS = 300
+MAX_RESERVATION_TIMEOUT_SECONDS = 3600
+
 # Currency precision (cents)
 CURRENCY_PRECISION = 100  # 1 USD = 100 cents
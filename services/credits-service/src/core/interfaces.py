@@ -5,6 +5,8 @@ from __future__ import annotations
 from abc import ABC, abstractmethod
 from decimal import Decimal
 
+from .models import BillBatchItem, BillBatchResult
+
 
 class ITigerBeetleClient(ABC):
     """Interface for TigerBeetle client operations"""
@@ -36,8 +38,47 @@ class ITigerBeetleClient(ABC):
         debit_account_id: int,
         credit_account_id: int,
         amount_cents: int,
-    ) -> None:
-        """Create a transfer between accounts"""
+    ) -> bool:
+        """Create a transfer between accounts. Returns False if it already existed."""
+        pass
+
+    @abstractmethod
+    async def create_transfer_with_balance(
+        self,
+        transfer_id: int,
+        debit_account_id: int,
+        credit_account_id: int,
+        amount_cents: int,
+        balance_account_id: int,
+    ) -> tuple[bool, int]:
+        """
+        Create a transfer, usually in one round trip.
+
+        Returns:
+            Whether it was created (False if it already existed) and the
+            balance in cents of balance_account_id after it
+        """
+        pass
+
+    @abstractmethod
+    async def create_transfers(self, transfers: list[tuple[int, ...]]) -> list[bool | Exception]:
+        """
+        Create independent (transfer_id, debit_account_id, credit_account_id,
+        amount_cents[, flags, pending_id, timeout_seconds]) transfers in one
+        round trip.
+
+        Returns:
+            Per transfer: True if created, False if it already existed, or
+            the exception it was rejected with
+        """
+        pass
+
+    @abstractmethod
+    async def get_account_balances(self, account_ids: list[int], include_pending: bool = False) -> dict[int, int]:
+        """
+        Get balances in cents by account ID in one lookup; missing accounts
+        are absent. include_pending also deducts holds (pending debits).
+        """
         pass
 
     @abstractmethod
@@ -50,6 +91,11 @@ class ITigerBeetleClient(ABC):
         """Generate a unique transfer ID"""
         pass
 
+    @abstractmethod
+    def transfer_id_for_key(self, idempotency_key: str) -> int:
+        """Derive a deterministic transfer ID from an idempotency key"""
+        pass
+
 
 class IAccountService(ABC):
     """Interface for account management"""
@@ -82,10 +128,20 @@ class IBalanceService(ABC):
         """Get current balance for a user"""
         pass
 
+    @abstractmethod
+    async def get_balances(self, user_ids: list[str]) -> dict[str, Decimal]:
+        """Get many users' balances in one lookup; users without an account are absent"""
+        pass
+
 
 class IBillingService(ABC):
     """Interface for billing operations"""
 
+    @abstractmethod
+    async def ensure_system_account(self) -> None:
+        """Create the system account credits are minted from, once at startup"""
+        pass
+
     @abstractmethod
     async def top_up(self, user_id: str, amount: Decimal) -> Decimal:
         """
@@ -97,15 +153,56 @@ class IBillingService(ABC):
         pass
 
     @abstractmethod
-    async def bill(self, user_id: str, amount: Decimal, description: str | None = None) -> Decimal:
+    async def bill(
+        self,
+        user_id: str,
+        amount: Decimal,
+        description: str | None = None,
+        idempotency_key: str | None = None,
+    ) -> Decimal:
         """
-        Bill an account
+        Bill an account. Repeating a call with the same idempotency_key
+        charges only once.
 
         Returns:
             New balance
         """
         pass
 
+    @abstractmethod
+    async def bill_batch(self, items: list[BillBatchItem]) -> list[BillBatchResult]:
+        """
+        Bill many charges with a single ledger write. Each item succeeds or
+        fails on its own and is idempotent on its key.
+
+        Returns:
+            One result per item, in order
+        """
+        pass
+
+    @abstractmethod
+    async def reserve(
+        self, user_id: str, amount: Decimal, idempotency_key: str, timeout_seconds: int
+    ) -> tuple[bool, Decimal]:
+        """
+        Place a hold for an estimated charge, released by bill_batch (with
+        the key as reservation_key), release() or its timeout.
+
+        Returns:
+            Tuple of (reserved, available balance after the hold)
+        """
+        pass
+
+    @abstractmethod
+    async def release(self, holds: list[tuple[str, str]]) -> int:
+        """
+        Release (user_id, reservation key) holds in one round trip
+
+        Returns:
+            Number of holds released
+        """
+        pass
+
 
 class IUserRegistryService(ABC):
     """Interface for user registry operations"""
@@ -121,8 +218,10 @@ class IUserRegistryService(ABC):
         pass
 
     @abstractmethod
-    async def list_users(self, page: int = 1, page_size: int = 20) -> tuple[list[dict], int]:
-        """List users with pagination. Returns (users, total_count)."""
+    async def list_users(
+        self, page: int = 1, page_size: int = 20, cursor: str | None = None
+    ) -> tuple[list[dict], int, str | None]:
+        """List users with pagination. Returns (users, total_count, next_cursor)."""
         pass
 
     @abstractmethod
@@ -146,9 +245,16 @@ class ITransactionLogService(ABC):
         """Log a transaction"""
         pass
 
+    @abstractmethod
+    async def log_transactions(
+        self, entries: list[tuple[str, str, Decimal, Decimal, str | None]]
+    ) -> None:
+        """Log (user_id, tx_type, amount, balance_after, description) entries in one write"""
+        pass
+
     @abstractmethod
     async def get_transactions(
-        self, user_id: str, page: int = 1, page_size: int = 20
-    ) -> tuple[list[dict], int]:
-        """Get transactions for a user with pagination. Returns (transactions, total_count)."""
+        self, user_id: str, page: int = 1, page_size: int = 20, cursor: str | None = None
+    ) -> tuple[list[dict], int, str | None]:
+        """Get transactions for a user with pagination. Returns (transactions, total_count, next_cursor)."""
         pass
@@ -6,6 +6,12 @@ from decimal import Decimal
 
 from pydantic import BaseModel, Field, field_validator
 
+from .constants import (
+    DEFAULT_RESERVATION_TIMEOUT_SECONDS,
+    MAX_BILL_BATCH_SIZE,
+    MAX_RESERVATION_TIMEOUT_SECONDS,
+)
+
 
 class AccountCreateRequest(BaseModel):
     """Request to create a new account"""
@@ -72,6 +78,11 @@ class BillRequest(BaseModel):
     user_id: str = Field(..., description="User identifier")
     amount: Decimal = Field(..., description="Amount to bill in USD", gt=0)
     description: str | None = Field(None, description="Description of the charge (e.g., 'Gemini API call')")
+    idempotency_key: str | None = Field(
+        None,
+        max_length=128,
+        description="Client-chosen key; retrying with the same key bills only once",
+    )
 
     @field_validator("amount")
     @classmethod
@@ -90,6 +101,99 @@ class BillResponse(BaseModel):
     new_balance: Decimal = Field(..., description="New balance in USD")
 
 
+class BillBatchItem(BaseModel):
+    """One charge in a batch bill request"""
+
+    user_id: str = Field(..., description="User identifier")
+    amount: Decimal = Field(..., description="Amount to bill in USD", gt=0)
+    description: str | None = Field(None, description="Description of the charge")
+    idempotency_key: str = Field(
+        ...,
+        min_length=1,
+        max_length=128,
+        description="Client-chosen key; retrying with the same key bills only once",
+    )
+    reservation_key: str | None = Field(
+        None,
+        max_length=128,
+        description="Key of a hold placed with /reserve; it is released as this charge is applied",
+    )
+
+
+class BillBatchRequest(BaseModel):
+    """Request to bill many charges at once"""
+
+    items: list[BillBatchItem] = Field(
+        ..., min_length=1, max_length=MAX_BILL_BATCH_SIZE, description="Charges to apply"
+    )
+
+
+class BillBatchResult(BaseModel):
+    """Outcome of one charge in a batch"""
+
+    user_id: str = Field(..., description="User identifier")
+    idempotency_key: str = Field(..., description="Idempotency key of the charge")
+    status: str = Field(
+        ...,
+        description="'billed', 'duplicate' (already applied), 'insufficient_balance', "
+        "'account_not_found' or 'error' (transient; safe to retry)",
+    )
+    new_balance: Decimal | None = Field(None, description="Balance in USD after the whole batch")
+
+
+class BillBatchResponse(BaseModel):
+    """Response after billing a batch"""
+
+    results: list[BillBatchResult] = Field(..., description="One result per item, in request order")
+
+
+class ReserveRequest(BaseModel):
+    """Request to hold credits for an estimated charge"""
+
+    user_id: str = Field(..., description="User identifier")
+    amount: Decimal = Field(..., description="Amount to hold in USD (rounded up to whole cents)", gt=0)
+    idempotency_key: str = Field(
+        ...,
+        min_length=1,
+        max_length=128,
+        description="Client-chosen key of the hold; pass it as reservation_key when billing",
+    )
+    timeout_seconds: int = Field(
+        DEFAULT_RESERVATION_TIMEOUT_SECONDS,
+        ge=1,
+        le=MAX_RESERVATION_TIMEOUT_SECONDS,
+        description="Seconds after which an unsettled hold is released automatically",
+    )
+
+
+class ReserveResponse(BaseModel):
+    """Response after trying to hold credits"""
+
+    user_id: str = Field(..., description="User identifier")
+    idempotency_key: str = Field(..., description="Key of the hold")
+    reserved: bool = Field(..., description="Whether the hold was placed (False: insufficient balance)")
+    available_balance: Decimal = Field(..., description="Balance in USD not yet spent or held")
+
+
+class ReleaseItem(BaseModel):
+    """One hold to release"""
+
+    user_id: str = Field(..., description="User identifier")
+    reservation_key: str = Field(..., min_length=1, max_length=128, description="Key the hold was placed with")
+
+
+class ReleaseRequest(BaseModel):
+    """Request to release holds that will not be billed"""
+
+    items: list[ReleaseItem] = Field(..., min_length=1, max_length=MAX_BILL_BATCH_SIZE, description="Holds to release")
+
+
+class ReleaseResponse(BaseModel):
+    """Response after releasing holds"""
+
+    released: int = Field(..., description="Holds released (already settled or expired ones are skipped)")
+
+
 class ErrorResponse(BaseModel):
     """Standard error response"""
 
@@ -113,6 +217,9 @@ class UserListResponse(BaseModel):
     total: int = Field(..., description="Total number of users")
     page: int = Field(..., description="Current page number")
     page_size: int = Field(..., description="Number of users per page")
+    next_cursor: str | None = Field(
+        None, description="Cursor for the next page, absent on the last page"
+    )
 
 
 class TransactionRecord(BaseModel):
@@ -134,3 +241,6 @@ class TransactionListResponse(BaseModel):
     total: int = Field(..., description="Total number of transactions")
     page: int = Field(..., description="Current page number")
     page_size: int = Field(..., description="Number of transactions per page")
+    next_cursor: str | None = Field(
+        None, description="Cursor for the next page, absent on the last page"
+    )
@@ -2,6 +2,7 @@
 
 import logging
 import os
+import time
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
@@ -30,6 +31,15 @@ async def lifespan(app: FastAPI):
     tigerbeetle_client = container.get_tigerbeetle_client()
     await tigerbeetle_client.connect()
 
+    # Create the ledger's system account once, instead of checking on every charge
+    await container.get_billing_service().ensure_system_account()
+
+    # Build services and open connections now rather than on the first request
+    if os.getenv("STARTUP_WARM_ENABLED", "true").lower() == "true":
+        started = time.perf_counter()
+        await container.warm()
+        logger.info(f"Services warmed in {(time.perf_counter() - started) * 1000:.0f}ms")
+
     logger.info("Credits Service started successfully")
 
     yield
@@ -37,6 +47,7 @@ async def lifespan(app: FastAPI):
     # Shutdown
     logger.info("Shutting down Credits Service...")
     await tigerbeetle_client.disconnect()
+    await container.shutdown()
     logger.info("Credits Service shutdown complete")
 
 
@@ -49,3 +49,25 @@ class BalanceService(IBalanceService):
         except AccountNotFoundException:
             logger.warning(f"Account not found for user {user_id}")
             raise
+
+    async def get_balances(self, user_ids: list[str]) -> dict[str, Decimal]:
+        """
+        Get current balances for many users with one ledger lookup
+
+        Args:
+            user_ids: User identifiers
+
+        Returns:
+            Balance in USD by user ID; users without an account are absent
+
+        Raises:
+            TigerBeetleException: On lookup errors
+        """
+        account_ids = {user_id: self.client.user_id_to_account_id(user_id) for user_id in user_ids}
+        balances_cents = await self.client.get_account_balances(list(account_ids.values()))
+
+        return {
+            user_id: Decimal(balances_cents[account_id]) / CURRENCY_PRECISION
+            for user_id, account_id in account_ids.items()
+            if account_id in balances_cents
+        }
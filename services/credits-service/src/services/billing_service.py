@@ -3,15 +3,22 @@
 from __future__ import annotations
 
 import logging
-from decimal import Decimal
+from decimal import ROUND_CEILING, Decimal
 
-from ..core.constants import CURRENCY_PRECISION, SYSTEM_ACCOUNT_ID
+from ..core.constants import (
+    CURRENCY_PRECISION,
+    SYSTEM_ACCOUNT_ID,
+    TRANSFER_FLAGS_PENDING,
+    TRANSFER_FLAGS_VOIDING,
+)
 from ..core.exceptions import (
+    AccountAlreadyExistsException,
     AccountNotFoundException,
     InsufficientBalanceException,
     InvalidAmountException,
 )
 from ..core.interfaces import IBillingService, ITransactionLogService, ITigerBeetleClient
+from ..core.models import BillBatchItem, BillBatchResult
 
 logger = logging.getLogger(__name__)
 
@@ -33,23 +40,21 @@ class BillingService(IBillingService):
         """
         self.client = tigerbeetle_client
         self.transaction_log = transaction_log
-        self._system_account_initialized = False
 
-    async def _ensure_system_account(self) -> None:
-        """Ensure system account exists"""
-        if self._system_account_initialized:
-            return
+    async def ensure_system_account(self) -> None:
+        """
+        Ensure the system account exists
 
+        Called once at startup, so billing never checks for it. Creating
+        it is idempotent, so this is a single request whether or not it
+        already exists.
+        """
         try:
-            # Try to get balance to check if it exists
-            await self.client.get_account_balance(SYSTEM_ACCOUNT_ID)
-            self._system_account_initialized = True
-        except AccountNotFoundException:
-            # Create system account with zero balance
             # System account allows overdrafts for "minting" credits
-            logger.info("Creating system account")
             await self.client.create_account(SYSTEM_ACCOUNT_ID, "system", is_system_account=True)
-            self._system_account_initialized = True
+            logger.info("Created system account")
+        except AccountAlreadyExistsException:
+            pass
 
     async def top_up(self, user_id: str, amount: Decimal) -> Decimal:
         """
@@ -71,8 +76,6 @@ class BillingService(IBillingService):
 
         logger.info(f"Top-up ${amount} for user {user_id}")
 
-        await self._ensure_system_account()
-
         account_id = self.client.user_id_to_account_id(user_id)
         amount_cents = int(amount * CURRENCY_PRECISION)
 
@@ -80,15 +83,14 @@ class BillingService(IBillingService):
         transfer_id = self.client.generate_transfer_id()
 
         try:
-            await self.client.create_transfer(
+            # One round trip: the client reads the new balance back itself
+            _, new_balance_cents = await self.client.create_transfer_with_balance(
                 transfer_id=transfer_id,
                 debit_account_id=SYSTEM_ACCOUNT_ID,  # System pays
                 credit_account_id=account_id,  # User receives
                 amount_cents=amount_cents,
+                balance_account_id=account_id,
             )
-
-            # Get new balance
-            new_balance_cents = await self.client.get_account_balance(account_id)
             new_balance = Decimal(new_balance_cents) / CURRENCY_PRECISION
 
             logger.info(f"Top-up successful. New balance for {user_id}: ${new_balance}")
@@ -108,7 +110,13 @@ class BillingService(IBillingService):
             logger.warning(f"Account not found for user {user_id}")
             raise
 
-    async def bill(self, user_id: str, amount: Decimal, description: str | None = None) -> Decimal:
+    async def bill(
+        self,
+        user_id: str,
+        amount: Decimal,
+        description: str | None = None,
+        idempotency_key: str | None = None,
+    ) -> Decimal:
         """
         Bill an account (deduct credits)
 
@@ -116,6 +124,8 @@ class BillingService(IBillingService):
             user_id: User identifier
             amount: Amount to bill in USD
             description: Optional description of the charge
+            idempotency_key: Optional client key; retries with the same key
+                reuse the same transfer ID, so the charge is applied once
 
         Returns:
             New balance in USD
@@ -131,27 +141,31 @@ class BillingService(IBillingService):
         desc_str = f" ({description})" if description else ""
         logger.info(f"Billing ${amount} for user {user_id}{desc_str}")
 
-        await self._ensure_system_account()
-
         account_id = self.client.user_id_to_account_id(user_id)
         amount_cents = int(amount * CURRENCY_PRECISION)
 
         # Transfer from user to system (debit user account)
         # TigerBeetle will atomically check and enforce balance constraints
-        transfer_id = self.client.generate_transfer_id()
+        if idempotency_key:
+            transfer_id = self.client.transfer_id_for_key(f"bill:{user_id}:{idempotency_key}")
+        else:
+            transfer_id = self.client.generate_transfer_id()
 
         try:
-            await self.client.create_transfer(
+            created, new_balance_cents = await self.client.create_transfer_with_balance(
                 transfer_id=transfer_id,
                 debit_account_id=account_id,  # User pays
                 credit_account_id=SYSTEM_ACCOUNT_ID,  # System receives
                 amount_cents=amount_cents,
+                balance_account_id=account_id,
             )
-
-            # Get new balance
-            new_balance_cents = await self.client.get_account_balance(account_id)
             new_balance = Decimal(new_balance_cents) / CURRENCY_PRECISION
 
+            if not created:
+                # Replayed request: the charge and its log entry already exist
+                logger.info(f"Duplicate bill for {user_id} (key {idempotency_key}); already applied")
+                return new_balance
+
             logger.info(f"Billing successful. New balance for {user_id}: ${new_balance}")
 
             # Log the transaction (best-effort; transfer is already committed)
@@ -168,3 +182,209 @@ class BillingService(IBillingService):
         except (AccountNotFoundException, InsufficientBalanceException):
             logger.warning(f"Billing failed for user {user_id}")
             raise
+
+    async def bill_batch(self, items: list[BillBatchItem]) -> list[BillBatchResult]:
+        """
+        Bill many charges with one TigerBeetle request
+
+        The charges are independent transfers: one that fails (insufficient
+        balance, unknown account) does not affect the others. Balances of
+        the users involved are then read back in one lookup, and the new
+        transactions are logged in one commit, so a batch costs two ledger
+        round trips however many charges it carries.
+
+        Args:
+            items: Charges to apply, each with its own idempotency key
+
+        Returns:
+            One result per item, in order
+
+        Raises:
+            InvalidAmountException: If an amount is not positive
+            TigerBeetleException: If the ledger request failed; no outcome is
+                known and the whole batch is safe to retry
+        """
+        if any(item.amount <= 0 for item in items):
+            raise InvalidAmountException("Bill amount must be positive")
+        if not items:
+            return []
+
+        account_ids = [self.client.user_id_to_account_id(item.user_id) for item in items]
+        amounts_cents = [int(item.amount * CURRENCY_PRECISION) for item in items]
+        # Holds are released first, in the same request, so the funds they
+        # held are available to the charges that settle them
+        voids = [
+            self._void_transfer(item.user_id, account_id, item.reservation_key)
+            for item, account_id in zip(items, account_ids)
+            if item.reservation_key
+        ]
+        outcomes = await self.client.create_transfers(
+            voids
+            + [
+                (
+                    self.client.transfer_id_for_key(f"bill:{item.user_id}:{item.idempotency_key}"),
+                    account_id,  # User pays
+                    SYSTEM_ACCOUNT_ID,  # System receives
+                    amount_cents,
+                )
+                for item, account_id, amount_cents in zip(items, account_ids, amounts_cents)
+            ]
+        )
+        # A hold that already expired or was released needs no settling
+        outcomes = outcomes[len(voids) :]
+
+        balances = await self.client.get_account_balances(account_ids)
+
+        results: list[BillBatchResult] = []
+        # Charges applied later in the batch, per account, to reconstruct the
+        # balance right after each one for the transaction log
+        applied_after: dict[int, int] = {}
+        log_entries = []
+        for item, account_id, amount_cents, outcome in reversed(
+            list(zip(items, account_ids, amounts_cents, outcomes))
+        ):
+            new_balance = None
+            if account_id in balances:
+                new_balance = Decimal(balances[account_id]) / CURRENCY_PRECISION
+
+            if outcome is True:
+                status = "billed"
+                balance_after = balances.get(account_id, 0) + applied_after.get(account_id, 0)
+                applied_after[account_id] = applied_after.get(account_id, 0) + amount_cents
+                log_entries.append(
+                    (
+                        item.user_id,
+                        "bill",
+                        Decimal(amount_cents) / CURRENCY_PRECISION,
+                        Decimal(balance_after) / CURRENCY_PRECISION,
+                        item.description,
+                    )
+                )
+            elif outcome is False:
+                status = "duplicate"
+            elif isinstance(outcome, InsufficientBalanceException):
+                status = "insufficient_balance"
+            elif isinstance(outcome, AccountNotFoundException):
+                status = "account_not_found"
+            else:
+                status = "error"
+
+            results.append(
+                BillBatchResult(
+                    user_id=item.user_id,
+                    idempotency_key=item.idempotency_key,
+                    status=status,
+                    new_balance=new_balance,
+                )
+            )
+        results.reverse()
+        log_entries.reverse()
+
+        billed = len(log_entries)
+        logger.info(f"Batch billing: {billed} of {len(items)} charges applied")
+
+        # Log the transactions (best-effort; transfers are already committed)
+        if self.transaction_log is not None and log_entries:
+            try:
+                await self.transaction_log.log_transactions(log_entries)
+            except Exception:
+                logger.exception("Failed to log %d batch bill transactions", billed)
+
+        return results
+
+    def _hold_id(self, user_id: str, reservation_key: str) -> int:
+        return self.client.transfer_id_for_key(f"reserve:{user_id}:{reservation_key}")
+
+    def _void_transfer(self, user_id: str, account_id: int, reservation_key: str) -> tuple[int, ...]:
+        """Transfer releasing a hold; replaying it is a no-op like any other key"""
+        return (
+            self.client.transfer_id_for_key(f"void:{user_id}:{reservation_key}"),
+            account_id,
+            SYSTEM_ACCOUNT_ID,
+            0,  # The whole held amount
+            TRANSFER_FLAGS_VOIDING,
+            self._hold_id(user_id, reservation_key),
+        )
+
+    async def reserve(
+        self, user_id: str, amount: Decimal, idempotency_key: str, timeout_seconds: int
+    ) -> tuple[bool, Decimal]:
+        """
+        Hold credits for an estimated charge
+
+        The hold is a TigerBeetle pending transfer: it counts against the
+        balance immediately, so concurrent requests cannot overspend it, and
+        is released when the charge is billed with the key as its
+        reservation_key, by release(), or automatically after the timeout.
+
+        Args:
+            user_id: User identifier
+            amount: Amount to hold in USD (rounded up to whole cents)
+            idempotency_key: Key of the hold; reserving again with the same
+                key does not place a second hold
+            timeout_seconds: Seconds after which the hold expires
+
+        Returns:
+            Tuple of (whether the hold was placed, available balance in USD)
+
+        Raises:
+            InvalidAmountException: If amount is not positive
+            AccountNotFoundException: If account doesn't exist
+        """
+        if amount <= 0:
+            raise InvalidAmountException("Reservation amount must be positive")
+
+        account_id = self.client.user_id_to_account_id(user_id)
+        # Round up: a hold must never be smaller than the charge it stands for
+        amount_cents = int((amount * CURRENCY_PRECISION).to_integral_value(rounding=ROUND_CEILING))
+
+        (outcome,) = await self.client.create_transfers(
+            [
+                (
+                    self._hold_id(user_id, idempotency_key),
+                    account_id,  # User's credits are held
+                    SYSTEM_ACCOUNT_ID,
+                    amount_cents,
+                    TRANSFER_FLAGS_PENDING,
+                    0,
+                    timeout_seconds,
+                )
+            ]
+        )
+        if isinstance(outcome, InsufficientBalanceException):
+            reserved = False
+        elif isinstance(outcome, Exception):
+            raise outcome
+        else:
+            reserved = True
+
+        balances = await self.client.get_account_balances([account_id], include_pending=True)
+        available = Decimal(balances.get(account_id, 0)) / CURRENCY_PRECISION
+        logger.info(
+            f"Reservation of ${amount} for {user_id}: {'held' if reserved else 'insufficient balance'} "
+            f"(available ${available})"
+        )
+        return reserved, available
+
+    async def release(self, holds: list[tuple[str, str]]) -> int:
+        """
+        Release holds that will not be billed
+
+        Args:
+            holds: (user_id, reservation key) pairs
+
+        Returns:
+            Number of holds released; holds that were already settled,
+            released or expired are skipped
+        """
+        if not holds:
+            return 0
+        outcomes = await self.client.create_transfers(
+            [
+                self._void_transfer(user_id, self.client.user_id_to_account_id(user_id), key)
+                for user_id, key in holds
+            ]
+        )
+        released = outcomes.count(True)
+        logger.info(f"Released {released} of {len(holds)} reservations")
+        return released
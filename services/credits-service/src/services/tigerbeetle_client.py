@@ -1,15 +1,17 @@
 """TigerBeetle client implementation"""
 
+import asyncio
 import hashlib
 import logging
 import uuid
-from typing import Optional
+from typing import Awaitable, Callable, Generic, Optional, TypeVar
 
-from tigerbeetle import ClientAsync, Account, Transfer, AccountFlags, TransferFlags
+from tigerbeetle import ClientAsync, Account, Transfer, AccountFlags, CreateTransferResult, TransferFlags
 
 from ..core.constants import (
     LEDGER_ID,
     ACCOUNT_CODE_USER,
+    TIGERBEETLE_BATCH_WINDOW_SECONDS,
 )
 from ..core.exceptions import (
     TigerBeetleException,
@@ -22,21 +24,139 @@ from ..core.interfaces import ITigerBeetleClient
 
 logger = logging.getLogger(__name__)
 
+# One request carries at most this many events (TigerBeetle's batch limit)
+MAX_BATCH_SIZE = 8189
+
+ItemT = TypeVar("ItemT")
+OutcomeT = TypeVar("OutcomeT")
+
+_ACCOUNT_NOT_FOUND_RESULTS = frozenset(
+    {CreateTransferResult.DEBIT_ACCOUNT_NOT_FOUND, CreateTransferResult.CREDIT_ACCOUNT_NOT_FOUND}
+)
+# Voiding a hold that is already gone: expected when it timed out or was settled
+_HOLD_GONE_RESULTS = frozenset(
+    {
+        CreateTransferResult.PENDING_TRANSFER_NOT_FOUND,
+        CreateTransferResult.PENDING_TRANSFER_EXPIRED,
+        CreateTransferResult.PENDING_TRANSFER_ALREADY_VOIDED,
+        CreateTransferResult.PENDING_TRANSFER_ALREADY_POSTED,
+    }
+)
+
+
+class _Batcher(Generic[ItemT, OutcomeT]):
+    """Coalesces concurrent single operations into batched requests
+
+    Operations submitted within `window` seconds of the first pending one are
+    sent together through `run_batch`, which takes the queued items and
+    returns one outcome per item, in order. Each caller gets its own item's
+    outcome, e.g. a result or the exception rejecting that item alone. If the
+    request as a whole fails, every caller in the batch gets the error raised.
+    With no window, each operation is sent on its own.
+    """
+
+    def __init__(
+        self,
+        run_batch: Callable[[list[ItemT]], Awaitable[list[OutcomeT]]],
+        window: float | None,
+        max_size: int = MAX_BATCH_SIZE,
+    ) -> None:
+        self._run_batch = run_batch
+        self._window = window
+        self._max_size = max_size
+        self._pending: list[tuple[ItemT, asyncio.Future[OutcomeT]]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._in_flight: set[asyncio.Task] = set()
+
+    async def submit(self, item: ItemT) -> OutcomeT:
+        """Queue one operation and wait for its outcome"""
+        if self._window is None:
+            (outcome,) = await self._run_batch([item])
+            return outcome
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future[OutcomeT] = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self._max_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self._window, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        task = asyncio.create_task(self._send(batch))
+        self._in_flight.add(task)
+        task.add_done_callback(self._in_flight.discard)
+
+    async def _send(self, batch: list[tuple[ItemT, asyncio.Future[OutcomeT]]]) -> None:
+        try:
+            outcomes = await self._run_batch([item for item, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), outcome in zip(batch, outcomes):
+            # A caller that was cancelled no longer waits for its outcome
+            if not future.done():
+                future.set_result(outcome)
+
+    async def drain(self) -> None:
+        """Send everything queued and wait for all batches in flight"""
+        self._flush()
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight, return_exceptions=True)
+
 
 class TigerBeetleClient(ITigerBeetleClient):
-    """TigerBeetle client for ledger operations"""
+    """TigerBeetle client for ledger operations
+
+    TigerBeetle is built for batches of thousands of events per round trip.
+    Single transfers, account creations and balance lookups from concurrent
+    requests are therefore queued and coalesced into one create_transfers,
+    create_accounts or lookup_accounts request per batch window, and each
+    caller gets its own item's result or error back.
+
+    The client also keeps the posted balance of every account it has looked
+    up or created, and applies its own transfers to it as they succeed. A
+    transfer can then report the balance after it without a second round
+    trip. This holds while this client is the only writer to the ledger.
+    """
 
-    def __init__(self, cluster_id: int = 0, addresses: str = "3000"):
+    def __init__(
+        self,
+        cluster_id: int = 0,
+        addresses: str = "3000",
+        batch_window: float | None = TIGERBEETLE_BATCH_WINDOW_SECONDS,
+        track_balances: bool = False,
+    ):
         """
         Initialize TigerBeetle client
 
         Args:
             cluster_id: TigerBeetle cluster ID
             addresses: TigerBeetle server addresses (e.g., "3000" or "localhost:3000")
+            batch_window: Seconds single operations wait for others to share
+                their request; 0 batches only operations queued in the same
+                event loop iteration, None sends each one on its own
+            track_balances: Keep posted balances up to date from this
+                client's own transfers instead of looking them up; only
+                safe when no other process writes to the ledger, since
+                nothing refreshes a tracked balance
         """
         self.cluster_id = cluster_id
         self.addresses = addresses
         self._client: Optional[ClientAsync] = None
+        self._transfer_batcher = _Batcher(self.create_transfers, batch_window)
+        self._account_batcher = _Batcher(self._create_accounts, batch_window)
+        self._lookup_batcher = _Batcher(self._lookup_balances, batch_window)
+        # Posted balance in cents by account ID, when tracking
+        self._balances: dict[int, int] | None = {} if track_balances else None
 
     async def connect(self) -> None:
         """Connect to TigerBeetle"""
@@ -49,7 +169,9 @@ class TigerBeetleClient(ITigerBeetleClient):
             raise DatabaseConnectionException(f"Failed to connect to TigerBeetle: {e}") from e
 
     async def disconnect(self) -> None:
-        """Disconnect from TigerBeetle"""
+        """Disconnect from TigerBeetle, after sending the operations still queued"""
+        for batcher in (self._transfer_batcher, self._account_batcher, self._lookup_batcher):
+            await batcher.drain()
         if self._client:
             try:
                 await self._client.close()
@@ -95,54 +217,71 @@ class TigerBeetleClient(ITigerBeetleClient):
             Use create_transfer() to set an initial balance after creation.
             User accounts enforce DEBITS_MUST_NOT_EXCEED_CREDITS to prevent overdrafts.
         """
+        self._ensure_connected()
+
+        # TigerBeetle requires accounts to be created with zero balance
+        # Initial balance must be set via transfers after creation
+
+        # User accounts: Prevent overdrafts by enforcing debits <= credits
+        # System account: Allow unlimited debits for "minting" credits
+        if is_system_account:
+            flags = AccountFlags.NONE  # System can overdraft (mint credits)
+        else:
+            flags = AccountFlags.DEBITS_MUST_NOT_EXCEED_CREDITS  # Users cannot overdraft
+
+        account = Account(
+            id=account_id,
+            debits_pending=0,
+            debits_posted=0,
+            credits_pending=0,
+            credits_posted=0,  # Must be zero on creation
+            user_data_128=0,  # Could store user metadata here
+            user_data_64=0,
+            user_data_32=0,
+            ledger=LEDGER_ID,  # USD ledger
+            code=ACCOUNT_CODE_USER,  # User account type
+            flags=flags,
+            timestamp=0,  # Let TigerBeetle set the timestamp
+        )
+
+        error = await self._account_batcher.submit(account)
+        if isinstance(error, AccountAlreadyExistsException):
+            raise AccountAlreadyExistsException(
+                f"Account for user {user_id} already exists"
+            ) from None
+        if error is not None:
+            raise error
+
+        logger.info(f"Created account {account_id} for user {user_id}")
+
+    async def _create_accounts(self, accounts: list[Account]) -> list[Exception | None]:
+        """Create accounts in one request; None or the exception per account, in order"""
         client = self._ensure_connected()
-
+        outcomes: list[Exception | None] = [None] * len(accounts)
         try:
-            # TigerBeetle requires accounts to be created with zero balance
-            # Initial balance must be set via transfers after creation
-
-            # User accounts: Prevent overdrafts by enforcing debits <= credits
-            # System account: Allow unlimited debits for "minting" credits
-            if is_system_account:
-                flags = AccountFlags.NONE  # System can overdraft (mint credits)
-            else:
-                flags = AccountFlags.DEBITS_MUST_NOT_EXCEED_CREDITS  # Users cannot overdraft
-
-            account = Account(
-                id=account_id,
-                debits_pending=0,
-                debits_posted=0,
-                credits_pending=0,
-                credits_posted=0,  # Must be zero on creation
-                user_data_128=0,  # Could store user metadata here
-                user_data_64=0,
-                user_data_32=0,
-                ledger=LEDGER_ID,  # USD ledger
-                code=ACCOUNT_CODE_USER,  # User account type
-                flags=flags,
-                timestamp=0,  # Let TigerBeetle set the timestamp
-            )
-
-            errors = await client.create_accounts([account])
-
-            if errors:
-                error = errors[0]
-                # Check for account already exists errors (21 = EXISTS, 25 = exists_with_different_flags)
-                if error.result in (21, 25):
-                    logger.warning(f"Account {account_id} already exists")
-                    raise AccountAlreadyExistsException(f"Account for user {user_id} already exists")
-                else:
-                    logger.error(f"TigerBeetle error creating account: {error}")
-                    raise TigerBeetleException(f"Failed to create account: {error}")
-
-            logger.info(f"Created account {account_id} for user {user_id}")
-
-        except (AccountAlreadyExistsException, TigerBeetleException):
-            raise
+            errors = await client.create_accounts(accounts)
         except Exception as e:
-            logger.error(f"Unexpected error creating account: {e}")
+            logger.error(f"Unexpected error creating accounts: {e}")
             raise TigerBeetleException(f"Unexpected error creating account: {e}") from e
 
+        # Only failed events are reported, by index into the request
+        for error in errors:
+            account_id = accounts[error.index].id
+            # Check for account already exists errors (21 = EXISTS, 25 = exists_with_different_flags)
+            if error.result in (21, 25):
+                logger.warning(f"Account {account_id} already exists")
+                outcomes[error.index] = AccountAlreadyExistsException(
+                    f"Account {account_id} already exists"
+                )
+            else:
+                logger.error(f"TigerBeetle error creating account: {error}")
+                outcomes[error.index] = TigerBeetleException(f"Failed to create account: {error}")
+        if self._balances is not None:
+            for account, outcome in zip(accounts, outcomes):
+                if outcome is None:
+                    self._balances[account.id] = 0
+        return outcomes
+
     async def get_account_balance(self, account_id: int) -> int:
         """
         Get account balance in cents
@@ -154,27 +293,133 @@ class TigerBeetleClient(ITigerBeetleClient):
             AccountNotFoundException: If account doesn't exist
             TigerBeetleException: On other errors
         """
-        client = self._ensure_connected()
+        self._ensure_connected()
+
+        balance = await self._lookup_batcher.submit(account_id)
+        if isinstance(balance, Exception):
+            raise balance
+
+        logger.debug(f"Account {account_id} balance: {balance} cents")
+        return balance
+
+    async def _lookup_balances(self, account_ids: list[int]) -> list[int | Exception]:
+        """Look up posted balances in one request; the balance or the exception per ID, in order"""
+        balances = await self.get_account_balances(account_ids)
+        outcomes: list[int | Exception] = []
+        for account_id in account_ids:
+            if account_id in balances:
+                outcomes.append(balances[account_id])
+            else:
+                logger.warning(f"Account {account_id} not found")
+                outcomes.append(AccountNotFoundException(f"Account {account_id} not found"))
+        return outcomes
 
-        try:
-            accounts = await client.lookup_accounts([account_id])
+    def _transfer(
+        self,
+        transfer_id: int,
+        debit_account_id: int,
+        credit_account_id: int,
+        amount_cents: int,
+        flags: int = TransferFlags.NONE,
+        pending_id: int = 0,
+        timeout: int = 0,
+    ) -> Transfer:
+        return Transfer(
+            id=transfer_id,
+            debit_account_id=debit_account_id,
+            credit_account_id=credit_account_id,
+            amount=amount_cents,
+            pending_id=pending_id,
+            user_data_128=0,
+            user_data_64=0,
+            user_data_32=0,
+            timeout=timeout,
+            ledger=LEDGER_ID,
+            code=1,  # Standard transfer code
+            flags=TransferFlags(flags),
+            timestamp=0,
+        )
+
+    @staticmethod
+    def _transfer_outcome(result: int, transfer: Transfer) -> bool | Exception:
+        """Map a create_transfers error result to True/False or an exception"""
+        # Same ID with the same fields: already applied, nothing to do
+        if result == CreateTransferResult.EXISTS:
+            logger.info(f"Transfer {transfer.id} already exists; treating as replay")
+            return False
+        if result in _ACCOUNT_NOT_FOUND_RESULTS:
+            logger.warning(f"Account not found for transfer {transfer.id}")
+            return AccountNotFoundException("Account not found for transfer")
+        if result == CreateTransferResult.EXCEEDS_CREDITS:
+            logger.warning(f"Insufficient balance for transfer {transfer.id}")
+            return InsufficientBalanceException(
+                f"Insufficient balance for account {transfer.debit_account_id}"
+            )
+        if result in _HOLD_GONE_RESULTS:
+            logger.info(f"Hold {transfer.pending_id} not released: {CreateTransferResult(result).name}")
+        else:
+            logger.error(f"TigerBeetle error creating transfer {transfer.id}: {CreateTransferResult(result).name}")
+        return TigerBeetleException(f"Failed to create transfer: {CreateTransferResult(result).name}")
+
+    def _track_transfers(self, transfers: list[Transfer], outcomes: list[bool | Exception]) -> None:
+        """Apply the created transfers to the tracked posted balances"""
+        if self._balances is None:
+            return
+        for transfer, outcome in zip(transfers, outcomes):
+            # Holds and their release only move pending amounts
+            if outcome is not True or transfer.flags != TransferFlags.NONE:
+                continue
+            if transfer.debit_account_id in self._balances:
+                self._balances[transfer.debit_account_id] -= transfer.amount
+            if transfer.credit_account_id in self._balances:
+                self._balances[transfer.credit_account_id] += transfer.amount
+
+    async def create_transfers(self, transfers: list[tuple[int, ...]]) -> list[bool | Exception]:
+        """
+        Create independent transfers in as few requests as possible
 
-            if not accounts:
-                logger.warning(f"Account {account_id} not found")
-                raise AccountNotFoundException(f"Account {account_id} not found")
+        Args:
+            transfers: (transfer_id, debit_account_id, credit_account_id,
+                amount_cents[, flags, pending_id, timeout_seconds]) tuples,
+                applied in order; one failing does not affect the others.
+                flags are TRANSFER_FLAGS_* values, e.g. PENDING to place a
+                hold that expires after timeout_seconds, or VOIDING (with
+                the hold's ID as pending_id) to release it
 
-            account = accounts[0]
-            # Balance = credits - debits
-            balance_cents = account.credits_posted - account.debits_posted
+        Returns:
+            One outcome per transfer, in order: True if created, False if an
+            identical transfer with this ID already existed (an idempotent
+            replay), or the exception explaining why it was rejected
+            (AccountNotFoundException, InsufficientBalanceException or
+            TigerBeetleException)
 
-            logger.debug(f"Account {account_id} balance: {balance_cents} cents")
-            return balance_cents
+        Raises:
+            TigerBeetleException: If the request itself failed, in which case
+                none of the outcomes are known
+        """
+        client = self._ensure_connected()
+        outcomes: list[bool | Exception] = []
 
-        except AccountNotFoundException:
-            raise
+        try:
+            for offset in range(0, len(transfers), MAX_BATCH_SIZE):
+                chunk = [self._transfer(*t) for t in transfers[offset : offset + MAX_BATCH_SIZE]]
+                chunk_outcomes: list[bool | Exception] = [True] * len(chunk)
+                # Only failed events are reported, by index into the request
+                for error in await client.create_transfers(chunk):
+                    chunk_outcomes[error.index] = self._transfer_outcome(error.result, chunk[error.index])
+                self._track_transfers(chunk, chunk_outcomes)
+                outcomes.extend(chunk_outcomes)
         except Exception as e:
-            logger.error(f"Error getting account balance: {e}")
-            raise TigerBeetleException(f"Error getting account balance: {e}") from e
+            if self._balances is not None:
+                # Which transfers were applied is unknown; look the accounts up again
+                for t in transfers[len(outcomes) :]:
+                    self._balances.pop(t[1], None)
+                    self._balances.pop(t[2], None)
+            logger.error(f"Unexpected error creating transfers: {e}")
+            raise TigerBeetleException(f"Unexpected error creating transfers: {e}") from e
+
+        logger.debug(f"Created {outcomes.count(True)} of {len(transfers)} transfers")
+        return outcomes
 
     async def create_transfer(
         self,
@@ -182,7 +427,7 @@ class TigerBeetleClient(ITigerBeetleClient):
         debit_account_id: int,
         credit_account_id: int,
         amount_cents: int,
-    ) -> None:
+    ) -> bool:
         """
         Create a transfer between accounts
 
@@ -192,56 +437,109 @@ class TigerBeetleClient(ITigerBeetleClient):
             credit_account_id: Account to credit (receiver)
             amount_cents: Amount in cents
 
+        Returns:
+            True if the transfer was created, False if an identical transfer
+            with this ID already existed (an idempotent replay)
+
         Raises:
             AccountNotFoundException: If either account doesn't exist
             InsufficientBalanceException: If debit account has insufficient balance
             TigerBeetleException: On other transfer errors
         """
-        client = self._ensure_connected()
-
-        try:
-            transfer = Transfer(
-                id=transfer_id,
-                debit_account_id=debit_account_id,
-                credit_account_id=credit_account_id,
-                amount=amount_cents,
-                pending_id=0,
-                user_data_128=0,
-                user_data_64=0,
-                user_data_32=0,
-                timeout=0,
-                ledger=LEDGER_ID,
-                code=1,  # Standard transfer code
-                flags=TransferFlags.NONE,
-                timestamp=0,
-            )
-
-            errors = await client.create_transfers([transfer])
-
-            if errors:
-                error = errors[0]
-                # Check for account not found errors
-                if error.result in (15, 22):  # DEBIT_ACCOUNT_NOT_FOUND, CREDIT_ACCOUNT_NOT_FOUND
-                    logger.warning(f"Account not found for transfer: {error}")
-                    raise AccountNotFoundException("Account not found for transfer")
-                # Check for insufficient balance
-                elif error.result == 35:  # DEBITS_WOULD_EXCEED_CREDITS
-                    logger.warning(f"Insufficient balance for transfer: {error}")
-                    raise InsufficientBalanceException(f"Insufficient balance for account {debit_account_id}")
-                else:
-                    logger.error(f"TigerBeetle error creating transfer: {error}")
-                    raise TigerBeetleException(f"Failed to create transfer: {error}")
-
+        self._ensure_connected()
+        outcome: bool | Exception = await self._transfer_batcher.submit(
+            (transfer_id, debit_account_id, credit_account_id, amount_cents)
+        )
+        if isinstance(outcome, Exception):
+            raise outcome
+        if outcome:
             logger.info(
                 f"Created transfer {transfer_id}: {amount_cents} cents from {debit_account_id} to {credit_account_id}"
             )
+        return outcome
 
-        except (TigerBeetleException, AccountNotFoundException, InsufficientBalanceException):
-            raise
+    async def create_transfer_with_balance(
+        self,
+        transfer_id: int,
+        debit_account_id: int,
+        credit_account_id: int,
+        amount_cents: int,
+        balance_account_id: int,
+    ) -> tuple[bool, int]:
+        """
+        Create a transfer and read back the balance of one of its accounts
+
+        A client tracking balances takes it from the tracked posted
+        balances, so this is one round trip; only an account not seen
+        before costs a lookup afterwards. Otherwise it is looked up.
+
+        Args:
+            transfer_id: Unique transfer ID
+            debit_account_id: Account to debit (sender)
+            credit_account_id: Account to credit (receiver)
+            amount_cents: Amount in cents
+            balance_account_id: Account whose balance to return
+
+        Returns:
+            Tuple of (whether the transfer was created, balance in cents of
+            balance_account_id after it)
+
+        Raises:
+            AccountNotFoundException: If either account doesn't exist
+            InsufficientBalanceException: If debit account has insufficient balance
+            TigerBeetleException: On other transfer errors
+        """
+        created = await self.create_transfer(
+            transfer_id, debit_account_id, credit_account_id, amount_cents
+        )
+        if self._balances is not None and balance_account_id in self._balances:
+            return created, self._balances[balance_account_id]
+        return created, await self.get_account_balance(balance_account_id)
+
+    async def get_account_balances(self, account_ids: list[int], include_pending: bool = False) -> dict[int, int]:
+        """
+        Get the balances of many accounts in one lookup
+
+        Args:
+            account_ids: Accounts to look up (duplicates are fine)
+            include_pending: Also deduct pending debits (holds), giving the
+                balance still available to spend
+
+        Returns:
+            Balance in cents by account ID; accounts that don't exist are absent
+
+        Raises:
+            TigerBeetleException: On lookup errors
+        """
+        client = self._ensure_connected()
+        unique_ids = list(dict.fromkeys(account_ids))
+        balances: dict[int, int] = {}
+
+        try:
+            for offset in range(0, len(unique_ids), MAX_BATCH_SIZE):
+                for account in await client.lookup_accounts(unique_ids[offset : offset + MAX_BATCH_SIZE]):
+                    balance = account.credits_posted - account.debits_posted
+                    if self._balances is not None:
+                        self._balances[account.id] = balance
+                    if include_pending:
+                        balance -= account.debits_pending
+                    balances[account.id] = balance
         except Exception as e:
-            logger.error(f"Unexpected error creating transfer: {e}")
-            raise TigerBeetleException(f"Unexpected error creating transfer: {e}") from e
+            logger.error(f"Error getting account balances: {e}")
+            raise TigerBeetleException(f"Error getting account balances: {e}") from e
+
+        return balances
 
     def generate_transfer_id(self) -> int:
         """Generate a unique 128-bit transfer ID using UUID4"""
         return uuid.uuid4().int
+
+    def transfer_id_for_key(self, idempotency_key: str) -> int:
+        """
+        Derive a deterministic 128-bit transfer ID from an idempotency key
+
+        Retrying a request with the same key produces the same transfer ID,
+        which TigerBeetle rejects as already existing instead of applying twice.
+        """
+        hash_bytes = hashlib.sha256(f"transfer:{idempotency_key}".encode()).digest()
+        return int.from_bytes(hash_bytes[:16], byteorder="big") or 1
@@ -2,13 +2,13 @@
 
 from __future__ import annotations
 
-import asyncio
 import logging
-import os
-import sqlite3
 from datetime import datetime, timezone
 from decimal import Decimal
 
+from shared.pagination import TotalCache, decode_cursor, encode_cursor
+from shared.sqlite import SQLiteDatabase
+
 from ..core.constants import CURRENCY_PRECISION
 from ..core.interfaces import ITransactionLogService
 
@@ -20,66 +20,70 @@ class TransactionLogService(ITransactionLogService):
 
     def __init__(self, db_path: str = "data/transaction_log.db"):
         self.db_path = db_path
-        self._ensure_db()
+        self._db = SQLiteDatabase(db_path)
+        self._totals = TotalCache()
+        self._db.write_sync(self._ensure_db)
+
+    async def warm(self) -> None:
+        """Open the pooled database connections ahead of the first query"""
+        await self._db.warm()
+
+    def close(self) -> None:
+        """Close the pooled database connections"""
+        self._db.close()
 
     def _ensure_db(self) -> None:
         """Create database and table if they don't exist"""
-        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
-        conn = sqlite3.connect(self.db_path)
-        try:
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS transactions (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id TEXT NOT NULL,
-                    type TEXT NOT NULL,
-                    amount_cents INTEGER NOT NULL,
-                    description TEXT,
-                    balance_after_cents INTEGER NOT NULL,
-                    created_at TEXT NOT NULL
-                )
-            """)
-            conn.execute("""
-                CREATE INDEX IF NOT EXISTS idx_transactions_user_id
-                ON transactions (user_id)
-            """)
-            conn.commit()
-        finally:
-            conn.close()
-
-    def _log_transaction_sync(
-        self,
-        user_id: str,
-        tx_type: str,
-        amount: Decimal,
-        balance_after: Decimal,
-        description: str | None,
+        conn = self._db.connection()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS transactions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id TEXT NOT NULL,
+                type TEXT NOT NULL,
+                amount_cents INTEGER NOT NULL,
+                description TEXT,
+                balance_after_cents INTEGER NOT NULL,
+                created_at TEXT NOT NULL
+            )
+        """)
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_transactions_user_id
+            ON transactions (user_id)
+        """)
+        conn.commit()
+
+    @staticmethod
+    def _to_cents(value: Decimal, name: str) -> int:
+        scaled = value * CURRENCY_PRECISION
+        if scaled != int(scaled):
+            raise ValueError(f"{name} must be whole cents, got {value}")
+        return int(scaled)
+
+    def _log_transactions_sync(
+        self, entries: list[tuple[str, str, Decimal, Decimal, str | None]]
     ) -> None:
-        amount_scaled = amount * CURRENCY_PRECISION
-        balance_scaled = balance_after * CURRENCY_PRECISION
-        if amount_scaled != int(amount_scaled):
-            raise ValueError(f"amount must be whole cents, got {amount}")
-        if balance_scaled != int(balance_scaled):
-            raise ValueError(f"balance_after must be whole cents, got {balance_after}")
-        amount_cents = int(amount_scaled)
-        balance_after_cents = int(balance_scaled)
-        conn = sqlite3.connect(self.db_path)
-        try:
-            conn.execute(
-                """INSERT INTO transactions
-                   (user_id, type, amount_cents, description, balance_after_cents, created_at)
-                   VALUES (?, ?, ?, ?, ?, ?)""",
-                (
-                    user_id,
-                    tx_type,
-                    amount_cents,
-                    description,
-                    balance_after_cents,
-                    datetime.now(timezone.utc).isoformat(),
-                ),
+        created_at = datetime.now(timezone.utc).isoformat()
+        rows = [
+            (
+                user_id,
+                tx_type,
+                self._to_cents(amount, "amount"),
+                description,
+                self._to_cents(balance_after, "balance_after"),
+                created_at,
             )
-            conn.commit()
-        finally:
-            conn.close()
+            for user_id, tx_type, amount, balance_after, description in entries
+        ]
+        conn = self._db.connection()
+        conn.executemany(
+            """INSERT INTO transactions
+               (user_id, type, amount_cents, description, balance_after_cents, created_at)
+               VALUES (?, ?, ?, ?, ?, ?)""",
+            rows,
+        )
+        conn.commit()
+        for user_id in {row[0] for row in rows}:
+            self._totals.invalidate(user_id)
 
     async def log_transaction(
         self,
@@ -90,38 +94,58 @@ class TransactionLogService(ITransactionLogService):
         description: str | None = None,
     ) -> None:
         """Log a transaction"""
-        await asyncio.to_thread(
-            self._log_transaction_sync, user_id, tx_type, amount, balance_after, description
+        await self._db.write(
+            self._log_transactions_sync, [(user_id, tx_type, amount, balance_after, description)]
         )
 
+    async def log_transactions(
+        self, entries: list[tuple[str, str, Decimal, Decimal, str | None]]
+    ) -> None:
+        """Log (user_id, tx_type, amount, balance_after, description) entries in one commit"""
+        if entries:
+            await self._db.write(self._log_transactions_sync, entries)
+
     def _get_transactions_sync(
-        self, user_id: str, page: int, page_size: int
-    ) -> tuple[list[dict], int]:
+        self, user_id: str, page: int, page_size: int, cursor: str | None = None
+    ) -> tuple[list[dict], int, str | None]:
         page = max(1, page)
         page_size = max(1, min(100, page_size))
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        try:
-            total = conn.execute(
+        conn = self._db.connection()
+        total = self._totals.get_or_compute(
+            user_id,
+            lambda: conn.execute(
                 "SELECT COUNT(*) FROM transactions WHERE user_id = ?", (user_id,)
-            ).fetchone()[0]
+            ).fetchone()[0],
+        )
+        # idx_transactions_user_id carries the rowid, so seeking past the
+        # cursor's id is an index range scan rather than an OFFSET skip
+        if cursor is not None:
+            (last_id,) = decode_cursor(cursor, 1)
+            rows = conn.execute(
+                "SELECT * FROM transactions WHERE user_id = ? AND id < ? "
+                "ORDER BY id DESC LIMIT ?",
+                (user_id, last_id, page_size),
+            ).fetchall()
+        else:
             offset = (page - 1) * page_size
             rows = conn.execute(
                 "SELECT * FROM transactions WHERE user_id = ? ORDER BY id DESC LIMIT ? OFFSET ?",
                 (user_id, page_size, offset),
             ).fetchall()
-            result = []
-            for row in rows:
-                d = dict(row)
-                d["amount"] = Decimal(d.pop("amount_cents")) / CURRENCY_PRECISION
-                d["balance_after"] = Decimal(d.pop("balance_after_cents")) / CURRENCY_PRECISION
-                result.append(d)
-            return result, total
-        finally:
-            conn.close()
+        result = []
+        for row in rows:
+            d = dict(row)
+            d["amount"] = Decimal(d.pop("amount_cents")) / CURRENCY_PRECISION
+            d["balance_after"] = Decimal(d.pop("balance_after_cents")) / CURRENCY_PRECISION
+            result.append(d)
+        next_cursor = encode_cursor(result[-1]["id"]) if len(result) == page_size else None
+        return result, total, next_cursor
 
     async def get_transactions(
-        self, user_id: str, page: int = 1, page_size: int = 20
-    ) -> tuple[list[dict], int]:
-        """Get transactions for a user with pagination"""
-        return await asyncio.to_thread(self._get_transactions_sync, user_id, page, page_size)
+        self, user_id: str, page: int = 1, page_size: int = 20, cursor: str | None = None
+    ) -> tuple[list[dict], int, str | None]:
+        """Get transactions for a user with page or cursor pagination"""
+        listing: tuple[list[dict], int, str | None] = await self._db.read(
+            self._get_transactions_sync, user_id, page, page_size, cursor
+        )
+        return listing
@@ -2,12 +2,12 @@
 
 from __future__ import annotations
 
-import asyncio
 import logging
-import os
-import sqlite3
 from datetime import datetime, timezone
 
+from shared.pagination import TotalCache, decode_cursor, encode_cursor
+from shared.sqlite import SQLiteDatabase
+
 from ..core.interfaces import IUserRegistryService
 
 logger = logging.getLogger(__name__)
@@ -18,80 +18,104 @@ class UserRegistryService(IUserRegistryService):
 
     def __init__(self, db_path: str = "data/user_registry.db"):
         self.db_path = db_path
-        self._ensure_db()
+        self._db = SQLiteDatabase(db_path)
+        self._totals = TotalCache()
+        self._db.write_sync(self._ensure_db)
+
+    async def warm(self) -> None:
+        """Open the pooled database connections ahead of the first query"""
+        await self._db.warm()
+
+    def close(self) -> None:
+        """Close the pooled database connections"""
+        self._db.close()
 
     def _ensure_db(self) -> None:
         """Create database and table if they don't exist"""
-        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
-        conn = sqlite3.connect(self.db_path)
-        try:
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS users (
-                    user_id TEXT PRIMARY KEY,
-                    display_name TEXT,
-                    created_at TEXT NOT NULL
-                )
-            """)
-            conn.commit()
-        finally:
-            conn.close()
+        conn = self._db.connection()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS users (
+                user_id TEXT PRIMARY KEY,
+                display_name TEXT,
+                created_at TEXT NOT NULL
+            )
+        """)
+        # Matches the listing order (user_id breaks created_at ties) so
+        # both OFFSET and cursor pages read the index in order
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_users_created_at
+            ON users (created_at, user_id)
+        """)
+        conn.commit()
 
     def _register_user_sync(self, user_id: str, display_name: str | None = None) -> None:
-        conn = sqlite3.connect(self.db_path)
-        try:
-            conn.execute(
-                "INSERT OR IGNORE INTO users (user_id, display_name, created_at) VALUES (?, ?, ?)",
-                (user_id, display_name, datetime.now(timezone.utc).isoformat()),
-            )
-            conn.commit()
-        finally:
-            conn.close()
+        conn = self._db.connection()
+        conn.execute(
+            "INSERT OR IGNORE INTO users (user_id, display_name, created_at) VALUES (?, ?, ?)",
+            (user_id, display_name, datetime.now(timezone.utc).isoformat()),
+        )
+        conn.commit()
+        self._totals.invalidate()
 
     async def register_user(self, user_id: str, display_name: str | None = None) -> None:
         """Register a user in the registry"""
-        await asyncio.to_thread(self._register_user_sync, user_id, display_name)
+        await self._db.write(self._register_user_sync, user_id, display_name)
 
     def _get_user_sync(self, user_id: str) -> dict | None:
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        try:
-            row = conn.execute("SELECT * FROM users WHERE user_id = ?", (user_id,)).fetchone()
-            return dict(row) if row else None
-        finally:
-            conn.close()
+        conn = self._db.connection()
+        row = conn.execute("SELECT * FROM users WHERE user_id = ?", (user_id,)).fetchone()
+        return dict(row) if row else None
 
     async def get_user(self, user_id: str) -> dict | None:
         """Get user info by ID"""
-        return await asyncio.to_thread(self._get_user_sync, user_id)
+        user: dict | None = await self._db.read(self._get_user_sync, user_id)
+        return user
 
-    def _list_users_sync(self, page: int, page_size: int) -> tuple[list[dict], int]:
+    def _list_users_sync(
+        self, page: int, page_size: int, cursor: str | None = None
+    ) -> tuple[list[dict], int, str | None]:
         page = max(1, page)
         page_size = max(1, min(100, page_size))
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        try:
-            total = conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+        conn = self._db.connection()
+        total = self._totals.get_or_compute(
+            "users", lambda: conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+        )
+        if cursor is not None:
+            created_at, last_user_id = decode_cursor(cursor, 2)
+            rows = conn.execute(
+                "SELECT * FROM users WHERE (created_at, user_id) < (?, ?) "
+                "ORDER BY created_at DESC, user_id DESC LIMIT ?",
+                (created_at, last_user_id, page_size),
+            ).fetchall()
+        else:
             offset = (page - 1) * page_size
             rows = conn.execute(
-                "SELECT * FROM users ORDER BY created_at DESC LIMIT ? OFFSET ?",
+                "SELECT * FROM users ORDER BY created_at DESC, user_id DESC LIMIT ? OFFSET ?",
                 (page_size, offset),
             ).fetchall()
-            return [dict(row) for row in rows], total
-        finally:
-            conn.close()
-
-    async def list_users(self, page: int = 1, page_size: int = 20) -> tuple[list[dict], int]:
-        """List users with pagination"""
-        return await asyncio.to_thread(self._list_users_sync, page, page_size)
+        users = [dict(row) for row in rows]
+        next_cursor = (
+            encode_cursor(users[-1]["created_at"], users[-1]["user_id"])
+            if len(users) == page_size
+            else None
+        )
+        return users, total, next_cursor
+
+    async def list_users(
+        self, page: int = 1, page_size: int = 20, cursor: str | None = None
+    ) -> tuple[list[dict], int, str | None]:
+        """List users with page or cursor pagination"""
+        listing: tuple[list[dict], int, str | None] = await self._db.read(
+            self._list_users_sync, page, page_size, cursor
+        )
+        return listing
 
     def _user_exists_sync(self, user_id: str) -> bool:
-        conn = sqlite3.connect(self.db_path)
-        try:
-            row = conn.execute("SELECT 1 FROM users WHERE user_id = ?", (user_id,)).fetchone()
-            return row is not None
-        finally:
-            conn.close()
+        conn = self._db.connection()
+        row = conn.execute("SELECT 1 FROM users WHERE user_id = ?", (user_id,)).fetchone()
+        return row is not None
 
     async def user_exists(self, user_id: str) -> bool:
         """Check if a user is registered"""
-        return await asyncio.to_thread(self._user_exists_sync, user_id)
+        exists: bool = await self._db.read(self._user_exists_sync, user_id)
+        return exists
@@ -137,3 +137,76 @@ class TestEndToEndFlow:
         assert response.status_code == 404
 
         print("✓ Operations on non-existent account correctly rejected")
+
+    async def test_batch_bill(self, client: AsyncClient):
+        """Test that a batch bills each charge independently and once per key"""
+        funded = f"test_user_{uuid.uuid4().hex[:16]}"
+        broke = f"test_user_{uuid.uuid4().hex[:16]}"
+        for user_id in (funded, broke):
+            response = await client.post("/api/v1/accounts", json={"user_id": user_id, "initial_balance": 0.0})
+            assert response.status_code == 201
+        response = await client.post("/api/v1/topup", json={"user_id": funded, "amount": 10.0})
+        assert response.status_code == 200
+
+        batch = {
+            "items": [
+                {"user_id": funded, "amount": 1.0, "idempotency_key": "req-1"},
+                {"user_id": broke, "amount": 1.0, "idempotency_key": "req-2"},
+                {"user_id": funded, "amount": 2.0, "idempotency_key": "req-3"},
+            ]
+        }
+        response = await client.post("/api/v1/bill/batch", json=batch)
+        assert response.status_code == 200, f"Failed to bill batch: {response.text}"
+        results = response.json()["results"]
+        assert [r["status"] for r in results] == ["billed", "insufficient_balance", "billed"]
+        assert Decimal(str(results[0]["new_balance"])) == Decimal("7.00")
+
+        # Replaying the batch changes nothing
+        response = await client.post("/api/v1/bill/batch", json=batch)
+        results = response.json()["results"]
+        assert [r["status"] for r in results] == ["duplicate", "insufficient_balance", "duplicate"]
+        assert Decimal(str(results[2]["new_balance"])) == Decimal("7.00")
+        print("✓ Batch billed once per key")
+
+    async def test_reservation_settle_and_release(self, client: AsyncClient, user_id: str):
+        """Test that holds reduce the available balance until settled or released"""
+        response = await client.post("/api/v1/accounts", json={"user_id": user_id, "initial_balance": 0.0})
+        assert response.status_code == 201
+        await client.post("/api/v1/topup", json={"user_id": user_id, "amount": 5.0})
+
+        response = await client.post(
+            "/api/v1/reserve", json={"user_id": user_id, "amount": 2.0, "idempotency_key": "req-1"}
+        )
+        data = response.json()
+        assert data["reserved"] is True
+        assert Decimal(str(data["available_balance"])) == Decimal("3.00")
+
+        # A second hold that does not fit is refused
+        response = await client.post(
+            "/api/v1/reserve", json={"user_id": user_id, "amount": 4.0, "idempotency_key": "req-2"}
+        )
+        assert response.json()["reserved"] is False
+
+        # Settling bills the actual amount and releases the rest of the hold
+        response = await client.post(
+            "/api/v1/bill/batch",
+            json={
+                "items": [
+                    {"user_id": user_id, "amount": 0.5, "idempotency_key": "req-1", "reservation_key": "req-1"}
+                ]
+            },
+        )
+        assert response.json()["results"][0]["status"] == "billed"
+
+        response = await client.post(
+            "/api/v1/reserve", json={"user_id": user_id, "amount": 1.0, "idempotency_key": "req-3"}
+        )
+        assert Decimal(str(response.json()["available_balance"])) == Decimal("3.50")
+        response = await client.post(
+            "/api/v1/release", json={"items": [{"user_id": user_id, "reservation_key": "req-3"}]}
+        )
+        assert response.json()["released"] == 1
+
+        response = await client.post("/api/v1/balance", json={"user_id": user_id})
+        assert Decimal(str(response.json()["balance"])) == Decimal("4.50")
+        print("✓ Reservations held, settled and released")
@@ -0,0 +1,110 @@
+"""Benchmark of TigerBeetle request batching against a stand-in cluster
+
+Runs many concurrent transfers, each followed by a balance read, through the
+TigerBeetleClient twice: sending every operation in its own request (batching
+off) and coalescing concurrent operations into shared requests (the default).
+The stand-in takes one request at a time with a fixed round trip, as a client
+session of a real cluster does, and keeps balances in memory. The test prints
+operations/sec for both runs and checks the speedup. Runs in a few seconds.
+"""
+
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+from tigerbeetle import CreateTransferResult, CreateTransfersResult
+
+from src.services.tigerbeetle_client import TigerBeetleClient
+
+USERS = 200
+ROUNDS = 5
+# Seconds per request, roughly a round trip to a cluster on the local network
+ROUND_TRIP = 0.001
+MIN_SPEEDUP = 5
+
+
+class StandInCluster:
+    """In-memory ledger answering one request at a time after a round trip"""
+
+    def __init__(self) -> None:
+        self.credits: dict[int, int] = {}
+        self.debits: dict[int, int] = {}
+        self.requests = 0
+        self._lock = asyncio.Lock()
+
+    async def _round_trip(self) -> None:
+        async with self._lock:
+            self.requests += 1
+            await asyncio.sleep(ROUND_TRIP)
+
+    async def create_transfers(self, transfers):
+        await self._round_trip()
+        errors = []
+        for index, transfer in enumerate(transfers):
+            balance = self.credits.get(transfer.debit_account_id, 0) - self.debits.get(
+                transfer.debit_account_id, 0
+            )
+            if transfer.debit_account_id != 0 and balance < transfer.amount:
+                errors.append(
+                    CreateTransfersResult(index=index, result=CreateTransferResult.EXCEEDS_CREDITS)
+                )
+                continue
+            self.debits[transfer.debit_account_id] = (
+                self.debits.get(transfer.debit_account_id, 0) + transfer.amount
+            )
+            self.credits[transfer.credit_account_id] = (
+                self.credits.get(transfer.credit_account_id, 0) + transfer.amount
+            )
+        return errors
+
+    async def lookup_accounts(self, account_ids):
+        await self._round_trip()
+        return [
+            SimpleNamespace(
+                id=account_id,
+                credits_posted=self.credits.get(account_id, 0),
+                debits_posted=self.debits.get(account_id, 0),
+                debits_pending=0,
+            )
+            for account_id in account_ids
+        ]
+
+
+async def _run(batch_window: float | None) -> tuple[float, StandInCluster]:
+    """Time USERS concurrent users each making ROUNDS top-ups and balance reads"""
+    cluster = StandInCluster()
+    client = TigerBeetleClient(batch_window=batch_window)
+    client._client = cluster
+
+    async def user(account_id: int) -> None:
+        for round_number in range(ROUNDS):
+            transfer_id = account_id * ROUNDS + round_number + 1
+            await client.create_transfer(transfer_id, 0, account_id, 100)
+            assert await client.get_account_balance(account_id) == 100 * (round_number + 1)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(user(account_id) for account_id in range(1, USERS + 1)))
+    return time.perf_counter() - started, cluster
+
+
+@pytest.mark.asyncio
+async def test_batching_multiplies_throughput():
+    operations = USERS * ROUNDS * 2
+
+    unbatched, unbatched_cluster = await _run(batch_window=None)
+    batched, batched_cluster = await _run(batch_window=0.0005)
+
+    print(f"\n{operations} operations from {USERS} users, {ROUND_TRIP * 1000:g}ms per request")
+    for name, elapsed, cluster in (
+        ("unbatched", unbatched, unbatched_cluster),
+        ("batched", batched, batched_cluster),
+    ):
+        print(
+            f"  {name:<10} {operations / elapsed:8.0f} ops/s  "
+            f"{cluster.requests:5d} requests  {elapsed:.2f}s"
+        )
+    print(f"  speedup    {unbatched / batched:.1f}x")
+
+    assert batched_cluster.requests < unbatched_cluster.requests / MIN_SPEEDUP
+    assert unbatched / batched >= MIN_SPEEDUP
@@ -60,3 +60,14 @@ class TestBalanceService:
         balance = await balance_service.get_balance("user@example.com")
 
         assert balance == Decimal("123.45")
+
+    @pytest.mark.asyncio
+    async def test_get_balances_is_one_lookup(self, balance_service, mock_client):
+        """Test that many users' balances come from a single ledger lookup"""
+        mock_client.user_id_to_account_id.side_effect = {"alice": 10, "bob": 20, "carol": 30}.get
+        mock_client.get_account_balances = AsyncMock(return_value={10: 1500, 30: 0})
+
+        balances = await balance_service.get_balances(["alice", "bob", "carol"])
+
+        assert balances == {"alice": Decimal("15.00"), "carol": Decimal("0.00")}
+        mock_client.get_account_balances.assert_awaited_once_with([10, 20, 30])
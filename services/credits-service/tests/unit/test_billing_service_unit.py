@@ -4,12 +4,15 @@ import pytest
 from decimal import Decimal
 from unittest.mock import AsyncMock, Mock
 
-from src.core.constants import SYSTEM_ACCOUNT_ID
+from src.core.constants import SYSTEM_ACCOUNT_ID, TRANSFER_FLAGS_PENDING, TRANSFER_FLAGS_VOIDING
+from src.core.models import BillBatchItem
 from src.services.billing_service import BillingService
 from src.core.exceptions import (
+    AccountAlreadyExistsException,
     AccountNotFoundException,
     InsufficientBalanceException,
     InvalidAmountException,
+    TigerBeetleException,
 )
 
 
@@ -23,53 +26,51 @@ class TestBillingService:
         client.user_id_to_account_id = Mock(return_value=12345)
         client.generate_transfer_id = Mock(return_value=1)
         client.create_account = AsyncMock()
-        client.create_transfer = AsyncMock()
-        client.get_account_balance = AsyncMock()
+        client.create_transfer_with_balance = AsyncMock(return_value=(True, 0))
         return client
 
     @pytest.fixture
     def billing_service(self, mock_client):
         """Create a BillingService instance with mocked client"""
-        service = BillingService(tigerbeetle_client=mock_client)
-        # Pre-initialize system account to avoid extra calls in tests
-        service._system_account_initialized = True
-        return service
+        return BillingService(tigerbeetle_client=mock_client)
 
     @pytest.mark.asyncio
-    async def test_ensure_system_account_creates_if_missing(self, mock_client):
+    async def test_ensure_system_account_creates_if_missing(self, billing_service, mock_client):
         """Test system account creation when it doesn't exist"""
-        mock_client.get_account_balance.side_effect = AccountNotFoundException("Account not found")
-        service = BillingService(tigerbeetle_client=mock_client)
-
-        await service._ensure_system_account()
+        await billing_service.ensure_system_account()
 
         mock_client.create_account.assert_called_once_with(SYSTEM_ACCOUNT_ID, "system", is_system_account=True)
-        assert service._system_account_initialized is True
 
     @pytest.mark.asyncio
-    async def test_ensure_system_account_already_exists(self, mock_client):
-        """Test system account check when it already exists"""
-        mock_client.get_account_balance.return_value = 0
-        service = BillingService(tigerbeetle_client=mock_client)
+    async def test_ensure_system_account_already_exists(self, billing_service, mock_client):
+        """Test that an existing system account is left as it is, in the same single request"""
+        mock_client.create_account.side_effect = AccountAlreadyExistsException("Account already exists")
 
-        await service._ensure_system_account()
+        await billing_service.ensure_system_account()
+
+        mock_client.create_account.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_billing_does_not_check_the_system_account(self, billing_service, mock_client):
+        """Test that a charge is a single ledger call, without a system account check"""
+        await billing_service.bill("user@example.com", Decimal("1.00"))
+        await billing_service.top_up("user@example.com", Decimal("1.00"))
 
-        mock_client.get_account_balance.assert_called_once_with(SYSTEM_ACCOUNT_ID)
         mock_client.create_account.assert_not_called()
-        assert service._system_account_initialized is True
+        assert mock_client.create_transfer_with_balance.await_count == 2
 
     @pytest.mark.asyncio
     async def test_top_up_success(self, billing_service, mock_client):
         """Test successful top-up"""
-        mock_client.get_account_balance.return_value = 2500  # $25.00 after top-up
+        mock_client.create_transfer_with_balance.return_value = (True, 2500)  # $25.00 after top-up
 
         new_balance = await billing_service.top_up("user@example.com", Decimal("10.00"))
 
         assert new_balance == Decimal("25.00")
-        mock_client.create_transfer.assert_called_once()
+        mock_client.create_transfer_with_balance.assert_called_once()
 
         # Verify transfer details
-        call_kwargs = mock_client.create_transfer.call_args.kwargs
+        call_kwargs = mock_client.create_transfer_with_balance.call_args.kwargs
         assert call_kwargs["debit_account_id"] == SYSTEM_ACCOUNT_ID
         assert call_kwargs["credit_account_id"] == 12345
         assert call_kwargs["amount_cents"] == 1000  # $10.00 in cents
@@ -86,7 +87,7 @@ class TestBillingService:
     @pytest.mark.asyncio
     async def test_top_up_account_not_found(self, billing_service, mock_client):
         """Test top-up for non-existent account"""
-        mock_client.create_transfer.side_effect = AccountNotFoundException("Account not found")
+        mock_client.create_transfer_with_balance.side_effect = AccountNotFoundException("Account not found")
 
         with pytest.raises(AccountNotFoundException):
             await billing_service.top_up("user@example.com", Decimal("10.00"))
@@ -94,15 +95,15 @@ class TestBillingService:
     @pytest.mark.asyncio
     async def test_bill_success(self, billing_service, mock_client):
         """Test successful billing"""
-        mock_client.get_account_balance.return_value = 500  # $5.00 after billing
+        mock_client.create_transfer_with_balance.return_value = (True, 500)  # $5.00 after billing
 
         new_balance = await billing_service.bill("user@example.com", Decimal("10.00"))
 
         assert new_balance == Decimal("5.00")
-        mock_client.create_transfer.assert_called_once()
+        mock_client.create_transfer_with_balance.assert_called_once()
 
         # Verify transfer details
-        call_kwargs = mock_client.create_transfer.call_args.kwargs
+        call_kwargs = mock_client.create_transfer_with_balance.call_args.kwargs
         assert call_kwargs["debit_account_id"] == 12345
         assert call_kwargs["credit_account_id"] == SYSTEM_ACCOUNT_ID
         assert call_kwargs["amount_cents"] == 1000  # $10.00 in cents
@@ -110,11 +111,37 @@ class TestBillingService:
     @pytest.mark.asyncio
     async def test_bill_with_description(self, billing_service, mock_client):
         """Test billing with description"""
-        mock_client.get_account_balance.return_value = 500
+        mock_client.create_transfer_with_balance.return_value = (True, 500)
 
         await billing_service.bill("user@example.com", Decimal("10.00"), description="AI API usage")
 
-        mock_client.create_transfer.assert_called_once()
+        mock_client.create_transfer_with_balance.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_bill_with_idempotency_key_uses_derived_transfer_id(self, billing_service, mock_client):
+        """Test that an idempotency key maps to a deterministic transfer ID"""
+        mock_client.transfer_id_for_key = Mock(return_value=777)
+        mock_client.create_transfer_with_balance.return_value = (True, 500)
+
+        await billing_service.bill("user@example.com", Decimal("1.00"), idempotency_key="req-1")
+
+        mock_client.transfer_id_for_key.assert_called_once_with("bill:user@example.com:req-1")
+        mock_client.generate_transfer_id.assert_not_called()
+        assert mock_client.create_transfer_with_balance.call_args.kwargs["transfer_id"] == 777
+
+    @pytest.mark.asyncio
+    async def test_replayed_bill_is_not_logged_twice(self, mock_client):
+        """Test that a bill whose transfer already exists skips the transaction log"""
+        transaction_log = Mock()
+        transaction_log.log_transaction = AsyncMock()
+        service = BillingService(tigerbeetle_client=mock_client, transaction_log=transaction_log)
+        mock_client.transfer_id_for_key = Mock(return_value=777)
+        mock_client.create_transfer_with_balance.return_value = (False, 500)
+
+        new_balance = await service.bill("user@example.com", Decimal("1.00"), idempotency_key="req-1")
+
+        assert new_balance == Decimal("5.00")
+        transaction_log.log_transaction.assert_not_called()
 
     @pytest.mark.asyncio
     async def test_bill_invalid_amount(self, billing_service, mock_client):
@@ -128,7 +155,7 @@ class TestBillingService:
     @pytest.mark.asyncio
     async def test_bill_insufficient_balance(self, billing_service, mock_client):
         """Test billing with insufficient balance"""
-        mock_client.create_transfer.side_effect = InsufficientBalanceException("Insufficient balance")
+        mock_client.create_transfer_with_balance.side_effect = InsufficientBalanceException("Insufficient balance")
 
         with pytest.raises(InsufficientBalanceException):
             await billing_service.bill("user@example.com", Decimal("100.00"))
@@ -136,7 +163,185 @@ class TestBillingService:
     @pytest.mark.asyncio
     async def test_bill_account_not_found(self, billing_service, mock_client):
         """Test billing for non-existent account"""
-        mock_client.create_transfer.side_effect = AccountNotFoundException("Account not found")
+        mock_client.create_transfer_with_balance.side_effect = AccountNotFoundException("Account not found")
 
         with pytest.raises(AccountNotFoundException):
             await billing_service.bill("user@example.com", Decimal("10.00"))
+
+
+class TestBillBatch:
+    """Test cases for BillingService.bill_batch"""
+
+    @pytest.fixture
+    def mock_client(self):
+        """Mock TigerBeetle client where account and transfer IDs derive from their keys"""
+        client = Mock()
+        client.user_id_to_account_id = Mock(side_effect=lambda user_id: {"alice": 10, "bob": 20}[user_id])
+        client.transfer_id_for_key = Mock(side_effect=lambda key: hash(key))
+        client.create_transfers = AsyncMock()
+        client.get_account_balances = AsyncMock(return_value={10: 700, 20: 50})
+        return client
+
+    @pytest.fixture
+    def transaction_log(self):
+        log = Mock()
+        log.log_transactions = AsyncMock()
+        return log
+
+    @pytest.fixture
+    def billing_service(self, mock_client, transaction_log):
+        service = BillingService(tigerbeetle_client=mock_client, transaction_log=transaction_log)
+        return service
+
+    @staticmethod
+    def _items():
+        return [
+            BillBatchItem(user_id="alice", amount=Decimal("1.00"), idempotency_key="req-1"),
+            BillBatchItem(user_id="bob", amount=Decimal("5.00"), idempotency_key="req-2"),
+            BillBatchItem(user_id="alice", amount=Decimal("2.00"), idempotency_key="req-3", description="chat"),
+            BillBatchItem(user_id="alice", amount=Decimal("0.50"), idempotency_key="req-4"),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_batch_is_one_transfer_request_and_one_lookup(self, billing_service, mock_client, transaction_log):
+        """Test that every charge goes to the ledger in one request, with per-item results"""
+        mock_client.create_transfers.return_value = [
+            True,
+            InsufficientBalanceException("Insufficient balance"),
+            True,
+            False,
+        ]
+
+        results = await billing_service.bill_batch(self._items())
+
+        mock_client.create_transfers.assert_awaited_once()
+        (transfers,) = mock_client.create_transfers.await_args.args
+        assert [t[1:] for t in transfers] == [
+            (10, SYSTEM_ACCOUNT_ID, 100),
+            (20, SYSTEM_ACCOUNT_ID, 500),
+            (10, SYSTEM_ACCOUNT_ID, 200),
+            (10, SYSTEM_ACCOUNT_ID, 50),
+        ]
+        assert transfers[0][0] == hash("bill:alice:req-1")
+        mock_client.get_account_balances.assert_awaited_once_with([10, 20, 10, 10])
+
+        assert [r.status for r in results] == ["billed", "insufficient_balance", "billed", "duplicate"]
+        assert results[0].new_balance == Decimal("7.00")
+        assert results[1].new_balance == Decimal("0.50")
+
+        # Only applied charges are logged, each with the balance right after it
+        (entries,) = transaction_log.log_transactions.await_args.args
+        assert entries == [
+            ("alice", "bill", Decimal("1.00"), Decimal("9.00"), None),
+            ("alice", "bill", Decimal("2.00"), Decimal("7.00"), "chat"),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_unknown_accounts_and_ledger_errors_are_reported_per_item(self, billing_service, mock_client):
+        """Test that account and ledger errors only fail their own item"""
+        mock_client.create_transfers.return_value = [
+            True,
+            AccountNotFoundException("Account not found"),
+            TigerBeetleException("ledger error"),
+            True,
+        ]
+
+        results = await billing_service.bill_batch(self._items())
+
+        assert [r.status for r in results] == ["billed", "account_not_found", "error", "billed"]
+
+    @pytest.mark.asyncio
+    async def test_failed_request_raises(self, billing_service, mock_client, transaction_log):
+        """Test that a failed ledger request fails the whole batch"""
+        mock_client.create_transfers.side_effect = TigerBeetleException("connection lost")
+
+        with pytest.raises(TigerBeetleException):
+            await billing_service.bill_batch(self._items())
+        transaction_log.log_transactions.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_invalid_amount_rejects_batch(self, billing_service, mock_client):
+        """Test that a non-positive amount rejects the batch before touching the ledger"""
+        item = BillBatchItem.model_construct(user_id="alice", amount=Decimal("0"), idempotency_key="req-1")
+
+        with pytest.raises(InvalidAmountException):
+            await billing_service.bill_batch([item])
+        mock_client.create_transfers.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_reservations_are_released_before_charges(self, billing_service, mock_client):
+        """Test that settling a hold voids it in the same request as the charge"""
+        mock_client.create_transfers.return_value = [True, True, True]
+        items = [
+            BillBatchItem(user_id="alice", amount=Decimal("1.00"), idempotency_key="req-1", reservation_key="req-1"),
+            BillBatchItem(user_id="bob", amount=Decimal("5.00"), idempotency_key="req-2"),
+        ]
+
+        results = await billing_service.bill_batch(items)
+
+        (transfers,) = mock_client.create_transfers.await_args.args
+        void, first, second = transfers
+        assert void[0] == hash("void:alice:req-1")
+        assert void[3:] == (0, TRANSFER_FLAGS_VOIDING, hash("reserve:alice:req-1"))
+        assert first[0] == hash("bill:alice:req-1")
+        assert second[0] == hash("bill:bob:req-2")
+        assert [r.status for r in results] == ["billed", "billed"]
+
+
+class TestReservations:
+    """Test cases for holding credits ahead of a charge"""
+
+    @pytest.fixture
+    def mock_client(self):
+        client = Mock()
+        client.user_id_to_account_id = Mock(return_value=10)
+        client.transfer_id_for_key = Mock(side_effect=lambda key: hash(key))
+        client.create_transfers = AsyncMock(return_value=[True])
+        client.get_account_balances = AsyncMock(return_value={10: 420})
+        return client
+
+    @pytest.fixture
+    def billing_service(self, mock_client):
+        service = BillingService(tigerbeetle_client=mock_client)
+        return service
+
+    @pytest.mark.asyncio
+    async def test_reserve_places_pending_transfer(self, billing_service, mock_client):
+        """Test that a hold is a pending transfer rounded up to whole cents"""
+        reserved, available = await billing_service.reserve("alice", Decimal("0.0301"), "req-1", 120)
+
+        assert reserved is True
+        assert available == Decimal("4.20")
+        (transfers,) = mock_client.create_transfers.await_args.args
+        assert transfers == [(hash("reserve:alice:req-1"), 10, SYSTEM_ACCOUNT_ID, 4, TRANSFER_FLAGS_PENDING, 0, 120)]
+        mock_client.get_account_balances.assert_awaited_once_with([10], include_pending=True)
+
+    @pytest.mark.asyncio
+    async def test_reserve_reports_insufficient_balance(self, billing_service, mock_client):
+        """Test that an unaffordable hold is reported, not raised"""
+        mock_client.create_transfers.return_value = [InsufficientBalanceException("Insufficient balance")]
+        mock_client.get_account_balances.return_value = {10: 3}
+
+        reserved, available = await billing_service.reserve("alice", Decimal("1.00"), "req-1", 120)
+
+        assert reserved is False
+        assert available == Decimal("0.03")
+
+    @pytest.mark.asyncio
+    async def test_reserve_unknown_account(self, billing_service, mock_client):
+        """Test that reserving against a missing account raises"""
+        mock_client.create_transfers.return_value = [AccountNotFoundException("Account not found")]
+
+        with pytest.raises(AccountNotFoundException):
+            await billing_service.reserve("alice", Decimal("1.00"), "req-1", 120)
+
+    @pytest.mark.asyncio
+    async def test_release_voids_holds_in_one_request(self, billing_service, mock_client):
+        """Test that holds are voided together and gone ones are skipped"""
+        mock_client.create_transfers.return_value = [True, TigerBeetleException("PENDING_TRANSFER_EXPIRED")]
+
+        released = await billing_service.release([("alice", "req-1"), ("alice", "req-2")])
+
+        assert released == 1
+        (transfers,) = mock_client.create_transfers.await_args.args
+        assert [t[5] for t in transfers] == [hash("reserve:alice:req-1"), hash("reserve:alice:req-2")]
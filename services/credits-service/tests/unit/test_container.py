@@ -0,0 +1,58 @@
+"""Unit tests for the dependency injection container"""
+
+from unittest.mock import Mock
+
+import pytest
+
+from src.container import Container
+from src.core.constants import (
+    SERVICE_BILLING_SERVICE,
+    SERVICE_TIGERBEETLE_CLIENT,
+    SERVICE_TRANSACTION_LOG,
+    SERVICE_USER_REGISTRY,
+)
+
+
+@pytest.fixture
+def container(tmp_path, monkeypatch):
+    # The SQLite-backed services create their files under ./data
+    monkeypatch.chdir(tmp_path)
+    container = Container()
+    container._factories[SERVICE_TIGERBEETLE_CLIENT] = lambda: Mock(spec=[])
+    return container
+
+
+class TestWarm:
+
+    @pytest.mark.asyncio
+    async def test_warm_creates_services_and_opens_their_databases(self, container):
+        try:
+            await container.warm()
+
+            for service_name in (
+                SERVICE_BILLING_SERVICE,
+                SERVICE_USER_REGISTRY,
+                SERVICE_TRANSACTION_LOG,
+            ):
+                assert service_name in container._services
+            # Every reader thread and the writer hold a connection already
+            assert container.get_user_registry()._db.stats()["connections"] == 5
+            assert container.get_transaction_log()._db.stats()["connections"] == 5
+        finally:
+            await container.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_warm_leaves_failing_services_to_first_use(self, container):
+        def unreachable():
+            raise OSError("TigerBeetle host not resolvable")
+
+        container._factories[SERVICE_TIGERBEETLE_CLIENT] = unreachable
+        try:
+            await container.warm()
+
+            assert SERVICE_BILLING_SERVICE not in container._services
+            assert SERVICE_USER_REGISTRY in container._services
+            with pytest.raises(OSError):
+                container.get_billing_service()
+        finally:
+            await container.shutdown()
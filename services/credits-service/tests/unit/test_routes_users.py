@@ -7,6 +7,8 @@ from unittest.mock import AsyncMock, Mock, patch
 
 from httpx import ASGITransport, AsyncClient
 
+from shared.pagination import InvalidCursorError
+
 
 @pytest.fixture(autouse=True)
 def set_api_keys():
@@ -25,7 +27,7 @@ def set_api_keys():
 @pytest.fixture
 def mock_user_registry():
     registry = Mock()
-    registry.list_users = AsyncMock(return_value=([], 0))
+    registry.list_users = AsyncMock(return_value=([], 0, None))
     registry.get_user = AsyncMock(return_value=None)
     registry.user_exists = AsyncMock(return_value=False)
     return registry
@@ -35,13 +37,14 @@ def mock_user_registry():
 def mock_balance_service():
     service = Mock()
     service.get_balance = AsyncMock(return_value=Decimal("100.00"))
+    service.get_balances = AsyncMock(return_value={})
     return service
 
 
 @pytest.fixture
 def mock_transaction_log():
     log = Mock()
-    log.get_transactions = AsyncMock(return_value=([], 0))
+    log.get_transactions = AsyncMock(return_value=([], 0, None))
     return log
 
 
@@ -74,7 +77,7 @@ class TestUserListRoute:
 
     @pytest.mark.asyncio
     async def test_list_users_empty(self, client, mock_user_registry):
-        mock_user_registry.list_users.return_value = ([], 0)
+        mock_user_registry.list_users.return_value = ([], 0, None)
         response = await client.get("/api/v1/users")
         assert response.status_code == 200
         data = response.json()
@@ -92,6 +95,7 @@ class TestUserListRoute:
                 }
             ],
             1,
+            None,
         )
         response = await client.get("/api/v1/users")
         assert response.status_code == 200
@@ -99,12 +103,37 @@ class TestUserListRoute:
         assert len(data["users"]) == 1
         assert data["users"][0]["user_id"] == "u1"
 
+    @pytest.mark.asyncio
+    async def test_list_users_one_lookup(self, client, mock_user_registry, mock_balance_service):
+        mock_user_registry.list_users.return_value = (
+            [
+                {"user_id": "u1", "display_name": None, "created_at": "2026-01-01T00:00:00Z"},
+                {"user_id": "u2", "display_name": None, "created_at": "2026-01-02T00:00:00Z"},
+            ],
+            2,
+            None,
+        )
+        mock_balance_service.get_balances.return_value = {"u1": Decimal("12.50")}
+        response = await client.get("/api/v1/users")
+        assert response.status_code == 200
+        users = response.json()["users"]
+        assert Decimal(str(users[0]["balance"])) == Decimal("12.50")
+        assert users[1]["balance"] is None
+        mock_balance_service.get_balances.assert_awaited_once_with(["u1", "u2"])
+        mock_balance_service.get_balance.assert_not_called()
+
     @pytest.mark.asyncio
     async def test_list_users_pagination_params(self, client, mock_user_registry):
-        mock_user_registry.list_users.return_value = ([], 0)
+        mock_user_registry.list_users.return_value = ([], 0, None)
         response = await client.get("/api/v1/users?page=2&page_size=10")
         assert response.status_code == 200
-        mock_user_registry.list_users.assert_called_once_with(page=2, page_size=10)
+        mock_user_registry.list_users.assert_called_once_with(page=2, page_size=10, cursor=None)
+
+    @pytest.mark.asyncio
+    async def test_list_users_invalid_cursor(self, client, mock_user_registry):
+        mock_user_registry.list_users.side_effect = InvalidCursorError("Malformed pagination cursor")
+        response = await client.get("/api/v1/users?cursor=garbage")
+        assert response.status_code == 400
 
 
 class TestUserDetailRoute:
@@ -156,6 +185,7 @@ class TestTransactionRoute:
                 }
             ],
             1,
+            None,
         )
         response = await client.get("/api/v1/users/u1/transactions")
         assert response.status_code == 200
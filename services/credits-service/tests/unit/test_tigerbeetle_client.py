@@ -0,0 +1,304 @@
+"""Unit tests for TigerBeetle client result handling"""
+
+import asyncio
+
+import pytest
+from unittest.mock import AsyncMock, Mock
+
+from tigerbeetle import CreateTransferResult, CreateTransfersResult
+
+from src.core.constants import TRANSFER_FLAGS_PENDING
+from src.core.exceptions import (
+    AccountAlreadyExistsException,
+    AccountNotFoundException,
+    InsufficientBalanceException,
+    TigerBeetleException,
+)
+from src.services.tigerbeetle_client import TigerBeetleClient
+
+
+class TestCreateTransfers:
+    """Test cases for per-item routing of create_transfers results"""
+
+    @pytest.fixture
+    def client(self):
+        client = TigerBeetleClient()
+        client._client = Mock()
+        client._client.create_transfers = AsyncMock(return_value=[])
+        return client
+
+    @pytest.mark.asyncio
+    async def test_outcomes_follow_request_order(self, client):
+        """Test that only failed events are reported, by index, and mapped to outcomes"""
+        client._client.create_transfers.return_value = [
+            CreateTransfersResult(index=1, result=CreateTransferResult.EXISTS),
+            CreateTransfersResult(index=2, result=CreateTransferResult.EXCEEDS_CREDITS),
+            CreateTransfersResult(index=3, result=CreateTransferResult.DEBIT_ACCOUNT_NOT_FOUND),
+            CreateTransfersResult(index=4, result=CreateTransferResult.EXISTS_WITH_DIFFERENT_AMOUNT),
+        ]
+
+        outcomes = await client.create_transfers([(i + 1, 10, 1, 100) for i in range(5)])
+
+        client._client.create_transfers.assert_awaited_once()
+        assert outcomes[0] is True
+        assert outcomes[1] is False
+        assert isinstance(outcomes[2], InsufficientBalanceException)
+        assert isinstance(outcomes[3], AccountNotFoundException)
+        assert isinstance(outcomes[4], TigerBeetleException)
+
+    @pytest.mark.asyncio
+    async def test_create_transfer_raises_its_outcome(self, client):
+        """Test that the single-transfer call raises the mapped exception"""
+        client._client.create_transfers.return_value = [
+            CreateTransfersResult(index=0, result=CreateTransferResult.CREDIT_ACCOUNT_NOT_FOUND)
+        ]
+
+        with pytest.raises(AccountNotFoundException):
+            await client.create_transfer(1, 1, 10, 100)
+
+    @pytest.mark.asyncio
+    async def test_request_failure_raises(self, client):
+        """Test that a failed request raises rather than reporting per-item outcomes"""
+        client._client.create_transfers.side_effect = RuntimeError("connection lost")
+
+        with pytest.raises(TigerBeetleException):
+            await client.create_transfers([(1, 10, 1, 100)])
+
+    @pytest.mark.asyncio
+    async def test_get_account_balances_skips_missing_accounts(self, client):
+        """Test that balances come from one lookup and missing accounts are absent"""
+        client._client.lookup_accounts = AsyncMock(
+            return_value=[Mock(id=10, credits_posted=1000, debits_posted=250)]
+        )
+
+        balances = await client.get_account_balances([10, 20, 10])
+
+        client._client.lookup_accounts.assert_awaited_once_with([10, 20])
+        assert balances == {10: 750}
+
+
+class TestBatching:
+    """Test cases for coalescing concurrent single operations into one request"""
+
+    @pytest.fixture
+    def client(self):
+        client = TigerBeetleClient(batch_window=0.001)
+        client._client = Mock()
+        client._client.create_transfers = AsyncMock(return_value=[])
+        client._client.create_accounts = AsyncMock(return_value=[])
+        client._client.lookup_accounts = AsyncMock(return_value=[])
+        return client
+
+    @pytest.mark.asyncio
+    async def test_concurrent_transfers_share_one_request(self, client):
+        """Test that each caller gets its own transfer's outcome from the shared request"""
+        client._client.create_transfers.return_value = [
+            CreateTransfersResult(index=1, result=CreateTransferResult.EXCEEDS_CREDITS),
+            CreateTransfersResult(index=2, result=CreateTransferResult.EXISTS),
+        ]
+
+        outcomes = await asyncio.gather(
+            *(client.create_transfer(i + 1, 10 + i, 1, 100) for i in range(4)),
+            return_exceptions=True,
+        )
+
+        client._client.create_transfers.assert_awaited_once()
+        assert len(client._client.create_transfers.await_args.args[0]) == 4
+        assert outcomes[0] is True
+        assert isinstance(outcomes[1], InsufficientBalanceException)
+        assert outcomes[2] is False
+        assert outcomes[3] is True
+
+    @pytest.mark.asyncio
+    async def test_concurrent_balance_lookups_share_one_request(self, client):
+        """Test that lookups are coalesced and a missing account fails only its caller"""
+        client._client.lookup_accounts.return_value = [
+            Mock(id=10, credits_posted=1000, debits_posted=250),
+            Mock(id=11, credits_posted=500, debits_posted=0),
+        ]
+
+        outcomes = await asyncio.gather(
+            client.get_account_balance(10),
+            client.get_account_balance(12),
+            client.get_account_balance(11),
+            return_exceptions=True,
+        )
+
+        client._client.lookup_accounts.assert_awaited_once_with([10, 12, 11])
+        assert outcomes[0] == 750
+        assert isinstance(outcomes[1], AccountNotFoundException)
+        assert outcomes[2] == 500
+
+    @pytest.mark.asyncio
+    async def test_concurrent_account_creations_share_one_request(self, client):
+        """Test that a duplicate in the batch is reported to its caller alone"""
+        client._client.create_accounts.return_value = [Mock(index=1, result=21)]
+
+        outcomes = await asyncio.gather(
+            client.create_account(10, "alice"),
+            client.create_account(10, "alice"),
+            return_exceptions=True,
+        )
+
+        client._client.create_accounts.assert_awaited_once()
+        assert outcomes[0] is None
+        assert isinstance(outcomes[1], AccountAlreadyExistsException)
+        assert "alice" in str(outcomes[1])
+
+    @pytest.mark.asyncio
+    async def test_failed_request_fails_every_caller(self, client):
+        """Test that when the shared request fails, every caller in it gets the error"""
+        client._client.create_transfers.side_effect = RuntimeError("connection lost")
+
+        outcomes = await asyncio.gather(
+            *(client.create_transfer(i + 1, 10, 1, 100) for i in range(3)),
+            return_exceptions=True,
+        )
+
+        assert all(isinstance(outcome, TigerBeetleException) for outcome in outcomes)
+
+    @pytest.mark.asyncio
+    async def test_operations_apart_in_time_are_sent_separately(self, client):
+        """Test that a batch is sent once its window closes"""
+        await client.create_transfer(1, 10, 1, 100)
+        await client.create_transfer(2, 10, 1, 100)
+
+        assert client._client.create_transfers.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_disconnect_sends_queued_operations_first(self, client):
+        """Test that operations queued when shutdown starts are still sent"""
+        raw = client._client
+        raw.close = AsyncMock()
+        pending = asyncio.ensure_future(client.create_transfer(1, 10, 1, 100))
+        await asyncio.sleep(0)
+
+        await client.disconnect()
+
+        assert await pending is True
+        raw.create_transfers.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_without_a_window_each_operation_is_sent_alone(self):
+        """Test that batching can be turned off"""
+        client = TigerBeetleClient(batch_window=None)
+        client._client = Mock()
+        client._client.create_transfers = AsyncMock(return_value=[])
+
+        await asyncio.gather(*(client.create_transfer(i + 1, 10, 1, 100) for i in range(3)))
+
+        assert client._client.create_transfers.await_count == 3
+
+
+class TestBalanceTracking:
+    """Test cases for reading balances back from the client's own transfers"""
+
+    @pytest.fixture
+    def client(self):
+        client = TigerBeetleClient(batch_window=None, track_balances=True)
+        client._client = Mock()
+        client._client.create_transfers = AsyncMock(return_value=[])
+        client._client.create_accounts = AsyncMock(return_value=[])
+        client._client.lookup_accounts = AsyncMock(
+            return_value=[Mock(id=10, credits_posted=1000, debits_posted=200)]
+        )
+        return client
+
+    @pytest.mark.asyncio
+    async def test_balances_are_looked_up_by_default(self):
+        """Test that without tracking every read-back sees other writers' transfers"""
+        client = TigerBeetleClient(batch_window=None)
+        client._client = Mock()
+        client._client.create_transfers = AsyncMock(return_value=[])
+        client._client.lookup_accounts = AsyncMock(
+            return_value=[Mock(id=10, credits_posted=1000, debits_posted=200)]
+        )
+
+        await client.create_transfer_with_balance(1, 10, 1, 100, 10)
+        # Another writer moved the balance in between
+        client._client.lookup_accounts.return_value = [
+            Mock(id=10, credits_posted=1000, debits_posted=500)
+        ]
+        _, balance = await client.create_transfer_with_balance(2, 10, 1, 100, 10)
+
+        assert balance == 500
+        assert client._client.lookup_accounts.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_first_transfer_looks_the_balance_up(self, client):
+        """Test that an account not seen before is looked up once"""
+        created, balance = await client.create_transfer_with_balance(1, 10, 1, 100, 10)
+
+        assert created is True
+        assert balance == 800
+        client._client.lookup_accounts.assert_awaited_once_with([10])
+
+    @pytest.mark.asyncio
+    async def test_later_transfers_are_one_round_trip(self, client):
+        """Test that balances follow applied transfers without further lookups"""
+        await client.get_account_balance(10)
+
+        _, after_bill = await client.create_transfer_with_balance(1, 10, 1, 100, 10)
+        _, after_top_up = await client.create_transfer_with_balance(2, 1, 10, 500, 10)
+
+        assert (after_bill, after_top_up) == (700, 1200)
+        client._client.lookup_accounts.assert_awaited_once()
+        assert client._client.create_transfers.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_new_accounts_start_at_zero(self, client):
+        """Test that a created account's balance is known without a lookup"""
+        await client.create_account(20, "alice")
+
+        _, balance = await client.create_transfer_with_balance(1, 1, 20, 500, 20)
+
+        assert balance == 500
+        client._client.lookup_accounts.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_rejected_and_replayed_transfers_leave_the_balance(self, client):
+        """Test that only transfers created now move the tracked balance"""
+        await client.get_account_balance(10)
+        client._client.create_transfers.return_value = [
+            CreateTransfersResult(index=0, result=CreateTransferResult.EXISTS),
+            CreateTransfersResult(index=1, result=CreateTransferResult.EXCEEDS_CREDITS),
+        ]
+
+        await client.create_transfers([(1, 10, 1, 100), (2, 10, 1, 5000)])
+        client._client.create_transfers.return_value = []
+        _, balance = await client.create_transfer_with_balance(3, 1, 10, 0, 10)
+
+        assert balance == 800
+
+    @pytest.mark.asyncio
+    async def test_holds_leave_the_posted_balance(self, client):
+        """Test that pending and voiding transfers do not move the posted balance"""
+        await client.get_account_balance(10)
+
+        await client.create_transfers([(1, 10, 1, 300, TRANSFER_FLAGS_PENDING, 0, 60)])
+        _, balance = await client.create_transfer_with_balance(2, 1, 10, 0, 10)
+
+        assert balance == 800
+
+    @pytest.mark.asyncio
+    async def test_failed_request_forgets_the_balance(self, client):
+        """Test that accounts in a request with an unknown outcome are looked up again"""
+        await client.get_account_balance(10)
+        client._client.create_transfers.side_effect = RuntimeError("connection lost")
+        with pytest.raises(TigerBeetleException):
+            await client.create_transfer(1, 10, 1, 100)
+        client._client.create_transfers.side_effect = None
+
+        await client.create_transfer_with_balance(2, 10, 1, 100, 10)
+
+        assert client._client.lookup_accounts.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_tracking_can_be_turned_off(self, client):
+        """Test that without tracking every read-back is a lookup"""
+        client._balances = None
+
+        await client.create_transfer_with_balance(1, 10, 1, 100, 10)
+        await client.create_transfer_with_balance(2, 10, 1, 100, 10)
+
+        assert client._client.lookup_accounts.await_count == 2
@@ -19,7 +19,7 @@ class TestTransactionLogService:
     @pytest.mark.asyncio
     async def test_log_and_get_transaction(self, service):
         await service.log_transaction("user-1", "topup", Decimal("100.00"), Decimal("100.00"))
-        txns, total = await service.get_transactions("user-1")
+        txns, total, _ = await service.get_transactions("user-1")
         assert total == 1
         assert txns[0]["user_id"] == "user-1"
         assert txns[0]["type"] == "topup"
@@ -31,7 +31,7 @@ class TestTransactionLogService:
         await service.log_transaction(
             "user-1", "bill", Decimal("0.25"), Decimal("99.75"), "Gemini API call"
         )
-        txns, total = await service.get_transactions("user-1")
+        txns, total, _ = await service.get_transactions("user-1")
         assert txns[0]["description"] == "Gemini API call"
 
     @pytest.mark.asyncio
@@ -39,7 +39,7 @@ class TestTransactionLogService:
         await service.log_transaction("user-1", "topup", Decimal("100.00"), Decimal("100.00"))
         await service.log_transaction("user-1", "bill", Decimal("10.00"), Decimal("90.00"))
         await service.log_transaction("user-1", "bill", Decimal("5.00"), Decimal("85.00"))
-        txns, total = await service.get_transactions("user-1")
+        txns, total, _ = await service.get_transactions("user-1")
         assert total == 3
         assert txns[0]["amount"] == Decimal("5.00")  # newest first
         assert txns[2]["amount"] == Decimal("100.00")  # oldest last
@@ -51,16 +51,44 @@ class TestTransactionLogService:
                 "user-1", "bill", Decimal("1.00"), Decimal(str(99 - i))
             )
 
-        txns, total = await service.get_transactions("user-1", page=1, page_size=2)
+        txns, total, _ = await service.get_transactions("user-1", page=1, page_size=2)
         assert len(txns) == 2
         assert total == 5
 
-        txns, total = await service.get_transactions("user-1", page=3, page_size=2)
+        txns, total, _ = await service.get_transactions("user-1", page=3, page_size=2)
         assert len(txns) == 1
 
+    @pytest.mark.asyncio
+    async def test_cursor_pagination(self, service):
+        for i in range(5):
+            await service.log_transaction(
+                "user-1", "bill", Decimal("1.00"), Decimal(str(99 - i))
+            )
+
+        txns, total, cursor = await service.get_transactions("user-1", page_size=2)
+        balances = [t["balance_after"] for t in txns]
+        while cursor:
+            txns, total, cursor = await service.get_transactions(
+                "user-1", page_size=2, cursor=cursor
+            )
+            balances.extend(t["balance_after"] for t in txns)
+
+        assert balances == [Decimal(str(99 - i)) for i in reversed(range(5))]
+        assert total == 5
+
+    @pytest.mark.asyncio
+    async def test_total_reflects_new_transactions(self, service):
+        await service.log_transaction("user-1", "topup", Decimal("1.00"), Decimal("1.00"))
+        _, total, _ = await service.get_transactions("user-1")
+        assert total == 1
+
+        await service.log_transaction("user-1", "topup", Decimal("1.00"), Decimal("2.00"))
+        _, total, _ = await service.get_transactions("user-1")
+        assert total == 2
+
     @pytest.mark.asyncio
     async def test_get_transactions_empty(self, service):
-        txns, total = await service.get_transactions("no-user")
+        txns, total, _ = await service.get_transactions("no-user")
         assert txns == []
         assert total == 0
 
@@ -68,6 +96,26 @@ class TestTransactionLogService:
     async def test_transactions_isolated_by_user(self, service):
         await service.log_transaction("user-1", "topup", Decimal("100.00"), Decimal("100.00"))
         await service.log_transaction("user-2", "topup", Decimal("50.00"), Decimal("50.00"))
-        txns, total = await service.get_transactions("user-1")
+        txns, total, _ = await service.get_transactions("user-1")
         assert total == 1
         assert txns[0]["user_id"] == "user-1"
+
+    @pytest.mark.asyncio
+    async def test_log_transactions_in_one_write(self, service):
+        await service.log_transaction("user-1", "topup", Decimal("10.00"), Decimal("10.00"))
+        _, total, _ = await service.get_transactions("user-1")
+        assert total == 1
+
+        await service.log_transactions(
+            [
+                ("user-1", "bill", Decimal("1.00"), Decimal("9.00"), "first"),
+                ("user-2", "bill", Decimal("0.50"), Decimal("4.50"), None),
+                ("user-1", "bill", Decimal("2.00"), Decimal("7.00"), "second"),
+            ]
+        )
+
+        txns, total, _ = await service.get_transactions("user-1")
+        assert total == 3
+        assert [t["description"] for t in txns[:2]] == ["second", "first"]
+        _, total, _ = await service.get_transactions("user-2")
+        assert total == 1
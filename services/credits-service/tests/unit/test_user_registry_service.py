@@ -38,7 +38,7 @@ class TestUserRegistryService:
 
     @pytest.mark.asyncio
     async def test_list_users_empty(self, service):
-        users, total = await service.list_users()
+        users, total, _ = await service.list_users()
         assert users == []
         assert total == 0
 
@@ -47,14 +47,28 @@ class TestUserRegistryService:
         for i in range(5):
             await service.register_user(f"user-{i}", f"User {i}")
 
-        users, total = await service.list_users(page=1, page_size=2)
+        users, total, _ = await service.list_users(page=1, page_size=2)
         assert len(users) == 2
         assert total == 5
 
-        users, total = await service.list_users(page=3, page_size=2)
+        users, total, _ = await service.list_users(page=3, page_size=2)
         assert len(users) == 1
         assert total == 5
 
+    @pytest.mark.asyncio
+    async def test_list_users_cursor_walks_every_user_once(self, service):
+        for i in range(5):
+            await service.register_user(f"user-{i}")
+
+        users, total, cursor = await service.list_users(page_size=2)
+        seen = [u["user_id"] for u in users]
+        while cursor:
+            users, total, cursor = await service.list_users(page_size=2, cursor=cursor)
+            seen.extend(u["user_id"] for u in users)
+
+        assert sorted(seen) == [f"user-{i}" for i in range(5)]
+        assert len(seen) == 5
+
     @pytest.mark.asyncio
     async def test_user_exists(self, service):
         assert not await service.user_exists("user-123")
@@ -6,6 +6,8 @@ import logging
 
 from fastapi import APIRouter, HTTPException, Query, status
 
+from shared.pagination import InvalidCursorError
+
 from ..container import container
 from ..core.constants import (
     DEFAULT_EVENT_LIMIT,
@@ -67,15 +69,22 @@ async def list_bundles(
     page_size: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
     bundle_status: BundleStatus | None = Query(None, alias="status"),
     payment_status: PaymentStatus | None = Query(None),
+    cursor: str | None = Query(None, description="`next_cursor` from the previous page"),
 ) -> ProvisionedUserListResponse:
     """List provisioned users, newest first."""
-    users, total = await container.get_repository().list_users(
-        page=page,
-        page_size=page_size,
-        status=bundle_status,
-        payment_status=payment_status,
+    try:
+        users, total, next_cursor = await container.get_repository().list_users(
+            page=page,
+            page_size=page_size,
+            status=bundle_status,
+            payment_status=payment_status,
+            cursor=cursor,
+        )
+    except InvalidCursorError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+    return ProvisionedUserListResponse(
+        users=users, total=total, page=page, page_size=page_size, next_cursor=next_cursor
     )
-    return ProvisionedUserListResponse(users=users, total=total, page=page, page_size=page_size)
 
 
 @router.get("/bundles/{bundle_id}", response_model=ProvisionedUser, tags=["bundles"])
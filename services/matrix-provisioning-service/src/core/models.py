@@ -218,6 +218,9 @@ class ProvisionedUserListResponse(BaseModel):
     total: int = Field(..., description="Total records matching the filter")
     page: int = Field(..., description="1-based page number")
     page_size: int = Field(..., description="Records per page")
+    next_cursor: str | None = Field(
+        None, description="Pass as `cursor` to fetch the next page; absent on the last page"
+    )
 
 
 class StatsResponse(BaseModel):
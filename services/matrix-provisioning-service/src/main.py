@@ -67,6 +67,7 @@ async def lifespan(app: FastAPI):
     # After the background loops, so nothing is mid-request when the shared
     # connection pool goes away.
     await container.get_admin_client().aclose()
+    container.get_repository().close()
     logger.info("Matrix Provisioning Service shutdown complete")
 
 
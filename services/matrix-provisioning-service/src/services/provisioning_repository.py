@@ -1,18 +1,20 @@
 """SQLite-backed persistence for provisioned users, bundles and purge runs.
 
-Mirrors the credits-service pattern: synchronous sqlite3 work wrapped in
-``asyncio.to_thread`` so the event loop is never blocked.
+Mirrors the credits-service pattern: synchronous sqlite3 methods run through
+the shared pooled database (``shared.sqlite``) so the event loop is never
+blocked — reads on its reader pool, writes on its single writer thread.
 """
 
 from __future__ import annotations
 
-import asyncio
 import logging
-import os
 import sqlite3
 import uuid
 from datetime import datetime, timedelta, timezone
 
+from shared.pagination import TotalCache, decode_cursor, encode_cursor
+from shared.sqlite import SQLiteDatabase
+
 from ..core.constants import (
     BUSY_TIMEOUT_SECONDS,
     DEFAULT_DB_PATH,
@@ -64,8 +66,16 @@ CREATE TABLE IF NOT EXISTS provisioned_users (
 CREATE UNIQUE INDEX IF NOT EXISTS idx_users_username_server
     ON provisioned_users (username, server_name);
 
-CREATE INDEX IF NOT EXISTS idx_users_status ON provisioned_users (status);
-CREATE INDEX IF NOT EXISTS idx_users_created_at ON provisioned_users (created_at);
+-- The listing pages newest first with bundle_id breaking created_at ties, and
+-- optionally filters by status. Both indexes end in the full sort key so a
+-- page, whether OFFSET or cursor, is read straight off the index. They
+-- supersede the single-column status and created_at indexes.
+CREATE INDEX IF NOT EXISTS idx_users_created_bundle
+    ON provisioned_users (created_at, bundle_id);
+CREATE INDEX IF NOT EXISTS idx_users_status_created
+    ON provisioned_users (status, created_at, bundle_id);
+DROP INDEX IF EXISTS idx_users_status;
+DROP INDEX IF EXISTS idx_users_created_at;
 
 CREATE TABLE IF NOT EXISTS bundle_events (
     id          INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -130,22 +140,29 @@ class ProvisioningRepository:
 
     def __init__(self, db_path: str = DEFAULT_DB_PATH):
         self.db_path = db_path
-        self._ensure_db()
-
-    def _connect(self) -> sqlite3.Connection:
-        # Three writers share this file — request threads, the redemption poller
-        # and the retention sweep — each opening its own connection. Under the
-        # default rollback journal a write blocks readers outright, and without
-        # a busy timeout a concurrent writer raises "database is locked"
-        # immediately, which surfaces to the admin as a 500. WAL lets readers
-        # continue during a write; the timeout makes writers queue instead of
-        # failing.
-        # `timeout` is sqlite3's busy timeout; setting the PRAGMA as well would
-        # be the same instruction twice.
-        conn = sqlite3.connect(self.db_path, timeout=BUSY_TIMEOUT_SECONDS)
-        conn.row_factory = sqlite3.Row
-        conn.execute("PRAGMA foreign_keys = ON")
-        return conn
+        # Three writers share this file — request handlers, the redemption
+        # poller and the retention sweep. Within this process they queue on
+        # the pool's single writer thread instead of racing for SQLite's lock;
+        # WAL lets reads proceed during a write, and the busy timeout covers
+        # the other processes (the CLI) that may open the file, so a
+        # concurrent writer waits instead of surfacing "database is locked"
+        # to the admin as a 500.
+        self._db = SQLiteDatabase(
+            db_path,
+            name="provisioning",
+            pragmas={
+                "busy_timeout": int(BUSY_TIMEOUT_SECONDS * 1000),
+                "foreign_keys": "ON",
+            },
+        )
+        self._db.write_sync(self._ensure_db)
+        # Listing totals per (status, payment_status) filter; dropped on any
+        # write that adds a record or moves one between filters
+        self._totals = TotalCache()
+
+    def close(self) -> None:
+        """Close the pooled connections once nothing else will touch the database."""
+        self._db.close()
 
     #: Columns added after the first release, keyed by table, with the DDL to
     #: add them. SQLite has no "ADD COLUMN IF NOT EXISTS", so they are applied
@@ -170,25 +187,17 @@ class ProvisioningRepository:
 
     def _ensure_db(self) -> None:
         """Create the database file and schema, and apply column migrations."""
-        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
-        conn = sqlite3.connect(self.db_path, timeout=BUSY_TIMEOUT_SECONDS)
-        try:
-            # WAL is a property of the database file, not the connection, so it
-            # is set once here rather than on every connect. It is what lets a
-            # read proceed while the retention sweep is mid-write.
-            conn.execute("PRAGMA journal_mode = WAL")
-            conn.executescript(_SCHEMA)
-            for table, columns in self._MIGRATIONS.items():
-                existing = {
-                    row[1] for row in conn.execute(f"PRAGMA table_info({table})").fetchall()
-                }
-                for column, ddl in columns.items():
-                    if column not in existing:
-                        conn.execute(ddl)
-                        logger.info("Migrated %s: added %s", table, column)
-            conn.commit()
-        finally:
-            conn.close()
+        conn = self._db.connection()
+        conn.executescript(_SCHEMA)
+        for table, columns in self._MIGRATIONS.items():
+            existing = {
+                row[1] for row in conn.execute(f"PRAGMA table_info({table})").fetchall()
+            }
+            for column, ddl in columns.items():
+                if column not in existing:
+                    conn.execute(ddl)
+                    logger.info("Migrated %s: added %s", table, column)
+        conn.commit()
 
     @staticmethod
     def _row_to_user(row: sqlite3.Row) -> ProvisionedUser:
@@ -243,44 +252,42 @@ class ProvisioningRepository:
     ) -> ProvisionedUser:
         bundle_id = str(uuid.uuid4())
         created_at = _now()
-        conn = self._connect()
+        conn = self._db.connection()
         try:
-            try:
-                conn.execute(
-                    "INSERT INTO provisioned_users ("
-                    "bundle_id, username, user_mxid, home_server, server_name, room_id, "
-                    "display_name, status, payment_status, bundle_fingerprint, created_at, notes"
-                    ") VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
-                    (
-                        bundle_id,
-                        username,
-                        user_mxid,
-                        home_server,
-                        server_name,
-                        room_id,
-                        display_name,
-                        BundleStatus.UNUSED.value,
-                        PaymentStatus.UNKNOWN.value,
-                        bundle_fingerprint,
-                        _iso(created_at),
-                        notes,
-                    ),
-                )
-            except sqlite3.IntegrityError as exc:
-                raise UsernameAlreadyProvisionedException(
-                    f"{username} is already provisioned on {server_name}"
-                ) from exc
-
-            self._record_event_sync(
-                conn, bundle_id, BundleEventType.CREATED, f"Provisioned {user_mxid}"
+            conn.execute(
+                "INSERT INTO provisioned_users ("
+                "bundle_id, username, user_mxid, home_server, server_name, room_id, "
+                "display_name, status, payment_status, bundle_fingerprint, created_at, notes"
+                ") VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    bundle_id,
+                    username,
+                    user_mxid,
+                    home_server,
+                    server_name,
+                    room_id,
+                    display_name,
+                    BundleStatus.UNUSED.value,
+                    PaymentStatus.UNKNOWN.value,
+                    bundle_fingerprint,
+                    _iso(created_at),
+                    notes,
+                ),
             )
-            conn.commit()
-            row = conn.execute(
-                "SELECT * FROM provisioned_users WHERE bundle_id = ?", (bundle_id,)
-            ).fetchone()
-            return self._row_to_user(row)
-        finally:
-            conn.close()
+        except sqlite3.IntegrityError as exc:
+            raise UsernameAlreadyProvisionedException(
+                f"{username} is already provisioned on {server_name}"
+            ) from exc
+
+        self._record_event_sync(
+            conn, bundle_id, BundleEventType.CREATED, f"Provisioned {user_mxid}"
+        )
+        conn.commit()
+        self._totals.invalidate()
+        row = conn.execute(
+            "SELECT * FROM provisioned_users WHERE bundle_id = ?", (bundle_id,)
+        ).fetchone()
+        return self._row_to_user(row)
 
     async def create(
         self,
@@ -300,7 +307,7 @@ class ProvisioningRepository:
             UsernameAlreadyProvisionedException: If the username already exists
                 on this homeserver.
         """
-        return await asyncio.to_thread(
+        return await self._db.write(
             self._create_sync,
             username=username,
             user_mxid=user_mxid,
@@ -313,55 +320,53 @@ class ProvisioningRepository:
         )
 
     def _mark_redeemed_sync(self, bundle_id: str, last_seen_at: datetime | None) -> ProvisionedUser:
-        conn = self._connect()
-        try:
-            row = conn.execute(
-                "SELECT * FROM provisioned_users WHERE bundle_id = ?", (bundle_id,)
-            ).fetchone()
-            if row is None:
-                raise BundleNotFoundException(bundle_id)
-
-            current = BundleStatus(row["status"])
-            if current is BundleStatus.REVOKED:
-                raise InvalidBundleStateException(
-                    f"Bundle {bundle_id} is revoked and cannot be redeemed"
-                )
-
-            # Redemption is only ever an advance from UNUSED. Observing activity
-            # on an already-rotated account must not walk the status backwards.
-            first_login = _parse(row["first_login_at"]) or last_seen_at or _now()
-            new_status = BundleStatus.REDEEMED if current is BundleStatus.UNUSED else current
-
-            # COALESCE, not a plain write: `last_seen_at` is optional, so a
-            # caller that omits it means "no new observation", not "forget the
-            # one we had". Overwriting with NULL would contradict the docstring
-            # and lose the only record of when the account was last active.
-            conn.execute(
-                "UPDATE provisioned_users SET status = ?, first_login_at = ?, "
-                "last_seen_at = COALESCE(?, last_seen_at), last_polled_at = ? "
-                "WHERE bundle_id = ?",
-                (
-                    new_status.value,
-                    _iso(first_login),
-                    _iso(last_seen_at),
-                    _iso(_now()),
-                    bundle_id,
-                ),
+        conn = self._db.connection()
+        row = conn.execute(
+            "SELECT * FROM provisioned_users WHERE bundle_id = ?", (bundle_id,)
+        ).fetchone()
+        if row is None:
+            raise BundleNotFoundException(bundle_id)
+
+        current = BundleStatus(row["status"])
+        if current is BundleStatus.REVOKED:
+            raise InvalidBundleStateException(
+                f"Bundle {bundle_id} is revoked and cannot be redeemed"
             )
-            if current is BundleStatus.UNUSED:
-                self._record_event_sync(
-                    conn,
-                    bundle_id,
-                    BundleEventType.REDEEMED,
-                    "Sign-in observed on the homeserver",
-                )
-            conn.commit()
-            row = conn.execute(
-                "SELECT * FROM provisioned_users WHERE bundle_id = ?", (bundle_id,)
-            ).fetchone()
-            return self._row_to_user(row)
-        finally:
-            conn.close()
+
+        # Redemption is only ever an advance from UNUSED. Observing activity
+        # on an already-rotated account must not walk the status backwards.
+        first_login = _parse(row["first_login_at"]) or last_seen_at or _now()
+        new_status = BundleStatus.REDEEMED if current is BundleStatus.UNUSED else current
+
+        # COALESCE, not a plain write: `last_seen_at` is optional, so a
+        # caller that omits it means "no new observation", not "forget the
+        # one we had". Overwriting with NULL would contradict the docstring
+        # and lose the only record of when the account was last active.
+        conn.execute(
+            "UPDATE provisioned_users SET status = ?, first_login_at = ?, "
+            "last_seen_at = COALESCE(?, last_seen_at), last_polled_at = ? "
+            "WHERE bundle_id = ?",
+            (
+                new_status.value,
+                _iso(first_login),
+                _iso(last_seen_at),
+                _iso(_now()),
+                bundle_id,
+            ),
+        )
+        if current is BundleStatus.UNUSED:
+            self._record_event_sync(
+                conn,
+                bundle_id,
+                BundleEventType.REDEEMED,
+                "Sign-in observed on the homeserver",
+            )
+        conn.commit()
+        self._totals.invalidate()
+        row = conn.execute(
+            "SELECT * FROM provisioned_users WHERE bundle_id = ?", (bundle_id,)
+        ).fetchone()
+        return self._row_to_user(row)
 
     async def mark_redeemed(
         self, bundle_id: str, last_seen_at: datetime | None = None
@@ -371,76 +376,72 @@ class ProvisioningRepository:
         Idempotent: re-observing activity on an already redeemed or rotated
         bundle refreshes timestamps without changing the status.
         """
-        return await asyncio.to_thread(self._mark_redeemed_sync, bundle_id, last_seen_at)
+        return await self._db.write(self._mark_redeemed_sync, bundle_id, last_seen_at)
 
     def _mark_rotated_sync(self, bundle_id: str) -> ProvisionedUser:
-        conn = self._connect()
-        try:
-            row = conn.execute(
-                "SELECT * FROM provisioned_users WHERE bundle_id = ?", (bundle_id,)
-            ).fetchone()
-            if row is None:
-                raise BundleNotFoundException(bundle_id)
-
-            current = BundleStatus(row["status"])
-            if current is BundleStatus.REVOKED:
-                raise InvalidBundleStateException(
-                    f"Bundle {bundle_id} is revoked and cannot be rotated"
-                )
-            if current is BundleStatus.ROTATED:
-                return self._row_to_user(row)
-
-            now = _now()
-            # A rotation callback also proves redemption, even if the poller has
-            # not caught up yet.
-            first_login = _parse(row["first_login_at"]) or now
-            conn.execute(
-                "UPDATE provisioned_users SET status = ?, rotated_at = ?, first_login_at = ? "
-                "WHERE bundle_id = ?",
-                (BundleStatus.ROTATED.value, _iso(now), _iso(first_login), bundle_id),
-            )
-            self._record_event_sync(
-                conn, bundle_id, BundleEventType.ROTATED, "Client confirmed password rotation"
+        conn = self._db.connection()
+        row = conn.execute(
+            "SELECT * FROM provisioned_users WHERE bundle_id = ?", (bundle_id,)
+        ).fetchone()
+        if row is None:
+            raise BundleNotFoundException(bundle_id)
+
+        current = BundleStatus(row["status"])
+        if current is BundleStatus.REVOKED:
+            raise InvalidBundleStateException(
+                f"Bundle {bundle_id} is revoked and cannot be rotated"
             )
-            conn.commit()
-            row = conn.execute(
-                "SELECT * FROM provisioned_users WHERE bundle_id = ?", (bundle_id,)
-            ).fetchone()
+        if current is BundleStatus.ROTATED:
             return self._row_to_user(row)
-        finally:
-            conn.close()
+
+        now = _now()
+        # A rotation callback also proves redemption, even if the poller has
+        # not caught up yet.
+        first_login = _parse(row["first_login_at"]) or now
+        conn.execute(
+            "UPDATE provisioned_users SET status = ?, rotated_at = ?, first_login_at = ? "
+            "WHERE bundle_id = ?",
+            (BundleStatus.ROTATED.value, _iso(now), _iso(first_login), bundle_id),
+        )
+        self._record_event_sync(
+            conn, bundle_id, BundleEventType.ROTATED, "Client confirmed password rotation"
+        )
+        conn.commit()
+        self._totals.invalidate()
+        row = conn.execute(
+            "SELECT * FROM provisioned_users WHERE bundle_id = ?", (bundle_id,)
+        ).fetchone()
+        return self._row_to_user(row)
 
     async def mark_rotated(self, bundle_id: str) -> ProvisionedUser:
         """Advance a bundle to ``ROTATED`` on confirmed client rotation."""
-        return await asyncio.to_thread(self._mark_rotated_sync, bundle_id)
+        return await self._db.write(self._mark_rotated_sync, bundle_id)
 
     def _revoke_sync(self, bundle_id: str, reason: str) -> ProvisionedUser:
-        conn = self._connect()
-        try:
-            row = conn.execute(
-                "SELECT * FROM provisioned_users WHERE bundle_id = ?", (bundle_id,)
-            ).fetchone()
-            if row is None:
-                raise BundleNotFoundException(bundle_id)
+        conn = self._db.connection()
+        row = conn.execute(
+            "SELECT * FROM provisioned_users WHERE bundle_id = ?", (bundle_id,)
+        ).fetchone()
+        if row is None:
+            raise BundleNotFoundException(bundle_id)
 
-            conn.execute(
-                "UPDATE provisioned_users SET status = ?, revoked_at = ? WHERE bundle_id = ?",
-                (BundleStatus.REVOKED.value, _iso(_now()), bundle_id),
-            )
-            self._record_event_sync(
-                conn, bundle_id, BundleEventType.REVOKED, reason or "Revoked by admin"
-            )
-            conn.commit()
-            row = conn.execute(
-                "SELECT * FROM provisioned_users WHERE bundle_id = ?", (bundle_id,)
-            ).fetchone()
-            return self._row_to_user(row)
-        finally:
-            conn.close()
+        conn.execute(
+            "UPDATE provisioned_users SET status = ?, revoked_at = ? WHERE bundle_id = ?",
+            (BundleStatus.REVOKED.value, _iso(_now()), bundle_id),
+        )
+        self._record_event_sync(
+            conn, bundle_id, BundleEventType.REVOKED, reason or "Revoked by admin"
+        )
+        conn.commit()
+        self._totals.invalidate()
+        row = conn.execute(
+            "SELECT * FROM provisioned_users WHERE bundle_id = ?", (bundle_id,)
+        ).fetchone()
+        return self._row_to_user(row)
 
     async def revoke(self, bundle_id: str, reason: str = "") -> ProvisionedUser:
         """Mark a bundle revoked. Does not touch the Matrix account itself."""
-        return await asyncio.to_thread(self._revoke_sync, bundle_id, reason)
+        return await self._db.write(self._revoke_sync, bundle_id, reason)
 
     def _update_sync(
         self,
@@ -451,77 +452,75 @@ class ProvisioningRepository:
         retention_exempt: bool | None,
         clear_retention_override: bool,
     ) -> ProvisionedUser:
-        conn = self._connect()
-        try:
-            row = conn.execute(
-                "SELECT * FROM provisioned_users WHERE bundle_id = ?", (bundle_id,)
-            ).fetchone()
-            if row is None:
-                raise BundleNotFoundException(bundle_id)
-
-            if payment_status is not None and payment_status.value != row["payment_status"]:
-                conn.execute(
-                    "UPDATE provisioned_users SET payment_status = ? WHERE bundle_id = ?",
-                    (payment_status.value, bundle_id),
-                )
-                self._record_event_sync(
-                    conn,
-                    bundle_id,
-                    BundleEventType.PAYMENT_STATUS_CHANGED,
-                    f"{row['payment_status']} → {payment_status.value}",
-                )
-
-            if notes is not None and notes != (row["notes"] or ""):
-                conn.execute(
-                    "UPDATE provisioned_users SET notes = ? WHERE bundle_id = ?",
-                    (notes, bundle_id),
-                )
-                self._record_event_sync(conn, bundle_id, BundleEventType.NOTE_UPDATED)
-
-            # `None` already means "unchanged", so clearing an override needs
-            # its own explicit flag rather than a magic value.
-            if clear_retention_override and row["retention_days"] is not None:
-                conn.execute(
-                    "UPDATE provisioned_users SET retention_days = NULL WHERE bundle_id = ?",
-                    (bundle_id,),
-                )
-                self._record_event_sync(
-                    conn,
-                    bundle_id,
-                    BundleEventType.RETENTION_CHANGED,
-                    f"{row['retention_days']}d → service default",
-                )
-            elif retention_days is not None and retention_days != row["retention_days"]:
-                conn.execute(
-                    "UPDATE provisioned_users SET retention_days = ? WHERE bundle_id = ?",
-                    (retention_days, bundle_id),
-                )
-                self._record_event_sync(
-                    conn,
-                    bundle_id,
-                    BundleEventType.RETENTION_CHANGED,
-                    f"{row['retention_days'] or 'default'} → {retention_days}d",
-                )
-
-            if retention_exempt is not None and int(retention_exempt) != row["retention_exempt"]:
-                conn.execute(
-                    "UPDATE provisioned_users SET retention_exempt = ? WHERE bundle_id = ?",
-                    (int(retention_exempt), bundle_id),
-                )
-                self._record_event_sync(
-                    conn,
-                    bundle_id,
-                    BundleEventType.RETENTION_CHANGED,
-                    "exempted from sweep" if retention_exempt else "included in sweep",
-                )
+        conn = self._db.connection()
+        row = conn.execute(
+            "SELECT * FROM provisioned_users WHERE bundle_id = ?", (bundle_id,)
+        ).fetchone()
+        if row is None:
+            raise BundleNotFoundException(bundle_id)
 
-            conn.commit()
-            row = conn.execute(
-                "SELECT * FROM provisioned_users WHERE bundle_id = ?", (bundle_id,)
-            ).fetchone()
-            return self._row_to_user(row)
-        finally:
-            conn.close()
+        if payment_status is not None and payment_status.value != row["payment_status"]:
+            conn.execute(
+                "UPDATE provisioned_users SET payment_status = ? WHERE bundle_id = ?",
+                (payment_status.value, bundle_id),
+            )
+            self._record_event_sync(
+                conn,
+                bundle_id,
+                BundleEventType.PAYMENT_STATUS_CHANGED,
+                f"{row['payment_status']} → {payment_status.value}",
+            )
+
+        if notes is not None and notes != (row["notes"] or ""):
+            conn.execute(
+                "UPDATE provisioned_users SET notes = ? WHERE bundle_id = ?",
+                (notes, bundle_id),
+            )
+            self._record_event_sync(conn, bundle_id, BundleEventType.NOTE_UPDATED)
+
+        # `None` already means "unchanged", so clearing an override needs
+        # its own explicit flag rather than a magic value.
+        if clear_retention_override and row["retention_days"] is not None:
+            conn.execute(
+                "UPDATE provisioned_users SET retention_days = NULL WHERE bundle_id = ?",
+                (bundle_id,),
+            )
+            self._record_event_sync(
+                conn,
+                bundle_id,
+                BundleEventType.RETENTION_CHANGED,
+                f"{row['retention_days']}d → service default",
+            )
+        elif retention_days is not None and retention_days != row["retention_days"]:
+            conn.execute(
+                "UPDATE provisioned_users SET retention_days = ? WHERE bundle_id = ?",
+                (retention_days, bundle_id),
+            )
+            self._record_event_sync(
+                conn,
+                bundle_id,
+                BundleEventType.RETENTION_CHANGED,
+                f"{row['retention_days'] or 'default'} → {retention_days}d",
+            )
+
+        if retention_exempt is not None and int(retention_exempt) != row["retention_exempt"]:
+            conn.execute(
+                "UPDATE provisioned_users SET retention_exempt = ? WHERE bundle_id = ?",
+                (int(retention_exempt), bundle_id),
+            )
+            self._record_event_sync(
+                conn,
+                bundle_id,
+                BundleEventType.RETENTION_CHANGED,
+                "exempted from sweep" if retention_exempt else "included in sweep",
+            )
+
+        conn.commit()
+        self._totals.invalidate()
+        row = conn.execute(
+            "SELECT * FROM provisioned_users WHERE bundle_id = ?", (bundle_id,)
+        ).fetchone()
+        return self._row_to_user(row)
 
     async def update(
         self,
@@ -534,7 +533,7 @@ class ProvisioningRepository:
         clear_retention_override: bool = False,
     ) -> ProvisionedUser:
         """Update the manually maintained fields, recording an audit event."""
-        return await asyncio.to_thread(
+        return await self._db.write(
             self._update_sync,
             bundle_id,
             payment_status,
@@ -545,17 +544,14 @@ class ProvisioningRepository:
         )
 
     def _touch_poll_sync(self, bundle_id: str, detail: str | None) -> None:
-        conn = self._connect()
-        try:
-            conn.execute(
-                "UPDATE provisioned_users SET last_polled_at = ? WHERE bundle_id = ?",
-                (_iso(_now()), bundle_id),
-            )
-            if detail and not self._repeats_last_failure(conn, bundle_id, detail):
-                self._record_event_sync(conn, bundle_id, BundleEventType.POLL_FAILED, detail)
-            conn.commit()
-        finally:
-            conn.close()
+        conn = self._db.connection()
+        conn.execute(
+            "UPDATE provisioned_users SET last_polled_at = ? WHERE bundle_id = ?",
+            (_iso(_now()), bundle_id),
+        )
+        if detail and not self._repeats_last_failure(conn, bundle_id, detail):
+            self._record_event_sync(conn, bundle_id, BundleEventType.POLL_FAILED, detail)
+        conn.commit()
 
     @staticmethod
     def _repeats_last_failure(conn: sqlite3.Connection, bundle_id: str, detail: str) -> bool:
@@ -584,44 +580,41 @@ class ProvisioningRepository:
         A failure identical to the bundle's most recent event is not recorded
         again, so a sustained outage leaves one entry rather than one per poll.
         """
-        await asyncio.to_thread(self._touch_poll_sync, bundle_id, failure_detail)
+        await self._db.write(self._touch_poll_sync, bundle_id, failure_detail)
 
     # -- reads --------------------------------------------------------------
 
     def _claim_username_sync(self, username: str, ttl_seconds: float) -> bool:
-        conn = self._connect()
+        conn = self._db.connection()
+        now = _now()
         try:
-            now = _now()
-            try:
-                conn.execute(
-                    "INSERT INTO provisioning_claims (username, claimed_at) VALUES (?, ?)",
-                    (username, _iso(now)),
-                )
-                conn.commit()
-                return True
-            except sqlite3.IntegrityError:
-                pass
-
-            # Someone holds it. A claim only blocks while it is fresh: a process
-            # killed mid-provision would otherwise lock the name forever, with
-            # no way to release it short of editing the database. The UPDATE is
-            # conditional on the age, so the takeover is itself atomic.
-            cutoff = _iso(now - timedelta(seconds=ttl_seconds))
-            cursor = conn.execute(
-                "UPDATE provisioning_claims SET claimed_at = ? "
-                "WHERE username = ? AND claimed_at < ?",
-                (_iso(now), username, cutoff),
+            conn.execute(
+                "INSERT INTO provisioning_claims (username, claimed_at) VALUES (?, ?)",
+                (username, _iso(now)),
             )
             conn.commit()
-            if cursor.rowcount:
-                logger.warning(
-                    "Took over a stale provisioning claim for %s; a previous run "
-                    "may have died partway",
-                    username,
-                )
-            return cursor.rowcount > 0
-        finally:
-            conn.close()
+            return True
+        except sqlite3.IntegrityError:
+            pass
+
+        # Someone holds it. A claim only blocks while it is fresh: a process
+        # killed mid-provision would otherwise lock the name forever, with
+        # no way to release it short of editing the database. The UPDATE is
+        # conditional on the age, so the takeover is itself atomic.
+        cutoff = _iso(now - timedelta(seconds=ttl_seconds))
+        cursor = conn.execute(
+            "UPDATE provisioning_claims SET claimed_at = ? "
+            "WHERE username = ? AND claimed_at < ?",
+            (_iso(now), username, cutoff),
+        )
+        conn.commit()
+        if cursor.rowcount:
+            logger.warning(
+                "Took over a stale provisioning claim for %s; a previous run "
+                "may have died partway",
+                username,
+            )
+        return cursor.rowcount > 0
 
     async def claim_username(
         self, username: str, ttl_seconds: float = PROVISIONING_CLAIM_TTL_SECONDS
@@ -631,45 +624,36 @@ class ProvisioningRepository:
         Returns:
             True if the claim was taken, False if another run holds a fresh one.
         """
-        return await asyncio.to_thread(self._claim_username_sync, username, ttl_seconds)
+        return await self._db.write(self._claim_username_sync, username, ttl_seconds)
 
     def _release_username_sync(self, username: str) -> None:
-        conn = self._connect()
-        try:
-            conn.execute("DELETE FROM provisioning_claims WHERE username = ?", (username,))
-            conn.commit()
-        finally:
-            conn.close()
+        conn = self._db.connection()
+        conn.execute("DELETE FROM provisioning_claims WHERE username = ?", (username,))
+        conn.commit()
 
     async def release_username(self, username: str) -> None:
         """Release a provisioning claim. Safe to call when none is held."""
-        await asyncio.to_thread(self._release_username_sync, username)
+        await self._db.write(self._release_username_sync, username)
 
     def _get_sync(self, bundle_id: str) -> ProvisionedUser | None:
-        conn = self._connect()
-        try:
-            row = conn.execute(
-                "SELECT * FROM provisioned_users WHERE bundle_id = ?", (bundle_id,)
-            ).fetchone()
-            return self._row_to_user(row) if row else None
-        finally:
-            conn.close()
+        conn = self._db.connection()
+        row = conn.execute(
+            "SELECT * FROM provisioned_users WHERE bundle_id = ?", (bundle_id,)
+        ).fetchone()
+        return self._row_to_user(row) if row else None
 
     async def get(self, bundle_id: str) -> ProvisionedUser | None:
         """Fetch one record, or ``None`` if the bundle ID is unknown."""
-        return await asyncio.to_thread(self._get_sync, bundle_id)
+        return await self._db.read(self._get_sync, bundle_id)
 
     def _find_by_username_sync(self, username: str) -> ProvisionedUser | None:
-        conn = self._connect()
-        try:
-            row = conn.execute(
-                "SELECT * FROM provisioned_users WHERE username = ? "
-                "ORDER BY created_at DESC LIMIT 1",
-                (username,),
-            ).fetchone()
-            return self._row_to_user(row) if row else None
-        finally:
-            conn.close()
+        conn = self._db.connection()
+        row = conn.execute(
+            "SELECT * FROM provisioned_users WHERE username = ? "
+            "ORDER BY created_at DESC LIMIT 1",
+            (username,),
+        ).fetchone()
+        return self._row_to_user(row) if row else None
 
     async def find_by_username(self, username: str) -> ProvisionedUser | None:
         """Return the most recent record for a username, or ``None``.
@@ -677,7 +661,7 @@ class ProvisioningRepository:
         Used to reject a duplicate before provisioning, so the common failure
         does not leave an orphan account on Synapse to roll back.
         """
-        return await asyncio.to_thread(self._find_by_username_sync, username)
+        return await self._db.read(self._find_by_username_sync, username)
 
     def _list_sync(
         self,
@@ -685,7 +669,8 @@ class ProvisioningRepository:
         page_size: int,
         status: BundleStatus | None,
         payment_status: PaymentStatus | None,
-    ) -> tuple[list[ProvisionedUser], int]:
+        cursor: str | None = None,
+    ) -> tuple[list[ProvisionedUser], int, str | None]:
         page = max(1, page)
         page_size = max(1, min(MAX_PAGE_SIZE, page_size))
 
@@ -698,19 +683,36 @@ class ProvisioningRepository:
             params.append(payment_status.value)
         clause = f" WHERE {' AND '.join(where)}" if where else ""
 
-        conn = self._connect()
-        try:
-            total = conn.execute(
+        # A cursor is the (created_at, bundle_id) of the previous page's last
+        # row. Seeking past it costs the same on page 500 as on page 1, and
+        # records created meanwhile cannot shift rows between pages the way
+        # they do under OFFSET.
+        seek, seek_params = [], []
+        if cursor is not None:
+            seek.append("(created_at, bundle_id) < (?, ?)")
+            seek_params.extend(decode_cursor(cursor, 2))
+        page_where = where + seek
+        page_clause = f" WHERE {' AND '.join(page_where)}" if page_where else ""
+        offset = 0 if cursor is not None else (page - 1) * page_size
+
+        conn = self._db.connection()
+        total = self._totals.get_or_compute(
+            (status, payment_status),
+            lambda: conn.execute(
                 f"SELECT COUNT(*) FROM provisioned_users{clause}", params
-            ).fetchone()[0]
-            rows = conn.execute(
-                f"SELECT * FROM provisioned_users{clause} "
-                "ORDER BY created_at DESC LIMIT ? OFFSET ?",
-                [*params, page_size, (page - 1) * page_size],
-            ).fetchall()
-            return [self._row_to_user(r) for r in rows], total
-        finally:
-            conn.close()
+            ).fetchone()[0],
+        )
+        rows = conn.execute(
+            f"SELECT * FROM provisioned_users{page_clause} "
+            "ORDER BY created_at DESC, bundle_id DESC LIMIT ? OFFSET ?",
+            [*params, *seek_params, page_size, offset],
+        ).fetchall()
+        next_cursor = (
+            encode_cursor(rows[-1]["created_at"], rows[-1]["bundle_id"])
+            if len(rows) == page_size
+            else None
+        )
+        return [self._row_to_user(r) for r in rows], total, next_cursor
 
     async def list_users(
         self,
@@ -718,43 +720,47 @@ class ProvisioningRepository:
         page_size: int = 20,
         status: BundleStatus | None = None,
         payment_status: PaymentStatus | None = None,
-    ) -> tuple[list[ProvisionedUser], int]:
-        """List records newest first, optionally filtered."""
-        return await asyncio.to_thread(self._list_sync, page, page_size, status, payment_status)
+        cursor: str | None = None,
+    ) -> tuple[list[ProvisionedUser], int, str | None]:
+        """List records newest first, optionally filtered.
+
+        Returns the page, the filtered total and a cursor for the next page
+        (``None`` on the last one). Passing ``cursor`` ignores ``page``.
+
+        Raises:
+            InvalidCursorError: If ``cursor`` was not issued by this listing.
+        """
+        return await self._db.read(
+            self._list_sync, page, page_size, status, payment_status, cursor
+        )
 
     def _list_pollable_sync(self, limit: int) -> list[ProvisionedUser]:
-        conn = self._connect()
-        try:
-            rows = conn.execute(
-                "SELECT * FROM provisioned_users WHERE status IN (?, ?) "
-                "ORDER BY COALESCE(last_polled_at, '') ASC LIMIT ?",
-                (BundleStatus.UNUSED.value, BundleStatus.REDEEMED.value, limit),
-            ).fetchall()
-            return [self._row_to_user(r) for r in rows]
-        finally:
-            conn.close()
+        conn = self._db.connection()
+        rows = conn.execute(
+            "SELECT * FROM provisioned_users WHERE status IN (?, ?) "
+            "ORDER BY COALESCE(last_polled_at, '') ASC LIMIT ?",
+            (BundleStatus.UNUSED.value, BundleStatus.REDEEMED.value, limit),
+        ).fetchall()
+        return [self._row_to_user(r) for r in rows]
 
     async def list_pollable(self, limit: int) -> list[ProvisionedUser]:
         """Return accounts still worth polling, least-recently-polled first.
 
         Rotated and revoked bundles are terminal, so they are never polled again.
         """
-        return await asyncio.to_thread(self._list_pollable_sync, limit)
+        return await self._db.read(self._list_pollable_sync, limit)
 
     def _list_purgeable_sync(self, limit: int) -> list[ProvisionedUser]:
-        conn = self._connect()
-        try:
-            rows = conn.execute(
-                "SELECT * FROM provisioned_users "
-                "WHERE first_login_at IS NOT NULL "
-                "  AND revoked_at IS NULL "
-                "  AND retention_exempt = 0 "
-                "ORDER BY created_at ASC LIMIT ?",
-                (limit,),
-            ).fetchall()
-            return [self._row_to_user(r) for r in rows]
-        finally:
-            conn.close()
+        conn = self._db.connection()
+        rows = conn.execute(
+            "SELECT * FROM provisioned_users "
+            "WHERE first_login_at IS NOT NULL "
+            "  AND revoked_at IS NULL "
+            "  AND retention_exempt = 0 "
+            "ORDER BY created_at ASC LIMIT ?",
+            (limit,),
+        ).fetchall()
+        return [self._row_to_user(r) for r in rows]
 
     async def list_purgeable(self, limit: int = 500) -> list[ProvisionedUser]:
         """Return users the retention sweep should process.
@@ -764,30 +770,27 @@ class ProvisioningRepository:
         a revoked one may be under investigation, and an exempt user has been
         deliberately pinned.
         """
-        return await asyncio.to_thread(self._list_purgeable_sync, limit)
+        return await self._db.read(self._list_purgeable_sync, limit)
 
     def _events_sync(self, bundle_id: str, limit: int) -> list[BundleEvent]:
-        conn = self._connect()
-        try:
-            # Newest-first in SQL so the limit keeps the *recent* entries, then
-            # reversed for display. Selecting the oldest N would pin the caller
-            # to the creation event forever.
-            rows = conn.execute(
-                "SELECT * FROM bundle_events WHERE bundle_id = ? ORDER BY id DESC LIMIT ?",
-                (bundle_id, max(1, limit)),
-            ).fetchall()
-            return [
-                BundleEvent(
-                    id=r["id"],
-                    bundle_id=r["bundle_id"],
-                    event_type=BundleEventType(r["event_type"]),
-                    detail=r["detail"] or "",
-                    created_at=_parse(r["created_at"]),
-                )
-                for r in reversed(rows)
-            ]
-        finally:
-            conn.close()
+        conn = self._db.connection()
+        # Newest-first in SQL so the limit keeps the *recent* entries, then
+        # reversed for display. Selecting the oldest N would pin the caller
+        # to the creation event forever.
+        rows = conn.execute(
+            "SELECT * FROM bundle_events WHERE bundle_id = ? ORDER BY id DESC LIMIT ?",
+            (bundle_id, max(1, limit)),
+        ).fetchall()
+        return [
+            BundleEvent(
+                id=r["id"],
+                bundle_id=r["bundle_id"],
+                event_type=BundleEventType(r["event_type"]),
+                detail=r["detail"] or "",
+                created_at=_parse(r["created_at"]),
+            )
+            for r in reversed(rows)
+        ]
 
     async def get_events(
         self, bundle_id: str, limit: int = DEFAULT_EVENT_LIMIT
@@ -798,36 +801,33 @@ class ProvisioningRepository:
         writes to it), so an unlimited read is a response size no caller can
         predict.
         """
-        return await asyncio.to_thread(self._events_sync, bundle_id, limit)
+        return await self._db.read(self._events_sync, bundle_id, limit)
 
     def _stats_sync(self, signup_history_days: int) -> StatsResponse:
-        conn = self._connect()
-        try:
-            status_counts = {
-                r["status"]: r["n"]
-                for r in conn.execute(
-                    "SELECT status, COUNT(*) AS n FROM provisioned_users GROUP BY status"
-                ).fetchall()
-            }
-            payment_counts = {
-                r["payment_status"]: r["n"]
-                for r in conn.execute(
-                    "SELECT payment_status, COUNT(*) AS n FROM provisioned_users "
-                    "GROUP BY payment_status"
-                ).fetchall()
-            }
-            cutoff = _iso(_now() - timedelta(days=signup_history_days))
-            signups = {
-                r["day"]: r["n"]
-                for r in conn.execute(
-                    "SELECT substr(created_at, 1, 10) AS day, COUNT(*) AS n "
-                    "FROM provisioned_users WHERE created_at >= ? GROUP BY day ORDER BY day",
-                    (cutoff,),
-                ).fetchall()
-            }
-            total = conn.execute("SELECT COUNT(*) FROM provisioned_users").fetchone()[0]
-        finally:
-            conn.close()
+        conn = self._db.connection()
+        status_counts = {
+            r["status"]: r["n"]
+            for r in conn.execute(
+                "SELECT status, COUNT(*) AS n FROM provisioned_users GROUP BY status"
+            ).fetchall()
+        }
+        payment_counts = {
+            r["payment_status"]: r["n"]
+            for r in conn.execute(
+                "SELECT payment_status, COUNT(*) AS n FROM provisioned_users "
+                "GROUP BY payment_status"
+            ).fetchall()
+        }
+        cutoff = _iso(_now() - timedelta(days=signup_history_days))
+        signups = {
+            r["day"]: r["n"]
+            for r in conn.execute(
+                "SELECT substr(created_at, 1, 10) AS day, COUNT(*) AS n "
+                "FROM provisioned_users WHERE created_at >= ? GROUP BY day ORDER BY day",
+                (cutoff,),
+            ).fetchall()
+        }
+        total = conn.execute("SELECT COUNT(*) FROM provisioned_users").fetchone()[0]
 
         return StatsResponse(
             total_provisioned=total,
@@ -844,44 +844,38 @@ class ProvisioningRepository:
 
     async def get_stats(self, signup_history_days: int = 90) -> StatsResponse:
         """Aggregate counts for the dashboard."""
-        return await asyncio.to_thread(self._stats_sync, signup_history_days)
+        return await self._db.read(self._stats_sync, signup_history_days)
 
     # -- purge runs ---------------------------------------------------------
 
     def _record_purge_sync(
         self, purge_id: str, bundle_id: str, room_id: str, purge_up_to_ts: int
     ) -> None:
-        conn = self._connect()
-        try:
-            conn.execute(
-                "INSERT INTO purge_runs (purge_id, bundle_id, room_id, purge_up_to_ts, "
-                "status, started_at) VALUES (?, ?, ?, ?, ?, ?)",
-                (purge_id, bundle_id, room_id, purge_up_to_ts, "active", _iso(_now())),
-            )
-            conn.commit()
-        finally:
-            conn.close()
+        conn = self._db.connection()
+        conn.execute(
+            "INSERT INTO purge_runs (purge_id, bundle_id, room_id, purge_up_to_ts, "
+            "status, started_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (purge_id, bundle_id, room_id, purge_up_to_ts, "active", _iso(_now())),
+        )
+        conn.commit()
 
     async def record_purge(
         self, purge_id: str, bundle_id: str, room_id: str, purge_up_to_ts: int
     ) -> None:
         """Record a started purge so its outcome can be reported later."""
-        await asyncio.to_thread(
+        await self._db.write(
             self._record_purge_sync, purge_id, bundle_id, room_id, purge_up_to_ts
         )
 
     def _record_purge_volume_sync(
         self, purge_id: str, media_deleted: int, bytes_freed: int
     ) -> None:
-        conn = self._connect()
-        try:
-            conn.execute(
-                "UPDATE purge_runs SET media_deleted = ?, bytes_freed = ? WHERE purge_id = ?",
-                (media_deleted, bytes_freed, purge_id),
-            )
-            conn.commit()
-        finally:
-            conn.close()
+        conn = self._db.connection()
+        conn.execute(
+            "UPDATE purge_runs SET media_deleted = ?, bytes_freed = ? WHERE purge_id = ?",
+            (media_deleted, bytes_freed, purge_id),
+        )
+        conn.commit()
 
     async def record_purge_volume(
         self, purge_id: str, media_deleted: int, bytes_freed: int
@@ -892,22 +886,19 @@ class ProvisioningRepository:
         because the figure is only known once the files are gone and the usage
         has been re-read.
         """
-        await asyncio.to_thread(
+        await self._db.write(
             self._record_purge_volume_sync, purge_id, media_deleted, bytes_freed
         )
 
     def _purged_totals_sync(self, bundle_id: str) -> tuple[int, int]:
-        conn = self._connect()
-        try:
-            row = conn.execute(
-                "SELECT COALESCE(SUM(bytes_freed), 0) AS b, "
-                "COALESCE(SUM(media_deleted), 0) AS n "
-                "FROM purge_runs WHERE bundle_id = ?",
-                (bundle_id,),
-            ).fetchone()
-            return int(row["b"]), int(row["n"])
-        finally:
-            conn.close()
+        conn = self._db.connection()
+        row = conn.execute(
+            "SELECT COALESCE(SUM(bytes_freed), 0) AS b, "
+            "COALESCE(SUM(media_deleted), 0) AS n "
+            "FROM purge_runs WHERE bundle_id = ?",
+            (bundle_id,),
+        ).fetchone()
+        return int(row["b"]), int(row["n"])
 
     async def purged_totals(self, bundle_id: str) -> tuple[int, int]:
         """Return ``(bytes_freed, media_deleted)`` across every purge of a bundle.
@@ -916,40 +907,34 @@ class ProvisioningRepository:
         row, so the total cannot drift out of step with the history it is
         derived from.
         """
-        return await asyncio.to_thread(self._purged_totals_sync, bundle_id)
+        return await self._db.read(self._purged_totals_sync, bundle_id)
 
     def _update_purge_sync(self, purge_id: str, status: str) -> None:
-        conn = self._connect()
-        try:
-            completed = _iso(_now()) if status in ("complete", "failed") else None
-            conn.execute(
-                "UPDATE purge_runs SET status = ?, completed_at = ? WHERE purge_id = ?",
-                (status, completed, purge_id),
-            )
-            conn.commit()
-        finally:
-            conn.close()
+        conn = self._db.connection()
+        completed = _iso(_now()) if status in ("complete", "failed") else None
+        conn.execute(
+            "UPDATE purge_runs SET status = ?, completed_at = ? WHERE purge_id = ?",
+            (status, completed, purge_id),
+        )
+        conn.commit()
 
     async def update_purge_status(self, purge_id: str, status: str) -> None:
         """Update a purge run's status, stamping completion for terminal states."""
-        await asyncio.to_thread(self._update_purge_sync, purge_id, status)
+        await self._db.write(self._update_purge_sync, purge_id, status)
 
     def _list_purges_sync(self, bundle_id: str | None) -> list[dict]:
-        conn = self._connect()
-        try:
-            if bundle_id:
-                rows = conn.execute(
-                    "SELECT * FROM purge_runs WHERE bundle_id = ? ORDER BY started_at DESC",
-                    (bundle_id,),
-                ).fetchall()
-            else:
-                rows = conn.execute(
-                    "SELECT * FROM purge_runs ORDER BY started_at DESC LIMIT 200"
-                ).fetchall()
-            return [dict(r) for r in rows]
-        finally:
-            conn.close()
+        conn = self._db.connection()
+        if bundle_id:
+            rows = conn.execute(
+                "SELECT * FROM purge_runs WHERE bundle_id = ? ORDER BY started_at DESC",
+                (bundle_id,),
+            ).fetchall()
+        else:
+            rows = conn.execute(
+                "SELECT * FROM purge_runs ORDER BY started_at DESC LIMIT 200"
+            ).fetchall()
+        return [dict(r) for r in rows]
 
     async def list_purges(self, bundle_id: str | None = None) -> list[dict]:
         """List purge runs, newest first."""
-        return await asyncio.to_thread(self._list_purges_sync, bundle_id)
+        return await self._db.read(self._list_purges_sync, bundle_id)
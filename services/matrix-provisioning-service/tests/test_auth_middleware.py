@@ -12,6 +12,7 @@ from fastapi import FastAPI
 from fastapi.testclient import TestClient
 
 from shared.auth import APIKeyAuthMiddleware
+from shared.auth.middleware import _digest, _key_matches, _PrefixTrie
 
 CLIENT_AUTH = {"Authorization": "Bearer test-key"}
 ADMIN_AUTH = {"Authorization": "Bearer test-admin-key"}
@@ -108,3 +109,61 @@ def test_an_admin_key_is_not_accepted_on_a_client_path(client_default_deny):
     response = client_default_deny.get("/api/v1/client", headers=ADMIN_AUTH)
 
     assert response.status_code == 403
+
+
+@pytest.mark.parametrize(
+    ("path", "expected"),
+    [
+        ("/api/v1/client", True),
+        ("/api/v1/client/", True),
+        ("/api/v1/client/bundles/x", True),
+        ("/api/v1/client-admin", False),
+        ("/api/v1", False),
+        ("/api/v1/users/42", True),
+        ("//api/v1/client", False),
+    ],
+)
+def test_the_compiled_prefixes_match_on_segment_boundaries(path, expected):
+    trie = _PrefixTrie(["/api/v1/client/", "/api/v1/users", "/api/v1/usage"])
+
+    assert trie.matches(path) is expected
+
+
+def test_keys_are_checked_against_every_configured_key():
+    digests = tuple(_digest(key) for key in ("first", "second"))
+
+    assert _key_matches("second", digests)
+    assert not _key_matches("secon", digests)
+    assert not _key_matches("", ())
+
+
+def test_a_key_file_is_reloaded_when_it_changes(tmp_path, monkeypatch):
+    """Rotating keys in the file takes effect without restarting the service."""
+    keys_file = tmp_path / "api_keys"
+    keys_file.write_text("# rotated monthly\nold-key\n")
+    monkeypatch.setenv("API_KEYS_FILE", str(keys_file))
+    monkeypatch.setenv("API_KEYS_RELOAD_SECONDS", "0")
+    client = TestClient(_app(admin_path_prefixes=["/api/v1/bundles"]))
+    old, new = {"Authorization": "Bearer old-key"}, {"Authorization": "Bearer new-key"}
+
+    assert client.get("/api/v1/client", headers=old).status_code == 200
+    assert client.get("/api/v1/client", headers=CLIENT_AUTH).status_code == 403
+
+    keys_file.write_text("new-key,\nanother-key\n")
+
+    assert client.get("/api/v1/client", headers=new).status_code == 200
+    assert client.get("/api/v1/client", headers=old).status_code == 403
+
+
+def test_an_unreadable_key_file_keeps_the_current_keys(tmp_path, monkeypatch):
+    keys_file = tmp_path / "api_keys"
+    keys_file.write_text("old-key")
+    monkeypatch.setenv("API_KEYS_FILE", str(keys_file))
+    monkeypatch.setenv("API_KEYS_RELOAD_SECONDS", "0")
+    client = TestClient(_app(admin_path_prefixes=["/api/v1/bundles"]))
+    old = {"Authorization": "Bearer old-key"}
+    assert client.get("/api/v1/client", headers=old).status_code == 200
+
+    keys_file.unlink()
+
+    assert client.get("/api/v1/client", headers=old).status_code == 200
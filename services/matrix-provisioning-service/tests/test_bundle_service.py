@@ -131,7 +131,7 @@ async def test_nothing_is_recorded_when_provisioning_fails(repository, credentia
     with pytest.raises(SynapseUnavailableException):
         await service.create_bundle(CreateBundleRequest(username="lotti_user"))
 
-    users, total = await repository.list_users()
+    users, total, _ = await repository.list_users()
     assert total == 0 and users == []
 
 
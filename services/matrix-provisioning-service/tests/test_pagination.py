@@ -0,0 +1,78 @@
+"""Tests for the shared keyset-pagination helpers.
+
+Every listing in the three services hands these cursors to clients, so a
+cursor that does not round-trip exactly would skip or repeat rows.
+"""
+
+from __future__ import annotations
+
+import pytest
+
+from shared.pagination import InvalidCursorError, TotalCache, decode_cursor, encode_cursor
+
+
+def test_a_cursor_round_trips_its_sort_key():
+    cursor = encode_cursor("2026-01-01T00:00:00+00:00", 42)
+
+    assert decode_cursor(cursor, 2) == ("2026-01-01T00:00:00+00:00", 42)
+
+
+def test_a_cursor_is_url_safe():
+    cursor = encode_cursor("ü/+?&=", 1)
+
+    assert all(c.isalnum() or c in "-_" for c in cursor)
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "",
+        "%%%",
+        "bm90LWpzb24",
+        encode_cursor("a", 1, 2),
+        encode_cursor({"x": 1}, 1),
+        encode_cursor("a", [1]),
+        encode_cursor(None, 1),
+    ],
+)
+def test_a_foreign_or_mis_shaped_cursor_is_rejected(cursor):
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(cursor, 2)
+
+
+def test_the_total_is_computed_once_within_its_ttl():
+    cache = TotalCache(ttl_seconds=60)
+    calls = []
+
+    def count() -> int:
+        calls.append(1)
+        return 7
+
+    assert cache.get_or_compute("user-1", count) == 7
+    assert cache.get_or_compute("user-1", count) == 7
+    assert len(calls) == 1
+
+
+def test_invalidation_forces_a_recount():
+    cache = TotalCache(ttl_seconds=60)
+    cache.get_or_compute("user-1", lambda: 1)
+
+    cache.invalidate("user-1")
+
+    assert cache.get_or_compute("user-1", lambda: 2) == 2
+
+
+def test_an_expired_total_is_recounted():
+    cache = TotalCache(ttl_seconds=0)
+    cache.get_or_compute("user-1", lambda: 1)
+
+    assert cache.get_or_compute("user-1", lambda: 2) == 2
+
+
+def test_the_cache_is_bounded():
+    cache = TotalCache(ttl_seconds=60, max_entries=2)
+    for key in ("a", "b", "c"):
+        cache.get_or_compute(key, lambda: 1)
+
+    # "a" was evicted, so it is counted afresh
+    assert cache.get_or_compute("a", lambda: 5) == 5
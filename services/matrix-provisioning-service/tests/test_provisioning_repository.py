@@ -222,16 +222,65 @@ async def test_touch_poll_with_failure_records_an_event(repository):
 async def test_list_users_filters_by_status_and_paginates(repository):
     for i in range(5):
         await seed_user(repository, username=f"user_{i}")
-    all_users, _ = await repository.list_users(page=1, page_size=100)
+    all_users, _, _ = await repository.list_users(page=1, page_size=100)
     await repository.mark_rotated(all_users[0].bundle_id)
 
-    rotated, total = await repository.list_users(status=BundleStatus.ROTATED)
-    page_one, overall = await repository.list_users(page=1, page_size=2)
+    rotated, total, _ = await repository.list_users(status=BundleStatus.ROTATED)
+    page_one, overall, _ = await repository.list_users(page=1, page_size=2)
 
     assert total == 1 and len(rotated) == 1
     assert overall == 5 and len(page_one) == 2
 
 
+async def test_cursor_pages_cover_every_record_once(repository):
+    for i in range(5):
+        await seed_user(repository, username=f"user_{i}")
+
+    page, _, cursor = await repository.list_users(page_size=2)
+    seen = [u.bundle_id for u in page]
+    while cursor:
+        page, _, cursor = await repository.list_users(page_size=2, cursor=cursor)
+        seen.extend(u.bundle_id for u in page)
+
+    everyone, _, last = await repository.list_users(page_size=100)
+    assert seen == [u.bundle_id for u in everyone]
+    assert last is None
+
+
+async def test_cursor_respects_the_status_filter(repository):
+    users = [await seed_user(repository, username=f"user_{i}") for i in range(4)]
+    for user in users[:3]:
+        await repository.mark_rotated(user.bundle_id)
+
+    page, total, cursor = await repository.list_users(
+        page_size=2, status=BundleStatus.ROTATED
+    )
+    rest, _, _ = await repository.list_users(
+        page_size=2, status=BundleStatus.ROTATED, cursor=cursor
+    )
+
+    assert total == 3
+    assert len(page) == 2 and len(rest) == 1
+    assert all(u.status is BundleStatus.ROTATED for u in page + rest)
+
+
+async def test_listing_totals_are_cached_until_a_record_changes_filter(repository):
+    users = [await seed_user(repository, username=f"user_{i}") for i in range(3)]
+    _, unused, _ = await repository.list_users(status=BundleStatus.UNUSED)
+    _, paying, _ = await repository.list_users(payment_status=PaymentStatus.PAYING)
+
+    await repository.revoke(users[0].bundle_id)
+    await repository.update(users[1].bundle_id, payment_status=PaymentStatus.PAYING)
+    _, unused_after, _ = await repository.list_users(status=BundleStatus.UNUSED)
+    _, paying_after, _ = await repository.list_users(payment_status=PaymentStatus.PAYING)
+    await seed_user(repository, username="user_3")
+    _, overall, _ = await repository.list_users()
+
+    assert (unused, paying) == (3, 0)
+    assert (unused_after, paying_after) == (2, 1)
+    assert overall == 4
+
+
 async def test_find_by_username_returns_none_when_absent(repository):
     assert await repository.find_by_username("nobody") is None
 
@@ -607,11 +656,8 @@ async def test_the_database_runs_in_wal_mode(repository):
 
 async def test_connections_wait_for_a_lock_rather_than_failing(repository):
     """Without a busy timeout a concurrent writer 500s instead of queueing."""
-    conn = repository._connect()
-    try:
-        timeout_ms = conn.execute("PRAGMA busy_timeout").fetchone()[0]
-    finally:
-        conn.close()
+    conn = repository._db.connection()
+    timeout_ms = conn.execute("PRAGMA busy_timeout").fetchone()[0]
 
     assert timeout_ms >= 1000
 
@@ -128,6 +128,27 @@ def test_list_returns_pagination_metadata(client):
     assert body["page_size"] == 1
 
 
+def test_list_follows_next_cursor(client):
+    _create(client, "user_one")
+    _create(client, "user_two")
+
+    first = client.get("/api/v1/bundles?page_size=1", headers=ADMIN_AUTH).json()
+    second = client.get(
+        f"/api/v1/bundles?page_size=1&cursor={first['next_cursor']}", headers=ADMIN_AUTH
+    ).json()
+
+    assert {first["users"][0]["username"], second["users"][0]["username"]} == {
+        "user_one",
+        "user_two",
+    }
+
+
+def test_list_rejects_a_malformed_cursor(client):
+    response = client.get("/api/v1/bundles?cursor=%%%", headers=ADMIN_AUTH)
+
+    assert response.status_code == 400
+
+
 def test_list_filters_by_status(client):
     _create(client, "user_one")
 
@@ -0,0 +1,148 @@
+"""Tests for the shared pooled SQLite layer.
+
+Lives here because this service has the most writers sharing one file: the
+request handlers, the redemption poller and the retention sweep all go through
+the same pool.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import sqlite3
+import threading
+
+import pytest
+
+from shared.sqlite import SQLiteDatabase, get_database_stats
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def db(tmp_path):
+    database = SQLiteDatabase(str(tmp_path / "pool.db"), name="pool-test")
+    database.write_sync(
+        lambda: database.connection().execute("CREATE TABLE t (v INTEGER NOT NULL UNIQUE)")
+    )
+    yield database
+    database.close()
+
+
+def _insert(db: SQLiteDatabase, value: int) -> str:
+    conn = db.connection()
+    conn.execute("INSERT INTO t (v) VALUES (?)", (value,))
+    conn.commit()
+    return threading.current_thread().name
+
+
+def _count(db: SQLiteDatabase) -> int:
+    return db.connection().execute("SELECT COUNT(*) FROM t").fetchone()[0]
+
+
+async def test_every_connection_gets_the_same_pragmas(tmp_path):
+    db = SQLiteDatabase(str(tmp_path / "p.db"), pragmas={"foreign_keys": "ON"})
+    try:
+        def pragmas():
+            conn = db.connection()
+            return tuple(
+                conn.execute(f"PRAGMA {name}").fetchone()[0]
+                for name in ("journal_mode", "synchronous", "foreign_keys", "busy_timeout")
+            )
+
+        # NORMAL is 1; the default busy timeout is 5s
+        assert await db.read(pragmas) == ("wal", 1, 1, 5000)
+    finally:
+        db.close()
+
+
+def test_a_thread_reuses_its_connection(db):
+    assert db.connection() is db.connection()
+
+
+async def test_all_writes_run_on_the_single_writer_thread(db):
+    threads = await asyncio.gather(*(db.write(_insert, db, i) for i in range(20)))
+
+    assert len(set(threads)) == 1
+    assert "writer" in threads[0]
+    assert await db.read(_count, db) == 20
+
+
+async def test_a_failed_write_does_not_leave_a_transaction_open(db):
+    def insert_twice():
+        conn = db.connection()
+        conn.execute("INSERT INTO t (v) VALUES (1)")
+        conn.execute("INSERT INTO t (v) VALUES (1)")
+
+    with pytest.raises(sqlite3.IntegrityError):
+        await db.write(insert_twice)
+
+    # The first insert was rolled back, and the writer's connection is usable
+    await db.write(_insert, db, 2)
+    assert await db.read(_count, db) == 1
+
+
+async def test_operations_are_timed_and_reported(tmp_path):
+    seen = []
+    db = SQLiteDatabase(
+        str(tmp_path / "timed.db"), name="timed", on_query=lambda op, s: seen.append(op)
+    )
+    try:
+        await db.read(lambda: db.connection().execute("SELECT 1").fetchone())
+        stats = get_database_stats()["timed"]
+    finally:
+        db.close()
+
+    assert seen == ["<lambda>"]
+    assert stats["operations"]["<lambda>"]["calls"] == 1
+    assert "timed" not in get_database_stats()
+
+
+async def test_the_database_still_works_after_close(db):
+    """A straggler during shutdown is run inline rather than lost."""
+    db.close()
+
+    await db.write(_insert, db, 1)
+
+    assert await db.read(_count, db) == 1
+
+
+async def test_a_straggler_after_close_does_not_leak_its_connection(db):
+    db.close()
+
+    conn = await db.read(db.connection)
+
+    assert db.stats()["connections"] == 0
+    with pytest.raises(sqlite3.ProgrammingError):
+        conn.execute("SELECT 1")
+
+
+async def test_warm_opens_every_connection_up_front(tmp_path):
+    db = SQLiteDatabase(str(tmp_path / "warm.db"), read_workers=3)
+    db.write_sync(lambda: db.connection().execute("CREATE TABLE t (v INTEGER)"))
+    try:
+        await db.warm()
+        warmed = db.stats()["connections"]
+
+        # The first reads reuse the connections opened at startup
+        await asyncio.gather(*(db.read(_count, db) for _ in range(9)))
+    finally:
+        stats = db.stats()
+        db.close()
+
+    assert warmed == 4  # three readers and the writer
+    assert stats["connections"] == 4
+
+
+async def test_warm_is_best_effort_when_a_reader_is_busy(tmp_path):
+    db = SQLiteDatabase(str(tmp_path / "busy.db"), read_workers=2)
+    release = threading.Event()
+    busy = asyncio.create_task(db.read(release.wait))
+    await asyncio.sleep(0.05)
+    try:
+        await asyncio.wait_for(db.warm(timeout=0.1), timeout=5)
+        # The loop stayed free while warming waited on the busy reader
+        await asyncio.sleep(0)
+    finally:
+        release.set()
+        await busy
+        db.close()
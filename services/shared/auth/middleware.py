@@ -2,13 +2,15 @@
 
 from __future__ import annotations
 
+import hashlib
+import hmac
 import logging
 import os
-from typing import Callable
+import time
 
-from fastapi import Request, status
-from starlette.middleware.base import BaseHTTPMiddleware
+from fastapi import status
 from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
 
 logger = logging.getLogger(__name__)
 
@@ -16,21 +18,103 @@ logger = logging.getLogger(__name__)
 def _deny(status_code: int, detail: str, *, challenge: bool = False) -> JSONResponse:
     """Build an auth failure response.
 
-    Middleware must *return* this rather than raise ``HTTPException``: a
-    ``BaseHTTPMiddleware`` runs above Starlette's ``ExceptionMiddleware``, so a
-    raised ``HTTPException`` is never translated into its status code and
-    surfaces as a 500 instead.
+    Middleware must *send* this rather than raise ``HTTPException``: it runs
+    above Starlette's ``ExceptionMiddleware``, so a raised ``HTTPException`` is
+    never translated into its status code and surfaces as a 500 instead.
     """
     headers = {"WWW-Authenticate": "Bearer"} if challenge else None
     return JSONResponse(status_code=status_code, content={"detail": detail}, headers=headers)
 
 
-class APIKeyAuthMiddleware(BaseHTTPMiddleware):
-    """Middleware to validate API keys for protected endpoints"""
+def _authorization(scope: Scope) -> str:
+    """The Authorization header of a request, or "" (header names are lowercase in ASGI)"""
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            return value.decode("latin-1")
+    return ""
+
+
+def _parse_keys(text: str) -> set[str]:
+    """Keys separated by commas or newlines; blank entries and ``#`` comment lines are skipped"""
+    keys = set()
+    for line in text.splitlines():
+        if line.strip().startswith("#"):
+            continue
+        keys.update(key.strip() for key in line.split(",") if key.strip())
+    return keys
+
+
+def _file_version(path: str) -> tuple[int, int] | None:
+    """Modification time and size of a file, or None when it cannot be read"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _digest(key: str) -> bytes:
+    return hashlib.sha256(key.encode()).digest()
+
+
+def _key_matches(api_key: str, digests: tuple[bytes, ...]) -> bool:
+    """Whether ``api_key`` is one of the configured keys, in constant time.
+
+    Comparing fixed-length digests with ``hmac.compare_digest``, and against
+    every key without stopping at a match, means the response time reveals
+    neither how much of a guessed key was right nor which key matched.
+    """
+    candidate = _digest(api_key)
+    matched = False
+    for digest in digests:
+        matched |= hmac.compare_digest(candidate, digest)
+    return matched
+
+
+class _PrefixTrie:
+    """Path prefixes compiled into a trie of path segments.
+
+    A path matches when it is one of the prefixes or sits beneath one on a
+    segment boundary. A bare ``startswith`` would treat
+    ``/api/v1/client-admin`` as being under ``/api/v1/client``, which in
+    admin-by-default mode is a privilege downgrade: a future admin route whose
+    name merely begins with a client prefix would accept a plain API key. A
+    trailing slash on a prefix is ignored. Matching walks the path's segments
+    once, so it costs the same however many prefixes are configured.
+    """
+
+    def __init__(self, prefixes: list[str]) -> None:
+        self._root: dict = {}
+        for prefix in prefixes:
+            node = self._root
+            for segment in prefix.rstrip("/").split("/"):
+                node = node.setdefault(segment, {})
+            # Segments never contain "/", so this key cannot collide with one
+            node["/"] = True
+
+    def matches(self, path: str) -> bool:
+        node = self._root
+        for segment in path.split("/"):
+            node = node.get(segment)
+            if node is None:
+                return False
+            if "/" in node:
+                return True
+        return False
+
+
+class APIKeyAuthMiddleware:
+    """Middleware to validate API keys for protected endpoints
+
+    Plain ASGI rather than ``BaseHTTPMiddleware``: requests are passed
+    straight through to the app once authenticated, with no extra task or
+    response-stream wrapping per request, so streaming responses and
+    background tasks behave exactly as without the middleware.
+    """
 
     def __init__(
         self,
-        app,
+        app: ASGIApp,
         exempt_paths: list[str] | None = None,
         admin_path_prefixes: list[str] | None = None,
         client_path_prefixes: list[str] | None = None,
@@ -53,27 +137,44 @@ class APIKeyAuthMiddleware(BaseHTTPMiddleware):
                 defaults, so a service that sets both has no answer for a path
                 matching neither.
         """
-        super().__init__(app)
+        self.app = app
         if admin_path_prefixes and client_path_prefixes:
             raise ValueError(
                 "Pass admin_path_prefixes or client_path_prefixes, not both: they "
                 "set opposite defaults for paths matching neither list"
             )
         self.exempt_paths = exempt_paths or ["/health", "/docs", "/openapi.json", "/redoc"]
+        self._exempt = frozenset(self.exempt_paths)
         self.admin_path_prefixes = admin_path_prefixes or []
         self.client_path_prefixes = client_path_prefixes or []
         #: When true, a path matching no prefix requires an admin key.
         self.admin_by_default = bool(client_path_prefixes)
 
-        # Load API keys from environment variable
-        # Format: API_KEYS=key1,key2,key3
-        api_keys_str = os.getenv("API_KEYS", "")
-        self.valid_api_keys = {key.strip() for key in api_keys_str.split(",") if key.strip()}
-
-        # Load admin API keys from environment variable
-        # Format: ADMIN_API_KEYS=admin-key1,admin-key2
-        admin_keys_str = os.getenv("ADMIN_API_KEYS", "")
-        self.valid_admin_keys = {key.strip() for key in admin_keys_str.split(",") if key.strip()}
+        #: Compiled once here so the per-request check is a walk over the
+        #: path's segments, whatever the number of configured prefixes.
+        self._prefixes = _PrefixTrie(
+            self.client_path_prefixes if self.admin_by_default else self.admin_path_prefixes
+        )
+
+        # Keys come from API_KEYS / ADMIN_API_KEYS (comma-separated), or from
+        # the files named by API_KEYS_FILE / ADMIN_API_KEYS_FILE, which are
+        # re-read when they change so keys can be rotated without a restart.
+        self._key_files = {
+            kind: path
+            for kind, path in (
+                ("api", os.getenv("API_KEYS_FILE", "")),
+                ("admin", os.getenv("ADMIN_API_KEYS_FILE", "")),
+            )
+            if path
+        }
+        self._reload_interval = float(os.getenv("API_KEYS_RELOAD_SECONDS", "5"))
+        self._next_reload_check = 0.0
+        self._file_versions: dict[str, tuple[int, int] | None] = {}
+        self.valid_api_keys: set[str] = set()
+        self.valid_admin_keys: set[str] = set()
+        self._api_key_digests: tuple[bytes, ...] = ()
+        self._admin_key_digests: tuple[bytes, ...] = ()
+        self.reload_keys()
 
         if not self.valid_api_keys:
             logger.warning(
@@ -94,18 +195,42 @@ class APIKeyAuthMiddleware(BaseHTTPMiddleware):
                 f"{len(self.valid_admin_keys)} key(s) for {scope}"
             )
 
-    @staticmethod
-    def _matches_prefix(path: str, prefix: str) -> bool:
-        """Whether ``path`` is ``prefix`` or sits beneath it.
+    def reload_keys(self) -> None:
+        """(Re)load the API and admin keys from their files or the environment.
 
-        A bare ``startswith`` would treat ``/api/v1/client-admin`` as being under
-        ``/api/v1/client``, which in admin-by-default mode is a privilege
-        downgrade: a future admin route whose name merely begins with a client
-        prefix would accept a plain API key. Matching on the segment boundary
-        makes the prefix mean a path segment rather than a string.
+        A key file that cannot be read keeps the keys loaded before, so a
+        rotation caught half-written never locks every client out.
         """
-        normalised = prefix.rstrip("/")
-        return path == normalised or path.startswith(f"{normalised}/")
+        for kind, env_var in (("api", "API_KEYS"), ("admin", "ADMIN_API_KEYS")):
+            path = self._key_files.get(kind)
+            if path is None:
+                keys = _parse_keys(os.getenv(env_var, ""))
+            else:
+                self._file_versions[path] = _file_version(path)
+                try:
+                    with open(path, encoding="utf-8") as f:
+                        keys = _parse_keys(f.read())
+                except OSError as e:
+                    logger.error(f"Could not read {env_var}_FILE {path}, keeping the current keys: {e}")
+                    continue
+            digests = tuple(_digest(key) for key in sorted(keys))
+            if kind == "api":
+                self.valid_api_keys, self._api_key_digests = keys, digests
+            else:
+                self.valid_admin_keys, self._admin_key_digests = keys, digests
+
+    def _reload_changed_key_files(self) -> None:
+        """Reload the keys if a key file changed, checking at most every reload interval"""
+        now = time.monotonic()
+        if now < self._next_reload_check:
+            return
+        self._next_reload_check = now + self._reload_interval
+        if any(_file_version(path) != self._file_versions.get(path) for path in self._key_files.values()):
+            self.reload_keys()
+            logger.info(
+                f"Reloaded API keys: {len(self.valid_api_keys)} key(s), "
+                f"{len(self.valid_admin_keys)} admin key(s)"
+            )
 
     def _is_admin_path(self, path: str) -> bool:
         """Check if the path requires admin authentication.
@@ -115,34 +240,40 @@ class APIKeyAuthMiddleware(BaseHTTPMiddleware):
         added later is privileged until someone says otherwise, rather than
         silently reachable with a plain client key.
         """
-        if self.admin_by_default:
-            return not any(
-                self._matches_prefix(path, prefix) for prefix in self.client_path_prefixes
-            )
-        return any(self._matches_prefix(path, prefix) for prefix in self.admin_path_prefixes)
+        return self._prefixes.matches(path) != self.admin_by_default
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Validate the API key of each HTTP request before passing it on"""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        denial = self._check(scope["path"], _authorization(scope))
+        if denial is not None:
+            await denial(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
 
-    async def dispatch(self, request: Request, call_next: Callable):
+    def _check(self, path: str, auth_header: str) -> JSONResponse | None:
         """
-        Validate API key for each request
+        Validate the API key for a request
 
         Args:
-            request: Incoming HTTP request
-            call_next: Next middleware in chain
+            path: Request path
+            auth_header: Authorization header value ("" when absent)
 
         Returns:
-            Response from next middleware or error response
+            None when the request may proceed, otherwise the error response
         """
         # Skip authentication for exempt paths
-        if request.url.path in self.exempt_paths:
-            return await call_next(request)
+        if path in self._exempt:
+            return None
 
-        # Extract API key from Authorization header
-        auth_header = request.headers.get("Authorization", "")
+        if self._key_files:
+            self._reload_changed_key_files()
 
         if not auth_header:
-            logger.warning(
-                f"Authentication failed: Missing Authorization header (path: {request.url.path})"
-            )
+            logger.warning(f"Authentication failed: Missing Authorization header (path: {path})")
             return _deny(
                 status.HTTP_401_UNAUTHORIZED,
                 "Missing Authorization header",
@@ -152,9 +283,7 @@ class APIKeyAuthMiddleware(BaseHTTPMiddleware):
         # Parse Bearer token
         parts = auth_header.split()
         if len(parts) != 2 or parts[0].lower() != "bearer":
-            logger.warning(
-                f"Authentication failed: Invalid Authorization header format (path: {request.url.path})"
-            )
+            logger.warning(f"Authentication failed: Invalid Authorization header format (path: {path})")
             return _deny(
                 status.HTTP_401_UNAUTHORIZED,
                 "Invalid Authorization header format. Use: Bearer <api_key>",
@@ -164,42 +293,38 @@ class APIKeyAuthMiddleware(BaseHTTPMiddleware):
         api_key = parts[1]
 
         # Check admin paths first — require admin key
-        if self._is_admin_path(request.url.path):
+        if self._is_admin_path(path):
             if not self.valid_admin_keys:
                 logger.error(
-                    f"Authentication failed: Admin API keys not configured for admin path (path: {request.url.path})"
+                    f"Authentication failed: Admin API keys not configured for admin path (path: {path})"
                 )
                 return _deny(
                     status.HTTP_503_SERVICE_UNAVAILABLE,
                     "Admin API keys not configured for this endpoint",
                 )
-            elif api_key not in self.valid_admin_keys:
-                logger.warning(
-                    f"Authentication failed: Admin API key required (path: {request.url.path})"
-                )
+            elif not _key_matches(api_key, self._admin_key_digests):
+                logger.warning(f"Authentication failed: Admin API key required (path: {path})")
                 return _deny(
                     status.HTTP_403_FORBIDDEN,
                     "Admin API key required for this endpoint",
                 )
 
-            logger.debug(f"Admin authentication successful for {request.url.path}")
-            return await call_next(request)
+            logger.debug(f"Admin authentication successful for {path}")
+            return None
 
         # Check if regular API keys are configured
         if not self.valid_api_keys:
-            logger.error(
-                f"Authentication failed: No API keys configured (path: {request.url.path})"
-            )
+            logger.error(f"Authentication failed: No API keys configured (path: {path})")
             return _deny(
                 status.HTTP_503_SERVICE_UNAVAILABLE,
                 "Service not configured - no API keys available",
             )
 
         # Validate regular API key (admin keys are not accepted for non-admin paths)
-        if api_key not in self.valid_api_keys:
-            logger.warning(f"Authentication failed: Invalid API key (path: {request.url.path})")
+        if not _key_matches(api_key, self._api_key_digests):
+            logger.warning(f"Authentication failed: Invalid API key (path: {path})")
             return _deny(status.HTTP_403_FORBIDDEN, "Invalid API key")
 
         # API key is valid, proceed with request
-        logger.debug(f"Authentication successful for {request.url.path}")
-        return await call_next(request)
+        logger.debug(f"Authentication successful for {path}")
+        return None
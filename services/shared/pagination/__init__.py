@@ -0,0 +1,6 @@
+"""Keyset pagination helpers package."""
+
+from .cursor import InvalidCursorError, decode_cursor, encode_cursor
+from .totals import TotalCache
+
+__all__ = ["InvalidCursorError", "TotalCache", "decode_cursor", "encode_cursor"]
@@ -0,0 +1,56 @@
+"""Opaque cursors for keyset (seek) pagination"""
+
+from __future__ import annotations
+
+import base64
+import json
+from typing import Any
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a client sends a cursor this service did not issue"""
+
+
+def encode_cursor(*sort_key: Any) -> str:
+    """
+    Encode the sort key of the last row on a page as an opaque cursor
+
+    The next page is everything strictly after this key in the listing's
+    order, which an index can seek to directly instead of skipping OFFSET rows.
+
+    Args:
+        *sort_key: Column values of the last row, in ORDER BY order
+
+    Returns:
+        URL-safe cursor string
+    """
+    payload = json.dumps(list(sort_key), separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, arity: int) -> tuple:
+    """
+    Decode a cursor produced by encode_cursor
+
+    Args:
+        cursor: Cursor string from a previous page
+        arity: Number of sort-key values the listing expects
+
+    Returns:
+        Tuple of sort-key values
+
+    Raises:
+        InvalidCursorError: If the cursor is malformed or has the wrong shape
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeError) as e:
+        raise InvalidCursorError("Malformed pagination cursor") from e
+
+    if not isinstance(values, list) or len(values) != arity:
+        raise InvalidCursorError("Malformed pagination cursor")
+    # Sort keys are bound as query parameters, which only take scalars
+    if not all(isinstance(value, (str, int, float)) for value in values):
+        raise InvalidCursorError("Malformed pagination cursor")
+    return tuple(values)
@@ -0,0 +1,64 @@
+"""Short-lived cache for listing totals"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable
+
+
+class TotalCache:
+    """Caches COUNT(*) results per filter so paging does not recount every time
+
+    Totals are at most ``ttl_seconds`` stale unless the owning repository
+    invalidates them on write. Safe to use from the worker threads that run
+    the synchronous SQLite code.
+    """
+
+    def __init__(self, ttl_seconds: float = 30.0, max_entries: int = 1024):
+        """
+        Initialize the cache
+
+        Args:
+            ttl_seconds: How long a computed total is reused
+            max_entries: Maximum number of distinct filters tracked
+        """
+        self._ttl_seconds = ttl_seconds
+        self._max_entries = max_entries
+        self._entries: OrderedDict[Hashable, tuple[float, int]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], int]) -> int:
+        """
+        Return the cached total for key, computing it if missing or expired
+
+        Args:
+            key: Filter identity (e.g. the user ID being listed)
+            compute: Runs the COUNT query
+
+        Returns:
+            Total number of rows matching the filter
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[0] < self._ttl_seconds:
+                self._entries.move_to_end(key)
+                return entry[1]
+
+        total = compute()
+        with self._lock:
+            self._entries[key] = (now, total)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+        return total
+
+    def invalidate(self, key: Hashable | None = None) -> None:
+        """Drop one cached total, or all of them when key is None"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
@@ -0,0 +1,5 @@
+"""Fast JSON serialization package."""
+
+from .fastjson import HAS_ORJSON, SSE_DONE, ChunkEncoder, FastJSONResponse, dumps, sse_event
+
+__all__ = ["HAS_ORJSON", "SSE_DONE", "ChunkEncoder", "FastJSONResponse", "dumps", "sse_event"]
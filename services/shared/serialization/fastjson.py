@@ -0,0 +1,121 @@
+"""Fast JSON encoding for API responses and server-sent event streams"""
+
+from __future__ import annotations
+
+import json
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised only without orjson
+    orjson = None
+
+#: Whether the orjson encoder is installed (otherwise the stdlib one is used)
+HAS_ORJSON = orjson is not None
+
+#: Terminates an OpenAI-style SSE stream
+SSE_DONE = b"data: [DONE]\n\n"
+
+
+if orjson is not None:
+
+    def dumps(obj: Any) -> bytes:
+        """Encode ``obj`` as compact UTF-8 JSON"""
+        return orjson.dumps(obj)
+
+    from fastapi.responses import ORJSONResponse as FastJSONResponse
+
+else:
+
+    def dumps(obj: Any) -> bytes:
+        """Encode ``obj`` as compact UTF-8 JSON"""
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+    # Starlette's JSONResponse already renders compact UTF-8 with the stdlib
+    FastJSONResponse = JSONResponse
+
+
+def sse_event(obj: Any) -> bytes:
+    """Encode ``obj`` as one ``data:`` server-sent event"""
+    return b"data: " + dumps(obj) + b"\n\n"
+
+
+class ChunkEncoder:
+    """Encodes the chat.completion.chunk events of one stream
+
+    Every chunk of a stream repeats the same envelope (id, object, created,
+    model), and almost all of them are content deltas differing only in
+    their text. The envelope of a content delta is encoded once, as a byte
+    prefix and suffix around the content, so a producer calling content()
+    pays for one string encoding per token instead of a nested dict build
+    and encode. encode() takes chunk dicts built elsewhere: with the stdlib
+    encoder it recognises content deltas and reuses the envelope too, while
+    orjson encodes a whole chunk faster than Python can inspect it, so with
+    orjson every dict goes straight through sse_event. The output is compact
+    UTF-8 JSON, so non-ASCII text is not expanded to escapes.
+    """
+
+    __slots__ = ("_envelope", "_prefix")
+
+    _SUFFIX = b'},"finish_reason":null}]}\n\n'
+
+    def __init__(self, completion_id: str | None = None, created: int | None = None, model: str | None = None):
+        """
+        Initialize the encoder
+
+        Args:
+            completion_id: Chunk id, when the caller builds chunks with content()
+            created: Creation timestamp of the completion
+            model: Model name reported in each chunk
+        """
+        self._envelope: tuple | None = None
+        self._prefix = b""
+        if completion_id is not None:
+            self._set_envelope(completion_id, created, model)
+
+    def _set_envelope(self, completion_id: str, created: int | None, model: str | None) -> None:
+        self._envelope = (completion_id, created, model)
+        self._prefix = (
+            b'data: {"id":'
+            + dumps(completion_id)
+            + b',"object":"chat.completion.chunk","created":'
+            + dumps(created)
+            + b',"model":'
+            + dumps(model)
+            + b',"choices":[{"index":0,"delta":{"content":'
+        )
+
+    def content(self, text: str) -> bytes:
+        """Encode a content delta chunk in this stream's envelope"""
+        if self._envelope is None:
+            raise ValueError("ChunkEncoder.content() needs the stream's id, created and model")
+        return self._prefix + dumps(text) + self._SUFFIX
+
+    def encode(self, chunk: dict) -> bytes:
+        """Encode any chunk dict, taking the pre-encoded path for plain content deltas"""
+        if HAS_ORJSON:
+            return sse_event(chunk)
+        choices = chunk.get("choices")
+        if (
+            len(chunk) == 5
+            and chunk.get("object") == "chat.completion.chunk"
+            and type(choices) is list
+            and len(choices) == 1
+        ):
+            choice = choices[0]
+            delta = choice.get("delta")
+            if (
+                len(choice) == 3
+                and choice.get("index") == 0
+                and choice.get("finish_reason", False) is None
+                and type(delta) is dict
+                and len(delta) == 1
+                and type(delta.get("content")) is str
+            ):
+                envelope = (chunk["id"], chunk["created"], chunk["model"])
+                if envelope != self._envelope:
+                    self._set_envelope(*envelope)
+                return self._prefix + dumps(delta["content"]) + self._SUFFIX
+        return sse_event(chunk)
@@ -0,0 +1,5 @@
+"""Pooled SQLite access layer package."""
+
+from .database import DEFAULT_PRAGMAS, SQLiteDatabase, get_database_stats
+
+__all__ = ["DEFAULT_PRAGMAS", "SQLiteDatabase", "get_database_stats"]
@@ -0,0 +1,277 @@
+"""Pooled SQLite access with persistent connections and a single writer"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+#: Applied to every connection the pool opens. WAL lets readers proceed while
+#: the writer commits; synchronous=NORMAL is durable across application
+#: crashes under WAL and skips an fsync per commit; mmap and a larger page
+#: cache keep hot pages out of read() calls.
+DEFAULT_PRAGMAS: dict[str, str | int] = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -16000,  # negative means KiB, i.e. ~16 MB per connection
+    "busy_timeout": 5000,
+}
+
+DEFAULT_READ_WORKERS = 4
+DEFAULT_STATEMENT_CACHE_SIZE = 256
+DEFAULT_SLOW_QUERY_MS = 250.0
+
+# Live databases by name, for metrics endpoints. Weak values so a database
+# that is closed and dropped (e.g. in tests) disappears from the report.
+_registry: "weakref.WeakValueDictionary[str, SQLiteDatabase]" = weakref.WeakValueDictionary()
+
+
+class SQLiteDatabase:
+    """One SQLite file shared by a service's repositories
+
+    Every thread that touches the database gets its own persistent
+    connection, opened once with the same PRAGMAs, so connection setup and
+    statement preparation (sqlite3 keeps a per-connection prepared-statement
+    cache) leave the hot path. Reads run on a small bounded pool; all writes
+    run on one dedicated writer thread, so writers queue in process instead
+    of contending for SQLite's file lock.
+
+    Callables passed to :meth:`read` / :meth:`write` fetch their connection
+    with :meth:`connection` and are expected to commit their own writes. A
+    transaction left open by a failing callable is rolled back so the
+    persistent connection is never returned to service mid-transaction.
+
+    After :meth:`close` the pools are gone but the database still works:
+    operations run on the caller's thread with a connection opened for it,
+    so a straggler during shutdown is slow rather than lost.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        name: str | None = None,
+        read_workers: int = DEFAULT_READ_WORKERS,
+        pragmas: dict[str, str | int] | None = None,
+        statement_cache_size: int = DEFAULT_STATEMENT_CACHE_SIZE,
+        slow_query_ms: float = DEFAULT_SLOW_QUERY_MS,
+        on_query: Callable[[str, float], None] | None = None,
+    ) -> None:
+        """
+        Open the pool (connections are created lazily, per thread)
+
+        Args:
+            path: Database file path; parent directories are created
+            name: Name used in logs and stats (defaults to the file name)
+            read_workers: Maximum number of reader threads
+            pragmas: Overrides merged on top of DEFAULT_PRAGMAS
+            statement_cache_size: Prepared statements cached per connection
+            slow_query_ms: Operations slower than this are logged as warnings
+            on_query: Called with (operation, seconds) after every operation
+        """
+        if read_workers < 1:
+            raise ValueError("read_workers must be at least 1")
+
+        self.path = path
+        self.name = name or os.path.splitext(os.path.basename(path))[0]
+        self._pragmas = {**DEFAULT_PRAGMAS, **(pragmas or {})}
+        self._statement_cache_size = statement_cache_size
+        self._slow_query_seconds = slow_query_ms / 1000
+        self._on_query = on_query
+        self._read_workers = read_workers
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        self._local = threading.local()
+        self._connections: list[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._stats: dict[str, dict[str, float]] = {}
+        self._closed = False
+        # Bumped by close() so threads drop connections that were closed
+        self._generation = 0
+        self._readers = ThreadPoolExecutor(
+            max_workers=read_workers, thread_name_prefix=f"{self.name}-db-reader"
+        )
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"{self.name}-db-writer")
+        _registry[self.name] = self
+
+    def connection(self) -> sqlite3.Connection:
+        """Return the calling thread's persistent connection, opening it once
+
+        After close() nothing would close a persistent connection again, so
+        an operation gets its own connection instead, closed when it ends.
+        """
+        if self._closed:
+            conn = getattr(self._local, "call_conn", None)
+            if conn is None:
+                conn = self._local.call_conn = self._open()
+            return conn
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.generation != self._generation:
+            conn = self._open()
+            self._local.conn = conn
+            self._local.generation = self._generation
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def _open(self) -> sqlite3.Connection:
+        """Open a connection and apply the configured PRAGMAs"""
+        conn = sqlite3.connect(
+            self.path,
+            timeout=int(self._pragmas.get("busy_timeout", 5000)) / 1000,
+            cached_statements=self._statement_cache_size,
+            # Connections are only ever used by the thread that opened them;
+            # this just lets close() release them from the shutdown thread.
+            check_same_thread=False,
+        )
+        conn.row_factory = sqlite3.Row
+        for pragma, value in self._pragmas.items():
+            conn.execute(f"PRAGMA {pragma} = {value}")
+        return conn
+
+    def _run(self, kind: str, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Run fn on the current thread with timing and transaction cleanup"""
+        start = time.perf_counter()
+        # Set when a write runs another inline (write_sync)
+        outer_kind = getattr(self._local, "kind", None)
+        self._local.kind = kind
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            self._local.kind = outer_kind
+            call_conn = getattr(self._local, "call_conn", None)
+            if call_conn is not None and outer_kind is None:
+                self._local.call_conn = None
+                call_conn.close()
+            conn = getattr(self._local, "conn", None)
+            current = getattr(self._local, "generation", None) == self._generation
+            if conn is not None and current and conn.in_transaction:
+                conn.rollback()
+            self._record(kind, fn, time.perf_counter() - start)
+
+    def _record(self, kind: str, fn: Callable[..., Any], seconds: float) -> None:
+        """Feed per-operation timings to the stats table and the hook"""
+        operation = getattr(fn, "__name__", repr(fn)).strip("_").removesuffix("_sync")
+        with self._lock:
+            entry = self._stats.setdefault(
+                operation, {"kind": kind, "calls": 0, "total_ms": 0.0, "max_ms": 0.0}
+            )
+            entry["calls"] += 1
+            entry["total_ms"] += seconds * 1000
+            entry["max_ms"] = max(entry["max_ms"], seconds * 1000)
+        if seconds >= self._slow_query_seconds:
+            logger.warning(f"Slow {kind} on '{self.name}': {operation} took {seconds * 1000:.1f}ms")
+        if self._on_query is not None:
+            try:
+                self._on_query(operation, seconds)
+            except Exception:
+                logger.exception("SQLite query hook failed")
+
+    async def read(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Run a read-only callable on the reader pool and await its result"""
+        if self._closed:
+            return await asyncio.to_thread(self._run, "read", fn, *args, **kwargs)
+        future = self._readers.submit(self._run, "read", fn, *args, **kwargs)
+        return await asyncio.wrap_future(future)
+
+    async def write(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Run a writing callable on the writer thread and await its result"""
+        if self._closed:
+            return await asyncio.to_thread(self._run, "write", fn, *args, **kwargs)
+        future = self._writer.submit(self._run, "write", fn, *args, **kwargs)
+        return await asyncio.wrap_future(future)
+
+    def write_sync(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Run a writing callable on the writer thread, blocking the caller
+
+        For code that is not on the event loop: schema setup in constructors
+        and background threads. Called from inside a write it runs inline
+        rather than deadlocking on the single writer.
+        """
+        if self._closed or getattr(self._local, "kind", None) == "write":
+            return self._run("write", fn, *args, **kwargs)
+        return self._writer.submit(self._run, "write", fn, *args, **kwargs).result()
+
+    async def warm(self, timeout: float = 5.0) -> None:
+        """Open the writer's and every reader's connection ahead of the first query
+
+        Each pool thread is started and opens its connection (and applies the
+        PRAGMAs) now, at startup, rather than on the first reads after a
+        deploy. Waits off the event loop until the connections are open.
+        Readers busy with queries for longer than timeout seconds are left
+        to open their connections on first use.
+        """
+        if self._closed:
+            return
+        await asyncio.to_thread(self._warm, timeout)
+
+    def _warm(self, timeout: float) -> None:
+        # Holding every reader at the barrier forces the pool to start all of
+        # its threads instead of reusing the first idle one
+        barrier = threading.Barrier(self._read_workers)
+
+        def open_reader() -> None:
+            self.connection()
+            try:
+                barrier.wait(timeout=timeout)
+            except threading.BrokenBarrierError:
+                # Best effort: a busy pool left some readers to open theirs on first use
+                logger.debug(f"Not every reader of '{self.name}' was warmed")
+
+        readers = [self._readers.submit(open_reader) for _ in range(self._read_workers)]
+        self._writer.submit(self.connection).result()
+        for future in readers:
+            future.result()
+
+    def stats(self) -> dict[str, Any]:
+        """
+        Get per-operation timings
+
+        Returns:
+            Dictionary with connection count and calls/avg/max per operation
+        """
+        with self._lock:
+            operations = {
+                name: {
+                    "kind": entry["kind"],
+                    "calls": int(entry["calls"]),
+                    "avg_ms": round(entry["total_ms"] / entry["calls"], 3),
+                    "max_ms": round(entry["max_ms"], 3),
+                }
+                for name, entry in self._stats.items()
+            }
+            return {"connections": len(self._connections), "operations": operations}
+
+    def close(self) -> None:
+        """Finish queued work and close every pooled connection"""
+        if not self._closed:
+            self._closed = True
+            self._writer.shutdown(wait=True)
+            self._readers.shutdown(wait=True)
+        with self._lock:
+            connections, self._connections = self._connections, []
+            self._generation += 1
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                logger.exception(f"Failed to close a connection to '{self.name}'")
+        if _registry.get(self.name) is self:
+            del _registry[self.name]
+
+
+def get_database_stats() -> dict[str, dict[str, Any]]:
+    """Get timing snapshots for every open database, keyed by name"""
+    return {name: db.stats() for name, db in list(_registry.items())}
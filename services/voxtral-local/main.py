@@ -33,6 +33,14 @@ from audio_processor import audio_processor
 from config import ServiceConfig
 from model_manager import model_manager
 
+# shared/ sits next to this service under services/ (bundled into the binary
+# by voxtral_server.spec)
+_SERVICES_DIR = Path(__file__).resolve().parent.parent
+if str(_SERVICES_DIR) not in sys.path:
+    sys.path.insert(0, str(_SERVICES_DIR))
+
+from shared.serialization import SSE_DONE, ChunkEncoder, sse_event  # noqa: E402
+
 # Configure logging
 logging.basicConfig(
     level=getattr(logging, ServiceConfig.LOG_LEVEL),
@@ -361,6 +369,8 @@ async def _stream_transcription(
     try:
         created_time = int(time.time())
         chunk_index = 0
+        # Token events differ only in their text: the envelope is encoded once
+        encoder = ChunkEncoder(f"chatcmpl-{req_id}", created_time, request.model)
 
         if isinstance(result[0], list):
             # Multiple chunks - stream tokens within each chunk
@@ -385,20 +395,7 @@ async def _stream_transcription(
                                 content = " " + content
                             first_token_in_chunk = False
 
-                            event_data = {
-                                "id": f"chatcmpl-{req_id}",
-                                "object": "chat.completion.chunk",
-                                "created": created_time,
-                                "model": request.model,
-                                "choices": [
-                                    {
-                                        "index": 0,
-                                        "delta": {"content": content},
-                                        "finish_reason": None,
-                                    }
-                                ],
-                            }
-                            yield f"data: {json.dumps(event_data)}\n\n"
+                            yield encoder.content(content)
 
                     chunk_index += 1
 
@@ -408,20 +405,7 @@ async def _stream_transcription(
                     error_content = f" [Chunk {i+1} failed]"
                     if chunk_index == 0:
                         error_content = error_content.strip()
-                    event_data = {
-                        "id": f"chatcmpl-{req_id}",
-                        "object": "chat.completion.chunk",
-                        "created": created_time,
-                        "model": request.model,
-                        "choices": [
-                            {
-                                "index": 0,
-                                "delta": {"content": error_content},
-                                "finish_reason": None,
-                            }
-                        ],
-                    }
-                    yield f"data: {json.dumps(event_data)}\n\n"
+                    yield encoder.content(error_content)
                     chunk_index += 1
 
         else:
@@ -433,20 +417,7 @@ async def _stream_transcription(
                 audio_array, context_prompt, request.language, req_id
             ):
                 if token:
-                    event_data = {
-                        "id": f"chatcmpl-{req_id}",
-                        "object": "chat.completion.chunk",
-                        "created": created_time,
-                        "model": request.model,
-                        "choices": [
-                            {
-                                "index": 0,
-                                "delta": {"content": token},
-                                "finish_reason": None,
-                            }
-                        ],
-                    }
-                    yield f"data: {json.dumps(event_data)}\n\n"
+                    yield encoder.content(token)
 
         # Send final chunk with finish_reason
         final_event = {
@@ -462,8 +433,8 @@ async def _stream_transcription(
                 }
             ],
         }
-        yield f"data: {json.dumps(final_event)}\n\n"
-        yield "data: [DONE]\n\n"
+        yield sse_event(final_event)
+        yield SSE_DONE
 
         t_end = time.perf_counter()
         logger.info(f"[REQ {req_id}] Streaming complete. Total time: {t_end-t0:.2f}s")
@@ -488,8 +459,8 @@ async def _stream_transcription(
                 }
             ],
         }
-        yield f"data: {json.dumps(error_event)}\n\n"
-        yield "data: [DONE]\n\n"
+        yield sse_event(error_event)
+        yield SSE_DONE
 
 
 def _audio_array_to_base64(audio_array: NDArray[np.float32], sample_rate: int) -> str:
@@ -4,7 +4,8 @@ block_cipher = None
 
 a = Analysis(
     ['main.py'],
-    pathex=[],
+    # services/, for the shared package
+    pathex=['..'],
     binaries=[],
     datas=[],
     hiddenimports=[
@@ -56,6 +57,9 @@ a = Analysis(
         'config',
         'model_manager',
         'audio_processor',
+        # Shared service code
+        'shared.serialization',
+        'orjson',
     ],
     hookspath=[],
     hooksconfig={},
@@ -0,0 +1,25 @@
+"""Concurrent streaming load generator for the AI services."""
+
+from .report import build_report, diff, percentiles
+from .runner import RunConfig, RunResult, Sample, run
+from .scenario import Mix, RequestSpec, load_replay, parse_mix, synthetic_mix, tone_wav
+from .stub import StubApp, StubBehaviour, StubServer
+
+__all__ = [
+    "Mix",
+    "RequestSpec",
+    "RunConfig",
+    "RunResult",
+    "Sample",
+    "StubApp",
+    "StubBehaviour",
+    "StubServer",
+    "build_report",
+    "diff",
+    "load_replay",
+    "parse_mix",
+    "percentiles",
+    "run",
+    "synthetic_mix",
+    "tone_wav",
+]
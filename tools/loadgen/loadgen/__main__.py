@@ -0,0 +1,206 @@
+"""Command line: ``python -m loadgen run|stub|diff``."""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from contextlib import nullcontext
+from pathlib import Path
+
+from . import report
+from .runner import RunConfig, run
+from .scenario import PROFILES, load_replay, parse_mix, synthetic_mix
+from .stub import StubBehaviour, StubServer
+
+
+def _add_stub_arguments(parser: argparse.ArgumentParser) -> None:
+    group = parser.add_argument_group("stub behaviour")
+    group.add_argument(
+        "--stub-ttft-ms", type=float, default=200.0, help="Time to first token (default: 200)"
+    )
+    group.add_argument(
+        "--stub-token-ms", type=float, default=20.0, help="Time between tokens (default: 20)"
+    )
+    group.add_argument(
+        "--stub-tokens", type=int, default=40, help="Tokens per answer (default: 40)"
+    )
+    group.add_argument(
+        "--stub-error-rate", type=float, default=0.0, help="Fraction answered with 503"
+    )
+
+
+def _behaviour(args: argparse.Namespace) -> StubBehaviour:
+    return StubBehaviour(
+        ttft=args.stub_ttft_ms / 1000,
+        token_interval=args.stub_token_ms / 1000,
+        tokens=args.stub_tokens,
+        error_rate=args.stub_error_rate,
+        seed=args.seed,
+    )
+
+
+def _cmd_run(args: argparse.Namespace) -> int:
+    profile = PROFILES[args.profile]
+    model = args.model or profile["model"]
+    if args.replay:
+        mix = load_replay(args.replay)
+    else:
+        weights = parse_mix(args.mix) if args.mix else profile["mix"]
+        audio = [path.read_bytes() for path in args.audio] if args.audio else None
+        mix = synthetic_mix(weights, model, audio=audio, max_tokens=args.max_tokens, seed=args.seed)
+
+    if args.rps is None and args.concurrency is None and not mix.timed:
+        args.concurrency = 8
+    if args.duration is None and args.requests is None and not mix.timed:
+        args.duration = 30.0
+    default_mix = ",".join(f"{kind}={weight:g}" for kind, weight in profile["mix"].items())
+
+    stub = StubServer(_behaviour(args)) if args.stub else nullcontext()
+    with stub:
+        target = stub.url if args.stub else args.target
+        config = RunConfig(
+            target=target,
+            rps=args.rps,
+            concurrency=args.concurrency,
+            duration=args.duration,
+            requests=args.requests,
+            poisson=not args.uniform,
+            speed=args.speed,
+            max_in_flight=args.max_in_flight,
+            timeout=args.timeout,
+            api_key=args.api_key or os.getenv("LOADGEN_API_KEY"),
+            seed=args.seed,
+        )
+        print(f"Driving {target} ...", file=sys.stderr)
+        started = time.monotonic()
+        result = asyncio.run(run(config, mix))
+        print(f"Finished in {time.monotonic() - started:.1f}s", file=sys.stderr)
+
+    settings = {
+        "target": "stub" if args.stub else args.target,
+        "profile": args.profile,
+        "model": model,
+        "mix": f"replay:{args.replay.name}" if args.replay else (args.mix or default_mix),
+        "rps": args.rps,
+        "concurrency": args.concurrency,
+        "duration_s": args.duration,
+        "requests": args.requests,
+        "arrivals": "uniform" if args.uniform else "poisson",
+        "seed": args.seed,
+    }
+    if args.stub:
+        settings["stub"] = vars(_behaviour(args))
+    result_report = report.build_report(result, settings)
+
+    print(report.render_text(result_report))
+    if args.report:
+        args.report.write_text(report.dumps(result_report), encoding="utf-8")
+        print(f"Report written to {args.report}", file=sys.stderr)
+    threshold = args.fail_on_error_rate
+    return 1 if threshold is not None and result_report["overall"]["error_rate"] > threshold else 0
+
+
+def _cmd_stub(args: argparse.Namespace) -> int:
+    with StubServer(_behaviour(args), host=args.host, port=args.port) as stub:
+        print(f"Stub serving on {stub.url} (Ctrl-C to stop)", file=sys.stderr)
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+
+def _cmd_diff(args: argparse.Namespace) -> int:
+    before = json.loads(args.before.read_text(encoding="utf-8"))
+    after = json.loads(args.after.read_text(encoding="utf-8"))
+    sys.stdout.write(report.diff(before, after))
+    return 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="loadgen",
+        description=(
+            "Concurrent streaming load generator for the ai-proxy, voxtral-local and whisper_server"
+        ),
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser(
+        "run", help="Drive a target with a request mix and report latencies"
+    )
+    target = run_parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--target", help="Base URL of the service, e.g. http://localhost:8002")
+    target.add_argument(
+        "--stub", action="store_true", help="Start a local stub and drive it (offline)"
+    )
+    run_parser.add_argument(
+        "--profile", choices=sorted(PROFILES), default="ai-proxy", help="Default mix and model"
+    )
+    run_parser.add_argument(
+        "--mix", help="Weighted kinds, e.g. chat=1,chat_stream=3,transcription_stream=1"
+    )
+    run_parser.add_argument(
+        "--replay", type=Path, help="JSON Lines file of recorded requests to replay"
+    )
+    run_parser.add_argument("--model", help="Model name in the requests (default: the profile's)")
+    run_parser.add_argument(
+        "--audio", type=Path, action="append", help="WAV fixture for transcriptions (repeatable)"
+    )
+    run_parser.add_argument(
+        "--max-tokens", type=int, default=256, help="max_tokens of chat requests"
+    )
+    pace = run_parser.add_mutually_exclusive_group()
+    pace.add_argument("--rps", type=float, help="Open loop: target requests per second")
+    pace.add_argument(
+        "--concurrency", type=int, help="Closed loop: requests in flight (default: 8)"
+    )
+    run_parser.add_argument(
+        "--uniform", action="store_true", help="Evenly spaced arrivals instead of Poisson"
+    )
+    run_parser.add_argument(
+        "--duration", type=float, help="Seconds to run (default: 30, or a whole timed replay)"
+    )
+    run_parser.add_argument("--requests", type=int, help="Stop after this many requests")
+    run_parser.add_argument(
+        "--speed", type=float, default=1.0, help="Replay timed recordings this much faster"
+    )
+    run_parser.add_argument(
+        "--max-in-flight", type=int, default=1000, help="Open-loop cap before dropping"
+    )
+    run_parser.add_argument(
+        "--timeout", type=float, default=120.0, help="Per-request timeout in seconds"
+    )
+    run_parser.add_argument("--api-key", help="Bearer key (default: $LOADGEN_API_KEY)")
+    run_parser.add_argument("--seed", type=int, default=0, help="Seed for the mix and arrivals")
+    run_parser.add_argument("--report", type=Path, help="Write the JSON report here")
+    run_parser.add_argument("--fail-on-error-rate", type=float, help="Exit 1 above this error rate")
+    _add_stub_arguments(run_parser)
+    run_parser.set_defaults(handler=_cmd_run)
+
+    stub_parser = commands.add_parser("stub", help="Serve the stub until interrupted")
+    stub_parser.add_argument("--host", default="127.0.0.1")
+    stub_parser.add_argument("--port", type=int, default=9100)
+    stub_parser.add_argument("--seed", type=int, default=0)
+    _add_stub_arguments(stub_parser)
+    stub_parser.set_defaults(handler=_cmd_stub)
+
+    diff_parser = commands.add_parser("diff", help="Compare two JSON reports")
+    diff_parser.add_argument("before", type=Path)
+    diff_parser.add_argument("after", type=Path)
+    diff_parser.set_defaults(handler=_cmd_diff)
+
+    args = parser.parse_args(argv)
+    try:
+        return args.handler(args)
+    except ValueError as e:
+        parser.error(str(e))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
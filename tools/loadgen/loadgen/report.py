@@ -0,0 +1,122 @@
+"""Summarise a run as a stable, diffable report."""
+
+from __future__ import annotations
+
+import json
+import math
+from collections import Counter
+
+from .runner import RunResult, Sample
+
+QUANTILES = {"p50": 0.50, "p90": 0.90, "p95": 0.95, "p99": 0.99}
+
+
+def percentiles(values: list[float]) -> dict[str, float] | None:
+    """Nearest-rank percentiles and max of ``values``, in milliseconds."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    result = {
+        name: round(ordered[max(0, math.ceil(q * len(ordered)) - 1)] * 1000, 1)
+        for name, q in QUANTILES.items()
+    }
+    result["max"] = round(ordered[-1] * 1000, 1)
+    return result
+
+
+def _summarise(samples: list[Sample], elapsed: float) -> dict:
+    errors = [sample for sample in samples if not sample.ok]
+    ok = [sample for sample in samples if sample.ok]
+    summary = {
+        "requests": len(samples),
+        "errors": len(errors),
+        "error_rate": round(len(errors) / len(samples), 4) if samples else 0.0,
+        "throughput_rps": round(len(ok) / elapsed, 2) if elapsed else 0.0,
+        "statuses": dict(sorted(Counter(str(sample.status) for sample in samples).items())),
+        "error_reasons": dict(sorted(Counter(sample.error for sample in errors).items())),
+        "total_ms": percentiles([sample.total for sample in ok]),
+    }
+    streamed = [sample for sample in ok if sample.ttft is not None]
+    if streamed:
+        tokens = sum(sample.tokens for sample in streamed)
+        summary["ttft_ms"] = percentiles([sample.ttft for sample in streamed])
+        gaps = [gap for sample in streamed for gap in sample.inter_token]
+        summary["inter_token_ms"] = percentiles(gaps)
+        summary["tokens"] = tokens
+        summary["tokens_per_second"] = round(tokens / elapsed, 1) if elapsed else 0.0
+    return summary
+
+
+def build_report(result: RunResult, config: dict) -> dict:
+    """Build the report of a run.
+
+    Only the run's settings and measurements go in, rounded to a sensible
+    precision, with no timestamps or host details, so two reports of the
+    same scenario differ only where the target behaved differently.
+    """
+    by_kind: dict[str, list[Sample]] = {}
+    for sample in result.samples:
+        by_kind.setdefault(sample.kind, []).append(sample)
+    overall = _summarise(result.samples, result.elapsed)
+    overall["dropped"] = result.dropped
+    overall["duration_s"] = round(result.elapsed, 1)
+    return {
+        "config": config,
+        "overall": overall,
+        "kinds": {
+            kind: _summarise(samples, result.elapsed) for kind, samples in sorted(by_kind.items())
+        },
+    }
+
+
+def dumps(report: dict) -> str:
+    """Serialise a report with sorted keys, one value per line, for diffing."""
+    return json.dumps(report, indent=2, sort_keys=True) + "\n"
+
+
+def render_text(report: dict) -> str:
+    """A fixed-width table of a report, for the terminal."""
+    lines = []
+    overall = report["overall"]
+    lines.append(
+        f"{overall['requests']} requests in {overall['duration_s']}s: "
+        f"{overall['throughput_rps']} req/s, error rate {overall['error_rate']:.2%}, "
+        f"{overall['dropped']} dropped"
+    )
+    if overall["error_reasons"]:
+        reasons = overall["error_reasons"].items()
+        lines.append("errors: " + ", ".join(f"{reason} x{n}" for reason, n in reasons))
+    header = f"{'kind':<22}{'metric':<16}" + "".join(f"{name:>10}" for name in (*QUANTILES, "max"))
+    lines += ["", header, "-" * len(header)]
+    for kind, summary in report["kinds"].items():
+        for metric in ("ttft_ms", "inter_token_ms", "total_ms"):
+            values = summary.get(metric)
+            if values:
+                cells = "".join(f"{values[name]:>10.1f}" for name in (*QUANTILES, "max"))
+                lines.append(f"{kind:<22}{metric:<16}{cells}")
+    return "\n".join(lines) + "\n"
+
+
+def _flatten(value, prefix: str = "") -> dict:
+    if isinstance(value, dict):
+        flat = {}
+        for key, item in value.items():
+            flat.update(_flatten(item, f"{prefix}.{key}" if prefix else str(key)))
+        return flat
+    return {prefix: value}
+
+
+def diff(before: dict, after: dict) -> str:
+    """Compare two reports value by value, with relative change for numbers."""
+    old, new = _flatten(before), _flatten(after)
+    lines = []
+    for key in sorted(old.keys() | new.keys()):
+        a, b = old.get(key), new.get(key)
+        if a == b:
+            continue
+        change = ""
+        numbers = all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in (a, b))
+        if numbers and a:
+            change = f" ({(b - a) / abs(a):+.1%})"
+        lines.append(f"{key}: {a} -> {b}{change}")
+    return "\n".join(lines) + "\n" if lines else "No differences\n"
@@ -0,0 +1,211 @@
+"""Send a request mix at a target rate or concurrency and time every response."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import random
+import time
+from dataclasses import dataclass, field
+
+import httpx
+
+from .scenario import Mix, RequestSpec
+
+
+@dataclass
+class Sample:
+    """Timings and outcome of one request."""
+
+    kind: str
+    status: int | None = None
+    error: str | None = None
+    #: Seconds from sending the request to the first content token (streams only).
+    ttft: float | None = None
+    #: Seconds between successive content tokens (streams only).
+    inter_token: list[float] = field(default_factory=list)
+    total: float | None = None
+    tokens: int = 0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+@dataclass
+class RunConfig:
+    """How hard and how long to drive the target."""
+
+    target: str
+    #: Open loop: requests per second, sent on schedule whatever the target does.
+    rps: float | None = None
+    #: Closed loop: requests kept in flight.
+    concurrency: int | None = None
+    duration: float | None = 30.0
+    requests: int | None = None
+    #: Poisson arrivals (open loop), as from independent clients; else evenly spaced.
+    poisson: bool = True
+    #: Replays at recorded offsets run this many times faster.
+    speed: float = 1.0
+    #: Open loop cap; arrivals beyond it are counted as dropped, not queued.
+    max_in_flight: int = 1000
+    timeout: float = 120.0
+    api_key: str | None = None
+    seed: int = 0
+
+
+@dataclass
+class RunResult:
+    samples: list[Sample]
+    elapsed: float
+    dropped: int = 0
+
+
+def _content(event: dict) -> str | None:
+    choices = event.get("choices") or []
+    if not choices:
+        return None
+    return (choices[0].get("delta") or {}).get("content")
+
+
+async def send(client: httpx.AsyncClient, spec: RequestSpec) -> Sample:
+    """Send one request and time it, reading streams event by event."""
+    sample = Sample(spec.kind)
+    started = time.perf_counter()
+    last_token = None
+    try:
+        async with client.stream("POST", spec.path, json=spec.body) as response:
+            sample.status = response.status_code
+            if response.status_code >= 400:
+                await response.aread()
+                sample.error = f"HTTP {response.status_code}"
+            elif spec.stream:
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == "[DONE]":
+                        break
+                    now = time.perf_counter()
+                    event = json.loads(data)
+                    if "error" in event:
+                        error = event["error"]
+                        reason = error.get("type", "unknown") if isinstance(error, dict) else error
+                        sample.error = f"stream error: {reason}"
+                        break
+                    if not _content(event):
+                        continue
+                    sample.tokens += 1
+                    if last_token is None:
+                        sample.ttft = now - started
+                    else:
+                        sample.inter_token.append(now - last_token)
+                    last_token = now
+                else:
+                    if sample.error is None:
+                        sample.error = "stream ended without [DONE]"
+            else:
+                json.loads(await response.aread())
+    except httpx.TimeoutException:
+        sample.error = "timeout"
+    except Exception as e:
+        # Connection failures, malformed bodies: all count as errors of the run
+        sample.error = type(e).__name__
+    sample.total = time.perf_counter() - started
+    return sample
+
+
+def _arrivals(config: RunConfig, mix: Mix, rng: random.Random):
+    """Yield (seconds since start, request) for an open-loop run."""
+    index = 0
+    at = 0.0
+    while config.requests is None or index < config.requests:
+        if mix.timed and index >= len(mix.specs):
+            return
+        spec = mix.pick(rng, index)
+        if mix.timed:
+            at = spec.offset / config.speed
+        elif not config.poisson:
+            at = index / config.rps
+        elif index:
+            at += rng.expovariate(config.rps)
+        if config.duration is not None and at > config.duration:
+            return
+        yield at, spec
+        index += 1
+
+
+async def _open_loop(
+    client: httpx.AsyncClient, config: RunConfig, mix: Mix, rng: random.Random
+) -> RunResult:
+    samples: list[Sample] = []
+    in_flight: set[asyncio.Task] = set()
+    dropped = 0
+    started = time.perf_counter()
+    for at, spec in _arrivals(config, mix, rng):
+        delay = started + at - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if len(in_flight) >= config.max_in_flight:
+            dropped += 1
+            continue
+        task = asyncio.create_task(send(client, spec))
+        task.add_done_callback(lambda t: samples.append(t.result()))
+        in_flight.add(task)
+        task.add_done_callback(in_flight.discard)
+    if in_flight:
+        await asyncio.wait(in_flight)
+    return RunResult(samples, time.perf_counter() - started, dropped)
+
+
+async def _closed_loop(
+    client: httpx.AsyncClient, config: RunConfig, mix: Mix, rng: random.Random
+) -> RunResult:
+    samples: list[Sample] = []
+    started = time.perf_counter()
+    deadline = None if config.duration is None else started + config.duration
+    issued = 0
+
+    async def worker() -> None:
+        nonlocal issued
+        while (config.requests is None or issued < config.requests) and (
+            deadline is None or time.perf_counter() < deadline
+        ):
+            spec = mix.pick(rng, issued)
+            issued += 1
+            samples.append(await send(client, spec))
+
+    await asyncio.gather(*(worker() for _ in range(config.concurrency)))
+    return RunResult(samples, time.perf_counter() - started)
+
+
+async def run(
+    config: RunConfig, mix: Mix, transport: httpx.AsyncBaseTransport | None = None
+) -> RunResult:
+    """Drive the target with the mix and collect a sample per request.
+
+    Raises:
+        ValueError: If neither or both of rps and concurrency are set (a timed
+            replay needs neither), or the run has no end.
+    """
+    if mix.timed:
+        if config.concurrency is not None:
+            raise ValueError("A timed replay sets its own pace; drop --concurrency")
+    elif (config.rps is None) == (config.concurrency is None):
+        raise ValueError("Set exactly one of rps (open loop) or concurrency (closed loop)")
+    if config.duration is None and config.requests is None and not mix.timed:
+        raise ValueError("Set a duration or a number of requests")
+
+    rng = random.Random(config.seed)
+    headers = {"Authorization": f"Bearer {config.api_key}"} if config.api_key else {}
+    connections = config.concurrency or config.max_in_flight
+    async with httpx.AsyncClient(
+        base_url=config.target,
+        headers=headers,
+        timeout=config.timeout,
+        limits=httpx.Limits(max_connections=connections, max_keepalive_connections=connections),
+        transport=transport,
+    ) as client:
+        if config.concurrency is not None:
+            return await _closed_loop(client, config, mix, rng)
+        return await _open_loop(client, config, mix, rng)
@@ -0,0 +1,189 @@
+"""Request mixes: synthetic weighted mixes and recorded request replays."""
+
+from __future__ import annotations
+
+import base64
+import io
+import json
+import math
+import random
+import struct
+import wave
+from dataclasses import dataclass, field
+from pathlib import Path
+
+CHAT_PATH = "/v1/chat/completions"
+
+#: Request kinds a synthetic mix can contain.
+KINDS = ("chat", "chat_stream", "transcription", "transcription_stream")
+
+#: Default mix and model per target service. Voxtral and Whisper both take
+#: base64 audio on /v1/chat/completions; only Voxtral streams its output.
+PROFILES: dict[str, dict] = {
+    "ai-proxy": {"mix": {"chat": 1.0, "chat_stream": 3.0}, "model": "gemini-2.5-flash"},
+    "voxtral": {
+        "mix": {"transcription_stream": 3.0, "transcription": 1.0},
+        "model": "voxtral-mini",
+    },
+    "whisper": {"mix": {"transcription": 1.0}, "model": "whisper-1"},
+}
+
+_WORDS = (
+    "summarise the following journal entry and list any open tasks with their due dates "
+    "then suggest a short title for the entry and flag anything that sounds urgent"
+).split()
+
+
+@dataclass(frozen=True)
+class RequestSpec:
+    """One HTTP request the generator sends."""
+
+    kind: str
+    path: str
+    body: dict
+    stream: bool
+    #: Seconds after the start of the run, for replays at recorded timing.
+    offset: float | None = None
+
+
+@dataclass
+class Mix:
+    """A source of requests: a weighted synthetic mix or a recorded replay."""
+
+    specs: list[RequestSpec]
+    weights: list[float] = field(default_factory=list)
+    #: Replay in order (and at recorded offsets, when every spec has one).
+    sequential: bool = False
+
+    @property
+    def timed(self) -> bool:
+        return self.sequential and all(spec.offset is not None for spec in self.specs)
+
+    def pick(self, rng: random.Random, index: int) -> RequestSpec:
+        """The request to send as the ``index``-th of the run."""
+        if self.sequential:
+            return self.specs[index % len(self.specs)]
+        return rng.choices(self.specs, weights=self.weights)[0]
+
+
+def parse_mix(text: str) -> dict[str, float]:
+    """Parse ``chat=1,chat_stream=3`` into kind weights.
+
+    Raises:
+        ValueError: For unknown kinds or weights that are not positive numbers.
+    """
+    weights: dict[str, float] = {}
+    for item in filter(None, (part.strip() for part in text.split(","))):
+        kind, _, weight = item.partition("=")
+        kind = kind.strip()
+        if kind not in KINDS:
+            raise ValueError(f"Unknown request kind '{kind}' (expected one of {', '.join(KINDS)})")
+        try:
+            weights[kind] = float(weight) if weight else 1.0
+        except ValueError:
+            raise ValueError(f"Invalid weight for '{kind}': {weight!r}") from None
+        if weights[kind] <= 0:
+            raise ValueError(f"Weight for '{kind}' must be positive")
+    if not weights:
+        raise ValueError("The request mix is empty")
+    return weights
+
+
+def tone_wav(seconds: float = 2.0, sample_rate: int = 16000, frequency: float = 440.0) -> bytes:
+    """A mono 16-bit sine tone as WAV bytes, the default audio fixture."""
+    frames = int(seconds * sample_rate)
+    step = 2 * math.pi * frequency / sample_rate
+    samples = (int(0.3 * 32767 * math.sin(step * i)) for i in range(frames))
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(struct.pack(f"<{frames}h", *samples))
+    return buffer.getvalue()
+
+
+def _prompt(words: int, rng: random.Random) -> str:
+    return " ".join(rng.choice(_WORDS) for _ in range(words))
+
+
+def synthetic_mix(
+    weights: dict[str, float],
+    model: str,
+    *,
+    audio: list[bytes] | None = None,
+    prompt_words: int = 60,
+    max_tokens: int | None = 256,
+    variants: int = 8,
+    seed: int = 0,
+) -> Mix:
+    """Build a weighted mix of synthetic requests.
+
+    Each kind gets ``variants`` distinct requests (different prompts or audio
+    fixtures) so response caches and request coalescing in the target do not
+    turn the run into a cache benchmark.
+    """
+    rng = random.Random(seed)
+    clips = [base64.b64encode(clip).decode("ascii") for clip in (audio or [tone_wav()])]
+    specs: list[RequestSpec] = []
+    spec_weights: list[float] = []
+    for kind, weight in weights.items():
+        stream = kind.endswith("_stream")
+        for i in range(variants):
+            if kind.startswith("chat"):
+                body: dict = {
+                    "model": model,
+                    "messages": [
+                        {"role": "user", "content": f"[{i}] {_prompt(prompt_words, rng)}"}
+                    ],
+                    "stream": stream,
+                }
+                if max_tokens is not None:
+                    body["max_tokens"] = max_tokens
+            else:
+                body = {
+                    "model": model,
+                    "messages": [{"role": "user", "content": "Transcribe this audio."}],
+                    "audio": clips[i % len(clips)],
+                    "stream": stream,
+                }
+            specs.append(RequestSpec(kind, CHAT_PATH, body, stream))
+            spec_weights.append(weight / variants)
+    return Mix(specs, spec_weights)
+
+
+def load_replay(path: Path) -> Mix:
+    """Load recorded requests from a JSON Lines file.
+
+    Each line is ``{"body": {...}}`` with optional ``"path"`` (default
+    ``/v1/chat/completions``), ``"kind"`` (derived from the body otherwise) and
+    ``"offset"`` (seconds since the recording started). When every line has
+    an offset the requests are replayed at their recorded timing.
+
+    Raises:
+        ValueError: For lines that are not JSON objects with a ``body``.
+    """
+    specs = []
+    for number, line in enumerate(Path(path).read_text(encoding="utf-8").splitlines(), 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+            body = record["body"]
+        except (json.JSONDecodeError, KeyError, TypeError) as e:
+            raise ValueError(
+                f"{path}:{number}: expected a JSON object with a 'body': {e}"
+            ) from None
+        stream = bool(body.get("stream"))
+        kind = record.get("kind") or (
+            ("transcription" if "audio" in body else "chat") + ("_stream" if stream else "")
+        )
+        offset = record.get("offset")
+        offset = None if offset is None else float(offset)
+        specs.append(RequestSpec(kind, record.get("path", CHAT_PATH), body, stream, offset))
+    if not specs:
+        raise ValueError(f"{path}: no requests to replay")
+    mix = Mix(specs, sequential=True)
+    if mix.timed:
+        specs.sort(key=lambda spec: spec.offset)
+    return mix
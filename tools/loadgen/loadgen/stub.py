@@ -0,0 +1,207 @@
+"""An offline stand-in for the ai-proxy, voxtral-local, whisper_server or a provider.
+
+Speaks the OpenAI-style API the generator drives: ``POST /v1/chat/completions``
+(chat, SSE streaming, and transcription when the body carries ``audio``),
+``POST /v1/audio/transcriptions`` and ``GET /health``. Responses are synthetic
+but shaped like the real services', with configurable time to first token,
+token pacing and error rate, so runs need neither network nor models. It also
+works as an ai-proxy provider backend (``PROVIDER_BACKENDS`` pointing at
+``http://127.0.0.1:<port>/v1``) to load the real proxy offline.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import random
+import socket
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+
+import uvicorn
+
+
+@dataclass
+class StubBehaviour:
+    """How the stub answers."""
+
+    #: Seconds before the first token (or before a non-streamed answer starts).
+    ttft: float = 0.2
+    #: Seconds between tokens.
+    token_interval: float = 0.02
+    #: Tokens per answer.
+    tokens: int = 40
+    #: Fraction of requests answered with a 503.
+    error_rate: float = 0.0
+    seed: int = 0
+
+
+_POST_PATHS = ("/chat/completions", "/audio/transcriptions")
+
+
+class StubApp:
+    """Plain ASGI app serving synthetic completions and transcriptions."""
+
+    def __init__(self, behaviour: StubBehaviour | None = None) -> None:
+        self.behaviour = behaviour or StubBehaviour()
+        self._rng = random.Random(self.behaviour.seed)
+        self.requests = 0
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] == "lifespan":
+            while (await receive())["type"] != "lifespan.shutdown":
+                await send({"type": "lifespan.startup.complete"})
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+        if scope["type"] != "http":
+            return
+
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+
+        path = scope["path"]
+        if scope["method"] == "GET" and path == "/health":
+            await _json(send, 200, {"status": "healthy", "service": "loadgen-stub"})
+            return
+        if scope["method"] != "POST" or not path.endswith(_POST_PATHS):
+            await _json(send, 404, {"detail": "Not Found"})
+            return
+
+        self.requests += 1
+        try:
+            request = json.loads(body or b"{}")
+        except json.JSONDecodeError:
+            await _json(send, 400, {"detail": "Invalid JSON"})
+            return
+        if self._rng.random() < self.behaviour.error_rate:
+            await _json(send, 503, {"detail": "Stub provider overloaded"})
+            return
+
+        model = request.get("model", "stub")
+        if path.endswith("/audio/transcriptions"):
+            await asyncio.sleep(self._answer_time())
+            await _json(send, 200, {"text": self._text(), "model": model})
+        elif request.get("stream"):
+            await self._stream(send, model)
+        else:
+            await asyncio.sleep(self._answer_time())
+            text = self._text()
+            await _json(send, 200, _completion(model, text, self.behaviour.tokens))
+
+    def _answer_time(self) -> float:
+        behaviour = self.behaviour
+        return behaviour.ttft + behaviour.token_interval * max(0, behaviour.tokens - 1)
+
+    def _text(self) -> str:
+        return " ".join(f"token{i}" for i in range(self.behaviour.tokens))
+
+    async def _stream(self, send, model: str) -> None:
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:8]}"
+        created = int(time.time())
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [
+                    (b"content-type", b"text/event-stream"),
+                    (b"cache-control", b"no-cache"),
+                ],
+            }
+        )
+
+        async def event(
+            delta: dict, finish_reason: str | None = None, usage: dict | None = None
+        ) -> None:
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            if usage is not None:
+                chunk["usage"] = usage
+            payload = f"data: {json.dumps(chunk, separators=(',', ':'))}\n\n".encode()
+            await send({"type": "http.response.body", "body": payload, "more_body": True})
+
+        await event({"role": "assistant"})
+        await asyncio.sleep(self.behaviour.ttft)
+        for i in range(self.behaviour.tokens):
+            if i:
+                await asyncio.sleep(self.behaviour.token_interval)
+            await event({"content": f"token{i} "})
+        tokens = self.behaviour.tokens
+        await event({}, "stop", _usage(tokens))
+        await send({"type": "http.response.body", "body": b"data: [DONE]\n\n"})
+
+
+def _completion(model: str, text: str, tokens: int) -> dict:
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:8]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": text},
+                "finish_reason": "stop",
+            }
+        ],
+        "usage": _usage(tokens),
+    }
+
+
+def _usage(tokens: int) -> dict:
+    return {"prompt_tokens": 10, "completion_tokens": tokens, "total_tokens": 10 + tokens}
+
+
+async def _json(send, status: int, payload: dict) -> None:
+    body = json.dumps(payload).encode()
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
+
+
+class StubServer:
+    """Runs a StubApp under uvicorn in a background thread."""
+
+    def __init__(
+        self, behaviour: StubBehaviour | None = None, host: str = "127.0.0.1", port: int = 0
+    ) -> None:
+        if not port:
+            with socket.socket() as sock:
+                sock.bind((host, 0))
+                port = sock.getsockname()[1]
+        self.app = StubApp(behaviour)
+        self.url = f"http://{host}:{port}"
+        config = uvicorn.Config(self.app, host=host, port=port, log_level="warning")
+        self._server = uvicorn.Server(config)
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+
+    def __enter__(self) -> "StubServer":
+        self._thread.start()
+        deadline = time.monotonic() + 5
+        while not self._server.started:
+            if time.monotonic() > deadline or not self._thread.is_alive():
+                raise RuntimeError(f"Stub server did not start on {self.url}")
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.should_exit = True
+        self._thread.join(timeout=5)
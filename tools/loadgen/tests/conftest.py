@@ -0,0 +1,21 @@
+"""Pytest configuration and shared fixtures."""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from loadgen import StubBehaviour, StubServer  # noqa: E402
+
+# Configure pytest-asyncio
+pytest_plugins = ["pytest_asyncio"]
+
+
+@pytest.fixture
+def stub():
+    """A fast stub: 30 ms to the first token, then 5 tokens 5 ms apart."""
+    with StubServer(StubBehaviour(ttft=0.03, token_interval=0.005, tokens=5)) as server:
+        yield server
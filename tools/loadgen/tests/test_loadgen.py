@@ -0,0 +1,236 @@
+"""Tests for the load generator: mixes, the runner against the stub, and reports."""
+
+import io
+import json
+import random
+import wave
+
+import pytest
+
+from loadgen import (
+    Mix,
+    RequestSpec,
+    RunConfig,
+    RunResult,
+    Sample,
+    StubBehaviour,
+    StubServer,
+    build_report,
+    diff,
+    load_replay,
+    parse_mix,
+    percentiles,
+    run,
+    synthetic_mix,
+    tone_wav,
+)
+from loadgen.__main__ import main
+from loadgen.report import dumps
+from loadgen.scenario import CHAT_PATH
+
+
+class TestScenario:
+    def test_parse_mix(self):
+        assert parse_mix("chat=1, chat_stream=3,transcription") == {
+            "chat": 1.0,
+            "chat_stream": 3.0,
+            "transcription": 1.0,
+        }
+
+    @pytest.mark.parametrize("text", ["", "video=1", "chat=0", "chat=lots"])
+    def test_parse_mix_rejects_bad_input(self, text):
+        with pytest.raises(ValueError):
+            parse_mix(text)
+
+    def test_synthetic_mix_follows_the_weights(self):
+        mix = synthetic_mix({"chat": 1, "chat_stream": 3}, "gemini-2.5-flash")
+        rng = random.Random(1)
+
+        kinds = [mix.pick(rng, i).kind for i in range(4000)]
+
+        assert 0.70 < kinds.count("chat_stream") / len(kinds) < 0.80
+        # Distinct prompts, so caches in the target do not answer the run
+        assert len({json.dumps(spec.body) for spec in mix.specs}) == len(mix.specs)
+
+    def test_transcriptions_carry_the_audio_fixture(self):
+        mix = synthetic_mix(
+            {"transcription_stream": 1}, "voxtral-mini", audio=[b"RIFF-1", b"RIFF-2"]
+        )
+
+        assert {spec.body["audio"] for spec in mix.specs} == {"UklGRi0x", "UklGRi0y"}
+        assert all(spec.stream and spec.body["stream"] for spec in mix.specs)
+
+    def test_tone_wav_is_a_valid_wav(self):
+        with wave.open(io.BytesIO(tone_wav(seconds=0.5, sample_rate=8000))) as wav:
+            assert wav.getnframes() == 4000
+            assert wav.getframerate() == 8000
+
+    def test_load_replay(self, tmp_path):
+        path = tmp_path / "recorded.jsonl"
+        path.write_text(
+            '{"offset": 0.5, "body": {"model": "m", "messages": [], "stream": true}}\n'
+            "\n"
+            '{"offset": 0.1, "path": "/v1/audio/transcriptions", "body": {"audio": "x"}}\n'
+        )
+
+        mix = load_replay(path)
+
+        assert mix.timed
+        assert [spec.kind for spec in mix.specs] == ["transcription", "chat_stream"]
+        assert mix.specs[0].path == "/v1/audio/transcriptions"
+
+    def test_load_replay_rejects_records_without_a_body(self, tmp_path):
+        path = tmp_path / "recorded.jsonl"
+        path.write_text('{"path": "/v1/chat/completions"}\n')
+
+        with pytest.raises(ValueError, match="recorded.jsonl:1"):
+            load_replay(path)
+
+
+class TestRunner:
+    @pytest.mark.asyncio
+    async def test_streams_are_timed_per_token(self, stub):
+        mix = synthetic_mix({"chat_stream": 1}, "gemini-2.5-flash")
+
+        result = await run(RunConfig(stub.url, concurrency=4, duration=None, requests=12), mix)
+
+        assert len(result.samples) == 12
+        for sample in result.samples:
+            assert sample.ok and sample.status == 200
+            assert sample.tokens == 5
+            assert sample.ttft >= 0.03
+            assert len(sample.inter_token) == 4
+            assert sample.total >= sample.ttft
+
+    @pytest.mark.asyncio
+    async def test_non_streamed_requests_have_no_ttft(self, stub):
+        mix = synthetic_mix({"chat": 1, "transcription": 1}, "whisper-1")
+
+        result = await run(RunConfig(stub.url, concurrency=2, duration=None, requests=6), mix)
+
+        for sample in result.samples:
+            assert sample.ok and sample.ttft is None and sample.total > 0
+
+    @pytest.mark.asyncio
+    async def test_open_loop_sends_at_the_target_rate(self, stub):
+        mix = synthetic_mix({"chat": 1}, "gemini-2.5-flash")
+
+        result = await run(RunConfig(stub.url, rps=50, duration=0.5, poisson=False), mix)
+
+        # Arrivals at 0, 20, ..., 500 ms
+        assert len(result.samples) == 26
+        assert result.dropped == 0
+
+    @pytest.mark.asyncio
+    async def test_errors_are_counted(self):
+        mix = synthetic_mix({"chat_stream": 1}, "gemini-2.5-flash")
+        with StubServer(StubBehaviour(ttft=0, token_interval=0, error_rate=1.0)) as failing:
+            config = RunConfig(failing.url, concurrency=2, duration=None, requests=4)
+            result = await run(config, mix)
+
+        assert [sample.error for sample in result.samples] == ["HTTP 503"] * 4
+
+    @pytest.mark.asyncio
+    async def test_unreachable_target_is_an_error_not_a_crash(self):
+        mix = synthetic_mix({"chat": 1}, "gemini-2.5-flash")
+
+        config = RunConfig("http://127.0.0.1:9", concurrency=1, duration=None, requests=1)
+        result = await run(config, mix)
+
+        assert result.samples[0].error == "ConnectError"
+
+    @pytest.mark.asyncio
+    async def test_timed_replay_keeps_the_recorded_spacing(self, stub):
+        body = {"model": "m", "messages": [{"role": "user", "content": "hi"}]}
+        specs = [RequestSpec("chat", CHAT_PATH, body, False, offset) for offset in (0, 0.2, 0.4)]
+        mix = Mix(specs, sequential=True)
+
+        result = await run(RunConfig(stub.url, duration=None, speed=2.0), mix)
+
+        assert len(result.samples) == 3
+        assert 0.2 <= result.elapsed < 0.6
+
+    @pytest.mark.asyncio
+    async def test_pace_must_be_set_once(self, stub):
+        mix = synthetic_mix({"chat": 1}, "gemini-2.5-flash")
+
+        with pytest.raises(ValueError):
+            await run(RunConfig(stub.url, rps=1, concurrency=1), mix)
+
+
+def _result(totals_ms: list[float], errors: int = 0) -> RunResult:
+    samples = [
+        Sample("chat_stream", 200, ttft=t / 2000, inter_token=[0.01], total=t / 1000, tokens=2)
+        for t in totals_ms
+    ]
+    samples += [Sample("chat", 503, error="HTTP 503", total=0.001) for _ in range(errors)]
+    return RunResult(samples, elapsed=2.0)
+
+
+class TestReport:
+    def test_percentiles_use_nearest_rank(self):
+        values = [i / 1000 for i in range(1, 101)]
+
+        assert percentiles(values) == {
+            "p50": 50.0,
+            "p90": 90.0,
+            "p95": 95.0,
+            "p99": 99.0,
+            "max": 100.0,
+        }
+        assert percentiles([]) is None
+
+    def test_report_summarises_per_kind(self):
+        report = build_report(_result([100, 200, 300, 400], errors=1), {"seed": 0})
+
+        assert report["overall"]["requests"] == 5
+        assert report["overall"]["error_rate"] == 0.2
+        assert report["kinds"]["chat"]["error_reasons"] == {"HTTP 503": 1}
+        assert report["kinds"]["chat_stream"]["ttft_ms"]["p50"] == 100.0
+        assert report["kinds"]["chat_stream"]["tokens_per_second"] == 4.0
+
+    def test_identical_runs_give_identical_reports(self):
+        first = dumps(build_report(_result([100, 200]), {"seed": 0}))
+        second = dumps(build_report(_result([100, 200]), {"seed": 0}))
+
+        assert first == second
+        assert diff(json.loads(first), json.loads(second)) == "No differences\n"
+
+    def test_diff_shows_relative_changes(self):
+        before = build_report(_result([100, 200]), {})
+        after = build_report(_result([100, 300]), {})
+
+        assert "kinds.chat_stream.total_ms.max: 200.0 -> 300.0 (+50.0%)" in diff(before, after)
+
+
+def test_cli_run_against_the_stub_writes_a_report(tmp_path, capsys):
+    report_path = tmp_path / "report.json"
+
+    code = main(
+        [
+            "run",
+            "--stub",
+            "--profile",
+            "voxtral",
+            "--concurrency",
+            "4",
+            "--requests",
+            "8",
+            "--stub-ttft-ms",
+            "10",
+            "--stub-token-ms",
+            "1",
+            "--stub-tokens",
+            "3",
+            "--report",
+            str(report_path),
+            "--fail-on-error-rate",
+            "0",
+        ]
+    )
+
+    report = json.loads(report_path.read_text())
+    assert code == 0
+    assert report["overall"]["requests"] == 8
+    assert report["config"]["model"] == "voxtral-mini"
+    assert "transcription_stream" in capsys.readouterr().out